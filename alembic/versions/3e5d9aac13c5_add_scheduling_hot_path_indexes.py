@@ -0,0 +1,101 @@
+"""add scheduling hot path indexes
+
+Revision ID: 3e5d9aac13c5
+Revises: 48ef455a6386
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e5d9aac13c5'
+down_revision: Union[str, Sequence[str], None] = '48ef455a6386'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - kept in sync with __table_args__ in app/models.py
+INDEXES = [
+    ('idx_shiftassignment_schedule_day_shift', 'shiftassignment', ['schedule_id', 'day', 'shift']),
+    ('idx_shiftassignment_schedule_staff_day', 'shiftassignment', ['schedule_id', 'staff_id', 'day']),
+    ('idx_shiftassignment_staff_schedule', 'shiftassignment', ['staff_id', 'schedule_id']),
+    ('idx_staff_facility_active', 'staff', ['facility_id', 'is_active']),
+    ('idx_staff_email', 'staff', ['email']),
+    ('idx_staff_email_lower', 'staff', [sa.text('lower(email)')]),
+    ('idx_staffunavailability_staff_start_end', 'staffunavailability', ['staff_id', 'start', 'end']),
+    ('idx_notification_recipient_read_created_at', 'notification', ['recipient_user_id', 'is_read', 'created_at']),
+    ('idx_swaprequest_schedule_status', 'swaprequest', ['schedule_id', 'status']),
+    ('idx_swaprequest_requesting_created_at', 'swaprequest', ['requesting_staff_id', 'created_at']),
+    ('idx_swaprequest_target_status', 'swaprequest', ['target_staff_id', 'status']),
+    ('idx_swaprequest_assigned_status', 'swaprequest', ['assigned_staff_id', 'status']),
+]
+
+SCHEDULE_REFERENCES = ['shiftassignment', 'swaprequest', 'zoneassignment', 'scheduleoptimization']
+
+
+def _remove_empty_duplicate_schedules() -> None:
+    """
+    Drop duplicate (facility_id, week_start) schedules that nothing refers to,
+    keeping a referenced one or else the newest. Duplicates that both carry
+    data must be merged by hand before the unique index can be built.
+    """
+    unreferenced = " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.schedule_id = {{alias}}.id)"
+        for table in SCHEDULE_REFERENCES
+    )
+    deleted = op.get_bind().execute(sa.text(f"""
+        DELETE FROM schedule s
+        WHERE {unreferenced.format(alias='s')}
+          AND EXISTS (
+              SELECT 1 FROM schedule keep
+              WHERE keep.facility_id = s.facility_id
+                AND keep.week_start = s.week_start
+                AND keep.id <> s.id
+                AND (
+                    NOT ({unreferenced.format(alias='keep')})
+                    OR (COALESCE(keep.created_at, 'epoch'), keep.id::text)
+                       > (COALESCE(s.created_at, 'epoch'), s.id::text)
+                )
+          )
+    """)).rowcount
+    if deleted:
+        print(f"🗑️ Removed {deleted} empty duplicate schedules")
+
+    remaining = op.get_bind().execute(sa.text("""
+        SELECT facility_id, week_start, count(*) FROM schedule
+        GROUP BY facility_id, week_start HAVING count(*) > 1
+    """)).all()
+    if remaining:
+        listed = ", ".join(f"{facility_id}/{week_start} ({count})" for facility_id, week_start, count in remaining[:10])
+        raise RuntimeError(
+            f"{len(remaining)} facility weeks have several schedules with assignments or swaps: {listed}. "
+            f"Merge or delete them, then run the migration again."
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _remove_empty_duplicate_schedules()
+
+    # Build without blocking writes to the hot tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_schedule_facility_week', 'schedule', ['facility_id', 'week_start'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True
+        )
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+    print("✅ Added scheduling hot path indexes")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.drop_index('uq_schedule_facility_week', table_name='schedule', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,59 @@
+"""add assignment cell unique indexes
+
+Revision ID: 7c2f4e9b1d3a
+Revises: 3e5d9aac13c5
+Create Date: 2026-10-18 22:05:47.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f4e9b1d3a'
+down_revision: Union[str, Sequence[str], None] = '3e5d9aac13c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, ordering of duplicates - the greatest is kept) - kept in sync with app/models.py
+INDEXES = [
+    ('uq_shiftassignment_cell', 'shiftassignment', ['schedule_id', 'day', 'shift', 'staff_id'], '{t}.id::text'),
+    ('uq_zoneassignment_cell', 'zoneassignment', ['schedule_id', 'staff_id', 'day', 'shift'],
+     "(COALESCE({t}.created_at, 'epoch'), {t}.id::text)"),
+]
+
+
+def _remove_duplicate_cells(table: str, columns: list, newest: str) -> None:
+    """Keep one row per cell; nothing references assignment rows by id"""
+    same_cell = " AND ".join(f"dup.{column} = keep.{column}" for column in columns)
+    deleted = op.get_bind().execute(sa.text(f"""
+        DELETE FROM {table} dup
+        USING {table} keep
+        WHERE {same_cell}
+          AND {newest.format(t='dup')} < {newest.format(t='keep')}
+    """)).rowcount
+    if deleted:
+        print(f"🗑️ Removed {deleted} duplicate {table} rows")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns, newest in INDEXES:
+        _remove_duplicate_cells(table, columns, newest)
+
+    # Build without blocking writes to the hot tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, _ in INDEXES:
+            op.create_index(name, table, columns, unique=True, postgresql_concurrently=True, if_not_exists=True)
+
+    print("✅ Added assignment cell unique indexes")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,42 @@
+"""add schedule version and change log
+
+Revision ID: b81d0c4f6e27
+Revises: 7c2f4e9b1d3a
+Create Date: 2026-10-18 23:40:12.550931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d0c4f6e27'
+down_revision: Union[str, Sequence[str], None] = '7c2f4e9b1d3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default: no table rewrite on PostgreSQL 11+
+    op.add_column('schedule', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    op.create_table('schedulechange',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('schedule_id', sa.Uuid(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changes', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['schedule_id'], ['schedule.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_schedulechange_schedule_version', 'schedulechange', ['schedule_id', 'version'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_schedulechange_schedule_version', table_name='schedulechange')
+    op.drop_table('schedulechange')
+    op.drop_column('schedule', 'version')
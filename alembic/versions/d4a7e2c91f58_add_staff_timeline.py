@@ -0,0 +1,47 @@
+"""add staff timeline
+
+Revision ID: d4a7e2c91f58
+Revises: b81d0c4f6e27
+Create Date: 2026-10-19 01:12:47.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e2c91f58'
+down_revision: Union[str, Sequence[str], None] = 'b81d0c4f6e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stafftimelineentry',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('staff_id', sa.Uuid(), nullable=False),
+        sa.Column('shift_date', sa.Date(), nullable=False),
+        sa.Column('shift', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('schedule_id', sa.Uuid(), nullable=False),
+        sa.Column('facility_id', sa.Uuid(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill from existing assignments before indexing
+    op.execute("""
+        INSERT INTO stafftimelineentry (id, staff_id, shift_date, shift, day, schedule_id, facility_id)
+        SELECT sa.id, sa.staff_id, s.week_start + sa.day, sa.shift, sa.day, sa.schedule_id, s.facility_id
+        FROM shiftassignment sa
+        JOIN schedule s ON s.id = sa.schedule_id
+    """)
+    op.create_index('idx_stafftimelineentry_staff_date', 'stafftimelineentry', ['staff_id', 'shift_date', 'shift'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_stafftimelineentry_staff_date', table_name='stafftimelineentry')
+    op.drop_table('stafftimelineentry')
@@ -0,0 +1,34 @@
+"""add user email lower index
+
+Revision ID: e6b3f1a8c042
+Revises: d4a7e2c91f58
+Create Date: 2026-10-19 02:05:18.611934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f1a8c042'
+down_revision: Union[str, Sequence[str], None] = 'd4a7e2c91f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build without blocking logins and staff lookups
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_email_lower', 'user', [sa.text('lower(email)')],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_user_email_lower', table_name='user', postgresql_concurrently=True, if_exists=True)
@@ -5,16 +5,17 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from uuid import UUID
 
-from ...deps import get_db, get_current_user
+from ...deps import get_current_user, get_read_db
 from ...models import Staff, Facility, SwapRequest, SwapHistory
 from ...schemas import StaffRead
+from ...services.user_staff_mapping import UserStaffMappingService
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 @router.get("/staff/{staff_id}/reliability-stats")
 def get_staff_reliability_stats(
     staff_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user),
     days: int = Query(30, description="Number of days to analyze")
 ):
@@ -107,7 +108,7 @@ def get_staff_reliability_stats(
 @router.get("/facilities/{facility_id}/team-insights")
 def get_team_insights(
     facility_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user),
     days: int = Query(30, description="Number of days to analyze")
 ):
@@ -157,12 +158,7 @@ def get_team_insights(
     # Calculate current user's contribution (if staff user)
     your_contribution = 0
     if not current_user.is_manager:
-        user_staff = db.exec(
-            select(Staff).where(
-                Staff.email == current_user.email,
-                Staff.facility_id == facility_id
-            )
-        ).first()
+        user_staff = UserStaffMappingService(db).get_staff_for_user(current_user, facility_id)
         
         if user_staff:
             your_helped = len([r for r in swap_requests if r.assigned_staff_id == user_staff.id])
@@ -192,7 +188,7 @@ def get_team_insights(
 @router.get("/staff/{staff_id}/swap-analytics")
 def get_swap_analytics(
     staff_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user),
     period: str = Query("30d", description="Period: 7d, 30d, 90d")
 ):
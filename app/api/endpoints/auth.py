@@ -12,11 +12,13 @@ from ...core.config import get_settings
 from ...deps import get_current_user, get_db
 from ...models import Facility, PasswordResetToken, Staff, User, Tenant, SecuritySettings 
 from ...schemas import ForgotPasswordRequest, PasswordResetResponse, ResetPasswordRequest, Token, UserCreate, UserRead
-from ...core.security import verify_password, hash_password, create_access_token
+from ...core.security import create_access_token
+from ...core.password_hashing import password_hasher
 from ...services.notification_service import NotificationService, NotificationType
 from ...services.account_lockout_service import AccountLockoutService
 from ...services.audit_service import AuditService, AuditEvent
 from ...services.session_service import SessionService
+from ...services.user_staff_mapping import UserStaffMappingService
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -67,7 +69,7 @@ async def signup(
         # Create user
         user = User(
             email=user_data.email.lower().strip(),
-            hashed_password=hash_password(user_data.password),
+            hashed_password=await password_hasher.hash(user_data.password),
             is_manager=True,
             tenant_id=tenant.id,
         )
@@ -189,15 +191,9 @@ def get_current_user_info(current_user = Depends(get_current_user), db: Session
     
     # If user is staff (not manager), look up their staff record
     if not current_user.is_manager:
-        staff = db.exec(
-            select(Staff).join(Facility).where(
-                Staff.email == current_user.email,
-                Facility.tenant_id == current_user.tenant_id,
-                Staff.is_active == True
-            )
-        ).first()
+        staff = UserStaffMappingService(db).get_staff_for_user(current_user)
         
-        if staff:
+        if staff and staff.is_active:
             user_data.update({
                 "name": staff.full_name,  # ✅ Use actual full name from Staff table
                 "facility_id": str(staff.facility_id),
@@ -243,9 +239,19 @@ async def login_access_token(
         select(User).where(User.email == form_data.username)
     ).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    password_valid = False
+    if user:
+        # Hashing runs off the event loop; hashes made with outdated Argon2
+        # parameters are replaced and saved with the login below
+        password_valid, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+        if password_valid and new_hash:
+            user.hashed_password = new_hash
+    
+    if not user or not password_valid:
         # Record failed attempt
-        await lockout_service.record_failed_attempt(form_data.username, client_ip)
+        await lockout_service.record_failed_attempt(form_data.username, client_ip, user_agent, user=user)
         
         # Log failed login
         await audit_service.log_event(
@@ -320,15 +326,9 @@ async def login_access_token(
     
     # Look up staff record to get full_name
     if not user.is_manager:
-        staff = db.exec(
-            select(Staff).join(Facility).where(
-                Staff.email == user.email,
-                Facility.tenant_id == user.tenant_id,
-                Staff.is_active == True
-            )
-        ).first()
+        staff = UserStaffMappingService(db).get_staff_for_user(user)
         
-        if staff:
+        if staff and staff.is_active:
             user_data.update({
                 "name": staff.full_name,
                 "facility_id": str(staff.facility_id),
@@ -440,7 +440,7 @@ async def reset_password(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Update password
-    user.hashed_password = hash_password(request_data.new_password)
+    user.hashed_password = await password_hasher.hash(request_data.new_password)
     reset_token.used = True
     db.commit()
     
@@ -616,15 +616,9 @@ async def oauth_login(
 
     # Look up staff record for non-managers
     if not user.is_manager:
-        staff = db.exec(
-            select(Staff).join(Facility).where(
-                Staff.email == user.email,
-                Facility.tenant_id == user.tenant_id,
-                Staff.is_active == True
-            )
-        ).first()
+        staff = UserStaffMappingService(db).get_staff_for_user(user)
 
-        if staff:
+        if staff and staff.is_active:
             jwt_extra_data.update({
                 "staff_id": str(staff.id),
                 "facility_id": str(staff.facility_id),
@@ -6,7 +6,7 @@ from typing import List, Optional
 from datetime import datetime, timedelta
 from uuid import UUID
 
-from ...deps import get_db, get_current_user
+from ...deps import get_db, get_current_staff, get_current_user
 from ...models import StaffUnavailability, Staff, Facility
 from ...schemas import (
     StaffUnavailabilityCreate, 
@@ -120,16 +120,9 @@ def create_my_unavailability(
     unavailability_in: StaffUnavailabilityCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
+    staff: Staff = Depends(get_current_staff),
 ):
     """Create unavailability period for current user (staff member)"""
-    # Get the staff record for the current user
-    staff = db.exec(
-        select(Staff).where(Staff.email == current_user.email)
-    ).first()
-    
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff profile not found. Please contact your manager.")
-    
     # Use the existing create logic but with the correct staff_id
     return create_staff_unavailability(staff.id, unavailability_in, db, current_user)
 
@@ -138,18 +131,11 @@ def create_my_quick_unavailability(
     quick_in: QuickUnavailabilityCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
+    staff: Staff = Depends(get_current_staff),
 ):
     """Create quick unavailability period for current user (staff member)"""
     from datetime import timezone
     
-    # Get the staff record for the current user
-    staff = db.exec(
-        select(Staff).where(Staff.email == current_user.email)
-    ).first()
-    
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff profile not found. Please contact your manager.")
-    
     # Use the existing quick create logic but with the correct staff_id
     return create_quick_unavailability(staff.id, quick_in, db, current_user)
 
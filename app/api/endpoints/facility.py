@@ -36,6 +36,8 @@ from ...schemas import (
     SoftDeleteRequest, SoftDeleteResponse
 )
 
+from ...services.facility_cache import facility_details_cache, load_facility_details
+
 router = APIRouter(prefix="/facilities", tags=["facility"])
 
 # ==================== FACILITY CRUD ====================
@@ -287,64 +289,17 @@ def list_facilities(
 ):
     """List all facilities for the current tenant with optional details"""
     
-    query = select(Facility).where(Facility.tenant_id == current_user.tenant_id)
-    
-    if facility_type:
-        query = query.where(Facility.facility_type == facility_type)
-    
-    facilities = db.exec(query).all()
-    
     if not include_details:
-        return [FacilityRead.model_validate(f) for f in facilities]
-    
-    # Include detailed information
-    result = []
-    for facility in facilities:
-        # Get shifts, roles, zones, and counts
-        shifts = db.exec(
-            select(FacilityShift)
-            .where(FacilityShift.facility_id == facility.id)
-            .where(FacilityShift.is_active == True if not include_inactive else True)
-            .order_by(FacilityShift.shift_order)
-        ).all()
-        
-        roles = db.exec(
-            select(FacilityRole)
-            .where(FacilityRole.facility_id == facility.id)
-            .where(FacilityRole.is_active == True if not include_inactive else True)
-        ).all()
-        
-        zones = db.exec(
-            select(FacilityZone)
-            .where(FacilityZone.facility_id == facility.id)
-            .where(FacilityZone.is_active == True if not include_inactive else True)
-            .order_by(FacilityZone.display_order)
-        ).all()
-        
-        # Get staff count
-        staff_count = db.exec(
-            select(func.count(Staff.id))
-            .where(Staff.facility_id == facility.id)
-            .where(Staff.is_active == True)
-        ).first() or 0
-        
-        # Get active schedules count
-        active_schedules = db.exec(
-            select(func.count(Schedule.id))
-            .where(Schedule.facility_id == facility.id)
-        ).first() or 0
-        
-        facility_detail = FacilityWithDetails(
-            **facility.model_dump(),
-            shifts=[FacilityShiftRead.model_validate(s) for s in shifts],
-            roles=[FacilityRoleRead.model_validate(r) for r in roles],
-            zones=[FacilityZoneRead.model_validate(z) for z in zones],
-            staff_count=staff_count,
-            active_schedules=active_schedules
-        )
-        result.append(facility_detail)
+        query = select(Facility).where(Facility.tenant_id == current_user.tenant_id)
+        if facility_type:
+            query = query.where(Facility.facility_type == facility_type)
+        return [FacilityRead.model_validate(f) for f in db.exec(query).all()]
     
-    return result
+    # Shifts, roles, zones and counts for every facility, cached per tenant
+    details = facility_details_cache.get_tenant_facilities(db, current_user.tenant_id, include_inactive)
+    if facility_type:
+        details = [facility for facility in details if facility["facility_type"] == facility_type]
+    return details
 
 
 @router.get("/{facility_id}", response_model=FacilityWithDetails)
@@ -354,48 +309,13 @@ def get_facility(
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific facility with all details"""
-    facility = _verify_facility_access(db, facility_id, current_user.tenant_id)
-    
-    # Get related data
-    shifts = db.exec(
-        select(FacilityShift)
-        .where(FacilityShift.facility_id == facility_id)
-        .where(FacilityShift.is_active == True)
-        .order_by(FacilityShift.shift_order)
-    ).all()
-    
-    roles = db.exec(
-        select(FacilityRole)
-        .where(FacilityRole.facility_id == facility_id)
-        .where(FacilityRole.is_active == True)
-    ).all()
-    
-    zones = db.exec(
-        select(FacilityZone)
-        .where(FacilityZone.facility_id == facility_id)
-        .where(FacilityZone.is_active == True)
-        .order_by(FacilityZone.display_order)
-    ).all()
-    
-    staff_count = db.exec(
-        select(func.count(Staff.id))
-        .where(Staff.facility_id == facility_id)
-        .where(Staff.is_active == True)
-    ).first() or 0
+    details = facility_details_cache.get_facility(db, current_user.tenant_id, facility_id)
+    if details is not None:
+        return details
     
-    active_schedules = db.exec(
-        select(func.count(Schedule.id))
-        .where(Schedule.facility_id == facility_id)
-    ).first() or 0
-    
-    return FacilityWithDetails(
-        **facility.model_dump(),
-        shifts=[FacilityShiftRead.model_validate(s) for s in shifts],
-        roles=[FacilityRoleRead.model_validate(r) for r in roles],
-        zones=[FacilityZoneRead.model_validate(z) for z in zones],
-        staff_count=staff_count,
-        active_schedules=active_schedules
-    )
+    # Not in the tenant's cached list: 404/403, or created since the list was cached
+    _verify_facility_access(db, facility_id, current_user.tenant_id)
+    return load_facility_details(db, current_user.tenant_id, facility_ids=[facility_id])[0]
 
 
 @router.put("/{facility_id}", response_model=FacilityRead)
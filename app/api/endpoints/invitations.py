@@ -132,6 +132,7 @@ def get_invitation_by_token(
     }
 
 from app.core.security import create_access_token
+from app.core.password_hashing import password_hasher
 
 @router.post("/accept")
 async def accept_invitation(
@@ -144,10 +145,15 @@ async def accept_invitation(
     service = InvitationService(db)
 
     try:
+        hashed_password = None
+        if request.signup_method == "credentials" and request.password:
+            hashed_password = await password_hasher.hash(request.password)
+
         result = service.accept_invitation(
             request.token,
             request.signup_method,
-            request.password
+            request.password,
+            hashed_password=hashed_password
         )
 
         # Build user data for JWT and response
@@ -2,13 +2,14 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlmodel import Session, select, func, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import cast
 from sqlalchemy.dialects.postgresql import JSONB
 from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from ...deps import get_db, get_current_user
+from ...deps import get_async_db, get_db, get_current_user
 from ...models import Notification, NotificationPreference, NotificationType, User
 from ...schemas import (
     NotificationRead, NotificationPreferenceRead, NotificationPreferenceUpdate, WhatsAppNumberUpdate
@@ -18,8 +19,8 @@ from ...services.notification_service import NotificationService
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 @router.get("/", response_model=List[NotificationRead])
-def get_my_notifications(
-    db: Session = Depends(get_db),
+async def get_my_notifications(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
@@ -54,7 +55,7 @@ def get_my_notifications(
     
     query = query.order_by(desc(Notification.created_at)).offset(offset).limit(limit)
     
-    notifications = db.exec(query).all()
+    notifications = (await db.exec(query)).all()
     return notifications
 
 @router.post("/{notification_id}/read")
@@ -98,18 +99,18 @@ def mark_all_notifications_read(
     return {"success": True, "marked_count": len(notifications)}
 
 @router.get("/unread-count")
-def get_unread_count(
-    db: Session = Depends(get_db),
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get count of unread notifications"""
     
-    count = db.exec(
+    count = (await db.exec(
         select(func.count(Notification.id)).where( # type: ignore
             Notification.recipient_user_id == current_user.id,
             Notification.is_read == False
         )
-    ).first()
+    )).first()
     
     return {"unread_count": count or 0}
 
@@ -3,12 +3,15 @@
 from datetime import date, datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from uuid import UUID
+import asyncio
 import uuid
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session, select, text
-from sqlalchemy import desc, func
+from sqlalchemy import delete, desc, func
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
  
 from app.core.config import get_settings
 from app.schemas import (
@@ -16,14 +19,18 @@ from app.schemas import (
     ScheduleValidationResult
 )
 from app.services.notification_service import NotificationService
+from app.services.user_staff_mapping import UserStaffMappingService
 from app.services.scheduler import create_schedule, validate_schedule_constraints
 from app.services.schedule_solver import (
     generate_weekly_schedule, ScheduleConstraints, constraints_from_config
 )
-from app.models import NotificationPriority, NotificationType, Staff, Schedule, ScheduleConfig, Facility, ShiftAssignment, StaffInvitation, User, ZoneAssignment, FacilityShift, FacilityZone
-from app.deps import get_db, get_current_user
-from ...services.pdf_service import PDFService
+from app.models import NotificationPriority, NotificationType, Staff, Schedule, ScheduleChange, ScheduleConfig, Facility, ShiftAssignment, StaffInvitation, User, ZoneAssignment, FacilityShift, FacilityZone
+from app.deps import get_db, get_current_user, get_read_db
+from ...services.pdf_service import PDFService, get_schedule_pdf_service, iter_pdf_chunks
 from ...services.puppeteer_pdf_service import PuppeteerPDFService 
+from ...services.pdf_cache import SchedulePDFCache
+from ...services.schedule_history import page_etag, schedule_page, serialize_page
+from ...services import schedule_versions, schedule_writes
 
 from pydantic import BaseModel
 
@@ -290,6 +297,9 @@ async def generate_daily_schedule(
             "success": True
         }
         
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Schedule already exists for {request.date}")
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Daily scheduling failed: {str(e)}")
 
@@ -377,6 +387,9 @@ async def generate_monthly_schedule(
             "success": True
         }
         
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Schedule already exists for {month_start}")
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Monthly scheduling failed: {str(e)}")
     
@@ -510,7 +523,8 @@ async def delete_schedule(
         was_published = schedule.is_published
         week_start = schedule.week_start
 
-        # Delete the schedule
+        # Delete the schedule and its change log
+        db.execute(delete(ScheduleChange).where(ScheduleChange.schedule_id == schedule_id))
         db.delete(schedule)
         db.commit()
 
@@ -521,12 +535,10 @@ async def delete_schedule(
             try:
                 notification_service = NotificationService(db)
 
-                for staff_id in affected_staff_ids:
-                    staff = db.get(Staff, staff_id)
-                    if not staff:
-                        continue
-
-                    user = db.exec(select(User).where(User.email == staff.email)).first()
+                affected_staff = db.exec(select(Staff).where(Staff.id.in_(affected_staff_ids))).all() # type: ignore
+                users = UserStaffMappingService(db).get_users_for_staff(affected_staff)
+                for staff in affected_staff:
+                    user = users.get(staff.id)
                     if not user:
                         continue
 
@@ -1052,7 +1064,7 @@ async def get_schedule_analytics(
     facility_id: str,
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Get comprehensive analytics for schedules in a date range"""
@@ -1612,14 +1624,23 @@ def generate(body: GenerateRequest, db: Session = Depends(get_db), current_user
             use_constraints=body.use_constraints
         )
         return sched
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Schedule already exists for week starting {body.week_start}")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=422, detail=f"Scheduling failed: {str(e)}")
 
 @router.get("/{schedule_id}", response_model=ScheduleDetail)
-def get_schedule(schedule_id: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """Get a schedule with all assignments"""
+def get_schedule(
+    schedule_id: UUID,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get a schedule with all assignments; revalidates with a 304 while its version is unchanged"""
     schedule = db.get(Schedule, schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
@@ -1629,75 +1650,106 @@ def get_schedule(schedule_id: str, db: Session = Depends(get_db), current_user =
     if not facility or facility.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    headers = _version_headers(schedule.id, schedule.version)
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
     return schedule
 
+@router.head("/{schedule_id}")
+def head_schedule(
+    schedule_id: UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Cheap change check: the schedule's ETag and X-Schedule-Version without a body"""
+    row = db.exec(
+        select(Schedule.version, Facility.tenant_id)
+        .join(Facility, Facility.id == Schedule.facility_id)
+        .where(Schedule.id == schedule_id)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    version, tenant_id = row
+    if tenant_id != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    headers = _version_headers(schedule_id, version)
+    return Response(status_code=304 if _etag_matches(request, headers["ETag"]) else 200, headers=headers)
+
+@router.get("/{schedule_id}/changes")
+def get_schedule_changes(
+    schedule_id: UUID,
+    response: Response,
+    since_version: int = Query(..., ge=0, description="Version the client already has"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Assignment diffs after since_version, oldest first.
+    
+    When the log no longer covers since_version, full_refresh is true and the
+    client should reload the schedule.
+    """
+    schedule = db.get(Schedule, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    facility = db.get(Facility, schedule.facility_id)
+    if not facility or facility.tenant_id != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    response.headers.update(_version_headers(schedule.id, schedule.version))
+    return schedule_versions.changes_since(db, schedule, since_version)
+
+def _version_headers(schedule_id: UUID, version: int) -> Dict[str, str]:
+    return {
+        "ETag": schedule_versions.schedule_etag(schedule_id, version),
+        "X-Schedule-Version": str(version),
+        "Cache-Control": "private, no-cache"
+    }
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
 @router.get("/facility/{facility_id}")
-def get_facility_schedules(facility_id: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """Get all schedules for a facility WITH assignments AND staff data"""
+def get_facility_schedules(
+    facility_id: UUID,
+    request: Request,
+    response: Response,
+    start_date: Optional[date] = Query(None, description="Only weeks overlapping this date or later"),
+    end_date: Optional[date] = Query(None, description="Only weeks starting on or before this date"),
+    cursor: Optional[date] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(12, ge=1, le=52),
+    summary: bool = Query(False, description="Assignment counts instead of assignments"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Schedules for a facility, newest week first, WITH assignments AND staff data.
+    Paged by date window and cursor; the next page's cursor is in X-Next-Cursor / Link.
+    """
     # Verify facility access
     facility = db.get(Facility, facility_id)
     if not facility or facility.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=403, detail="Invalid facility")
     
-    # Get schedules
-    schedules = db.exec(
-        select(Schedule).where(Schedule.facility_id == facility_id).order_by(desc(Schedule.week_start))
-    ).all()
+    schedules, next_cursor = schedule_page(db, facility_id, start_date, end_date, cursor, limit)
     
-    # Build response with assignments AND staff data for each schedule
-    result = []
-    for schedule in schedules:
-        # join to get assignments with staff data
-        assignments_with_data = db.exec(
-            select(ShiftAssignment, Staff, ZoneAssignment)
-            .join(Staff, ShiftAssignment.staff_id == Staff.id)
-            .outerjoin(ZoneAssignment, 
-                and_(
-                    ZoneAssignment.schedule_id == ShiftAssignment.schedule_id,
-                    ZoneAssignment.staff_id == ShiftAssignment.staff_id,
-                    ZoneAssignment.day == ShiftAssignment.day,        # Exact day match
-                    ZoneAssignment.shift == ShiftAssignment.shift     # Exact shift match
-                )
-            )
-            .where(ShiftAssignment.schedule_id == schedule.id)
-        ).all()
-        
-        # Format assignments with staff information
-        formatted_assignments = []
-        for assignment, staff, zone_assignment in assignments_with_data:
-            formatted_assignments.append({
-                'id': f"{schedule.id}-{assignment.day}-{assignment.shift}-{assignment.staff_id}",
-                'day': assignment.day,
-                'shift': assignment.shift,
-                'staff_id': str(assignment.staff_id),
-                'schedule_id': str(schedule.id),
-                # FIXED: Add the missing staff information
-                'staff_name': staff.full_name,
-                'staff_role': staff.role,
-                'staff_email': staff.email,
-                'staff_skill_level': staff.skill_level,
-                'zone_id': zone_assignment.zone_id if zone_assignment else None
-            })
-        
-        # Build schedule response
-        schedule_data = {
-            "id": str(schedule.id),
-            "facility_id": str(schedule.facility_id),
-            "week_start": schedule.week_start.isoformat(),
-            "created_at": schedule.created_at.isoformat() if schedule.created_at else None,
-            "updated_at": schedule.updated_at.isoformat() if schedule.updated_at else None,
-            "assignments": formatted_assignments  # Now includes staff data!
-        }
-        
-        result.append(schedule_data)
-        
-        # Debug logging
-        print(f"Schedule {schedule.id}: {len(formatted_assignments)} assignments with staff data")
-        if formatted_assignments:
-            sample = formatted_assignments[0]
-            print(f"Sample assignment with zone: day={sample['day']}, shift={sample['shift']}, zone_id={sample['zone_id']}")
+    etag = page_etag(db, facility_id, schedules, variant=str(request.query_params))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor.isoformat()
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor.isoformat())}>; rel="next"'
     
-    return result
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return serialize_page(db, schedules, summary=summary)
 
 @router.post("/{schedule_id}/validate")
 def validate_schedule(schedule_id: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -1789,11 +1841,10 @@ async def create_schedule(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Create a new schedule with comprehensive error handling"""
+    """Create a new schedule with its shift and zone assignments"""
     
     facility_id = request.get('facility_id')
     week_start = request.get('week_start')
-    assignments = request.get('assignments', [])
     
     # Validate required fields
     if not facility_id:
@@ -1812,176 +1863,81 @@ async def create_schedule(
     if not facility or facility.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=403, detail="Invalid facility or access denied")
     
+    # Parse and validate week_start date
     try:
-        print(f"🆕 Creating new schedule for facility {facility_id} with {len(assignments)} assignments")
-        
-        # Parse and validate week_start date
-        try:
-            week_start_date = datetime.fromisoformat(week_start).date()
-        except (ValueError, TypeError) as e:
-            raise HTTPException(status_code=400, detail=f"Invalid date format for week_start: {week_start}")
-        
-        # Check for duplicate schedule
-        existing_schedule = db.exec(
-            select(Schedule).where(
-                Schedule.facility_id == facility_uuid,
-                Schedule.week_start == week_start_date
-            )
-        ).first()
-        
-        if existing_schedule:
-            raise HTTPException(
-                status_code=409, 
-                detail=f"Schedule already exists for week starting {week_start_date}"
-            )
-        
-        # Validate and clean assignments
-        if assignments:
-            unique_staff_ids = []
-            cleaned_assignments = []
-            
-            for i, assignment_data in enumerate(assignments):
-                try:
-                    # Extract and validate data
-                    day = assignment_data.get('day')
-                    shift = assignment_data.get('shift')
-                    staff_id = assignment_data.get('staff_id')
-                    
-                    # Validate required fields
-                    if day is None or shift is None or not staff_id:
-                        raise ValueError(f"Assignment {i} missing required fields: day={day}, shift={shift}, staff_id={staff_id}")
-                    
-                    # Convert and validate types
-                    try:
-                        day_int = int(day)
-                        shift_int = int(shift)
-                        staff_uuid = UUID(staff_id)
-                    except (ValueError, TypeError) as e:
-                        raise ValueError(f"Assignment {i} has invalid data types: {e}")
-                    
-                    # Validate ranges
-                    if not (0 <= day_int <= 6):
-                        raise ValueError(f"Assignment {i} has invalid day: {day_int} (must be 0-6)")
-                    if not (0 <= shift_int <= 2):
-                        raise ValueError(f"Assignment {i} has invalid shift: {shift_int} (must be 0-2)")
-                    
-                    cleaned_assignment = {
-                        'day': day_int,
-                        'shift': shift_int,
-                        'staff_id': str(staff_uuid),  # Keep as string for consistency
-                        'zone_id': assignment_data.get('zone_id')
-                    }
-                    
-                    cleaned_assignments.append(cleaned_assignment)
-                    unique_staff_ids.append(str(staff_uuid))
-                    
-                    print(f"✅ Validated assignment {i+1}: day={day_int}, shift={shift_int}, staff_id={staff_uuid}")
-                    
-                except Exception as e:
-                    print(f"❌ Assignment {i} validation failed: {e}")
-                    raise HTTPException(status_code=400, detail=f"Assignment {i+1} is invalid: {str(e)}")
-            
-            # Validate all staff exist and belong to facility
-            if unique_staff_ids:
-                unique_staff_uuids = [UUID(sid) for sid in set(unique_staff_ids)]
-                existing_staff = db.exec(
-                    select(Staff).where(
-                        Staff.id.in_(unique_staff_uuids),
-                        Staff.facility_id == facility_uuid,
-                        Staff.is_active == True
-                    )
-                ).all()
-                
-                existing_staff_ids = {str(s.id) for s in existing_staff}
-                missing_staff = set(unique_staff_ids) - existing_staff_ids
-                
-                if missing_staff:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Staff members not found or inactive: {list(missing_staff)}"
-                    )
-                
-                print(f"✅ All {len(unique_staff_ids)} staff members validated")
-        else:
-            cleaned_assignments = []
+        week_start_date = datetime.fromisoformat(week_start).date()
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format for week_start: {week_start}")
+    
+    # Check for duplicate schedule
+    existing_schedule = db.exec(
+        select(Schedule).where(
+            Schedule.facility_id == facility_uuid,
+            Schedule.week_start == week_start_date
+        )
+    ).first()
+    
+    if existing_schedule:
+        raise HTTPException(
+            status_code=409, 
+            detail=f"Schedule already exists for week starting {week_start_date}"
+        )
+    
+    desired = _parse_schedule_cells(db, facility_uuid, request.get('assignments') or [])
+    
+    try:
+        schedule = Schedule(
+            facility_id=facility_uuid,
+            week_start=week_start_date
+        )
+        db.add(schedule)
+        db.flush()  # Get the ID without committing
         
-        # Start database transaction
-        try:
-            # Create new schedule
-            schedule = Schedule(
-                facility_id=facility_uuid,
-                week_start=week_start_date
-            )
-            db.add(schedule)
-            db.flush()  # Get the ID without committing
-            
-            print(f"📅 Schedule created with ID: {schedule.id}")
-            
-            # Create assignments
-            saved_assignments = []
-            for i, assignment_data in enumerate(cleaned_assignments):
-                try:
-                    assignment = ShiftAssignment(
-                        schedule_id=schedule.id,
-                        day=assignment_data['day'],
-                        shift=assignment_data['shift'],
-                        staff_id=UUID(assignment_data['staff_id'])
-                    )
-                    db.add(assignment)
-                    
-                    saved_assignments.append({
-                        'id': f"{schedule.id}-{assignment.day}-{assignment.shift}-{assignment.staff_id}",
-                        'day': assignment.day,
-                        'shift': assignment.shift,
-                        'staff_id': str(assignment.staff_id),
-                        'schedule_id': str(schedule.id)
-                    })
-                    
-                    print(f"✅ Added assignment {i+1}: day={assignment.day}, shift={assignment.shift}")
-                    
-                except Exception as e:
-                    print(f"❌ Failed to create assignment {i+1}: {e}")
-                    raise HTTPException(status_code=400, detail=f"Failed to create assignment {i+1}: {str(e)}")
-            
-            # Commit all changes
-            db.commit()
-            db.refresh(schedule)
-            
-            print(f"✅ Successfully created schedule with {len(saved_assignments)} assignments")
-            
-            return {
-                "id": str(schedule.id),
-                "facility_id": str(schedule.facility_id),
-                "week_start": schedule.week_start.isoformat(),
-                "assignments": saved_assignments,
-                "created_at": schedule.created_at.isoformat() if schedule.created_at else None,
-                "success": True
-            }
-            
-        except Exception as e:
-            # Rollback on any database error
-            db.rollback()
-            print(f"❌ Database error, rolled back: {e}")
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        diff = schedule_writes.apply_assignments(db, schedule, desired)
+        db.commit()
+        db.refresh(schedule)
         
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
+    except IntegrityError:
+        # Another request created this week's schedule since the check above
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Schedule already exists for week starting {week_start_date}"
+        )
     except Exception as e:
-        # Catch any other unexpected errors
-        print(f"❌ Unexpected error in create_schedule: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        db.rollback()
+        print(f"❌ Database error, rolled back: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    print(f"✅ Created schedule {schedule.id} with {len(desired)} assignments")
+    
+    return {
+        "id": str(schedule.id),
+        "facility_id": str(schedule.facility_id),
+        "week_start": schedule.week_start.isoformat(),
+        "assignments": schedule_writes.serialize_cells(schedule, desired),
+        "diff": diff,
+        "version": schedule.version,
+        "created_at": schedule.created_at.isoformat() if schedule.created_at else None,
+        "updated_at": schedule.updated_at.isoformat() if schedule.updated_at else None,
+        "success": True
+    }
 
 @router.put("/{schedule_id}")
 async def update_schedule(
     schedule_id: UUID,
     request: dict,
+    http_request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Update an existing schedule with comprehensive error handling"""
+    """
+    Save the full set of a schedule's assignments, writing only the difference.
+    
+    Pass the version the editor loaded, as `expected_version` or an If-Match
+    ETag, to get a 409 instead of overwriting someone else's changes.
+    """
     
     # Get existing schedule
     schedule = db.get(Schedule, schedule_id)
@@ -1993,90 +1949,335 @@ async def update_schedule(
     if not facility or facility.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    expected_version = request.get('expected_version')
+    if_match = http_request.headers.get("if-match")
+    if expected_version is None and if_match:
+        expected_version = schedule_versions.parse_etag_version(schedule.id, if_match)
+        if expected_version is None:
+            raise HTTPException(status_code=412, detail="If-Match does not name a version of this schedule")
+    if expected_version is not None and (isinstance(expected_version, bool) or not isinstance(expected_version, int)):
+        raise HTTPException(status_code=400, detail=f"Invalid expected_version: {expected_version}")
+    
+    desired = _parse_schedule_cells(db, schedule.facility_id, request.get('assignments') or [], schedule.id)
+    
     try:
-        assignments = request.get('assignments', [])
-        print(f"🔄 Updating schedule {schedule_id} with {len(assignments)} assignments")
+        diff = schedule_writes.apply_assignments(db, schedule, desired, expected_version)
+        db.commit()
         
-        # Start transaction
-        try:
-            # Update the schedule timestamp
-            schedule.updated_at = datetime.utcnow()
-            
-            # Delete existing assignments
-            existing_assignments = db.exec(
-                select(ShiftAssignment).where(ShiftAssignment.schedule_id == schedule_id)
-            ).all()
-            
-            print(f"🗑️ Deleting {len(existing_assignments)} existing assignments")
-            for assignment in existing_assignments:
-                db.delete(assignment)
-            
-            db.flush()  # Apply deletions
-            
-            # Validate and add new assignments
-            saved_assignments = []
-            for i, assignment_data in enumerate(assignments):
-                try:
-                    # Validate data
-                    day = int(assignment_data.get('day', 0))
-                    shift = int(assignment_data.get('shift', 0))
-                    staff_id = UUID(assignment_data.get('staff_id'))
-                    
-                    # Validate ranges
-                    if not (0 <= day <= 6):
-                        raise ValueError(f"Invalid day: {day}")
-                    if not (0 <= shift <= 2):
-                        raise ValueError(f"Invalid shift: {shift}")
-                    
-                    assignment = ShiftAssignment(
-                        schedule_id=schedule.id,
-                        day=day,
-                        shift=shift,
-                        staff_id=staff_id
-                    )
-                    db.add(assignment)
-                    
-                    saved_assignments.append({
-                        'id': f"{schedule.id}-{day}-{shift}-{staff_id}",
-                        'day': day,
-                        'shift': shift,
-                        'staff_id': str(staff_id),
-                        'schedule_id': str(schedule.id)
-                    })
-                    
-                except (ValueError, TypeError) as e:
-                    raise HTTPException(status_code=400, detail=f"Invalid assignment {i+1}: {str(e)}")
-            
-            # Commit all changes
-            db.commit()
-            db.refresh(schedule)
-            
-            print(f"✅ Successfully updated schedule with {len(saved_assignments)} assignments")
-            
-            return {
-                "id": str(schedule.id),
-                "facility_id": str(schedule.facility_id),
-                "week_start": schedule.week_start.isoformat(),
-                "assignments": saved_assignments,
-                "updated_at": schedule.updated_at.isoformat() if schedule.updated_at else None,
-                "success": True
+    except schedule_writes.ScheduleConflictError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Schedule was modified by someone else. Reload it and reapply your changes.",
+                "current_version": e.current_version
             }
-            
-        except Exception as e:
-            # Rollback on any error
-            db.rollback()
-            print(f"❌ Database error during update, rolled back: {e}")
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-        
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
+        )
     except Exception as e:
-        print(f"❌ Unexpected error in update_schedule: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        db.rollback()
+        print(f"❌ Database error during update, rolled back: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    if diff["changed"]:
+        print(f"✅ Updated schedule {schedule_id} to version {schedule.version}: +{len(diff['added'])} "
+              f"-{len(diff['removed'])} ~{len(diff['moved'])} moved, {len(diff['zone_changed'])} zone changes")
+    
+    response.headers.update(_version_headers(schedule.id, schedule.version))
+    return {
+        "id": str(schedule.id),
+        "facility_id": str(schedule.facility_id),
+        "week_start": schedule.week_start.isoformat(),
+        "assignments": schedule_writes.serialize_cells(schedule, desired),
+        "diff": diff,
+        "version": schedule.version,
+        "updated_at": schedule.updated_at.isoformat() if schedule.updated_at else None,
+        "success": True
+    }
+
+def _parse_schedule_cells(db: Session, facility_id: UUID, assignments: List[Dict[str, Any]], schedule_id: Optional[UUID] = None):
+    """Validated cells of a create/update request; new staff must be active members of the facility"""
+    try:
+        desired = schedule_writes.parse_assignments(assignments)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    # Only staff being added need checking; existing cells may belong to since-deactivated staff
+    staff_ids = {staff_id for _, _, staff_id in desired}
+    if schedule_id:
+        staff_ids -= set(db.exec(
+            select(ShiftAssignment.staff_id).where(ShiftAssignment.schedule_id == schedule_id).distinct()
+        ).all())
+    missing_staff = schedule_writes.unknown_staff(db, facility_id, staff_ids)
+    if missing_staff:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Staff members not found or inactive: {sorted(str(s) for s in missing_staff)}"
+        )
+    return desired
+    
+#======================== PDF EXPORT ===============================================
+def _collect_schedule_pdf_inputs(db: Session, schedule: Schedule, facility: Facility, assignments, staff_members) -> Dict[str, Any]:
+    """Load shifts/zones and convert a schedule into the dict inputs the PDF services expect"""
+    facility_shifts = db.exec(
+        select(FacilityShift).where(
+            FacilityShift.facility_id == facility.id,
+            FacilityShift.is_active == True
+        )
+    ).all()
+
+    facility_zones = db.exec(
+        select(FacilityZone).where(
+            FacilityZone.facility_id == facility.id,
+            FacilityZone.is_active == True
+        )
+    ).all()
+
+    # ZoneAssignment uses schedule_id, staff_id, day, shift (not assignment_id) - load once and match in memory
+    zone_assignments = db.exec(
+        select(ZoneAssignment).where(ZoneAssignment.schedule_id == schedule.id)
+    ).all()
+    zone_by_slot = {}
+    for zone_assignment in zone_assignments:
+        zone_by_slot.setdefault(
+            (zone_assignment.staff_id, zone_assignment.day, zone_assignment.shift),
+            zone_assignment.zone_id
+        )
+
+    assignment_dicts = []
+    for assignment in assignments:
+        zone_id = zone_by_slot.get((assignment.staff_id, assignment.day, assignment.shift))
+        assignment_dicts.append({
+            'staff_id': str(assignment.staff_id),
+            'day': assignment.day,
+            'shift': assignment.shift,
+            'zone_id': str(zone_id) if zone_id else None,
+            'id': str(assignment.id)
+        })
+
+    staff_dicts = [
+        {
+            'id': str(staff_member.id),
+            'full_name': staff_member.full_name,
+            'role': staff_member.role
+        }
+        for staff_member in staff_members
+    ]
+
+    facility_dict = {
+        'name': facility.name,
+        'facility_type': facility.facility_type
+    }
+
+    shifts_dicts = [
+        {
+            'shift_index': shift.shift_order,
+            'shift_name': shift.shift_name,
+            'start_time': shift.start_time,
+            'end_time': shift.end_time
+        }
+        for shift in facility_shifts
+    ]
+
+    zones_dicts = [
+        {
+            'id': str(zone.id),
+            'zone_id': zone.zone_id,
+            'zone_name': zone.zone_name
+        }
+        for zone in facility_zones
+    ]
+
+    return {
+        'assignments': assignment_dicts,
+        'staff': staff_dicts,
+        'facility': facility_dict,
+        'shifts': shifts_dicts,
+        'zones': zones_dicts
+    }
+
+async def _get_or_generate_schedule_pdf(db: Session, schedule: Schedule, facility: Facility, assignments, staff_members):
+    """
+    Return (cache_key, pdf_url) for a schedule, rendering only when no PDF
+    exists yet for the current assignments, zones, shifts and template.
+    """
+    pdf_service = get_schedule_pdf_service()
+    pdf_cache = SchedulePDFCache()
+
+    pdf_inputs = _collect_schedule_pdf_inputs(db, schedule, facility, assignments, staff_members)
+    cache_key = SchedulePDFCache.compute_key(
+        week_start=schedule.week_start,
+        template_version=pdf_service.template_version(),
+        **pdf_inputs
+    )
+
+    pdf_url = pdf_cache.get(cache_key)
+    if pdf_url:
+        # The rendering may have been cached for another tenant with identical content
+        pdf_cache.add_tenant(cache_key, facility.tenant_id)
+        return cache_key, pdf_url
+
+    # Plain values only: the renderer may run in a worker thread, away from the session
+    schedule_dict = {'id': schedule.id, 'week_start': schedule.week_start, 'facility_id': schedule.facility_id}
+    pdf_data = await pdf_service.generate_schedule_pdf(schedule=schedule_dict, **pdf_inputs)
+    pdf_url = await pdf_service.save_pdf(
+        pdf_data, f"schedule_{schedule.id}.pdf", cache_key=cache_key, tenant_id=facility.tenant_id
+    )
+    return cache_key, pdf_url
+
+def _cached_pdf_response(request: Request, cache_key: str, filename: str) -> Response:
+    """Serve a cached PDF with an ETag of its content key; unchanged PDFs get a 304"""
+    pdf_cache = SchedulePDFCache()
+    etag = f'"{cache_key}"'
+    headers = {
+        "ETag": etag,
+        # Content-addressed: the bytes behind a key never change
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if pdf_cache.get(cache_key) is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    return FileResponse(
+        pdf_cache.path_for(cache_key),
+        media_type="application/pdf",
+        filename=filename,
+        headers=headers
+    )
+
+@router.get("/pdf/{pdf_key}")
+async def download_cached_pdf(
+    pdf_key: str,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a previously generated schedule PDF by its content key, to the tenants it was rendered for"""
+    if not SchedulePDFCache.is_valid_key(pdf_key):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    # 404 rather than 403 so keys of other tenants cannot be probed
+    if str(current_user.tenant_id) not in SchedulePDFCache().tenants_for(pdf_key):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    return _cached_pdf_response(request, pdf_key, f"schedule_{pdf_key[:12]}.pdf")
+
+@router.get("/{schedule_id}/pdf")
+async def download_schedule_pdf(
+    schedule_id: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download the schedule PDF, rendering it only if the schedule changed since the last render"""
+    schedule = db.get(Schedule, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+
+    facility = db.get(Facility, schedule.facility_id)
+    if not facility or facility.tenant_id != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    assignments = db.exec(
+        select(ShiftAssignment).where(ShiftAssignment.schedule_id == schedule_id)
+    ).all()
+    staff_ids = list(set(assignment.staff_id for assignment in assignments))
+    staff_members = db.exec(
+        select(Staff).where(Staff.id.in_(staff_ids)) # type: ignore
+    ).all() if staff_ids else []
+
+    try:
+        cache_key, _ = await _get_or_generate_schedule_pdf(db, schedule, facility, assignments, staff_members)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+
+    return _cached_pdf_response(request, cache_key, f"schedule_{schedule.week_start}.pdf")
+
+@router.get("/facility/{facility_id}/pdf")
+async def download_period_pdf(
+    facility_id: uuid.UUID,
+    start_date: date,
+    days: int = 30,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream a multi-week (e.g. monthly) roster PDF for a facility.
+    Rendered with the ReportLab fast path so it works on nodes without Chromium.
+    """
+    if days < 1 or days > 62:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 62")
+
+    facility = db.get(Facility, facility_id)
+    if not facility or facility.tenant_id != current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Invalid facility")
+
+    end_date = start_date + timedelta(days=days - 1)
+
+    # One query for every schedule overlapping the window, one for their assignments
+    schedules = db.exec(
+        select(Schedule).where(
+            Schedule.facility_id == facility_id,
+            Schedule.week_start <= end_date,
+            Schedule.week_start >= start_date - timedelta(days=6)
+        )
+    ).all()
+    week_start_by_schedule = {schedule.id: schedule.week_start for schedule in schedules}
+
+    assignment_rows = db.exec(
+        select(ShiftAssignment.schedule_id, ShiftAssignment.staff_id, ShiftAssignment.day, ShiftAssignment.shift)
+        .where(ShiftAssignment.schedule_id.in_(list(week_start_by_schedule.keys()))) # type: ignore
+    ).all() if week_start_by_schedule else []
+
+    period_assignments = []
+    for schedule_id, staff_id, day, shift in assignment_rows:
+        offset = (week_start_by_schedule[schedule_id] + timedelta(days=day) - start_date).days
+        if 0 <= offset < days:
+            period_assignments.append({'staff_id': str(staff_id), 'day': offset, 'shift': shift})
+
+    staff_members = db.exec(
+        select(Staff).where(Staff.facility_id == facility_id, Staff.is_active == True).order_by(Staff.full_name)
+    ).all()
+    staff_dicts = [
+        {'id': str(staff_member.id), 'full_name': staff_member.full_name, 'role': staff_member.role}
+        for staff_member in staff_members
+    ]
+
+    facility_shifts = db.exec(
+        select(FacilityShift).where(
+            FacilityShift.facility_id == facility_id,
+            FacilityShift.is_active == True
+        )
+    ).all()
+    shifts_dicts = [
+        {
+            'shift_index': shift.shift_order,
+            'shift_name': shift.shift_name,
+            'start_time': shift.start_time,
+            'end_time': shift.end_time
+        }
+        for shift in facility_shifts
+    ]
+
+    try:
+        pdf_file = await asyncio.to_thread(
+            PDFService().render_period_pdf,
+            {'name': facility.name, 'facility_type': facility.facility_type},
+            staff_dicts,
+            period_assignments,
+            start_date,
+            days,
+            shifts_dicts
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+
+    filename = f"schedule_{start_date.isoformat()}_{end_date.isoformat()}.pdf"
+    return StreamingResponse(
+        iter_pdf_chunks(pdf_file),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 #======================== NOTIFICATIONS ===============================================
 @router.post("/{schedule_id}/publish")
 async def publish_schedule(
@@ -2119,97 +2320,12 @@ async def publish_schedule(
         select(Staff).where(Staff.id.in_(staff_ids)) # type: ignore
     ).all()
     
-    # Generate PDF if requested
+    # Generate PDF if requested (reused from the content-addressed cache when unchanged)
     pdf_url = None
     if notification_options.get('generate_pdf', False):
         try:
-            # Use the new Puppeteer-based PDF service for better quality
-            pdf_service = PuppeteerPDFService()
-
-            # Fetch facility shifts and zones
-            facility_shifts = db.exec(
-                select(FacilityShift).where(
-                    FacilityShift.facility_id == facility.id,
-                    FacilityShift.is_active == True
-                )
-            ).all()
-
-            facility_zones = db.exec(
-                select(FacilityZone).where(
-                    FacilityZone.facility_id == facility.id,
-                    FacilityZone.is_active == True
-                )
-            ).all()
-
-            # Convert assignments to dicts with zone_id
-            assignment_dicts = []
-            for assignment in assignments:
-                # Get zone assignment if exists
-                # ZoneAssignment uses schedule_id, staff_id, day, shift (not assignment_id)
-                zone_assignment = db.exec(
-                    select(ZoneAssignment).where(
-                        ZoneAssignment.schedule_id == assignment.schedule_id,
-                        ZoneAssignment.staff_id == assignment.staff_id,
-                        ZoneAssignment.day == assignment.day,
-                        ZoneAssignment.shift == assignment.shift
-                    )
-                ).first()
-
-                assignment_dicts.append({
-                    'staff_id': str(assignment.staff_id),
-                    'day': assignment.day,
-                    'shift': assignment.shift,
-                    'zone_id': str(zone_assignment.zone_id) if zone_assignment else None,
-                    'id': str(assignment.id)
-                })
-
-            # Convert staff to dicts
-            staff_dicts = []
-            for staff_member in staff_members:
-                staff_dicts.append({
-                    'id': str(staff_member.id),
-                    'full_name': staff_member.full_name,
-                    'role': staff_member.role
-                })
-
-            # Convert facility to dict
-            facility_dict = {
-                'name': facility.name,
-                'facility_type': facility.facility_type
-            }
-
-            # Convert shifts to dicts
-            shifts_dicts = []
-            for shift in facility_shifts:
-                shifts_dicts.append({
-                    'shift_index': shift.shift_order,
-                    'shift_name': shift.shift_name,
-                    'start_time': shift.start_time,
-                    'end_time': shift.end_time
-                })
-
-            # Convert zones to dicts
-            zones_dicts = []
-            for zone in facility_zones:
-                zones_dicts.append({
-                    'id': str(zone.id),
-                    'zone_id': zone.zone_id,
-                    'zone_name': zone.zone_name
-                })
-
-            # Generate PDF using Puppeteer service
-            pdf_data = await pdf_service.generate_schedule_pdf(
-                schedule=schedule,
-                assignments=assignment_dicts,
-                staff=staff_dicts,
-                facility=facility_dict,
-                shifts=shifts_dicts,
-                zones=zones_dicts
-            )
-
-            # Save PDF and get URL
-            pdf_url = await pdf_service.save_pdf(pdf_data, f"schedule_{schedule_id}.pdf")
-            print(f"✅ PDF generated successfully: {pdf_url}")
+            _, pdf_url = await _get_or_generate_schedule_pdf(db, schedule, facility, assignments, staff_members)
+            print(f"✅ PDF ready: {pdf_url}")
         except Exception as e:
             print(f"❌ PDF generation failed: {e}")
             import traceback
@@ -2229,11 +2345,10 @@ async def publish_schedule(
     notified_users: list[str] = []
     pending_invite_emails: list[str] = []
 
+    users = UserStaffMappingService(db).get_users_for_staff(staff_members)
     for staff_member in staff_members:
-        # Find User by matching email
-        user = db.exec(
-            select(User).where(User.email == staff_member.email)
-        ).first()
+        # User account of this staff member, if any
+        user = users.get(staff_member.id)
 
         if user and user.is_active:
             # ✅ HAPPY PATH: User exists and is active
@@ -2273,7 +2388,6 @@ async def publish_schedule(
                 print(f"📧 {staff_member.full_name} has pending invitation - sending reminder with schedule info")
 
                 try:
-                    notification_service = NotificationService(db)
                     await send_invitation_reminder_with_schedule(
                         pending_invitation, 
                         schedule, 
@@ -2294,9 +2408,14 @@ async def publish_schedule(
                 print(f"    Recommendation: Send new invitation to {staff_member.email}")
                 notifications_skipped += 1
     
-    # Mark schedule as published
+    # Deliver all schedule notifications together so pushes share FCM batches
+    await notification_service.flush_deferred_deliveries(background_tasks)
+    
+    # Mark schedule as published; the version bump makes cached copies revalidate
+    published_at = datetime.now(timezone.utc)
+    schedule_versions.bump_versions(db, {schedule.id: {"published": True, "published_at": published_at.isoformat()}})
     schedule.is_published = True
-    schedule.published_at = datetime.now(timezone.utc)
+    schedule.published_at = published_at
     db.commit()
     
     return {
@@ -2390,5 +2509,6 @@ async def send_schedule_notification(
         action_url=action_url,
         action_text="View Schedule",
         background_tasks=background_tasks,
-        pdf_attachment_url=pdf_url
+        pdf_attachment_url=pdf_url,
+        defer_delivery=True  # Flushed as one batch by publish_schedule
     )
@@ -6,10 +6,12 @@ from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 
 from ...deps import get_db, get_current_user
-from ...models import User, AuditLog, AccountLockout, UserSession, SecuritySettings
+from ...models import User, AuditLog, AccountLockout, UserSession
 from ...services.audit_service import AuditService, AuditEvent
 from ...services.account_lockout_service import AccountLockoutService
 from ...services.session_service import SessionService
+from ...services.session_cache import session_cache
+from ...services.tenant_settings_cache import tenant_settings_cache
 from ...schemas import (
     AccountUnlockRequest, AccountUnlockResponse, 
     SecuritySummaryResponse, SessionListResponse, SessionRevokeResponse,
@@ -238,6 +240,7 @@ async def revoke_user_session(
     session.revoked_at = datetime.now(timezone.utc)
     session.revocation_reason = "admin_revoked" if current_user.is_manager else "user_revoked"
     db.commit()
+    await session_cache.invalidate([session.session_token_hash])
     
     # Log the revocation
     audit_service = AuditService(db)
@@ -340,9 +343,7 @@ async def get_security_settings(
     if not current_user.is_manager:
         raise HTTPException(status_code=403, detail="Manager access required")
     
-    settings = db.exec(
-        select(SecuritySettings).where(SecuritySettings.tenant_id == current_user.tenant_id)
-    ).first()
+    settings = tenant_settings_cache.get_security_settings(db, current_user.tenant_id)
     
     if not settings:
         # Return default settings
@@ -22,7 +22,8 @@ from ...schemas import (
     UserProfileRead, UserProfileUpdate, SettingsTestResult,
     SettingsResponse
 )
-from ...core.encryption_db import create_audit_log_entry, load_and_decrypt_notification_settings
+from ...core.encryption_db import create_audit_log_entry
+from ...services.tenant_settings_cache import tenant_settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +39,7 @@ def get_system_settings(
     """Get system-wide settings for the current tenant, create defaults if none exist"""
     
     # Get settings for current tenant
-    statement = select(SystemSettings).where(
-        SystemSettings.tenant_id == current_user.tenant_id
-    )
-    settings = db.exec(statement).first()
+    settings = tenant_settings_cache.get_system_settings(db, current_user.tenant_id)
     
     if not settings:
         # Create default settings for new tenant
@@ -223,16 +221,10 @@ def get_service_status(
     """Get simple service status - just what managers need to know"""
     
     # Get business-level settings (manager toggles)
-    system_statement = select(SystemSettings).where(
-        SystemSettings.tenant_id == current_user.tenant_id
-    )
-    system_settings = db.exec(system_statement).first()
+    system_settings = tenant_settings_cache.get_system_settings(db, current_user.tenant_id)
     
     # Get technical configuration
-    notification_statement = select(NotificationGlobalSettings).where(
-        NotificationGlobalSettings.tenant_id == current_user.tenant_id
-    )
-    notification_settings = db.exec(notification_statement).first()
+    notification_settings = tenant_settings_cache.get_notification_settings(db, current_user.tenant_id)
     
     # Default values if settings don't exist
     if not system_settings:
@@ -296,16 +288,12 @@ def test_smtp_connection(
 ):
     """Test SMTP connection using current notification settings"""
     
-    from ...core.encryption_db import load_and_decrypt_notification_settings
     import smtplib
     from email.mime.text import MIMEText
     from email.mime.multipart import MIMEMultipart
     
     # Get decrypted notification settings
-    statement = select(NotificationGlobalSettings).where(
-        NotificationGlobalSettings.tenant_id == current_user.tenant_id
-    )
-    settings = db.exec(statement).first()
+    settings = tenant_settings_cache.get_notification_settings(db, current_user.tenant_id)
     
     if not settings:
         raise HTTPException(
@@ -319,14 +307,8 @@ def test_smtp_connection(
             detail="SMTP is not enabled in notification settings"
         )
     
-    # Decrypt settings for testing
-    decrypted_settings = load_and_decrypt_notification_settings(db, settings.id)
-    
-    if not decrypted_settings:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to decrypt notification settings"
-        )
+    # Settings from the cache are already decrypted
+    decrypted_settings = settings
     
     # Type-safe validation with proper None checking
     if not all([
@@ -431,15 +413,11 @@ def test_whatsapp_connection(
 ):
     """Test WhatsApp/Twilio connection using current notification settings"""
     
-    from ...core.encryption_db import load_and_decrypt_notification_settings
     from twilio.rest import Client
     from twilio.base.exceptions import TwilioException
     
     # Get decrypted notification settings
-    statement = select(NotificationGlobalSettings).where(
-        NotificationGlobalSettings.tenant_id == current_user.tenant_id
-    )
-    settings = db.exec(statement).first()
+    settings = tenant_settings_cache.get_notification_settings(db, current_user.tenant_id)
     
     if not settings:
         raise HTTPException(
@@ -453,14 +431,8 @@ def test_whatsapp_connection(
             detail="Twilio/WhatsApp is not enabled in notification settings"
         )
     
-    # Decrypt settings for testing
-    decrypted_settings = load_and_decrypt_notification_settings(db, settings.id)
-    
-    if not decrypted_settings:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to decrypt notification settings"
-        )
+    # Settings from the cache are already decrypted
+    decrypted_settings = settings
     
     # Type-safe validation with proper None checking
     if not all([
@@ -1010,11 +982,8 @@ def get_notification_settings(
 ):
     """Get notification settings for the current tenant, create defaults if none exist"""
     
-    # Get settings for current tenant
-    statement = select(NotificationGlobalSettings).where(
-        NotificationGlobalSettings.tenant_id == current_user.tenant_id
-    )
-    settings = db.exec(statement).first()
+    # Get settings for current tenant (already decrypted)
+    settings = tenant_settings_cache.get_notification_settings(db, current_user.tenant_id)
     
     if not settings:
         # Create default notification settings for new tenant
@@ -1050,18 +1019,6 @@ def get_notification_settings(
         
         logger.info(f"Created default notification settings with ID {settings.id}")
     
-    # For existing settings, try to decrypt if possible, otherwise return as-is
-    try:
-        # Only try decryption if the function exists and settings have an ID
-        if hasattr(settings, 'id') and settings.id:
-            from ...core.encryption_db import load_and_decrypt_notification_settings
-            decrypted_settings = load_and_decrypt_notification_settings(db, settings.id)
-            if decrypted_settings:
-                return decrypted_settings
-    except (ImportError, AttributeError, Exception) as e:
-        logger.info(f"Decryption not available or failed, returning settings as-is: {e}")
-    
-    # Return settings as-is (either new defaults or existing settings)
     return settings
 
 
@@ -1,11 +1,13 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, or_, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta, date, timezone
 from uuid import UUID
 
-from ...deps import get_db, get_current_user
+from ...deps import get_async_db, get_db, get_current_user, get_read_db
 from ...models import (
     Staff,
     Facility,
@@ -18,7 +20,22 @@ from ...models import (
     User,
     ZoneAssignment,        
 )
-from ...schemas import StaffCreate, StaffDeleteResponse, StaffDeleteValidation, StaffDuplicateCheck, StaffRead, StaffUpdate
+from ...schemas import (
+    StaffBulkDeactivateRequest,
+    StaffBulkDeleteRequest,
+    StaffBulkDeleteValidation,
+    StaffBulkOperationResponse,
+    StaffBulkRequest,
+    StaffBulkValidationItem,
+    StaffCreate,
+    StaffDeleteResponse,
+    StaffDeleteValidation,
+    StaffDuplicateCheck,
+    StaffRead,
+    StaffUpdate,
+)
+from ...services import staff_bulk, staff_timeline
+from ...services.user_staff_mapping import UserStaffMappingService
 
 router = APIRouter(prefix="/staff", tags=["staff"])
 
@@ -334,14 +351,13 @@ async def get_staff_registration_status(
         staff_query = staff_query.where(Staff.facility_id == facility_id)
         
     staff_members = db.exec(staff_query).all()
+    users = UserStaffMappingService(db).get_users_for_staff(staff_members)
     
     results = []
     
     for staff in staff_members:
         # Check for user account
-        user = db.exec(
-            select(User).where(func.lower(User.email) == func.lower(staff.email))
-        ).first()
+        user = users.get(staff.id)
         
         # Check for invitation
         invitation = db.exec(
@@ -421,12 +437,11 @@ async def check_specific_staff_status(
     if not staff:
         raise HTTPException(status_code=404, detail=f"No staff found matching '{staff_name}'")
     
+    users = UserStaffMappingService(db).get_users_for_staff(staff)
     results = []
     for member in staff:
         # Get detailed status (same logic as above)
-        user = db.exec(
-            select(User).where(func.lower(User.email) == func.lower(member.email))
-        ).first()
+        user = users.get(member.id)
         
         invitations = db.exec(
             select(StaffInvitation)
@@ -499,160 +514,109 @@ def validate_staff_deletion(
     if not facility or facility.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    errors = []
-    warnings = []
-    blocking_entities = []
-    today = date.today()
-    now = datetime.now()
-    
-    pending_invitations = db.exec(
-        select(func.count(StaffInvitation.id))
-        .where(StaffInvitation.staff_id == staff_uuid)
-        .where(StaffInvitation.accepted_at.is_(None))
-        .where(StaffInvitation.cancelled_at.is_(None))
-        .where(StaffInvitation.expires_at > datetime.now(timezone.utc))
-    ).first() or 0
-    
-    if pending_invitations > 0:
-        warnings.append(f"Staff member has {pending_invitations} pending invitation(s) that will be cancelled")
-    
-    total_invitations = db.exec(
-        select(func.count(StaffInvitation.id))
-        .where(StaffInvitation.staff_id == staff_uuid)
-    ).first() or 0
-    
-    if total_invitations > 0:
-        warnings.append(f"Staff member has {total_invitations} invitation record(s) that will be deleted")
-    
-    # Check for future shift assignments
-    today = date.today()
-    future_assignments_count = db.exec(
-        select(func.count(ShiftAssignment.id))
-        .join(Schedule, ShiftAssignment.schedule_id == Schedule.id)
-        .where(ShiftAssignment.staff_id == staff_uuid)
-        .where(Schedule.week_start >= today)
-    ).first() or 0
-    
-    if future_assignments_count > 0:
-        errors.append(f"Staff member has {future_assignments_count} future shift assignments")
-        
-        # Get specific schedules for blocking entities
-        future_schedules = db.exec(
-            select(Schedule)
-            .join(ShiftAssignment, ShiftAssignment.schedule_id == Schedule.id)
-            .where(ShiftAssignment.staff_id == staff_uuid)
-            .where(Schedule.week_start >= today)
-            .distinct()
-        ).all()
-        
-        for schedule in future_schedules:
-            blocking_entities.append({
-                "type": "schedule",
-                "id": str(schedule.id),
-                "name": f"Schedule for week {schedule.week_start}",
-                "facility_id": str(schedule.facility_id)
-            })
-    
-    # Check for pending swap requests (both as requester and target)
-    pending_swap_requests_count = db.exec(
-        select(func.count(SwapRequest.id))
-        .where(
-            or_(
-                SwapRequest.requesting_staff_id == staff_uuid,
-                SwapRequest.target_staff_id == staff_uuid,
-                SwapRequest.assigned_staff_id == staff_uuid
+    return staff_bulk.deletion_impact(db, [staff])[staff.id]
+
+
+# ==================== BULK OPERATIONS ====================
+
+@router.post("/bulk/validate-deletion", response_model=StaffBulkDeleteValidation)
+def validate_bulk_staff_deletion(
+    request: StaffBulkRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
+    """Deletion impact for many staff members at once, e.g. seasonal offboarding"""
+    if not current_user.is_manager:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Manager access required")
+
+    staff_members, not_found = staff_bulk.load_tenant_staff(db, request.staff_ids, current_user.tenant_id)
+    impact = staff_bulk.deletion_impact(db, staff_members)
+    results = [
+        StaffBulkValidationItem(staff_id=staff.id, full_name=staff.full_name, **impact[staff.id].model_dump())
+        for staff in staff_members
+    ]
+    return StaffBulkDeleteValidation(
+        can_delete=all(result.can_delete for result in results),
+        results=results,
+        not_found=not_found
+    )
+
+
+@router.post("/bulk/deactivate", response_model=StaffBulkOperationResponse)
+def bulk_deactivate_staff(
+    request: StaffBulkDeactivateRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
+    """Deactivate many staff members and their user accounts in one transaction"""
+    if not current_user.is_manager:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Manager access required")
+
+    staff_members, not_found = staff_bulk.load_tenant_staff(db, request.staff_ids, current_user.tenant_id)
+    if not staff_members:
+        raise HTTPException(status_code=404, detail="No matching staff members found")
+
+    affected_ids = [staff.id for staff in staff_members]
+    counts = staff_bulk.deactivate_staff(
+        db, staff_members, current_user.tenant_id, current_user.email, cancel_swaps=request.cancel_pending_swaps
+    )
+    return StaffBulkOperationResponse(
+        success=True,
+        message=f"{counts.pop('affected_count')} staff member(s) deactivated",
+        affected_ids=affected_ids,
+        not_found=not_found,
+        **counts
+    )
+
+
+@router.post("/bulk/delete", response_model=StaffBulkOperationResponse)
+def bulk_delete_staff(
+    request: StaffBulkDeleteRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user),
+):
+    """Permanently delete many staff members in one transaction"""
+    if not current_user.is_manager:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Manager access required")
+
+    staff_members, not_found = staff_bulk.load_tenant_staff(db, request.staff_ids, current_user.tenant_id)
+    if not staff_members:
+        raise HTTPException(status_code=404, detail="No matching staff members found")
+
+    if not request.force:
+        impact = staff_bulk.deletion_impact(db, staff_members)
+        blocked = [staff for staff in staff_members if not impact[staff.id].can_delete]
+        if blocked:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": f"{len(blocked)} staff member(s) cannot be deleted. Use force=true to override or handle dependencies first.",
+                    "blocked": [
+                        {"staff_id": str(staff.id), "full_name": staff.full_name, "errors": impact[staff.id].errors}
+                        for staff in blocked
+                    ]
+                }
             )
+
+    affected_ids = [staff.id for staff in staff_members]
+    try:
+        counts = staff_bulk.delete_staff(
+            db, staff_members, current_user.tenant_id, current_user.email,
+            force=request.force, cascade_assignments=request.cascade_assignments
         )
-        .where(SwapRequest.status.in_([
-            SwapStatus.PENDING,
-            SwapStatus.MANAGER_APPROVED, 
-            SwapStatus.POTENTIAL_ASSIGNMENT,
-            SwapStatus.STAFF_ACCEPTED,
-            SwapStatus.MANAGER_FINAL_APPROVAL
-        ]))
-    ).first() or 0
-    
-    if pending_swap_requests_count > 0:
-        warnings.append(f"Staff member has {pending_swap_requests_count} pending swap requests")
-    
-    # Check if staff is a manager (assuming role indicates manager status)
-    is_manager = staff.role and ('manager' in staff.role.lower() or 'supervisor' in staff.role.lower())
-    
-    if is_manager:
-        # Check if this is the only manager in the facility
-        other_managers_count = db.exec(
-            select(func.count(Staff.id))
-            .where(Staff.facility_id == staff.facility_id)
-            .where(Staff.is_active == True)
-            .where(Staff.id != staff_uuid)
-            .where(
-                or_(
-                    Staff.role.contains('manager'),
-                    Staff.role.contains('supervisor')
-                )
-            )
-        ).first() or 0
-        
-        if other_managers_count == 0:
-            warnings.append("This is the only manager/supervisor for this facility")
-    
-    # Check for unique role/skill combination
-    has_unique_skills = False
-    
-    # Check if this is the only person with this specific role
-    other_staff_with_role = db.exec(
-        select(func.count(Staff.id))
-        .where(Staff.facility_id == staff.facility_id)
-        .where(Staff.is_active == True)
-        .where(Staff.id != staff_uuid)
-        .where(Staff.role == staff.role)
-    ).first() or 0
-    
-    if other_staff_with_role == 0:
-        has_unique_skills = True
-        warnings.append(f"Staff member is the only one with role: {staff.role}")
-    
-    # Check if this is the only person with this role AND skill level combination
-    other_staff_with_role_skill = db.exec(
-        select(func.count(Staff.id))
-        .where(Staff.facility_id == staff.facility_id)
-        .where(Staff.is_active == True)
-        .where(Staff.id != staff_uuid)
-        .where(Staff.role == staff.role)
-        .where(Staff.skill_level == staff.skill_level)
-    ).first() or 0
-    
-    if other_staff_with_role_skill == 0 and staff.skill_level and staff.skill_level > 3:
-        warnings.append(f"Staff member is the only {staff.role} with skill level {staff.skill_level}")
-    
-    # Check for upcoming unavailability records
-    upcoming_unavailability = db.exec(
-        select(func.count(StaffUnavailability.id))
-        .where(StaffUnavailability.staff_id == staff_uuid)
-        .where(StaffUnavailability.end >= datetime.now())
-    ).first() or 0
-    
-    if upcoming_unavailability > 0:
-        warnings.append(f"Staff member has {upcoming_unavailability} future unavailability records")
-    
-    # Check for zone assignments
-    zone_assignments = db.exec(
-        select(func.count(ZoneAssignment.id))
-        .where(ZoneAssignment.staff_id == staff_uuid)
-    ).first() or 0
-    
-    if zone_assignments > 0:
-        warnings.append(f"Staff member has {zone_assignments} zone assignments")
-    
-    return StaffDeleteValidation(
-        can_delete=len(errors) == 0,
-        future_assignments_count=future_assignments_count,
-        pending_swap_requests_count=pending_swap_requests_count,
-        is_manager=is_manager,
-        has_unique_skills=has_unique_skills,
-        errors=errors,
-        warnings=warnings,
-        blocking_entities=blocking_entities
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete staff members that past schedules or swap requests still reference. "
+                   "Use /staff/bulk/deactivate (recommended) instead."
+        )
+    return StaffBulkOperationResponse(
+        success=True,
+        message=f"{counts.pop('affected_count')} staff member(s) permanently deleted",
+        affected_ids=affected_ids,
+        not_found=not_found,
+        **counts
     )
 
 
@@ -781,14 +745,7 @@ def delete_staff(
                 db.delete(unavail)
         
         # Handle associated User record
-        associated_user = None
-        if staff.email:
-            associated_user = db.exec(
-                select(User).where(
-                    func.lower(User.email) == func.lower(staff.email),
-                    User.tenant_id == current_user.tenant_id
-                )
-            ).first()
+        associated_user = UserStaffMappingService(db).get_user_for_staff(staff)
 
         # Delete or deactivate the staff member
         if soft_delete:
@@ -902,96 +859,71 @@ def check_staff_duplicate(
     }
 
 #================== STAFF PROFILING ===============================================
+async def _get_my_staff(db: AsyncSession, current_user) -> Staff:
+    """Staff record of the current user (cached user -> staff mapping), or 404"""
+    staff = await db.run_sync(lambda session: UserStaffMappingService(session).get_staff_for_user(current_user))
+    
+    if not staff:
+        raise HTTPException(status_code=404, detail="Staff profile not found")
+    return staff
+
 @router.get("/me", response_model=StaffRead)
-def get_my_staff_profile(
-    db: Session = Depends(get_db),
+async def get_my_staff_profile(
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Get current user's staff profile"""
     if current_user.is_manager:
         raise HTTPException(status_code=403, detail="This endpoint is for staff only")
     
-    # Find staff record by email match
-    staff = db.exec(
-        select(Staff).join(Facility).where(
-            Staff.email == current_user.email,
-            Facility.tenant_id == current_user.tenant_id
-        )
-    ).first()
-    
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff profile not found")
-    
-    return staff
+    return await _get_my_staff(db, current_user)
 
 @router.get("/me/schedule")
-def get_my_schedule(
+async def get_my_schedule(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Get current staff member's schedule for a date range"""
     if current_user.is_manager:
         raise HTTPException(status_code=403, detail="This endpoint is for staff only")
     
-    # Find staff record
-    staff = db.exec(
-        select(Staff).join(Facility).where(
-            Staff.email == current_user.email,
-            Facility.tenant_id == current_user.tenant_id
-        )
-    ).first()
-    
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff profile not found")
+    staff = await _get_my_staff(db, current_user)
     
     # Parse dates with timezone awareness
     start = parse_date_input(start_date)
     end = parse_date_input(end_date)
     
-    # Get all schedules for this facility in date range
-    schedules = db.exec(
-        select(Schedule).where(
-            Schedule.facility_id == staff.facility_id,
-            Schedule.week_start >= start - timedelta(days=7),  # Include overlapping weeks
-            Schedule.week_start <= end
-        )
-    ).all()
-    
-    my_assignments = []
-    for schedule in schedules:
-        assignments = db.exec(
-            select(ShiftAssignment).where(
-                ShiftAssignment.schedule_id == schedule.id,
-                ShiftAssignment.staff_id == staff.id
-            )
-        ).all()
-        
-        for assignment in assignments:
-            assignment_date = schedule.week_start + timedelta(days=assignment.day)
-            
-            # Only include assignments in requested date range
-            if start <= assignment_date <= end:
-                my_assignments.append({
-                    "date": assignment_date.isoformat(),
-                    "day_of_week": assignment.day,
-                    "shift": assignment.shift,
-                    "schedule_id": str(schedule.id),
-                    "assignment_id": str(assignment.id)
-                })
+    # One range scan of the personal timeline (cached per staff member)
+    timeline = await db.run_sync(
+        lambda session: staff_timeline.personal_timeline(session, staff.id, current_user.tenant_id, start, end)
+    )
     
     return {
         "staff_id": str(staff.id),
         "staff_name": staff.full_name,
         "facility_id": str(staff.facility_id),
-        "assignments": my_assignments
+        "assignments": [
+            {
+                "date": entry["date"].isoformat(),
+                "day_of_week": entry["day"],
+                "shift": entry["shift"],
+                "shift_name": entry["shift_name"],
+                "start_time": entry["start_time"],
+                "end_time": entry["end_time"],
+                "hours": entry["hours"],
+                "schedule_id": str(entry["schedule_id"]),
+                "assignment_id": str(entry["assignment_id"])
+            }
+            for entry in timeline
+        ]
     }
 
 
 @router.get("/me/dashboard-stats")
 def get_my_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """Get enhanced dashboard statistics for current staff member"""
@@ -999,12 +931,7 @@ def get_my_dashboard_stats(
         raise HTTPException(status_code=403, detail="This endpoint is for staff only")
     
     # Find staff record
-    staff = db.exec(
-        select(Staff).join(Facility).where(
-            Staff.email == current_user.email,
-            Facility.tenant_id == current_user.tenant_id
-        )
-    ).first()
+    staff = UserStaffMappingService(db).get_staff_for_user(current_user)
     
     if not staff:
         raise HTTPException(status_code=404, detail="Staff profile not found")
@@ -1022,85 +949,63 @@ def get_my_dashboard_stats(
     next_week_start = week_start + timedelta(days=7)
     next_week_end = next_week_start + timedelta(days=6)
     
-    # Get schedules for current and next week
-    schedules = db.exec(
-        select(Schedule).where(
-            Schedule.facility_id == staff.facility_id,
-            Schedule.week_start.in_([week_start, next_week_start]) # type: ignore
-        )
-    ).all()
+    # This week, next week and the coming 7 days in one timeline read, with real shift hours
+    timeline = staff_timeline.personal_timeline(db, staff.id, current_user.tenant_id, week_start, next_week_end)
     
-    # Count assignments and calculate hours
     current_week_hours = 0
     next_week_hours = 0
     upcoming_shifts = []
     
-    for schedule in schedules:
-        assignments = db.exec(
-            select(ShiftAssignment).where(
-                ShiftAssignment.schedule_id == schedule.id,
-                ShiftAssignment.staff_id == staff.id
-            )
-        ).all()
+    for entry in timeline:
+        assignment_date = entry["date"]
         
-        for assignment in assignments:
-            assignment_date = schedule.week_start + timedelta(days=assignment.day)
-            
-            # Estimate 8 hours per shift (could be made configurable)
-            shift_hours = 8
-            
-            if week_start <= assignment_date <= week_end:
-                current_week_hours += shift_hours
-            elif next_week_start <= assignment_date <= next_week_end:
-                next_week_hours += shift_hours
-            
-            # Add to upcoming shifts if within next 7 days
-            if assignment_date >= today_utc and assignment_date <= (today_utc + timedelta(days=7)):
-                shift_names = ["Morning", "Afternoon", "Evening"]
-                shift_times = ["6:00 AM - 2:00 PM", "2:00 PM - 10:00 PM", "10:00 PM - 6:00 AM"]
-                day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-                
-                upcoming_shifts.append({
-                    "day": assignment.day,
-                    "shift": assignment.shift,
-                    "date": assignment_date.strftime("%Y-%m-%d"),
-                    "day_name": day_names[assignment.day] if assignment.day < 7 else "Unknown",
-                    "shift_name": shift_names[assignment.shift] if assignment.shift < 3 else "Unknown",
-                    "shift_time": shift_times[assignment.shift] if assignment.shift < 3 else "Unknown",
-                    "is_today": assignment_date == today_utc,
-                    "is_tomorrow": assignment_date == (today_utc + timedelta(days=1)),
-                    "assignment_id": str(assignment.id),
-                    "schedule_id": str(schedule.id)
-                })
-    
-    # Sort upcoming shifts by date
-    upcoming_shifts.sort(key=lambda x: x["date"])
-    
-    # Get pending swap requests
-    pending_swaps = db.exec(
-        select(SwapRequest).where(
-            SwapRequest.requesting_staff_id == staff.id,
-            SwapRequest.status == "pending"
-        )
-    ).all()
+        if week_start <= assignment_date <= week_end:
+            current_week_hours += entry["hours"]
+        elif next_week_start <= assignment_date <= next_week_end:
+            next_week_hours += entry["hours"]
+        
+        # Add to upcoming shifts if within next 7 days
+        if today_utc <= assignment_date <= today_utc + timedelta(days=7):
+            upcoming_shifts.append({
+                "day": entry["day"],
+                "shift": entry["shift"],
+                "date": assignment_date.strftime("%Y-%m-%d"),
+                "day_name": staff_timeline.DAY_NAMES[entry["day"]] if entry["day"] < 7 else "Unknown",
+                "shift_name": entry["shift_name"],
+                "shift_time": staff_timeline.shift_time_label(entry["start_time"], entry["end_time"]),
+                "start_time": entry["start_time"],
+                "end_time": entry["end_time"],
+                "is_today": assignment_date == today_utc,
+                "is_tomorrow": assignment_date == (today_utc + timedelta(days=1)),
+                "assignment_id": str(entry["assignment_id"]),
+                "schedule_id": str(entry["schedule_id"])
+            })
     
     # Get recent swap activity for gamification stats (last 30 days)
     recent_date = now_utc - timedelta(days=30)
     
+    # Pending requests, requests I helped with and all auto requests, counted in one pass
+    is_recent = SwapRequest.created_at >= recent_date
+    pending_swaps, helped_others, total_auto_requests = db.exec(
+        select(
+            func.count(SwapRequest.id).filter(
+                SwapRequest.requesting_staff_id == staff.id, SwapRequest.status == "pending"
+            ),
+            func.count(SwapRequest.id).filter(
+                SwapRequest.assigned_staff_id == staff.id, is_recent,
+                SwapRequest.status.in_([SwapStatus.EXECUTED, SwapStatus.STAFF_ACCEPTED]) # type: ignore
+            ),
+            func.count(SwapRequest.id).filter(SwapRequest.swap_type == "auto", is_recent)
+        ).where(
+            or_(is_recent, (SwapRequest.requesting_staff_id == staff.id) & (SwapRequest.status == "pending"))
+        )
+    ).one()
+    
     # Requests where I was the target
     requests_for_me = db.exec(
-        select(SwapRequest).where(
+        select(SwapRequest.target_staff_accepted, SwapRequest.created_at, SwapRequest.staff_responded_at).where(
             SwapRequest.target_staff_id == staff.id,
-            SwapRequest.created_at >= recent_date
-        )
-    ).all()
-    
-    # Requests where I helped others (auto-assigned)
-    helped_others = db.exec(
-        select(SwapRequest).where(
-            SwapRequest.assigned_staff_id == staff.id,
-            SwapRequest.created_at >= recent_date,
-            SwapRequest.status.in_([SwapStatus.EXECUTED, SwapStatus.STAFF_ACCEPTED]) # type: ignore
+            is_recent
         )
     ).all()
     
@@ -1110,14 +1015,7 @@ def get_my_dashboard_stats(
     acceptance_rate = (accepted_requests / total_requests_for_me * 100) if total_requests_for_me > 0 else 0
     
     # Calculate helpfulness score
-    total_auto_requests = db.exec(
-        select(func.count(SwapRequest.id)).where(
-            SwapRequest.swap_type == "auto",
-            SwapRequest.created_at >= recent_date
-        )
-    ).one()
-    
-    helpfulness_score = (len(helped_others) / total_auto_requests * 100) if total_auto_requests > 0 else 0
+    helpfulness_score = (helped_others / total_auto_requests * 100) if total_auto_requests > 0 else 0
     
     # Calculate current streak
     recent_requests = sorted(requests_for_me, key=lambda x: x.created_at, reverse=True)[:10]
@@ -1129,16 +1027,16 @@ def get_my_dashboard_stats(
             break
     
     # Calculate average response time with timezone awareness
-    responded_requests = [r for r in requests_for_me if r.target_staff_accepted is not None and r.updated_at]
+    responded_requests = [r for r in requests_for_me if r.target_staff_accepted is not None and r.staff_responded_at]
     avg_response_time = "N/A"
     
     if responded_requests:
         total_response_time = 0
         for request in responded_requests:
             created_at = ensure_timezone_aware(request.created_at)
-            updated_at = ensure_timezone_aware(request.updated_at)
-            if created_at and updated_at:
-                total_response_time += (updated_at - created_at).total_seconds() / 3600
+            responded_at = ensure_timezone_aware(request.staff_responded_at)
+            if created_at and responded_at:
+                total_response_time += (responded_at - created_at).total_seconds() / 3600
         
         if total_response_time > 0:
             avg_hours = total_response_time / len(responded_requests)
@@ -1152,39 +1050,30 @@ def get_my_dashboard_stats(
     
     return {
         "staff_id": str(staff.id),
-        "thisWeekHours": current_week_hours,
-        "nextWeekHours": next_week_hours,
+        "thisWeekHours": round(current_week_hours, 1),
+        "nextWeekHours": round(next_week_hours, 1),
         "upcomingShifts": upcoming_shifts,
-        "pendingSwaps": len(pending_swaps),
+        "pendingSwaps": pending_swaps,
         "acceptanceRate": round(acceptance_rate, 1),
         "helpfulnessScore": round(helpfulness_score, 1),
         "currentStreak": current_streak,
-        "totalHelped": len(helped_others),
+        "totalHelped": helped_others,
         "avgResponseTime": avg_response_time,
         "teamRating": min(95, round((acceptance_rate * 0.6) + (helpfulness_score * 0.4), 1))
     }
 
 @router.get("/me/swap-requests", response_model=List[dict])
-def get_my_swap_requests(
+async def get_my_swap_requests(
     status: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Get swap requests for current staff member"""
     if current_user.is_manager:
         raise HTTPException(status_code=403, detail="This endpoint is for staff only")
     
-    # Find staff record
-    staff = db.exec(
-        select(Staff).join(Facility).where(
-            Staff.email == current_user.email,
-            Facility.tenant_id == current_user.tenant_id
-        )
-    ).first()
-    
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff profile not found")
+    staff = await _get_my_staff(db, current_user)
     
     # Properly specify the join condition between SwapRequest and Schedule
     query = select(SwapRequest).join(
@@ -1202,14 +1091,28 @@ def get_my_swap_requests(
     if status:
         query = query.where(SwapRequest.status == status)
     
-    swap_requests = db.exec(query.order_by(SwapRequest.created_at.desc()).limit(limit)).all()
+    swap_requests = (await db.exec(query.order_by(SwapRequest.created_at.desc()).limit(limit))).all()
+    
+    # Load the other staff involved in one query
+    staff_ids = {
+        staff_id
+        for swap in swap_requests
+        for staff_id in (swap.requesting_staff_id, swap.target_staff_id, swap.assigned_staff_id)
+        if staff_id
+    }
+    staff_by_id = {staff.id: staff}
+    if staff_ids - {staff.id}:
+        staff_by_id.update({
+            member.id: member
+            for member in (await db.exec(select(Staff).where(Staff.id.in_(staff_ids - {staff.id})))).all()
+        })
     
     # Format results with additional context
     result = []
     for swap in swap_requests:
-        requesting_staff = db.get(Staff, swap.requesting_staff_id)
-        target_staff = db.get(Staff, swap.target_staff_id) if swap.target_staff_id else None
-        assigned_staff = db.get(Staff, swap.assigned_staff_id) if swap.assigned_staff_id else None
+        requesting_staff = staff_by_id.get(swap.requesting_staff_id)
+        target_staff = staff_by_id.get(swap.target_staff_id) if swap.target_staff_id else None
+        assigned_staff = staff_by_id.get(swap.assigned_staff_id) if swap.assigned_staff_id else None
         
         # Determine user's role in this swap
         user_role = "unknown"
@@ -3,6 +3,7 @@
 import uuid
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional, Literal
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
@@ -13,7 +14,7 @@ from app.services.notification_service import NotificationService
 from app.models import NotificationType, NotificationPriority
 from app.services.user_staff_mapping import UserStaffMappingService
 
-from ...deps import get_db, get_current_user
+from ...deps import get_async_db, get_db, get_current_user, get_read_db
 from ...models import (
     StaffUnavailability, SwapRequest, SwapHistory, Schedule, ShiftAssignment, 
     Staff, Facility, User, SwapStatus, ZoneAssignment
@@ -254,9 +255,7 @@ async def send_swap_accepted_notifications(
     
     try:
         # Notify requesting staff
-        requesting_user = db.exec(
-            select(User).where(User.email == requesting_staff.email)
-        ).first()
+        requesting_user = UserStaffMappingService(db).get_user_for_staff(requesting_staff)
         
         if requesting_user:
             await notification_service.send_notification(
@@ -317,9 +316,7 @@ async def send_swap_declined_notifications(
     
     try:
         # Notify requesting staff
-        requesting_user = db.exec(
-            select(User).where(User.email == requesting_staff.email)
-        ).first()
+        requesting_user = UserStaffMappingService(db).get_user_for_staff(requesting_staff)
         
         if requesting_user:
             await notification_service.send_notification(
@@ -441,9 +438,9 @@ def _get_shift_name(shift_number: int) -> str:
 # ==================== CRITICAL: COLLECTION ENDPOINTS MUST BE BEFORE /{swap_id} ====================
 
 @router.get("/all", response_model=List[SwapRequestWithDetails])
-def get_all_swap_requests(
+async def get_all_swap_requests(
     limit: int = Query(200, le=300),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -453,7 +450,7 @@ def get_all_swap_requests(
     Placed **before** the dynamic `/{swap_id}` route so the literal
     path segment `/all` is not swallowed by the UUID matcher.
     """
-    return list_swap_requests(  # re‑use the existing helper
+    return await list_swap_requests(  # re‑use the existing helper
         db=db,
         current_user=current_user,
         facility_id=None,
@@ -465,7 +462,7 @@ def get_all_swap_requests(
 
 @router.get("/facilities-summary")
 def get_facilities_swap_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get swap summary for all facilities (ENHANCED)"""
@@ -524,7 +521,7 @@ def get_facilities_swap_summary(
 
 @router.get("/global-summary")
 async def get_global_swap_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get global swap summary across all facilities"""
@@ -623,17 +620,10 @@ async def create_specific_swap_request(
         else:
             raise HTTPException(status_code=400, detail="Manager must specify requesting_staff_id")
     else:
-        # For staff users, find their staff record using email lookup
-        requesting_staff = db.exec(
-            select(Staff).join(Facility).where(
-                Staff.email == current_user.email,
-                Facility.tenant_id == current_user.tenant_id,
-                Staff.facility_id == schedule.facility_id,
-                Staff.is_active.is_(True)
-            )
-        ).first()
+        # For staff users, find their staff record in the schedule's facility
+        requesting_staff = UserStaffMappingService(db).get_staff_for_user(current_user, schedule.facility_id)
         
-        if not requesting_staff:
+        if not requesting_staff or not requesting_staff.is_active:
             raise HTTPException(
                 status_code=403, 
                 detail=f"No active staff record found for {current_user.email} in this facility"
@@ -751,16 +741,9 @@ async def create_auto_swap_request(
         else:
             raise HTTPException(status_code=400, detail="Manager must specify requesting_staff_id")
     else:
-        requesting_staff = db.exec(
-            select(Staff).join(Facility).where(
-                Staff.email == current_user.email,
-                Facility.tenant_id == current_user.tenant_id,
-                Staff.facility_id == schedule.facility_id,
-                Staff.is_active.is_(True)
-            )
-        ).first()
+        requesting_staff = UserStaffMappingService(db).get_staff_for_user(current_user, schedule.facility_id)
         
-        if not requesting_staff:
+        if not requesting_staff or not requesting_staff.is_active:
             raise HTTPException(
                 status_code=403, 
                 detail=f"No active staff record found for {current_user.email} in this facility"
@@ -830,8 +813,8 @@ async def create_auto_swap_request(
 # ==================== LISTING ENDPOINTS ====================
 
 @router.get("/", response_model=List[SwapRequestWithDetails])
-def list_swap_requests(
-    db: Session = Depends(get_db),
+async def list_swap_requests(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     facility_id: Optional[UUID] = Query(None),
     status: Optional[str] = Query(None),
@@ -874,14 +857,28 @@ def list_swap_requests(
     
     query = query.order_by(SwapRequest.created_at.desc()).limit(limit)
     
-    swap_requests = db.exec(query).all()
+    swap_requests = (await db.exec(query)).all()
     
-    # Load related data and build enhanced response
+    # Load every staff member involved in one query
+    staff_ids = {
+        staff_id
+        for swap in swap_requests
+        for staff_id in (swap.requesting_staff_id, swap.target_staff_id, swap.assigned_staff_id)
+        if staff_id
+    }
+    staff_by_id = {}
+    if staff_ids:
+        staff_by_id = {
+            staff.id: staff
+            for staff in (await db.exec(select(Staff).where(Staff.id.in_(staff_ids)))).all()
+        }
+    
+    # Build enhanced response
     result = []
     for swap in swap_requests:
-        requesting_staff = db.get(Staff, swap.requesting_staff_id)
-        target_staff = db.get(Staff, swap.target_staff_id) if swap.target_staff_id else None
-        assigned_staff = db.get(Staff, swap.assigned_staff_id) if swap.assigned_staff_id else None
+        requesting_staff = staff_by_id.get(swap.requesting_staff_id)
+        target_staff = staff_by_id.get(swap.target_staff_id) if swap.target_staff_id else None
+        assigned_staff = staff_by_id.get(swap.assigned_staff_id) if swap.assigned_staff_id else None
         
         # Convert to dict and create SwapRequestWithDetails
         swap_data = swap.dict()
@@ -986,9 +983,7 @@ async def get_available_swap_actions(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get current user's staff record
-    current_staff = db.exec(
-        select(Staff).where(Staff.email == current_user.email)
-    ).first()
+    current_staff = UserStaffMappingService(db).get_staff_for_user(current_user)
     
     available_actions = []
     
@@ -1805,9 +1800,7 @@ async def respond_to_swap_request(
         raise HTTPException(status_code=404, detail="Swap request not found")
     
     # Get current staff member
-    current_staff = db.exec(
-        select(Staff).where(Staff.email == current_user.email)
-    ).first()
+    current_staff = UserStaffMappingService(db).get_staff_for_user(current_user)
     
     if not current_staff:
         raise HTTPException(status_code=404, detail="Staff member not found")
@@ -1920,9 +1913,7 @@ async def respond_to_potential_assignment(
         raise HTTPException(status_code=404, detail="Swap request not found")
     
     # Verify this is a potential assignment for the current user
-    current_staff = db.exec(
-        select(Staff).where(Staff.email == current_user.email)
-    ).first()
+    current_staff = UserStaffMappingService(db).get_staff_for_user(current_user)
     
     if not current_staff:
         raise HTTPException(status_code=404, detail="Staff member not found")
@@ -2441,9 +2432,7 @@ async def send_swap_executed_notifications(
         # Notify the requesting staff
         if requesting_staff.email:
             try:
-                requesting_user = db.exec(
-                    select(User).where(User.email == requesting_staff.email)
-                ).first()
+                requesting_user = UserStaffMappingService(db).get_user_for_staff(requesting_staff)
                 
                 if requesting_user:
                     await notification_service.send_notification(
@@ -2469,9 +2458,7 @@ async def send_swap_executed_notifications(
         # Notify the covering staff
         if covering_staff.email:
             try:
-                covering_user = db.exec(
-                    select(User).where(User.email == covering_staff.email)
-                ).first()
+                covering_user = UserStaffMappingService(db).get_user_for_staff(covering_staff)
                 
                 if covering_user:
                     await notification_service.send_notification(
@@ -23,6 +23,22 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://redis:6379/0"
     FRONTEND_URL: str = "http://localhost:3000"
     
+    # ==================== DATABASE POOL ====================
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Reconnect before server/proxy idle timeouts
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # 0 disables
+    DB_BACKGROUND_POOL_SIZE: int = 5  # Separate pool for notification delivery, audit and retention
+    DB_BACKGROUND_MAX_OVERFLOW: int = 5
+    DB_BACKGROUND_STATEMENT_TIMEOUT_MS: int = 300000
+    DB_SLOW_CHECKOUT_MS: int = 100  # Checkouts waiting longer count as slow
+    DB_PGBOUNCER_MODE: bool = False  # No pre-ping; statement timeout via SET LOCAL
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replicas for get_read_db
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5  # Lagging replicas are skipped
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 5
+    DB_READ_YOUR_WRITES_SECONDS: float = 30  # Reads stay on the primary this long after a user's write
+    
     # ==================== ENCRYPTION CONFIGURATION ====================
     # ✅ Optional fields with defaults
     ENCRYPTION_KEY: Optional[str] = None
@@ -30,6 +46,8 @@ class Settings(BaseSettings):
     ENCRYPTION_ALGORITHM: str = "Fernet"
     ENCRYPTION_ITERATIONS: int = 100000
     ENCRYPTION_SALT: str = "hospitality_scheduler_salt_v1"
+    ENCRYPTION_OLD_KEYS: Optional[str] = None  # Comma-separated retired keys, decrypt only (key rotation)
+    ENCRYPTION_BATCH_SIZE: int = 500  # Rows per batch when re-encrypting tables
     
     # Firebase Configuration
     FIREBASE_SERVICE_ACCOUNT_PATH: Optional[str] = None
@@ -54,21 +72,60 @@ class Settings(BaseSettings):
     MAX_OPTIMIZATION_ITERATIONS: int = 100
     ANALYTICS_CACHE_TTL: int = 3600  # 1 hour in seconds
     CONFLICT_CHECK_ENABLED: bool = True
-    
+
+    # Schedule PDF cache (content-addressed, see services/pdf_cache.py)
+    PDF_CACHE_DIR: str = "uploads/schedules/cache"
+    PDF_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB
+    PDF_CACHE_MAX_AGE_DAYS: int = 90
+    PDF_CACHE_EVICTION_INTERVAL_SECONDS: int = 6 * 3600
+    PDF_RENDERER: str = "auto"  # auto | puppeteer | reportlab (auto falls back to ReportLab without Node)
+    PDF_SPOOL_MAX_BYTES: int = 8 * 1024 * 1024  # Rendered PDFs above this spill to disk
+    SCHEDULE_CHANGE_LOG_VERSIONS: int = 200  # Diffs kept per schedule; older clients get a full refresh
+
     # ==================== SECURITY SETTINGS ====================
     SESSION_TIMEOUT_HOURS: int = 24
     AUDIT_LOG_ENABLED: bool = True
-    AUDIT_LOG_RETENTION_DAYS: int = 365
+    AUDIT_LOG_RETENTION_DAYS: int = 365  # For tenants without SecuritySettings.audit_retention_days
+    AUDIT_BATCH_SIZE: int = 500  # Rows per bulk insert
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    AUDIT_BUFFER_MAX_EVENTS: int = 10000  # Info events are dropped beyond this
+    AUDIT_REQUEST_SAMPLE_RATE: float = 1.0  # Fraction of successful-request events kept
+    AUDIT_PARTITION_MONTHS_AHEAD: int = 3  # Only used once the audit log is partitioned
+    SESSION_RETENTION_DAYS: int = 30  # Expired/revoked sessions are deleted after this
+    RETENTION_INTERVAL_SECONDS: int = 3600
+    RETENTION_BATCH_SIZE: int = 5000  # Rows per DELETE/UPDATE statement
+    RETENTION_BATCH_PAUSE_SECONDS: float = 0.05  # Pause between batches to limit I/O pressure
     ENCRYPTION_RATE_LIMIT: int = 100  # per hour
+    RATE_LIMIT_BACKEND: str = "auto"  # auto | redis | memory (auto uses Redis when it is reachable)
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Bound on in-process buckets (identity x endpoint)
     
     # Password security
     ARGON2_ROUNDS: int = Field(default=4)  # Dev: 4, Prod: 8-12
     ARGON2_MEMORY_COST: int = Field(default=65536)  # 64MB
     ARGON2_PARALLELISM: int = Field(default=1)
+    PASSWORD_HASH_MAX_WORKERS: int = 4  # Threads dedicated to hashing
+    PASSWORD_HASH_MEMORY_BUDGET_MB: int = 256  # Caps concurrent hashes at budget / ARGON2_MEMORY_COST
     
     # Enhanced security
     ENABLE_SESSION_TRACKING: bool = True
+    SESSION_CACHE_TTL_SECONDS: int = 30  # How long a validated session skips the DB
+    SESSION_CACHE_MAX_ENTRIES: int = 10000
+    SESSION_LAST_USED_FLUSH_SECONDS: int = 60
+    USER_CACHE_TTL_SECONDS: int = 30  # Authenticated user snapshots reused across requests
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    TENANT_SETTINGS_CACHE_TTL_SECONDS: int = 300  # Safety net; writes invalidate immediately
+    FACILITY_CACHE_TTL_SECONDS: int = 300  # Facility picker details; writes invalidate immediately
+    STAFF_IMPORT_CHUNK_SIZE: int = 2000  # Rows validated and inserted per batch during staff imports
+    STAFF_IMPORT_MAX_REPORTED_ERRORS: int = 1000  # Per-row errors returned; the total is always counted
+    STAFF_TIMELINE_CACHE_TTL_SECONDS: int = 60  # Personal schedules; writes in this process invalidate immediately
+    STAFF_TIMELINE_CACHE_MAX_ENTRIES: int = 10000
+    USER_STAFF_MAPPING_CACHE_TTL_SECONDS: int = 300  # User <-> staff ids; identity changes in this process invalidate immediately
+    USER_STAFF_MAPPING_CACHE_MAX_ENTRIES: int = 20000
     MAX_FAILED_LOGIN_ATTEMPTS: int = 5
+    LOCKOUT_BACKEND: str = "auto"  # database | auto | redis | memory (auto uses Redis when reachable, else the database)
+    LOCKOUT_MAX_KEYS: int = 100000  # Bound on in-process failure counters
+    LOGIN_ATTEMPT_SAMPLE_RATE: float = 0.1  # Share of attempts persisted when counters are used
+    LOGIN_ATTEMPT_FLUSH_SECONDS: int = 30
     ACCOUNT_LOCKOUT_DURATION: int = 30  # minutes
 
     # Pydantic v2 model configuration
@@ -0,0 +1,319 @@
+# app/core/database.py
+"""
+Engines and connection pools.
+
+`engine` serves API requests. `background_engine` has its own, smaller pool
+for notification delivery, audit batches and retention jobs, so background
+work during a publish storm cannot exhaust the connections requests need.
+
+Both pools count checkouts, checkout wait time and pool timeouts in
+PoolMetrics (see /metrics and /health). Every statement runs under a
+server-side statement_timeout.
+
+DB_PGBOUNCER_MODE is for running behind PgBouncer in transaction pooling
+mode: pre-ping is disabled and the statement timeout is set per
+transaction (SET LOCAL) instead of as a connection startup option, which
+PgBouncer does not pass through.
+
+`replica_router` sends read-only sessions (get_read_db) to the replicas in
+DATABASE_REPLICA_URLS; see replicas.py.
+
+get_async_engine() is the asyncpg (aiosqlite for SQLite) engine behind
+`get_async_db`, used by the hot read endpoints so their queries await
+instead of tying up a threadpool worker. It is created on first use.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import create_engine
+
+from .config import get_settings
+from .replicas import build_replica_router
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """Checkout counters and wait times for one engine's pool"""
+
+    def __init__(self, name: str, slow_checkout_seconds: float = 0.1):
+        self.name = name
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.pool: Optional[QueuePool] = None
+        self._lock = threading.Lock()
+
+    def record_checkout(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= self.slow_checkout_seconds:
+                self.slow_checkouts += 1
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[index] += 1
+
+    def stats(self) -> Dict[str, float]:
+        pool = self.pool
+        return {
+            "pool_size": pool.size() if pool else 0,
+            "checked_out": pool.checkedout() if pool else 0,
+            "overflow": max(pool.overflow(), 0) if pool else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "slow_checkouts": self.slow_checkouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout into its PoolMetrics"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics:
+            self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """InstrumentedQueuePool for async engines"""
+
+
+# Metrics for every engine built by build_engine(), by name
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def build_engine(
+    url: str,
+    name: str = "default",
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_timeout: Optional[float] = None,
+    pool_recycle: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+    pgbouncer_mode: Optional[bool] = None,
+):
+    """Create an engine with a sized, instrumented pool; unset options come from settings"""
+    settings = get_settings()
+    parsed = make_url(url)
+    pgbouncer_mode = settings.DB_PGBOUNCER_MODE if pgbouncer_mode is None else pgbouncer_mode
+    statement_timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+
+    if _is_memory_sqlite(parsed):
+        # In-memory SQLite (tests) needs its single-connection pool
+        return create_engine(url, echo=False)
+
+    options = {
+        "echo": False,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size if pool_size is not None else settings.DB_POOL_SIZE,
+        "max_overflow": max_overflow if max_overflow is not None else settings.DB_MAX_OVERFLOW,
+        "pool_timeout": pool_timeout if pool_timeout is not None else settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": pool_recycle if pool_recycle is not None else settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": not pgbouncer_mode,
+        "pool_logging_name": name,
+    }
+
+    is_postgres = parsed.get_backend_name() == "postgresql"
+    if is_postgres and statement_timeout_ms and not pgbouncer_mode:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout_ms)}"}
+
+    engine = create_engine(url, **options)
+
+    if is_postgres and statement_timeout_ms and pgbouncer_mode:
+        @event.listens_for(engine, "begin")
+        def _set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+
+    metrics = PoolMetrics(name, settings.DB_SLOW_CHECKOUT_MS / 1000)
+    metrics.pool = engine.pool
+    engine.pool.metrics = metrics
+    pool_metrics[name] = metrics
+
+    logger.info(
+        f"Database engine '{name}': pool_size={options['pool_size']} max_overflow={options['max_overflow']} "
+        f"statement_timeout={statement_timeout_ms}ms pgbouncer_mode={pgbouncer_mode}"
+    )
+    return engine
+
+
+def async_database_url(url: str):
+    """The asyncio driver equivalent of a sync DATABASE_URL"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg")
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    return parsed
+
+
+def build_async_engine(
+    url: str,
+    name: str = "api_async",
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+    pgbouncer_mode: Optional[bool] = None,
+):
+    """Async counterpart of build_engine(), with the same pool settings and metrics"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    settings = get_settings()
+    parsed = async_database_url(url)
+    pgbouncer_mode = settings.DB_PGBOUNCER_MODE if pgbouncer_mode is None else pgbouncer_mode
+    statement_timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+
+    if _is_memory_sqlite(parsed):
+        return create_async_engine(parsed, echo=False)
+
+    options = {
+        "echo": False,
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": pool_size if pool_size is not None else settings.DB_POOL_SIZE,
+        "max_overflow": max_overflow if max_overflow is not None else settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": not pgbouncer_mode,
+        "pool_logging_name": name,
+    }
+
+    is_postgres = parsed.get_backend_name() == "postgresql"
+    if is_postgres:
+        connect_args: Dict[str, object] = {}
+        if statement_timeout_ms and not pgbouncer_mode:
+            connect_args["server_settings"] = {"statement_timeout": str(int(statement_timeout_ms))}
+        if pgbouncer_mode:
+            # Prepared statements do not survive PgBouncer handing the connection to another client
+            connect_args["statement_cache_size"] = 0
+            parsed = parsed.update_query_dict({"prepared_statement_cache_size": "0"})
+        options["connect_args"] = connect_args
+
+    engine = create_async_engine(parsed, **options)
+
+    if is_postgres and statement_timeout_ms and pgbouncer_mode:
+        # PgBouncer rejects startup parameters it does not know, as in build_engine()
+        @event.listens_for(engine.sync_engine, "begin")
+        def _set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+
+    metrics = PoolMetrics(name, settings.DB_SLOW_CHECKOUT_MS / 1000)
+    metrics.pool = engine.sync_engine.pool
+    engine.sync_engine.pool.metrics = metrics
+    pool_metrics[name] = metrics
+    return engine
+
+
+_async_engine = None
+
+
+def get_async_engine():
+    """The shared async engine, built from DATABASE_URL on first use"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = build_async_engine(get_settings().DATABASE_URL)
+    return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+def pool_stats() -> Dict[str, Dict[str, float]]:
+    """Current pool state and counters per engine (see /health)"""
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
+
+
+def render_pool_metrics() -> str:
+    """Pool metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[tuple], suffix: str = ""):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}")
+
+    all_metrics = list(pool_metrics.values())
+    stats = {m.name: m.stats() for m in all_metrics}
+
+    metric("db_pool_size", "gauge", "Configured pool size",
+           [({"pool": n}, s["pool_size"]) for n, s in stats.items()])
+    metric("db_pool_checked_out", "gauge", "Connections currently checked out",
+           [({"pool": n}, s["checked_out"]) for n, s in stats.items()])
+    metric("db_pool_overflow", "gauge", "Overflow connections currently open",
+           [({"pool": n}, s["overflow"]) for n, s in stats.items()])
+    metric("db_pool_checkouts_total", "counter", "Successful connection checkouts",
+           [({"pool": n}, s["checkouts"]) for n, s in stats.items()])
+    metric("db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a connection",
+           [({"pool": n}, s["timeouts"]) for n, s in stats.items()])
+
+    histogram = []
+    for m in all_metrics:
+        for bound, count in zip(WAIT_BUCKETS, m.wait_buckets):
+            histogram.append(({"pool": m.name, "le": bound}, count))
+        histogram.append(({"pool": m.name, "le": "+Inf"}, m.checkouts + m.timeouts))
+    metric("db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a connection", histogram, "_bucket")
+    for m in all_metrics:
+        lines.append(f'db_pool_checkout_wait_seconds_sum{{pool="{m.name}"}} {m.wait_seconds_total}')
+        lines.append(f'db_pool_checkout_wait_seconds_count{{pool="{m.name}"}} {m.checkouts + m.timeouts}')
+
+    return "\n".join(lines) + "\n"
+
+
+settings = get_settings()
+
+# Create the global engines
+engine = build_engine(settings.DATABASE_URL, name="api")
+background_engine = build_engine(
+    settings.DATABASE_URL,
+    name="background",
+    pool_size=settings.DB_BACKGROUND_POOL_SIZE,
+    max_overflow=settings.DB_BACKGROUND_MAX_OVERFLOW,
+    statement_timeout_ms=settings.DB_BACKGROUND_STATEMENT_TIMEOUT_MS,
+)
+replica_router = build_replica_router(engine)
@@ -7,38 +7,68 @@ Supports field-level encryption for passwords, tokens, and API keys.
 import os
 import base64
 import logging
-from typing import Optional, Any, Dict
-from cryptography.fernet import Fernet
+from typing import Optional, Any, Dict, Iterable, List
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SALT = "hospitality_scheduler_salt_v1"
+DEFAULT_ITERATIONS = 100000  # NIST recommended minimum
+
 class EncryptionError(Exception):
     """Custom exception for encryption-related errors"""
     pass
 
+@lru_cache(maxsize=32)
+def derive_key(secret: str, salt: str = DEFAULT_SALT, iterations: int = DEFAULT_ITERATIONS) -> bytes:
+    """
+    Derive a Fernet key from a secret with PBKDF2.
+    Cached per process: each derivation costs ~100k SHA256 rounds.
+    """
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt.encode(),
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(secret.encode()))
+
+def _decode_encryption_key(value: str) -> bytes:
+    """Decode an ENCRYPTION_KEY value (see generate_encryption_key) to a Fernet key"""
+    key = base64.urlsafe_b64decode(value.encode())
+    Fernet(key)  # Raises if this is not a valid Fernet key
+    return key
+
 class FieldEncryption:
     """
     Field-level encryption utility using Fernet (symmetric encryption).
     Derives encryption keys from environment variables for security.
+
+    Values are encrypted with the current key and decrypted with the current
+    key or any retired key in ENCRYPTION_OLD_KEYS, so keys can be rotated
+    without downtime (see setup_encryption.py rotate).
     """
     
-    def __init__(self, encryption_key: Optional[str] = None):
+    def __init__(self, encryption_key: Optional[str] = None, old_keys: Optional[List[str]] = None):
         """
         Initialize encryption with optional custom key.
-        If no key provided, derives from SECRET_KEY environment variable.
+        If no key provided, uses ENCRYPTION_KEY or derives from SECRET_KEY.
+        `old_keys` (default: ENCRYPTION_OLD_KEYS) are only used to decrypt.
         """
         self._encryption_key = encryption_key
+        self._old_keys = old_keys
         self._fernet = None
+        self._primary = None
         
     @property
-    def fernet(self) -> Fernet:
-        """Lazy-load Fernet instance with derived key"""
+    def fernet(self) -> MultiFernet:
+        """Lazy-load Fernet instances: current key first, then retired keys"""
         if self._fernet is None:
-            key = self._get_or_derive_key()
-            self._fernet = Fernet(key)
+            self._primary = Fernet(self._get_or_derive_key())
+            self._fernet = MultiFernet([self._primary, *(Fernet(key) for key in self._get_old_keys())])
         return self._fernet
     
     def _get_or_derive_key(self) -> bytes:
@@ -46,6 +76,17 @@ class FieldEncryption:
         Get encryption key from environment or derive from SECRET_KEY.
         Uses PBKDF2 for key derivation with a static salt for consistency.
         """
+        salt = os.getenv("ENCRYPTION_SALT", DEFAULT_SALT)
+        iterations = int(os.getenv("ENCRYPTION_ITERATIONS", DEFAULT_ITERATIONS))
+        
+        # An explicit key wins so KeyRotation can hold two keys at once. Like
+        # ENCRYPTION_OLD_KEYS, it is an ENCRYPTION_KEY value or a secret to derive from.
+        if self._encryption_key:
+            try:
+                return _decode_encryption_key(self._encryption_key)
+            except Exception:
+                return derive_key(self._encryption_key, salt, iterations)
+        
         # Check for dedicated encryption key first
         encryption_key = os.getenv("ENCRYPTION_KEY")
         if encryption_key:
@@ -55,22 +96,36 @@ class FieldEncryption:
                 logger.warning(f"Invalid ENCRYPTION_KEY format: {e}")
         
         # Fallback to deriving from SECRET_KEY
-        secret_key = self._encryption_key or os.getenv("SECRET_KEY")
+        secret_key = os.getenv("SECRET_KEY")
         if not secret_key:
             raise EncryptionError(
                 "No encryption key available. Set ENCRYPTION_KEY or SECRET_KEY environment variable."
             )
         
         # Use static salt for consistency (in production, consider per-tenant salts)
-        salt = b"hospitality_scheduler_salt_v1"
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,  # NIST recommended minimum
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
-        return key
+        return derive_key(secret_key, salt, iterations)
+    
+    def _get_old_keys(self) -> List[bytes]:
+        """
+        Retired keys, each either an ENCRYPTION_KEY value or a secret
+        that keys were derived from (e.g. a previous SECRET_KEY).
+        """
+        if self._old_keys is not None:
+            old_keys = self._old_keys
+        elif self._encryption_key:
+            old_keys = []
+        else:
+            old_keys = [key.strip() for key in os.getenv("ENCRYPTION_OLD_KEYS", "").split(",") if key.strip()]
+        
+        salt = os.getenv("ENCRYPTION_SALT", DEFAULT_SALT)
+        iterations = int(os.getenv("ENCRYPTION_ITERATIONS", DEFAULT_ITERATIONS))
+        keys = []
+        for old_key in old_keys:
+            try:
+                keys.append(_decode_encryption_key(old_key))
+            except Exception:
+                keys.append(derive_key(old_key, salt, iterations))
+        return keys
     
     def encrypt(self, plaintext: str) -> str:
         """
@@ -103,6 +158,57 @@ class FieldEncryption:
             logger.error(f"Decryption failed: {e}")
             raise EncryptionError(f"Failed to decrypt data: {str(e)}")
     
+    def encrypt_many(self, values: Iterable[Optional[str]]) -> List[str]:
+        """
+        Encrypt a batch of values in one pass; empty values stay empty.
+        Raises EncryptionError if any value fails.
+        """
+        fernet = self.fernet
+        b64encode = base64.urlsafe_b64encode
+        try:
+            return [b64encode(fernet.encrypt(value.encode('utf-8'))).decode('utf-8') if value else "" for value in values]
+        except Exception as e:
+            logger.error(f"Bulk encryption failed: {e}")
+            raise EncryptionError(f"Failed to encrypt data: {str(e)}")
+    
+    def decrypt_many(self, encrypted_values: Iterable[Optional[str]]) -> List[str]:
+        """
+        Decrypt a batch of values in one pass; empty values stay empty.
+        Raises EncryptionError if any value fails.
+        """
+        fernet = self.fernet
+        b64decode = base64.urlsafe_b64decode
+        try:
+            return [fernet.decrypt(b64decode(value.encode('utf-8'))).decode('utf-8') if value else "" for value in encrypted_values]
+        except Exception as e:
+            logger.error(f"Bulk decryption failed: {e}")
+            raise EncryptionError(f"Failed to decrypt data: {str(e)}")
+    
+    def rotate_many(self, encrypted_values: Iterable[Optional[str]]) -> List[str]:
+        """
+        Re-encrypt a batch of values under the current key without
+        exposing plaintext. Raises EncryptionError if any value fails.
+        """
+        fernet = self.fernet
+        b64encode, b64decode = base64.urlsafe_b64encode, base64.urlsafe_b64decode
+        try:
+            return [
+                b64encode(fernet.rotate(b64decode(value.encode('utf-8')))).decode('utf-8') if value else ""
+                for value in encrypted_values
+            ]
+        except Exception as e:
+            logger.error(f"Key rotation failed: {e}")
+            raise EncryptionError(f"Failed to rotate data: {str(e)}")
+    
+    def uses_current_key(self, encrypted_text: str) -> bool:
+        """Check whether a value decrypts with the current key (not a retired one)"""
+        self.fernet
+        try:
+            self._primary.decrypt(base64.urlsafe_b64decode(encrypted_text.encode('utf-8')))
+            return True
+        except Exception:
+            return False
+    
     def is_encrypted(self, text: str) -> bool:
         """
         Check if text appears to be encrypted (basic heuristic).
@@ -170,36 +276,63 @@ class ModelEncryption:
         Encrypt sensitive fields in a model dictionary.
         Returns new dictionary with encrypted fields.
         """
-        encrypted_dict = model_dict.copy()
-        
-        for field_name in self.sensitive_fields:
-            if field_name in encrypted_dict and encrypted_dict[field_name]:
-                # Only encrypt if not already encrypted
-                value = encrypted_dict[field_name]
-                if isinstance(value, str) and not self.encryption.is_encrypted(value):
-                    encrypted_dict[field_name] = self.encryption.encrypt(value)
-                    logger.debug(f"Encrypted field: {field_name}")
-        
-        return encrypted_dict
+        return self.encrypt_models([model_dict])[0]
     
     def decrypt_model_fields(self, model_dict: Dict[str, Any]) -> Dict[str, Any]:
         """
         Decrypt sensitive fields in a model dictionary.
         Returns new dictionary with decrypted fields.
         """
-        decrypted_dict = model_dict.copy()
+        return self.decrypt_models([model_dict])[0]
+    
+    def _sensitive_values(self, model_dicts: List[Dict[str, Any]], encrypted: bool) -> List[tuple]:
+        """(dict index, field name, value) for each set sensitive field in the given state"""
+        found = []
+        for index, model_dict in enumerate(model_dicts):
+            for field_name in self.sensitive_fields:
+                value = model_dict.get(field_name)
+                if value and isinstance(value, str) and self.encryption.is_encrypted(value) == encrypted:
+                    found.append((index, field_name, value))
+        return found
+    
+    def encrypt_models(self, model_dicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Encrypt sensitive fields across many model dictionaries in one batch.
+        Fields that already look encrypted are left as-is.
+        """
+        result = [model_dict.copy() for model_dict in model_dicts]
+        pending = self._sensitive_values(result, encrypted=False)
         
-        for field_name in self.sensitive_fields:
-            if field_name in decrypted_dict and decrypted_dict[field_name]:
-                value = decrypted_dict[field_name]
-                if isinstance(value, str) and self.encryption.is_encrypted(value):
-                    try:
-                        decrypted_dict[field_name] = self.encryption.decrypt(value)
-                        logger.debug(f"Decrypted field: {field_name}")
-                    except EncryptionError:
-                        logger.warning(f"Failed to decrypt {field_name}, leaving as-is")
+        encrypted_values = self.encryption.encrypt_many(value for _, _, value in pending)
+        for (index, field_name, _), encrypted_value in zip(pending, encrypted_values):
+            result[index][field_name] = encrypted_value
+        
+        return result
+    
+    def decrypt_models(self, model_dicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Decrypt sensitive fields across many model dictionaries in one batch.
+        Fields that fail to decrypt are left as-is.
+        """
+        result = [model_dict.copy() for model_dict in model_dicts]
+        pending = self._sensitive_values(result, encrypted=True)
+        
+        try:
+            decrypted_values = self.encryption.decrypt_many(value for _, _, value in pending)
+        except EncryptionError:
+            # Fall back to one at a time to find the values that are bad
+            decrypted_values = []
+            for _, field_name, value in pending:
+                try:
+                    decrypted_values.append(self.encryption.decrypt(value))
+                except EncryptionError:
+                    logger.warning(f"Failed to decrypt {field_name}, leaving as-is")
+                    decrypted_values.append(value)
         
-        return decrypted_dict
+        for (index, field_name, _), decrypted_value in zip(pending, decrypted_values):
+            result[index][field_name] = decrypted_value
+        
+        return result
     
     def get_masked_fields(self, model_dict: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -242,7 +375,7 @@ class KeyRotation:
     
     def __init__(self, old_key: str, new_key: str):
         self.old_encryption = FieldEncryption(old_key)
-        self.new_encryption = FieldEncryption(new_key)
+        self.new_encryption = FieldEncryption(new_key, old_keys=[old_key])
     
     def rotate_field(self, encrypted_value: str) -> str:
         """
@@ -251,14 +384,14 @@ class KeyRotation:
         if not encrypted_value:
             return encrypted_value
         
-        try:
-            # Decrypt with old key
-            plaintext = self.old_encryption.decrypt(encrypted_value)
-            # Encrypt with new key
-            return self.new_encryption.encrypt(plaintext)
-        except EncryptionError as e:
-            logger.error(f"Key rotation failed: {e}")
-            raise
+        return self.rotate_fields([encrypted_value])[0]
+    
+    def rotate_fields(self, encrypted_values: List[str]) -> List[str]:
+        """
+        Rotate a batch of encrypted fields to the new key.
+        Values already under the new key are re-encrypted too, which is harmless.
+        """
+        return self.new_encryption.rotate_many(encrypted_values)
     
     def needs_rotation(self, encrypted_value: str) -> bool:
         """
@@ -267,16 +400,12 @@ class KeyRotation:
         if not encrypted_value:
             return False
         
-        try:
-            self.new_encryption.decrypt(encrypted_value)
+        if self.new_encryption.uses_current_key(encrypted_value):
             return False  # Already uses new key
-        except EncryptionError:
-            try:
-                self.old_encryption.decrypt(encrypted_value)
-                return True  # Uses old key, needs rotation
-            except EncryptionError:
-                logger.warning(f"Field not encrypted with either key")
-                return False
+        if self.old_encryption.uses_current_key(encrypted_value):
+            return True  # Uses old key, needs rotation
+        logger.warning(f"Field not encrypted with either key")
+        return False
 
 # Environment setup helper
 def generate_encryption_key() -> str:
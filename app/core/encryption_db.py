@@ -3,13 +3,17 @@ Database utilities for encryption operations.
 Handles automatic encryption/decryption and data migration.
 """
 
+import json
 import logging
+import os
 from typing import Any, Dict, List, Optional, Type
 from sqlmodel import Session, select
-from sqlalchemy import text
+from sqlalchemy import text, update
 from datetime import datetime, timezone
 
-from .encryption import ModelEncryption, get_field_encryption, SENSITIVE_FIELDS
+from .config import get_settings
+from .encryption import EncryptionError, FieldEncryption, ModelEncryption, get_field_encryption, SENSITIVE_FIELDS
+from .. import models
 from ..models import NotificationGlobalSettings, SystemSettings, AuditLog, AuditEvent
 
 logger = logging.getLogger(__name__)
@@ -126,59 +130,18 @@ class EncryptionMigration:
         }
         
         try:
-            # Get all notification settings
-            settings_list = self.db.exec(select(NotificationGlobalSettings)).all()
-            results["total_records"] = len(settings_list)
-            
-            model_encryption = ModelEncryption("NotificationGlobalSettings")
-            
-            for settings in settings_list:
-                try:
-                    needs_encryption = False
-                    
-                    # Check each sensitive field
-                    for field_name in model_encryption.sensitive_fields:
-                        if hasattr(settings, field_name):
-                            value = getattr(settings, field_name)
-                            if value and not self.encryption.is_encrypted(value):
-                                needs_encryption = True
-                                break
-                    
-                    if needs_encryption:
-                        if not dry_run:
-                            # Get settings as dict
-                            settings_dict = settings.__dict__.copy()
-                            
-                            # Encrypt sensitive fields
-                            encrypted_dict = model_encryption.encrypt_model_fields(settings_dict)
-                            
-                            # Update settings object
-                            for field_name, encrypted_value in encrypted_dict.items():
-                                if hasattr(settings, field_name):
-                                    setattr(settings, field_name, encrypted_value)
-                            
-                            settings.updated_at = datetime.utcnow()
-                            self.db.commit()
-                        
-                        results["encrypted_records"] += 1
-                        logger.info(f"{'Would encrypt' if dry_run else 'Encrypted'} settings for tenant {settings.tenant_id}")
-                    else:
-                        results["skipped_records"] += 1
-                        
-                except Exception as e:
-                    error_msg = f"Failed to migrate settings {settings.id}: {str(e)}"
-                    results["errors"].append(error_msg)
-                    logger.error(error_msg)
-            
-            if dry_run:
-                self.db.rollback()  # Rollback any changes made during dry run
-            
+            stats = TableReEncryption(self.db, dry_run=dry_run).reencrypt_model(
+                NotificationGlobalSettings, SENSITIVE_FIELDS["NotificationGlobalSettings"]
+            )
+            results["total_records"] = stats["rows"]
+            results["encrypted_records"] = stats["updated_rows"]
+            results["skipped_records"] = stats["rows"] - stats["updated_rows"]
+            results["errors"] = stats["errors"]
         except Exception as e:
             error_msg = f"Migration failed: {str(e)}"
             results["errors"].append(error_msg)
             logger.error(error_msg)
-            if not dry_run:
-                self.db.rollback()
+            self.db.rollback()
         
         return results
     
@@ -258,6 +221,156 @@ class EncryptionMigration:
         
         return report
 
+class TableReEncryption:
+    """
+    Streams the sensitive columns of each table in SENSITIVE_FIELDS in
+    primary key order and re-encrypts them in batches of
+    ENCRYPTION_BATCH_SIZE rows: plaintext values are encrypted and, with
+    rotate=True, values under a retired key (ENCRYPTION_OLD_KEYS) are moved
+    to the current key.
+
+    Each batch is one SELECT of just the key and sensitive columns, one bulk
+    UPDATE of the rows that changed and one commit. With a checkpoint file
+    the last key done is saved after every batch, so an interrupted run
+    picks up where it stopped.
+    """
+    
+    def __init__(self, db: Session, rotate: bool = False, batch_size: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None, dry_run: bool = False,
+                 encryption: Optional[FieldEncryption] = None):
+        self.db = db
+        self.rotate = rotate
+        self.batch_size = batch_size or get_settings().ENCRYPTION_BATCH_SIZE
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+        self.encryption = encryption or get_field_encryption()
+        self.checkpoint = self._load_checkpoint()
+    
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+    
+    def _save_checkpoint(self):
+        if not self.checkpoint_path or self.dry_run:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+    
+    def run(self, model_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Re-encrypt every model with sensitive fields; the checkpoint is removed once all finish"""
+        results = {}
+        for model_name, fields in SENSITIVE_FIELDS.items():
+            if not fields or (model_names and model_name not in model_names):
+                continue
+            model = getattr(models, model_name, None)
+            if model is None:
+                logger.warning(f"No model named {model_name}, skipping")
+                continue
+            results[model_name] = self.reencrypt_model(model, fields)
+        
+        if self.checkpoint_path and not self.dry_run and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return results
+    
+    def reencrypt_model(self, model: Type, fields: List[str]) -> Dict[str, Any]:
+        """Process one table from its checkpoint (or the start) to the end"""
+        name = model.__name__
+        pk = model.__table__.primary_key.columns.values()[0]
+        columns = [getattr(model, field) for field in fields]
+        has_updated_at = "updated_at" in model.__table__.columns
+        
+        stats = {"rows": 0, "updated_rows": 0, "encrypted": 0, "rotated": 0, "batches": 0, "errors": []}
+        progress = self.checkpoint.get(name, {})
+        if progress.get("done"):
+            logger.info(f"{name} already re-encrypted according to checkpoint")
+            return stats
+        last_id = progress.get("last_id")
+        last_id = pk.type.python_type(last_id) if last_id is not None else None
+        
+        while True:
+            query = select(pk, *columns).order_by(pk).limit(self.batch_size)
+            if last_id is not None:
+                query = query.where(pk > last_id)
+            rows = self.db.execute(query).all()
+            if not rows:
+                break
+            
+            updates = self._reencrypt_batch(rows, pk.key, fields, stats)
+            if updates and not self.dry_run:
+                if has_updated_at:
+                    now = datetime.now(timezone.utc)
+                    for values in updates:
+                        values["updated_at"] = now
+                self.db.execute(update(model), updates)
+                self.db.commit()
+            
+            last_id = rows[-1][0]
+            stats["rows"] += len(rows)
+            stats["updated_rows"] += len(updates)
+            stats["batches"] += 1
+            self.checkpoint[name] = {"last_id": str(last_id), "done": False}
+            self._save_checkpoint()
+            
+            if len(rows) < self.batch_size:
+                break
+        
+        if self.dry_run:
+            self.db.rollback()
+        self.checkpoint[name] = {"last_id": None, "done": True}
+        self._save_checkpoint()
+        
+        logger.info(
+            f"{'Would re-encrypt' if self.dry_run else 'Re-encrypted'} {name}: "
+            f"{stats['encrypted']} encrypted, {stats['rotated']} rotated in {stats['batches']} batches"
+        )
+        return stats
+    
+    def _reencrypt_batch(self, rows, pk_key: str, fields: List[str], stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Bulk values for the rows in this batch that need writing"""
+        to_encrypt, to_rotate = [], []
+        for row in rows:
+            for position, field_name in enumerate(fields, start=1):
+                value = row[position]
+                if not value or not isinstance(value, str):
+                    continue
+                if not self.encryption.is_encrypted(value):
+                    to_encrypt.append((row[0], field_name, value))
+                elif self.rotate and not self.encryption.uses_current_key(value):
+                    to_rotate.append((row[0], field_name, value))
+        
+        changed: Dict[Any, Dict[str, Any]] = {}
+        for pending, convert, counter in (
+            (to_encrypt, self.encryption.encrypt_many, "encrypted"),
+            (to_rotate, self.encryption.rotate_many, "rotated"),
+        ):
+            for (row_id, field_name, _), new_value in zip(pending, self._convert(pending, convert, stats)):
+                if new_value is None:
+                    continue
+                changed.setdefault(row_id, {pk_key: row_id})[field_name] = new_value
+                stats[counter] += 1
+        
+        return list(changed.values())
+    
+    def _convert(self, pending: List[tuple], convert, stats: Dict[str, Any]) -> List[Optional[str]]:
+        """Convert values in bulk; on failure retry one by one and record the bad ones"""
+        if not pending:
+            return []
+        try:
+            return convert([value for _, _, value in pending])
+        except EncryptionError:
+            converted = []
+            for row_id, field_name, value in pending:
+                try:
+                    converted.append(convert([value])[0])
+                except EncryptionError as e:
+                    stats["errors"].append(f"{row_id}.{field_name}: {e}")
+                    converted.append(None)
+            return converted
+
 def create_audit_log_entry(db: Session, user_id: Any, tenant_id: Any, 
                           action: str, resource_type: str, resource_id: Any = None,
                           changes: Dict[str, Any] = {}, ip_address: Optional[str] = None,
@@ -0,0 +1,132 @@
+"""
+Argon2 hashing off the event loop.
+
+Argon2 is deliberately slow and memory hungry (ARGON2_MEMORY_COST KiB per
+hash). Calling it from an `async def` endpoint blocks the loop for the whole
+hash, and a login burst runs many of them at once. PasswordHasher runs hashes
+on a dedicated thread pool (argon2-cffi releases the GIL) and admits at most
+`max_concurrency` of them at a time, sized so concurrent hashes stay within
+PASSWORD_HASH_MEMORY_BUDGET_MB. Callers beyond that wait on a semaphore and
+the wait is recorded in `stats()`.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from .config import get_settings
+from .security import pwd_context
+
+logger = logging.getLogger(__name__)
+
+
+def concurrency_for_memory_budget(memory_cost_kib: int, budget_mb: int, max_workers: int) -> int:
+    """How many hashes fit in the memory budget at once (at least one)"""
+    by_memory = (budget_mb * 1024) // max(memory_cost_kib, 1)
+    return max(1, min(max_workers, by_memory))
+
+
+class PasswordHasher:
+    """Bounded, off-loop Argon2 hash/verify with queue-time metrics"""
+
+    def __init__(self, context: Optional[CryptContext] = None, max_concurrency: Optional[int] = None):
+        settings = get_settings()
+        self.context = context or pwd_context
+        self.max_concurrency = max_concurrency or concurrency_for_memory_budget(
+            settings.ARGON2_MEMORY_COST,
+            settings.PASSWORD_HASH_MEMORY_BUDGET_MB,
+            settings.PASSWORD_HASH_MAX_WORKERS
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+        # Metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rehashed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_hash_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; recreate it if the loop changed (tests, reloads)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="argon2"
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        semaphore = self._get_semaphore()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        wait = started_at - queued_at
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_hash_seconds += time.perf_counter() - started_at
+            semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; when it matches a hash made with outdated
+        parameters, also return a fresh hash for the caller to store.
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rehashed": self.rehashed,
+            "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 2),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "avg_hash_ms": round(self.total_hash_seconds / completed * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Create a global instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,149 @@
+# app/core/query_plans.py
+"""
+Query plan checks for the scheduling hot paths.
+
+CRITICAL_QUERIES mirrors the filters the API runs on every request
+(swap conflict checks, slot lookups, staff pools, notification inboxes...).
+find_sequential_scans() runs EXPLAIN on one of them and reports every hot
+table that is read with a full table scan instead of an index.
+
+On PostgreSQL the check runs with enable_seqscan off, so a small or
+freshly seeded database still reports a Seq Scan only when no usable index
+exists. On SQLite (tests) it reads EXPLAIN QUERY PLAN.
+"""
+
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlmodel import select
+
+from ..models import (
+    Notification, Schedule, ShiftAssignment, Staff, StaffTimelineEntry, StaffUnavailability, SwapRequest, User
+)
+
+HOT_TABLES = {
+    model.__tablename__
+    for model in (Notification, Schedule, ShiftAssignment, Staff, StaffTimelineEntry, StaffUnavailability, SwapRequest, User)
+}
+
+
+def _critical_queries(ids: Dict[str, Any]) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {
+        "swap_conflict_check": select(ShiftAssignment).where(
+            ShiftAssignment.schedule_id == ids["schedule_id"],
+            ShiftAssignment.staff_id == ids["staff_id"],
+            ShiftAssignment.day == 2
+        ),
+        "slot_lookup": select(ShiftAssignment).where(
+            ShiftAssignment.schedule_id == ids["schedule_id"],
+            ShiftAssignment.day == 2,
+            ShiftAssignment.shift == 1
+        ),
+        "staff_shifts": select(ShiftAssignment).where(ShiftAssignment.staff_id == ids["staff_id"]),
+        "staff_timeline": select(StaffTimelineEntry).where(
+            StaffTimelineEntry.staff_id == ids["staff_id"],
+            StaffTimelineEntry.shift_date >= ids["week_start"],
+            StaffTimelineEntry.shift_date <= ids["week_start"] + timedelta(days=13)
+        ).order_by(StaffTimelineEntry.shift_date, StaffTimelineEntry.shift),
+        "schedule_for_week": select(Schedule).where(
+            Schedule.facility_id == ids["facility_id"],
+            Schedule.week_start == ids["week_start"]
+        ),
+        "staff_pool": select(Staff).where(
+            Staff.facility_id == ids["facility_id"],
+            Staff.is_active == True
+        ),
+        "staff_by_email": select(Staff).where(Staff.email == ids["email"]),
+        "staff_by_email_ci": select(Staff).where(func.lower(Staff.email) == ids["email"]),
+        "user_by_email_ci": select(User).where(func.lower(User.email) == ids["email"]),
+        "staff_unavailability": select(StaffUnavailability).where(
+            StaffUnavailability.staff_id == ids["staff_id"],
+            StaffUnavailability.start < now + timedelta(days=7),
+            StaffUnavailability.end > now
+        ),
+        "unread_notifications": select(Notification).where(
+            Notification.recipient_user_id == ids["user_id"],
+            Notification.is_read == False
+        ).order_by(Notification.created_at.desc()).limit(20),
+        "schedule_swaps": select(SwapRequest).where(
+            SwapRequest.schedule_id == ids["schedule_id"],
+            SwapRequest.status == "pending"
+        ),
+        "my_swap_requests": select(SwapRequest).where(
+            SwapRequest.requesting_staff_id == ids["staff_id"]
+        ).order_by(SwapRequest.created_at.desc()),
+        "swaps_targeting_me": select(SwapRequest).where(
+            SwapRequest.target_staff_id == ids["staff_id"],
+            SwapRequest.status == "pending"
+        ),
+        "swaps_assigned_to_me": select(SwapRequest).where(
+            SwapRequest.assigned_staff_id == ids["staff_id"],
+            SwapRequest.status == "potential_assignment"
+        ),
+    }
+
+
+def critical_queries(ids: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Hot-path queries by name; `ids` fills their parameters (random by default)"""
+    params = {
+        "schedule_id": uuid.uuid4(),
+        "staff_id": uuid.uuid4(),
+        "facility_id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "week_start": date.today(),
+        "email": "someone@example.com",
+    }
+    params.update(ids or {})
+    return _critical_queries(params)
+
+
+def _compile(conn, statement) -> str:
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _postgres_seq_scans(conn, statement) -> List[str]:
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {_compile(conn, statement)}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scanned = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+            scanned.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scanned
+
+
+def _sqlite_seq_scans(conn, statement) -> List[str]:
+    scanned = []
+    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {_compile(conn, statement)}"):
+        words = row[-1].split()
+        # "SCAN staff" is a table scan; "SEARCH staff USING INDEX ..." is not
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in HOT_TABLES and "INDEX" not in words:
+            scanned.append(words[1])
+    return scanned
+
+
+def find_sequential_scans(conn, statement) -> List[str]:
+    """Hot tables the plan for `statement` reads with a full table scan"""
+    check: Callable = _postgres_seq_scans if conn.dialect.name == "postgresql" else _sqlite_seq_scans
+    return check(conn, statement)
+
+
+def check_query_plans(engine, ids: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+    """Run every critical query's plan; returns {query name: tables scanned} for the failures"""
+    failures = {}
+    for name, statement in critical_queries(ids).items():
+        with engine.connect() as conn:
+            scanned = find_sequential_scans(conn, statement)
+            conn.rollback()
+        if scanned:
+            failures[name] = scanned
+    return failures
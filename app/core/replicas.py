@@ -0,0 +1,228 @@
+# app/core/replicas.py
+"""
+Read replica routing.
+
+Read-only endpoints (analytics, dashboards, swap summaries, schedule
+listings) take their session from `get_read_db`, which asks
+`replica_router` for an engine:
+
+- Replicas from DATABASE_REPLICA_URLS are used round-robin while their
+  replication lag is within DB_REPLICA_MAX_LAG_SECONDS. Lag is measured in
+  the background every DB_REPLICA_LAG_CHECK_SECONDS; a replica that fails
+  the check, or whose last check is too old, is skipped.
+- With no usable replica, reads fall back to the primary.
+- Read-your-writes: after a user's successful write (recorded by
+  SecurityMiddleware before the response goes out), that user's reads stay
+  on the primary for DB_READ_YOUR_WRITES_SECONDS. The mark is kept in
+  process and, when Redis is attached, shared with the other workers.
+
+Shared in-process caches (facility details, staff timelines, user-staff
+mappings) must not be filled from a replica: an entry read before the
+replica caught up would outlive read-your-writes and be served to primary
+readers too. get_read_db marks replica sessions so the caches can tell.
+
+Replicas can be any URL build_engine() accepts, so two SQLite files stand
+in for a primary and a replica in tests.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import text
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "db:read_your_writes:"
+
+# Session.info flag set on sessions bound to a replica
+REPLICA_SESSION_FLAG = "replica"
+
+# Seconds the replica has not replayed yet; 0 on a primary or a caught-up standby
+_POSTGRES_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replication_lag_seconds(conn) -> float:
+    """Replication lag seen from a replica connection (0 where there is no replication)"""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    return float(conn.execute(_POSTGRES_LAG_SQL).scalar() or 0)
+
+
+def is_replica_session(session) -> bool:
+    """Whether a session reads from a replica and so may lag behind the primary"""
+    return bool(session.info.get(REPLICA_SESSION_FLAG))
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: object
+    lag_seconds: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions"""
+
+    def __init__(
+        self,
+        primary,
+        replicas: Optional[List[object]] = None,
+        max_lag_seconds: Optional[float] = None,
+        check_interval_seconds: Optional[float] = None,
+        sticky_seconds: Optional[float] = None,
+        max_sticky_users: int = 10000,
+    ):
+        settings = get_settings()
+        self.primary = primary
+        self.replicas = [Replica(f"replica{i}", engine) for i, engine in enumerate(replicas or [])]
+        self.max_lag_seconds = settings.DB_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        self.check_interval_seconds = (
+            settings.DB_REPLICA_LAG_CHECK_SECONDS if check_interval_seconds is None else check_interval_seconds
+        )
+        self.sticky_seconds = settings.DB_READ_YOUR_WRITES_SECONDS if sticky_seconds is None else sticky_seconds
+        self.max_sticky_users = max_sticky_users
+        self._sticky: "OrderedDict[str, float]" = OrderedDict()
+        self._redis = None
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def attach_redis(self, redis) -> None:
+        """Share read-your-writes marks across workers through Redis (redis.asyncio)"""
+        self._redis = redis
+
+    # ==================== LAG ====================
+
+    def refresh_lag(self) -> Dict[str, Optional[float]]:
+        """Measure every replica's lag now; blocking, run it off the event loop"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    replica.lag_seconds = replication_lag_seconds(conn)
+                replica.error = None
+            except Exception as e:
+                replica.lag_seconds = None
+                replica.error = str(e)
+                logger.warning(f"Replica {replica.name} lag check failed: {e}")
+            replica.checked_at = time.monotonic()
+        return {replica.name: replica.lag_seconds for replica in self.replicas}
+
+    async def monitor_lag(self) -> None:
+        """Refresh replica lag periodically; runs until cancelled"""
+        if not self.replicas:
+            return
+
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_lag)
+            except Exception as e:
+                logger.error(f"Replica lag monitor error: {e}")
+            await asyncio.sleep(self.check_interval_seconds)
+
+    def _is_usable(self, replica: Replica, now: float) -> bool:
+        return (
+            replica.lag_seconds is not None
+            and replica.lag_seconds <= self.max_lag_seconds
+            # A stalled monitor must not keep routing to a replica that may have fallen behind
+            and replica.checked_at is not None
+            and now - replica.checked_at <= self.check_interval_seconds * 3
+        )
+
+    def read_engine(self, use_primary: bool = False):
+        """A caught-up replica, round-robin, or the primary"""
+        if not use_primary and self.replicas:
+            now = time.monotonic()
+            usable = [replica for replica in self.replicas if self._is_usable(replica, now)]
+            if usable:
+                with self._lock:
+                    self.replica_reads += 1
+                    index = next(self._next)
+                return usable[index % len(usable)].engine
+
+        with self._lock:
+            self.primary_reads += 1
+        return self.primary
+
+    # ==================== READ-YOUR-WRITES ====================
+
+    async def record_write(self, user_id: Union[str, uuid.UUID]) -> None:
+        """Keep this user's reads on the primary while replicas catch up"""
+        if not self.replicas:
+            return
+
+        key = str(user_id)
+        self._sticky[key] = time.monotonic() + self.sticky_seconds
+        self._sticky.move_to_end(key)
+        while len(self._sticky) > self.max_sticky_users:
+            self._sticky.popitem(last=False)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(REDIS_KEY_PREFIX + key, "1", ex=max(int(self.sticky_seconds), 1))
+            except Exception as e:
+                logger.warning(f"Could not share read-your-writes mark: {e}")
+
+    async def reads_from_primary(self, user_id: Union[str, uuid.UUID, None]) -> bool:
+        """Whether this user wrote recently enough that replicas may not have it yet"""
+        if not self.replicas or user_id is None:
+            return False
+
+        key = str(user_id)
+        until = self._sticky.get(key)
+        if until is not None:
+            if until > time.monotonic():
+                return True
+            self._sticky.pop(key, None)
+
+        if self._redis is None:
+            return False
+        try:
+            return bool(await self._redis.exists(REDIS_KEY_PREFIX + key))
+        except Exception as e:
+            # Cannot tell whether another worker saw a write; the primary is always current
+            logger.warning(f"Read-your-writes lookup failed: {e}")
+            return True
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "replicas": {
+                replica.name: {"lag_seconds": replica.lag_seconds, "error": replica.error}
+                for replica in self.replicas
+            },
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+
+def build_replica_router(primary) -> ReplicaRouter:
+    """Router over the replicas listed in DATABASE_REPLICA_URLS"""
+    from .database import build_engine
+
+    settings = get_settings()
+    urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    replicas = [build_engine(url, name=f"replica{i}") for i, url in enumerate(urls)]
+    if replicas:
+        logger.info(f"Routing read-only sessions over {len(replicas)} replica(s)")
+    return ReplicaRouter(primary, replicas)
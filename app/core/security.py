@@ -8,10 +8,14 @@ from passlib.context import CryptContext
 
 from .config import get_settings
 
+# Parameters come from settings; hashes made with other parameters are
+# upgraded on the next successful login (see PasswordHasher.verify_and_update)
 pwd_context = CryptContext(
-    schemes=["argon2"],           
+    schemes=["argon2"],
     deprecated="auto",
-    argon2__rounds=4               # fast dev setting; TODO: raise in prod 
+    argon2__rounds=get_settings().ARGON2_ROUNDS,
+    argon2__memory_cost=get_settings().ARGON2_MEMORY_COST,
+    argon2__parallelism=get_settings().ARGON2_PARALLELISM,
 )
 ALGORITHM = "HS256"
 
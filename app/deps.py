@@ -1,20 +1,23 @@
 import uuid
-from typing import Generator
-from sqlmodel import Session, create_engine
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 
 from .core.config import get_settings
-from .models import User
+from .core.database import background_engine, engine, get_async_engine, replica_router
+from .core.replicas import REPLICA_SESSION_FLAG
+from .models import Staff, User
 from .core.security import verify_password, ALGORITHM
 from .schemas import TokenPayload
+from .services.user_cache import Principal
+from .services.user_staff_mapping import UserStaffMappingService
 
 settings = get_settings()
 
-# Use DATABASE_URL directly from settings
-engine = create_engine(settings.DATABASE_URL, echo=False, pool_pre_ping=True)
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login")
 
 
@@ -23,9 +26,41 @@ def get_db() -> Generator:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """AsyncSession for read-heavy async endpoints; objects stay usable after commit"""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+def get_principal(request: Request) -> Optional[Principal]:
+    """Principal resolved by SecurityMiddleware for this request, if any"""
+    return getattr(request.state, "principal", None)
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[Session, None]:
+    """Session for read-only endpoints: a caught-up replica unless the caller just wrote"""
+    principal = get_principal(request)
+    use_primary = await replica_router.reads_from_primary(principal.user_id if principal else None)
+    read_engine = replica_router.read_engine(use_primary)
+    session = Session(read_engine)
+    session.info[REPLICA_SESSION_FLAG] = read_engine is not replica_router.primary
+    try:
+        yield session
+    finally:
+        # Returning the connection rolls it back; keep that round trip off the event loop
+        await run_in_threadpool(session.close)
+
+
 def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    request: Request,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
 ) -> User:
+    # SecurityMiddleware already decoded this token and validated its session
+    principal = get_principal(request)
+    if principal is not None:
+        return principal.attach_user(db)
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -41,4 +76,19 @@ def get_current_user(
     user = db.get(User, uuid.UUID(token_data.sub))
     if user is None or not user.is_active:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+
+def get_user_staff_mapping(db: Session = Depends(get_db)) -> UserStaffMappingService:
+    return UserStaffMappingService(db)
+
+
+def get_current_staff(
+    mapping: UserStaffMappingService = Depends(get_user_staff_mapping),
+    current_user: User = Depends(get_current_user),
+) -> Staff:
+    """Staff record of the current user (cached user -> staff mapping), or 404"""
+    staff = mapping.get_staff_for_user(current_user)
+    if staff is None:
+        raise HTTPException(status_code=404, detail="Staff profile not found")
+    return staff
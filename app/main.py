@@ -8,23 +8,39 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
 from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
 from slowapi.errors import RateLimitExceeded
 from redis import asyncio as redis_async
+from sqlmodel import Session
 
 # Import your existing modules
 from .core.config import get_settings
+from .core.database import (
+    background_engine, dispose_async_engine, engine, pool_stats, render_pool_metrics, replica_router
+)
+from .core.password_hashing import password_hasher
 from .api.api_v1 import api_router
 import app.logging_config  # Ensure logging is configured
 
 #  Import security middleware and services
 from .middleware.security_middleware import SecurityMiddleware
 from .middleware.rate_limit_middleware import CustomRateLimitMiddleware
+from .middleware.rate_limit_backends import configure_rate_limit_backend
 from .services.session_service import SessionService
+from .services.session_cache import session_cache
+from .services.lockout_counters import configure_lockout_backend, login_attempt_log
+from .services.tenant_settings_cache import tenant_settings_cache
+from .services.facility_cache import facility_details_cache
+from .services.user_staff_mapping import user_staff_mapping_cache
+from .services.staff_timeline import staff_timeline_cache
+from .services.user_cache import user_cache
 from .services.audit_service import AuditService, AuditEvent
+from .services.audit_writer import audit_writer
+from .services.retention_service import retention_metrics, run_retention_jobs
+from .services.pdf_cache import SchedulePDFCache
 from .deps import get_db
 
 settings = get_settings()
@@ -45,11 +61,37 @@ async def lifespan(app: FastAPI):
         )
         await FastAPILimiter.init(redis)
         logger.info("Redis rate limiting initialized")
+        # Share validated sessions and revocations across workers
+        session_cache.attach_redis(redis)
+        # Broadcast tenant settings changes to every worker
+        tenant_settings_cache.attach_redis(redis)
+        facility_details_cache.attach_redis(redis)
+        user_staff_mapping_cache.attach_redis(redis)
+        staff_timeline_cache.attach_redis(redis)
+        user_cache.attach_redis(redis)
+        # Enforce CustomRateLimitMiddleware limits across workers
+        configure_rate_limit_backend(redis)
+        # Count failed logins in Redis instead of the database
+        configure_lockout_backend(redis)
+        # Share read-your-writes marks so every worker keeps a writer's reads on the primary
+        replica_router.attach_redis(redis)
     except Exception as e:
         logger.warning(f"⚠️ Redis not available, rate limiting may be limited: {e}")
+        configure_lockout_backend()
     
     # Start background security tasks
-    cleanup_task = asyncio.create_task(session_cleanup_task())
+    cleanup_task = asyncio.create_task(retention_task())
+    pdf_eviction_task = asyncio.create_task(pdf_cache_eviction_task())
+    last_used_task = asyncio.create_task(session_last_used_flush_task())
+    login_attempt_task = asyncio.create_task(login_attempt_flush_task())
+    revocation_task = asyncio.create_task(session_cache.listen_for_revocations())
+    settings_invalidation_task = asyncio.create_task(tenant_settings_cache.listen_for_changes())
+    facility_invalidation_task = asyncio.create_task(facility_details_cache.listen_for_changes())
+    mapping_invalidation_task = asyncio.create_task(user_staff_mapping_cache.listen_for_changes())
+    timeline_invalidation_task = asyncio.create_task(staff_timeline_cache.listen_for_changes())
+    user_invalidation_task = asyncio.create_task(user_cache.listen_for_changes())
+    audit_task = asyncio.create_task(audit_writer.run())
+    replica_lag_task = asyncio.create_task(replica_router.monitor_lag())
     logger.info(" Background security tasks started")
     
     #  Log application startup
@@ -65,28 +107,84 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down Schedula API")
-    cleanup_task.cancel()
+    for task in (cleanup_task, pdf_eviction_task, last_used_task, login_attempt_task, revocation_task, settings_invalidation_task, facility_invalidation_task, mapping_invalidation_task, timeline_invalidation_task, user_invalidation_task, audit_task, replica_lag_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    logger.info("✅ Background tasks cancelled")
+    
+    # Write out buffered audit events and session last_used timestamps still pending
+    try:
+        await audit_writer.flush()
+    except Exception as e:
+        logger.warning(f"Final audit flush failed: {e}")
+    
     try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        logger.info("✅ Background tasks cancelled")
+        with Session(background_engine) as db:
+            session_cache.flush_last_used(db)
+            login_attempt_log.flush(db)
+    except Exception as e:
+        logger.warning(f"Final session last_used / login attempt flush failed: {e}")
+    
+    password_hasher.shutdown()
+    await dispose_async_engine()
+    replica_router.dispose()
+    background_engine.dispose()
+    engine.dispose()
 
-# Background task for session cleanup
-async def session_cleanup_task():
-    """Periodic task to clean up expired sessions"""
+# Background task for session and audit log retention
+async def retention_task():
+    """Periodic chunked cleanup of expired sessions and old audit logs; one worker leads each run"""
     while True:
         try:
-            db = next(get_db())
-            session_service = SessionService(db)
-            cleaned = await session_service.cleanup_expired_sessions()
-            if cleaned > 0:
-                logger.info(f"🧹 Cleaned up {cleaned} expired sessions")
-            db.close()
+            result = await asyncio.to_thread(run_retention_jobs)
+            if result and (result["sessions_expired"] or result["sessions_deleted"] or result["audit_logs_deleted"]):
+                logger.info(f"🧹 Retention: {result}")
+        except Exception as e:
+            logger.error(f"Retention jobs failed: {e}")
+        
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+# Background task for batched session last_used writes
+async def session_last_used_flush_task():
+    """Periodic task to persist session last_used timestamps collected by the session cache"""
+    while True:
+        await asyncio.sleep(settings.SESSION_LAST_USED_FLUSH_SECONDS)
+        try:
+            with Session(background_engine) as db:
+                flushed = session_cache.flush_last_used(db)
+            if flushed > 0:
+                logger.debug(f"Flushed last_used for {flushed} sessions")
+        except Exception as e:
+            logger.error(f"Session last_used flush failed: {e}")
+
+# Background task for batched login attempt / lockout records
+async def login_attempt_flush_task():
+    """Periodic task to persist sampled login attempts and lockouts tracked by the lockout counters"""
+    while True:
+        await asyncio.sleep(settings.LOGIN_ATTEMPT_FLUSH_SECONDS)
+        try:
+            with Session(background_engine) as db:
+                written = login_attempt_log.flush(db)
+            if written > 0:
+                logger.debug(f"Persisted {written} login attempt / lockout records")
+        except Exception as e:
+            logger.error(f"Login attempt flush failed: {e}")
+
+# Background task for schedule PDF cache eviction
+async def pdf_cache_eviction_task():
+    """Periodic task to drop old PDFs and keep the PDF cache under its size budget"""
+    while True:
+        try:
+            result = await asyncio.to_thread(SchedulePDFCache().evict)
+            if result["expired"] or result["evicted"]:
+                logger.info(f"🧹 PDF cache eviction: {result}")
         except Exception as e:
-            logger.error(f"Session cleanup failed: {e}")
+            logger.error(f"PDF cache eviction failed: {e}")
         
-        # Run every hour
-        await asyncio.sleep(3600)
+        await asyncio.sleep(settings.PDF_CACHE_EVICTION_INTERVAL_SECONDS)
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -114,7 +212,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Rate-Limit-Remaining", "X-Rate-Limit-Reset"],
+    expose_headers=["X-Rate-Limit-Remaining", "X-Rate-Limit-Reset", "ETag", "X-Next-Cursor", "Link"],
     max_age=600,
 )
 
@@ -268,6 +366,10 @@ async def health_check():
             "database": db_status,
             "redis": redis_status
         },
+        "password_hashing": password_hasher.stats(),
+        "retention": retention_metrics,
+        "database_pool": pool_stats(),
+        "database_replicas": replica_router.stats(),
         "features": [
             "account_lockout",
             "audit_logging", 
@@ -277,6 +379,12 @@ async def health_check():
         ]
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Connection pool metrics in Prometheus text format"""
+    return PlainTextResponse(render_pool_metrics(), media_type="text/plain; version=0.0.4")
+
 #  Security status endpoint for monitoring
 @app.get("/security/status")
 async def security_status(request: Request):
@@ -0,0 +1,21 @@
+import re
+from typing import Callable, Iterable
+
+
+def compile_path_matcher(
+    exact: Iterable[str] = (),
+    prefixes: Iterable[str] = ()
+) -> Callable[[str], bool]:
+    """
+    Build a single precompiled regex that matches any of the exact paths or
+    path prefixes, instead of scanning lists with startswith on every request.
+    """
+    alternatives = [re.escape(path) + r"\Z" for path in exact]
+    # Longest prefixes first so the alternation never stops at a shorter overlap
+    alternatives += [re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True)]
+
+    if not alternatives:
+        return lambda path: False
+
+    pattern = re.compile("(?:" + "|".join(alternatives) + ")")
+    return lambda path: pattern.match(path) is not None
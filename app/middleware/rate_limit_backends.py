@@ -0,0 +1,151 @@
+"""
+Storage backends for CustomRateLimitMiddleware.
+
+- InMemoryTokenBucketBackend: per-process token buckets with a bounded
+  number of keys; idle buckets (already refilled) are evicted.
+- RedisSlidingWindowBackend: sliding-window counters in Redis, updated by
+  an atomic Lua script so limits hold across all workers.
+
+The lifespan calls configure_rate_limit_backend() with the Redis client it
+already creates for FastAPILimiter.
+"""
+
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend:
+    """Counts hits for a key and decides whether the request is allowed"""
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int]:
+        """Record one request; return (allowed, remaining)"""
+        raise NotImplementedError
+
+
+class InMemoryTokenBucketBackend(RateLimitBackend):
+    """Token bucket per key: capacity `limit`, refilled at limit/window tokens per second"""
+
+    def __init__(self, max_keys: Optional[int] = None, sweep_interval: float = 60.0):
+        self.max_keys = max_keys or get_settings().RATE_LIMIT_MAX_KEYS
+        self.sweep_interval = sweep_interval
+        # key -> [tokens, last_refill, limit, window]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int]:
+        now = time.monotonic()
+        self._maybe_sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(limit), now, limit, window]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            tokens, last_refill, _, _ = bucket
+            bucket[0] = min(float(limit), tokens + (now - last_refill) * limit / window)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        if bucket[0] < 1:
+            return False, 0
+
+        bucket[0] -= 1
+        return True, int(bucket[0])
+
+    def _maybe_sweep(self, now: float) -> None:
+        """Drop buckets idle long enough to be full again; they carry no state"""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+
+        idle = [
+            key for key, (_, last_refill, _, window) in self._buckets.items()
+            if now - last_refill >= window
+        ]
+        for key in idle:
+            del self._buckets[key]
+
+
+# KEYS[1] = counter key; ARGV = now_ms, window_ms, limit, member
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count >= limit then
+    redis.call('PEXPIRE', key, window)
+    return {0, 0}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return {1, limit - count - 1}
+"""
+
+
+class RedisSlidingWindowBackend(RateLimitBackend):
+    """Sliding-window log in a Redis sorted set, shared by every worker"""
+
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, redis, fallback: Optional[RateLimitBackend] = None):
+        self.redis = redis
+        self.fallback = fallback or InMemoryTokenBucketBackend()
+        self._script = redis.register_script(_SLIDING_WINDOW_LUA)
+        self._failing = False
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int]:
+        now_ms = int(time.time() * 1000)
+        try:
+            allowed, remaining = await self._script(
+                keys=[self.KEY_PREFIX + key],
+                args=[now_ms, window * 1000, limit, f"{now_ms}-{uuid.uuid4().hex[:8]}"]
+            )
+        except Exception as e:
+            # Keep limiting per worker rather than failing open while Redis is down
+            if not self._failing:
+                logger.warning(f"Redis rate limiter unavailable, using in-process limits: {e}")
+                self._failing = True
+            return await self.fallback.hit(key, limit, window)
+
+        if self._failing:
+            logger.info("Redis rate limiter recovered")
+            self._failing = False
+        return bool(allowed), int(remaining)
+
+
+_backend: RateLimitBackend = InMemoryTokenBucketBackend()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    return _backend
+
+
+def configure_rate_limit_backend(redis=None) -> RateLimitBackend:
+    """Pick the backend from RATE_LIMIT_BACKEND (memory | redis | auto)"""
+    global _backend
+
+    choice = get_settings().RATE_LIMIT_BACKEND.lower()
+    if choice in ("redis", "auto") and redis is not None:
+        fallback = _backend if isinstance(_backend, InMemoryTokenBucketBackend) else None
+        _backend = RedisSlidingWindowBackend(redis, fallback=fallback)
+    elif choice == "redis":
+        logger.warning("RATE_LIMIT_BACKEND=redis but Redis is not available, using in-process limits")
+
+    logger.info(f"Rate limit backend: {type(_backend).__name__}")
+    return _backend
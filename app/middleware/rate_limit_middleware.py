@@ -1,27 +1,29 @@
 from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
 from starlette.responses import Response
-import time
-from collections import defaultdict, deque
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing import Dict, Optional, Tuple
 import logging
 
+from .path_matching import compile_path_matcher
+from .rate_limit_backends import get_rate_limit_backend
+
 logger = logging.getLogger(__name__)
 
-class CustomRateLimitMiddleware(BaseHTTPMiddleware):
-    """Custom rate limiting middleware with different limits per endpoint"""
+class CustomRateLimitMiddleware:
+    """Custom rate limiting middleware with different limits per endpoint (pure ASGI)"""
     
     EXEMPT_METHODS = {"OPTIONS"}
     EXEMPT_PATH_PREFIXES = {"/docs", "/static", "/health", "/ping", "/v1/notifications", "/v1/notifications/stream"}
     DEFAULT_RETRY_AFTER = 10  # seconds
     CORS_ALLOWED_ORIGINS = {"http://localhost:3000", "http://127.0.0.1:3000"}
 
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.is_exempt_path = compile_path_matcher(prefixes=self.EXEMPT_PATH_PREFIXES)
         
-        # Track requests: IP -> endpoint -> deque of timestamps
-        self.requests: Dict[str, Dict[str, deque]] = defaultdict(lambda: defaultdict(deque))
+        # Request counts live in a pluggable backend (see rate_limit_backends.py)
         
         # Rate limits: (requests_per_window, window_seconds)
         self.limits = {
@@ -62,22 +64,32 @@ class CustomRateLimitMiddleware(BaseHTTPMiddleware):
         
         return context
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Never rate-limit preflight and exempt certain paths (health, docs, notifications)
-        path = request.url.path
-        method = request.method
-        if method in self.EXEMPT_METHODS or any(path.startswith(p) for p in self.EXEMPT_PATH_PREFIXES):
-            return await call_next(request)
+        path = scope["path"]
+        method = scope["method"]
+        if method in self.EXEMPT_METHODS or self.is_exempt_path(path):
+            await self.app(scope, receive, send)
+            return
 
+        request = Request(scope, receive)
         client_ip = self._get_client_ip(request)
         endpoint = request.url.path
         # Prefer user/session identity when present; fall back to IP. Include endpoint+method to avoid cross-endpoint contention.
         user_id = getattr(getattr(request, "state", None), "user_id", None)
         rate_key_identity = str(user_id) if user_id else client_ip
         rate_bucket_key = f"{endpoint}:{method}"
+        limit, window = self._get_limit_for_bucket(rate_bucket_key)
 
         # Check rate limit
-        if self._is_rate_limited(rate_key_identity, rate_bucket_key):
+        allowed, remaining = await get_rate_limit_backend().hit(
+            f"{rate_key_identity}:{rate_bucket_key}", limit, window
+        )
+        if not allowed:
             logger.warning(f"Rate limit exceeded for {client_ip} on {endpoint}")
             
             # Extract context for audit logging
@@ -130,40 +142,22 @@ class CustomRateLimitMiddleware(BaseHTTPMiddleware):
                 },
             )
             resp.headers["Retry-After"] = str(self.retry_after)
-            limit_for_bucket = self._get_limit_for_endpoint(endpoint, method)[0]
-            resp.headers["X-RateLimit-Limit"] = str(limit_for_bucket)
+            resp.headers["X-RateLimit-Limit"] = str(limit)
             resp.headers["X-RateLimit-Remaining"] = "0"
             self._apply_cors_headers(resp, request)
-            return resp
-        
-        # Continue with request
-        response = await call_next(request)
-        
-        limit, window = self._get_limit_for_endpoint(endpoint, method)
-        remaining = self._get_remaining_requests(rate_key_identity, rate_bucket_key, method)
-
-        response.headers["X-Rate-Limit-Limit"] = str(limit)
-        response.headers["X-Rate-Limit-Remaining"] = str(remaining)
-        response.headers["X-Rate-Limit-Window"] = str(window)
+            await resp(scope, receive, send)
+            return
         
-        return response
-    
-    def _is_rate_limited(self, identity: str, bucket_key: str) -> bool:
-        """Check if request should be rate limited"""
-        limit, window = self._get_limit_for_bucket(bucket_key)
-        now = time.time()
-
-        requests_for_endpoint = self.requests[identity][bucket_key]
-        while requests_for_endpoint and requests_for_endpoint[0] < now - window:
-            requests_for_endpoint.popleft()
+        # Continue with request, adding the limit headers as the response starts
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Rate-Limit-Limit"] = str(limit)
+                headers["X-Rate-Limit-Remaining"] = str(remaining)
+                headers["X-Rate-Limit-Window"] = str(window)
+            await send(message)
 
-        # Check if limit exceeded
-        if len(requests_for_endpoint) >= limit:
-            return True
-
-        # Add current request
-        requests_for_endpoint.append(now)
-        return False
+        await self.app(scope, receive, send_with_headers)
     
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP with proxy header support"""
@@ -179,23 +173,9 @@ class CustomRateLimitMiddleware(BaseHTTPMiddleware):
         # Fall back to client host
         return request.client.host if request.client else "unknown"
     
-    def _get_limit_for_endpoint(self, endpoint: str, method: Optional[str] = None) -> tuple:
-        """Get rate limit for specific endpoint/method"""
-        if method is not None:
-            key = f"{endpoint}:{method}"
-            if key in self.limits:
-                return self.limits[key]
-        return self.limits.get(endpoint, self.limits["default"])
-    
     def _get_limit_for_bucket(self, bucket_key: str) -> tuple:
         return self.limits.get(bucket_key, self.limits.get(bucket_key.split(":" )[0], self.limits["default"]))
 
-    def _get_remaining_requests(self, identity: str, bucket_key: str, method: Optional[str] = None) -> int:
-        """Get remaining requests for client/endpoint/method"""
-        limit, _ = self._get_limit_for_bucket(bucket_key)
-        current_count = len(self.requests[identity][bucket_key])
-        return max(0, limit - current_count)
-
     def _apply_cors_headers(self, response: Response, request: Request) -> None:
         origin = request.headers.get("origin")
         if not origin:
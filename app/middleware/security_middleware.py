@@ -1,30 +1,35 @@
 from fastapi import Request, Response, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from sqlmodel import Session
-from datetime import datetime, timezone
 import logging
+import re
 import uuid
 import time
-from typing import Iterable
+from typing import Optional
 
-from ..deps import get_db
+from ..deps import engine, replica_router
 from ..services.session_service import SessionService
 from ..services.audit_service import AuditService, AuditEvent
+from ..services.user_cache import Principal, user_cache
 from ..core.security import decode_access_token
+from ..core.config import get_settings
+from .path_matching import compile_path_matcher
 
 logger = logging.getLogger(__name__)
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Enhanced security middleware for session validation and audit logging"""
+# Methods that never write; anything else sends the user's reads to the primary for a while
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class SecurityMiddleware:
+    """Enhanced security middleware for session validation and audit logging (pure ASGI)"""
     
-    def __init__(self, app):
-        super().__init__(app)
-        self.security = HTTPBearer(auto_error=False)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         
         # Paths that don't require session validation (exact matches)
-        self.excluded_paths = {
+        excluded_paths = {
             "/api/v1/auth/login",
             "/api/v1/auth/signup",
             "/api/v1/auth/forgot-password",
@@ -53,80 +58,112 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         }
 
         # Path prefixes that don't require session validation (for paths with dynamic parameters)
-        self.excluded_path_prefixes = [
+        excluded_path_prefixes = [
             "/api/v1/invitations/verify/",
             "/v1/invitations/verify/",
+            "/static",
         ]
         
-        self.monitoring_paths = {
+        monitoring_paths = [
             "/health",
             "/metrics", 
             "/status",
             "/ping",
             "/healthz"
-        }
+        ]
+        
+        # Precompiled once: each check is a single regex match per request
+        self.is_excluded_path = compile_path_matcher(
+            exact=excluded_paths,
+            prefixes=excluded_path_prefixes + monitoring_paths
+        )
+        self.is_protected_path = compile_path_matcher(prefixes=["/v1/", "/api/v1/"])
+        self.is_monitoring_path = compile_path_matcher(prefixes=["/health", "/metrics", "/status", "/ping"])
+        self.is_sensitive_path = compile_path_matcher(prefixes=[
+            "/api/v1/staff",
+            "/api/v1/schedules",
+            "/api/v1/facilities",
+            "/api/v1/admin",
+            "/api/v1/reports",
+            "/v1/staff",
+            "/v1/schedules",
+            "/v1/facilities",
+            "/v1/admin",
+            "/v1/reports"
+        ])
+        self.monitoring_user_agents = re.compile(
+            "curl|wget|python-requests|health-check|monitoring|probe|pingdom|uptimerobot|kube-probe|docker"
+        )
         self.cors_allowed_origins = {"http://localhost:3000", "http://127.0.0.1:3000"}
-        self.notification_paths = ("/v1/notifications", "/v1/notifications/stream")
     
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Allow CORS preflight to pass through untouched (handled by CORSMiddleware)
-        if request.method == "OPTIONS":
-            return await call_next(request)
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.time()
+        request = Request(scope, receive)
+        path = scope["path"]
         
         # Generate request ID for tracing
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
         
+        # ✅ FIX: Skip middleware completely for excluded paths
+        if self.is_excluded_path(path):
+            await self.app(scope, receive, send)
+            return
+        
         # Get client info
         client_ip = self._get_client_ip(request)
         user_agent = request.headers.get("user-agent", "")
         
-        # Allow unauthenticated GET preflights and ensure notifications polling isn't blocked by this middleware
-        is_notification_path = any(request.url.path.startswith(p) for p in self.notification_paths)
-        
-        # ✅ FIX: Skip middleware completely for excluded paths
-        if (request.url.path in self.excluded_paths or
-            request.url.path.startswith("/static") or
-            any(request.url.path.startswith(path) for path in self.monitoring_paths) or
-            any(request.url.path.startswith(prefix) for prefix in self.excluded_path_prefixes)):
-            response = await call_next(request)
-            return response
-        
         # ✅ FIX: Skip audit logging for monitoring tools
-        is_monitoring_request = self._is_monitoring_request(user_agent, request.url.path)
+        is_monitoring_request = self._is_monitoring_request(user_agent, path)
         
-        # Get database session
-        db = next(get_db())
+        # A Session only checks out a pool connection on its first query, so
+        # requests that never touch the database never hold a connection
+        db = Session(engine)
         audit_service = AuditService(db)
-        session_service = SessionService(db)
+        
+        # Track the response status without buffering the body (keeps streaming/SSE intact)
+        response_status: Optional[int] = None
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                # Mark before the client sees the response, so its next read cannot beat the mark
+                if user_id and response_status < 400 and scope["method"] not in SAFE_METHODS:
+                    await replica_router.record_write(user_id)
+            await send(message)
         
         # Initialize user_id to avoid unbound variable error
         user_id = None
         try:
             # Validate session for protected routes
-            if (request.url.path.startswith("/v1/") or request.url.path.startswith("/api/v1/")) and request.method not in ("OPTIONS",):
-                # For notifications, still require auth but avoid excessive audit noise
+            if self.is_protected_path(path):
+                session_service = SessionService(db)
                 user_id = await self._validate_session(request, session_service, audit_service, is_monitoring_request)
                 request.state.user_id = user_id
+                # Hand the connection back before the endpoint checks out its own
+                db.close()
             
             # Process request
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
             
             # Log successful request (only for authenticated endpoints, not monitoring)
-            if user_id and response.status_code < 400 and not is_monitoring_request:
+            if user_id and response_status is not None and response_status < 400 and not is_monitoring_request:
                 try:
                     await self._log_request_success(
-                        audit_service, user_id, request, response, 
+                        audit_service, user_id, request, response_status,
                         client_ip, user_agent, request_id, start_time
                     )
                 except Exception as audit_error:
                     # FIXED: Don't let audit failures crash the request
                     logger.warning(f"Audit logging failed: {audit_error}")
             
-            return response
-            
         except HTTPException as e:
             # ✅ FIX: Only log suspicious activity for actual users, not monitoring tools
             if not is_monitoring_request:
@@ -138,7 +175,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                         user_agent=user_agent,
                         request_id=request_id,
                         details={
-                            "path": request.url.path,
+                            "path": path,
                             "method": request.method,
                             "status_code": e.status_code,
                             "error": e.detail
@@ -150,11 +187,13 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                     logger.error(f"Failed to log suspicious activity: {audit_error}")
             else:
                 # Just log to application logger for monitoring tools
-                logger.debug(f"Monitoring tool access: {client_ip} -> {request.url.path}")
+                logger.debug(f"Monitoring tool access: {client_ip} -> {path}")
             
+            if response_status is not None:
+                raise
             resp = JSONResponse(status_code=e.status_code, content={"detail": e.detail})
             self._apply_cors_headers(resp, request)
-            return resp
+            await resp(scope, receive, send)
             
         except Exception as e:
             # ✅ FIX: Don't spam audit logs for monitoring tool errors
@@ -167,7 +206,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                         user_agent=user_agent,
                         request_id=request_id,
                         details={
-                            "path": request.url.path,
+                            "path": path,
                             "method": request.method,
                             "error": str(e)
                         },
@@ -178,9 +217,12 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                     logger.error(f"Failed to log exception to audit: {audit_error}")
             
             logger.error(f"Unexpected error in security middleware: {e}")
+            if response_status is not None:
+                # Response already started (e.g. a stream failed midway); nothing more can be sent
+                raise
             resp = JSONResponse(status_code=500, content={"detail": "Internal server error"})
             self._apply_cors_headers(resp, request)
-            return resp
+            await resp(scope, receive, send)
         finally:
             try:
                 db.close()
@@ -189,31 +231,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             
     def _is_monitoring_request(self, user_agent: str, path: str) -> bool:
         """Detect if this is a monitoring/health check request"""
-        monitoring_user_agents = [
-            "curl",
-            "wget", 
-            "python-requests",
-            "health-check",
-            "monitoring",
-            "probe",
-            "pingdom",
-            "uptimerobot",
-            "kube-probe",
-            "docker"
-        ]
-        
-        monitoring_paths = [
-            "/health",
-            "/metrics",
-            "/status", 
-            "/ping"
-        ]
-        
-        user_agent_lower = user_agent.lower()
-        is_monitoring_ua = any(ua in user_agent_lower for ua in monitoring_user_agents)
-        is_monitoring_path = any(path.startswith(mp) for mp in monitoring_paths)
-        
-        return is_monitoring_ua or is_monitoring_path
+        is_monitoring_ua = self.monitoring_user_agents.search(user_agent.lower()) is not None
+        return is_monitoring_ua or self.is_monitoring_path(path)
     
     async def _validate_session(
         self, 
@@ -244,8 +263,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 detail="Invalid token"
             )
         
-        # Validate session in database
-        session = await session_service.validate_session(token)
+        # Validate session (cached for a few seconds, revocations invalidate immediately)
+        session = await session_service.validate_session_cached(token)
         if not session:
             # ✅ FIX: Only log for non-monitoring requests
             if not is_monitoring_request:
@@ -267,6 +286,19 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 detail="Session expired or invalid"
             )
         
+        # Resolve the user once for the whole request; get_current_user reads it from request.state
+        user_data = user_cache.load(session_service.db, user_id)
+        if user_data and user_data.get("is_active"):
+            request.state.principal = Principal(
+                user_id=user_id,
+                tenant_id=user_data["tenant_id"],
+                is_manager=user_data["is_manager"],
+                is_super_admin=user_data["is_super_admin"],
+                token_payload=payload,
+                user_data=user_data
+            )
+            request.state.tenant_id = user_data["tenant_id"]
+        
         return user_id
     
     async def _log_request_success(
@@ -274,7 +306,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         audit_service: AuditService,
         user_id: uuid.UUID,
         request: Request,
-        response: Response,
+        status_code: int,
         client_ip: str,
         user_agent: str,
         request_id: str,
@@ -283,20 +315,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         """Log successful authenticated request"""
         
         # Only log sensitive operations, not every API call
-        sensitive_paths = [
-            "/api/v1/staff",
-            "/api/v1/schedules",
-            "/api/v1/facilities",
-            "/api/v1/admin",
-            "/api/v1/reports",
-            "/v1/staff",
-            "/v1/schedules",
-            "/v1/facilities",
-            "/v1/admin",
-            "/v1/reports"
-        ]
-        
-        if any(request.url.path.startswith(path) for path in sensitive_paths):
+        path = request.url.path
+        if self.is_sensitive_path(path):
             processing_time = time.time() - start_time
             
             await audit_service.log_event(
@@ -305,13 +325,14 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 ip_address=client_ip,
                 user_agent=user_agent,
                 request_id=request_id,
-                resource_type=request.url.path.split("/")[2] if len(request.url.path.split("/")) > 2 else None,
+                resource_type=path.split("/")[2] if len(path.split("/")) > 2 else None,
                 details={
-                    "path": request.url.path,
+                    "path": path,
                     "method": request.method,
-                    "status_code": response.status_code,
+                    "status_code": status_code,
                     "processing_time_ms": round(processing_time * 1000, 2)
-                }
+                },
+                sample_rate=get_settings().AUDIT_REQUEST_SAMPLE_RATE
             )
     
     def _apply_cors_headers(self, response: Response, request: Request) -> None:
@@ -6,7 +6,7 @@ from typing import ClassVar, Optional, List, Dict, Any, cast
 import uuid
 from hashlib import sha256
 from sqlmodel import Column, SQLModel, Field, Relationship, Index, JSON, select, Session, update
-from sqlalchemy import Column as SAColumn, DateTime, Enum as SQLEnum, String, update as sa_update
+from sqlalchemy import Column as SAColumn, DateTime, Enum as SQLEnum, String, text, update as sa_update
 from sqlalchemy.sql import Executable
 from sqlalchemy.sql.elements import ColumnElement
 import secrets
@@ -200,6 +200,11 @@ class User(SQLModel, table=True):
         sa_relationship_kwargs={"foreign_keys": "UserSession.revoked_by"}
     )
 
+    __table_args__ = (
+        # User <-> staff mapping and login lookups match emails case-insensitively
+        Index('idx_user_email_lower', text('lower(email)')),
+    )
+
 # ====== LINK ACCOUNTS ===============
 class UserProvider(SQLModel, table=True):
     """Track authentication providers linked to user accounts"""
@@ -611,6 +616,12 @@ class Staff(SQLModel, table=True):
     unavailability: List["StaffUnavailability"] = Relationship(back_populates="staff")
     facility: Facility = Relationship(back_populates="staff")
 
+    __table_args__ = (
+        Index('idx_staff_facility_active', 'facility_id', 'is_active'),
+        Index('idx_staff_email', 'email'),
+        Index('idx_staff_email_lower', text('lower(email)')),
+    )
+
 
 class StaffUnavailability(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
@@ -623,6 +634,10 @@ class StaffUnavailability(SQLModel, table=True):
     
     # Add relationship back to staff
     staff: Optional["Staff"] = Relationship(back_populates="unavailability")
+
+    __table_args__ = (
+        Index('idx_staffunavailability_staff_start_end', 'staff_id', 'start', 'end'),
+    )
     
 
 class Schedule(SQLModel, table=True):
@@ -631,6 +646,8 @@ class Schedule(SQLModel, table=True):
     week_start: date
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=SAColumn(DateTime(timezone=True)))
     updated_at: Optional[datetime] = None
+    # Bumped on every assignment change (see services/schedule_versions.py)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     is_published: bool = Field(default=False, nullable=False)
     published_at: Optional[datetime] = Field(
         default=None,
@@ -640,6 +657,10 @@ class Schedule(SQLModel, table=True):
 
     assignments: list["ShiftAssignment"] = Relationship(back_populates="schedule")
 
+    __table_args__ = (
+        Index('uq_schedule_facility_week', 'facility_id', 'week_start', unique=True),
+    )
+
 
 class ShiftAssignment(SQLModel, table=True):
     id: uuid.UUID | None = Field(default_factory=uuid.uuid4, primary_key=True)
@@ -650,6 +671,14 @@ class ShiftAssignment(SQLModel, table=True):
 
     schedule: Schedule = Relationship(back_populates="assignments")
 
+    __table_args__ = (
+        Index('idx_shiftassignment_schedule_day_shift', 'schedule_id', 'day', 'shift'),
+        Index('idx_shiftassignment_schedule_staff_day', 'schedule_id', 'staff_id', 'day'),
+        Index('idx_shiftassignment_staff_schedule', 'staff_id', 'schedule_id'),
+        # Conflict target for diff-based schedule writes
+        Index('uq_shiftassignment_cell', 'schedule_id', 'day', 'shift', 'staff_id', unique=True),
+    )
+
 # New constraint models
 class ScheduleConfig(SQLModel, table=True):
     """Manager-configurable scheduling constraints"""
@@ -809,6 +838,12 @@ class SwapRequest(SQLModel, table=True):
             unique=True,
             postgresql_where="swap_type = 'auto' AND assigned_staff_id IS NOT NULL AND status IN ('potential_assignment', 'staff_accepted', 'manager_final_approval')"
         ),
+
+        # Lookups by schedule and by each staff role in a swap
+        Index('idx_swaprequest_schedule_status', 'schedule_id', 'status'),
+        Index('idx_swaprequest_requesting_created_at', 'requesting_staff_id', 'created_at'),
+        Index('idx_swaprequest_target_status', 'target_staff_id', 'status'),
+        Index('idx_swaprequest_assigned_status', 'assigned_staff_id', 'status'),
     )
 
 class SwapHistory(SQLModel, table=True):
@@ -837,6 +872,40 @@ class ZoneAssignment(SQLModel, table=True):
     schedule: "Schedule" = Relationship()
     staff: "Staff" = Relationship()
 
+    __table_args__ = (
+        # One zone per staff member per shift; conflict target for diff-based schedule writes
+        Index('uq_zoneassignment_cell', 'schedule_id', 'staff_id', 'day', 'shift', unique=True),
+    )
+
+class StaffTimelineEntry(SQLModel, table=True):
+    """
+    Dated copy of a ShiftAssignment for personal schedules (see services/staff_timeline.py).
+    Derived data maintained alongside assignment writes, so it has no foreign keys.
+    """
+    id: uuid.UUID = Field(primary_key=True)  # The ShiftAssignment's id
+    staff_id: uuid.UUID
+    shift_date: date
+    shift: int
+    day: int
+    schedule_id: uuid.UUID
+    facility_id: uuid.UUID
+
+    __table_args__ = (
+        Index('idx_stafftimelineentry_staff_date', 'staff_id', 'shift_date', 'shift'),
+    )
+
+class ScheduleChange(SQLModel, table=True):
+    """Assignment diff that took a schedule to `version`, for the changes-since feed"""
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    schedule_id: uuid.UUID = Field(foreign_key="schedule.id")
+    version: int
+    changes: Dict[str, Any] = Field(default_factory=dict, sa_column=SAColumn(JSON))  # added/removed/moved/zone_changed
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=SAColumn(DateTime(timezone=True)))
+
+    __table_args__ = (
+        Index('uq_schedulechange_schedule_version', 'schedule_id', 'version', unique=True),
+    )
+
 class ScheduleTemplate(SQLModel, table=True):
     """Store reusable schedule templates"""
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
@@ -908,6 +977,10 @@ class Notification(SQLModel, table=True):
     # Relationships
     recipient: "User" = Relationship(back_populates="notifications")
 
+    __table_args__ = (
+        Index('idx_notification_recipient_read_created_at', 'recipient_user_id', 'is_read', 'created_at'),
+    )
+
 class NotificationTemplate(SQLModel, table=True):
     """Reusable notification templates"""
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
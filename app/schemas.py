@@ -732,6 +732,7 @@ class ScheduleRead(BaseModel):
     id: uuid.UUID
     facility_id: uuid.UUID
     week_start: date
+    version: int = 1
     is_published: bool
     published_at: Optional[datetime] = None
     published_by_id: Optional[uuid.UUID] = None
@@ -1480,6 +1481,38 @@ class StaffDeleteValidation(BaseDeleteValidation):
     is_manager: bool
     has_unique_skills: bool
 
+class StaffBulkRequest(BaseModel):
+    """Staff members for a bulk operation"""
+    staff_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=1000)
+
+class StaffBulkDeactivateRequest(StaffBulkRequest):
+    cancel_pending_swaps: bool = False
+
+class StaffBulkDeleteRequest(StaffBulkRequest):
+    force: bool = False
+    cascade_assignments: bool = False
+
+class StaffBulkValidationItem(StaffDeleteValidation):
+    staff_id: uuid.UUID
+    full_name: str
+
+class StaffBulkDeleteValidation(BaseModel):
+    """Deletion impact for every requested staff member"""
+    can_delete: bool
+    results: List[StaffBulkValidationItem]
+    not_found: List[uuid.UUID] = []
+
+class StaffBulkOperationResponse(BaseModel):
+    """Result of a bulk deactivate or delete"""
+    success: bool
+    message: str
+    affected_ids: List[uuid.UUID]
+    not_found: List[uuid.UUID] = []
+    deactivated_users_count: int
+    cancelled_invitations_count: int
+    cancelled_swaps_count: int
+    reassigned_schedules_count: int
+
 # ==================== SCHEDULE DELETE SCHEMAS ====================
 
 class ScheduleDeleteResponse(BaseDeleteResponse):
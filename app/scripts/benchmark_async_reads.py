@@ -0,0 +1,211 @@
+# app/scripts/benchmark_async_reads.py
+# A/B latency and throughput of the hot read path on the sync and async engines.
+#
+# Runs the /staff/me/schedule read (staff lookup by email, then the staff
+# member's assignments across a month of schedules) under concurrent load
+# in three variants:
+#   sync def + Session       - the old endpoints, one threadpool worker per request
+#   async def + Session      - sync queries inside async def, blocking the event loop
+#   async def + AsyncSession - get_async_db (asyncpg / aiosqlite)
+#
+# Seeds a throwaway SQLite file by default. With --database-url it reads the
+# existing staff of that database, or seeds it first with --seed (use an
+# empty database: SQLite has no network round trip, so the async driver
+# only shows its benefit against PostgreSQL). --db-latency-ms adds a
+# pg_sleep to every request to stand in for the round trip to a database
+# on another host. Runs on uvloop when it is installed, as under uvicorn.
+#
+# Usage: python -m app.scripts.benchmark_async_reads [--requests N] [--concurrency N] [--pool-size N]
+#            [--database-url URL [--seed]] [--db-latency-ms MS]
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import build_async_engine, build_engine
+from app.models import Facility, Schedule, ShiftAssignment, Staff, Tenant, User
+
+WEEKS = 5
+STAFF_PER_FACILITY = 40
+
+
+def seed(url: str) -> None:
+    engine = build_engine(url, name="bench_seed")
+    for model in (Tenant, User, Facility, Staff, Schedule, ShiftAssignment):
+        model.__table__.create(engine, checkfirst=True)
+
+    with Session(engine) as db:
+        tenant = Tenant(name="Benchmark")
+        facility = Facility(tenant_id=tenant.id, name="Benchmark Hotel")
+        staff = [
+            Staff(facility_id=facility.id, full_name=f"Staff {i}", email=f"staff{i}@example.com", role="Server")
+            for i in range(STAFF_PER_FACILITY)
+        ]
+        db.add_all([tenant, facility])
+        db.flush()
+        db.add_all(staff)
+        week_start = date.today() - timedelta(days=date.today().weekday())
+        for week in range(WEEKS):
+            schedule = Schedule(facility_id=facility.id, week_start=week_start - timedelta(weeks=week))
+            db.add(schedule)
+            for day in range(7):
+                for shift in range(3):
+                    for member in staff[(day + shift) % 4::4]:
+                        db.add(ShiftAssignment(schedule_id=schedule.id, day=day, shift=shift, staff_id=member.id))
+        db.commit()
+    engine.dispose()
+
+
+def _staff_query(email: str):
+    return select(Staff).where(Staff.email == email)
+
+
+def _assignments_query(staff: Staff, start: date, end: date):
+    return select(ShiftAssignment, Schedule.week_start).join(
+        Schedule, ShiftAssignment.schedule_id == Schedule.id
+    ).where(
+        Schedule.facility_id == staff.facility_id,
+        Schedule.week_start >= start - timedelta(days=7),
+        Schedule.week_start <= end,
+        ShiftAssignment.staff_id == staff.id
+    )
+
+
+def _response(staff: Staff, rows) -> dict:
+    return {
+        "staff_id": str(staff.id),
+        "assignments": [
+            {"date": (week_start + timedelta(days=a.day)).isoformat(), "shift": a.shift}
+            for a, week_start in rows
+        ],
+    }
+
+
+def build_apps(url: str, pool_size: int, latency_ms: float = 0):
+    engine = build_engine(url, name="bench_sync", pool_size=pool_size, max_overflow=0)
+    async_engine = build_async_engine(url, name="bench_async", pool_size=pool_size, max_overflow=0)
+    delay = text("SELECT pg_sleep(:seconds)").bindparams(seconds=latency_ms / 1000) if latency_ms else None
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/me/schedule")
+    def sync_schedule(email: str, start: date, end: date):
+        with Session(engine) as db:
+            if delay is not None:
+                db.exec(delay)
+            staff = db.exec(_staff_query(email)).first()
+            return _response(staff, db.exec(_assignments_query(staff, start, end)).all())
+
+    blocking_app = FastAPI()
+
+    @blocking_app.get("/me/schedule")
+    async def blocking_schedule(email: str, start: date, end: date):
+        with Session(engine) as db:
+            if delay is not None:
+                db.exec(delay)
+            staff = db.exec(_staff_query(email)).first()
+            return _response(staff, db.exec(_assignments_query(staff, start, end)).all())
+
+    async_app = FastAPI()
+
+    @async_app.get("/me/schedule")
+    async def async_schedule(email: str, start: date, end: date):
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            if delay is not None:
+                await db.exec(delay)
+            staff = (await db.exec(_staff_query(email))).first()
+            return _response(staff, (await db.exec(_assignments_query(staff, start, end))).all())
+
+    apps = {
+        "sync def + Session": sync_app,
+        "async def + Session": blocking_app,
+        "async def + AsyncSession": async_app,
+    }
+    return apps, engine, async_engine
+
+
+async def measure(app: FastAPI, emails, requests: int, concurrency: int):
+    """(p50 ms, p95 ms, requests per second)"""
+    end = date.today() + timedelta(days=6)
+    start = end - timedelta(days=27)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> float:
+            params = {"email": emails[i % len(emails)], "start": start.isoformat(), "end": end.isoformat()}
+            began = time.perf_counter()
+            response = await client.get("/me/schedule", params=params)
+            response.raise_for_status()
+            return time.perf_counter() - began
+
+        for i in range(min(50, requests)):
+            await one(i)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(i: int) -> float:
+            async with semaphore:
+                return await one(i)
+
+        began = time.perf_counter()
+        timings = await asyncio.gather(*(limited(i) for i in range(requests)))
+        elapsed = time.perf_counter() - began
+
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return statistics.median(timings) * 1000, p95 * 1000, requests / elapsed
+
+
+async def main(args):
+    temp_dir = None
+    url = args.database_url
+    if not url:
+        temp_dir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(temp_dir.name, 'bench.db')}"
+    if not args.database_url or args.seed:
+        seed(url)
+        print(f"🌱 Seeded {STAFF_PER_FACILITY} staff over {WEEKS} weeks in {url}")
+
+    apps, engine, async_engine = build_apps(url, args.pool_size, args.db_latency_ms)
+    with Session(engine) as db:
+        emails = [s.email for s in db.exec(select(Staff).where(Staff.is_active == True, Staff.email != None).limit(50))]
+
+    print(
+        f"⏱️  {args.requests} requests, {args.concurrency} concurrent, pool of {args.pool_size}, "
+        f"{args.db_latency_ms:g} ms added latency"
+    )
+    print(f"{'variant':<28}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+    for name, app in apps.items():
+        p50, p95, throughput = await measure(app, emails, args.requests, args.concurrency)
+        print(f"{name:<28}{p50:>10.2f}{p95:>10.2f}{throughput:>10.0f}")
+
+    await async_engine.dispose()
+    engine.dispose()
+    if temp_dir:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async database reads")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=20, help="connections per engine")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--seed", action="store_true", help="seed --database-url before measuring")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="PostgreSQL only")
+    args = parser.parse_args()
+    try:
+        import uvloop
+        uvloop.run(main(args))
+    except ImportError:
+        asyncio.run(main(args))
@@ -0,0 +1,79 @@
+# app/scripts/benchmark_middleware.py
+# Measure per-request overhead of the security and rate limit middleware stack.
+#
+# Compares a bare app, the same app wrapped in two BaseHTTPMiddleware
+# passthroughs (the wrapper cost the old middlewares paid on every request),
+# and the app wrapped in SecurityMiddleware + CustomRateLimitMiddleware.
+# The benchmarked paths never query the database.
+#
+# Usage: python -m app.scripts.benchmark_middleware [requests]
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.rate_limit_middleware import CustomRateLimitMiddleware
+from app.middleware.security_middleware import SecurityMiddleware
+
+PATHS = ["/health", "/bench"]
+
+
+class PassthroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def build_app(*middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/bench")
+    async def bench():
+        return {"ok": True}
+
+    for middleware_class in middleware:
+        app.add_middleware(middleware_class)
+    return app
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> float:
+    """Median latency in microseconds"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(50):
+            await client.get(path, headers={"x-forwarded-for": f"10.1.{i}.1"})
+
+        timings = []
+        for i in range(requests):
+            # Spread requests over client IPs so the rate limiter never returns 429
+            headers = {"x-forwarded-for": f"10.0.{i % 64}.1"}
+            start = time.perf_counter()
+            await client.get(path, headers=headers)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1_000_000
+
+
+async def main(requests: int):
+    stacks = {
+        "bare app": build_app(),
+        "BaseHTTPMiddleware x2": build_app(PassthroughMiddleware, PassthroughMiddleware),
+        "security + rate limit": build_app(SecurityMiddleware, CustomRateLimitMiddleware),
+    }
+
+    print(f"⏱️  Median latency over {requests} requests (µs)")
+    print(f"{'stack':<26}" + "".join(f"{path:>12}" for path in PATHS))
+    for name, app in stacks.items():
+        results = [await measure(app, path, requests) for path in PATHS]
+        print(f"{name:<26}" + "".join(f"{value:>12.0f}" for value in results))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,53 @@
+# app/scripts/check_query_plans.py
+"""
+EXPLAIN the scheduling hot-path queries against the configured database
+and fail if any of them falls back to a sequential scan of a hot table.
+
+Run after migrations, e.g. in CI against a seeded database:
+
+    python -m app.scripts.check_query_plans
+"""
+
+import sys
+
+from sqlmodel import Session, select
+
+from app.core.query_plans import check_query_plans, critical_queries
+from app.deps import engine
+from app.models import ShiftAssignment, Staff, User
+
+
+def sample_ids():
+    """Use real ids where the database has them so plans reflect real data"""
+    ids = {}
+    with Session(engine) as db:
+        assignment = db.exec(select(ShiftAssignment).limit(1)).first()
+        if assignment:
+            ids.update(schedule_id=assignment.schedule_id, staff_id=assignment.staff_id)
+        staff = db.exec(select(Staff).where(Staff.email.is_not(None)).limit(1)).first()
+        if staff:
+            ids.update(facility_id=staff.facility_id, email=staff.email.lower())
+        user = db.exec(select(User).limit(1)).first()
+        if user:
+            ids["user_id"] = user.id
+    return ids
+
+
+def main():
+    ids = sample_ids()
+    failures = check_query_plans(engine, ids)
+
+    for name in critical_queries(ids):
+        if name in failures:
+            print(f"❌ {name}: sequential scan on {', '.join(failures[name])}")
+        else:
+            print(f"✅ {name}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} critical queries are not using an index")
+        sys.exit(1)
+    print("\n✅ All critical queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# app/scripts/partition_audit_log.py
+"""
+Convert the audit log into a table partitioned by month on created_at.
+
+Once converted, the retention job drops whole monthly partitions older than
+the longest tenant retention instead of deleting rows, and creates the next
+AUDIT_PARTITION_MONTHS_AHEAD partitions ahead of time. A DEFAULT partition
+catches anything outside the monthly ranges.
+
+PostgreSQL only. The conversion copies all rows under an exclusive lock, so
+run it in a maintenance window. The old table is kept as
+auditlog_unpartitioned unless --drop-old is given.
+
+Usage: python -m app.scripts.partition_audit_log [--drop-old]
+"""
+
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.deps import engine
+from app.services.retention_service import (
+    AUDIT_TABLE, create_audit_partition_sql, month_start, next_month
+)
+
+OLD_TABLE = f"{AUDIT_TABLE}_unpartitioned"
+INDEXED_COLUMNS = ["tenant_id", "user_id", "ip_address", "created_at", "event_type", "request_id"]
+
+
+def partition_audit_log(drop_old: bool = False):
+    if engine.dialect.name != "postgresql":
+        print("❌ Audit log partitioning requires PostgreSQL")
+        return
+
+    with engine.begin() as conn:
+        relkind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :name"), {"name": AUDIT_TABLE}
+        ).scalar()
+        if relkind == "p":
+            print("✅ Audit log is already partitioned")
+            return
+
+        print("🔒 Locking audit log...")
+        conn.execute(text(f'LOCK TABLE "{AUDIT_TABLE}" IN ACCESS EXCLUSIVE MODE'))
+
+        # Free the index and constraint names for the new table
+        conn.execute(text(f'ALTER TABLE "{AUDIT_TABLE}" RENAME TO "{OLD_TABLE}"'))
+        conn.execute(text(f'ALTER TABLE "{OLD_TABLE}" RENAME CONSTRAINT "{AUDIT_TABLE}_pkey" TO "{OLD_TABLE}_pkey"'))
+        for column in INDEXED_COLUMNS:
+            conn.execute(text(f'ALTER INDEX IF EXISTS "ix_{AUDIT_TABLE}_{column}" RENAME TO "ix_{OLD_TABLE}_{column}"'))
+
+        # The partition key must be part of the primary key and cannot be NULL
+        conn.execute(text(f'UPDATE "{OLD_TABLE}" SET created_at = now() WHERE created_at IS NULL'))
+        conn.execute(text(
+            f'CREATE TABLE "{AUDIT_TABLE}" (LIKE "{OLD_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f"PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text(f'ALTER TABLE "{AUDIT_TABLE}" ALTER COLUMN created_at SET NOT NULL'))
+        conn.execute(text(f'ALTER TABLE "{AUDIT_TABLE}" ADD PRIMARY KEY (id, created_at)'))
+        conn.execute(text(f'ALTER TABLE "{AUDIT_TABLE}" ADD FOREIGN KEY (tenant_id) REFERENCES tenant (id)'))
+        conn.execute(text(f'ALTER TABLE "{AUDIT_TABLE}" ADD FOREIGN KEY (user_id) REFERENCES "user" (id)'))
+        for column in INDEXED_COLUMNS:
+            conn.execute(text(f'CREATE INDEX "ix_{AUDIT_TABLE}_{column}" ON "{AUDIT_TABLE}" ({column})'))
+
+        # One partition per month from the oldest row to a few months ahead
+        oldest = conn.execute(text(f'SELECT min(created_at) FROM "{OLD_TABLE}"')).scalar()
+        today = datetime.now(timezone.utc).date()
+        month = month_start(oldest.date() if oldest else today)
+        last = month_start(today)
+        for _ in range(get_settings().AUDIT_PARTITION_MONTHS_AHEAD):
+            last = next_month(last)
+
+        created = 0
+        while month <= last:
+            conn.execute(text(create_audit_partition_sql(month)))
+            month = next_month(month)
+            created += 1
+        conn.execute(text(f'CREATE TABLE "{AUDIT_TABLE}_default" PARTITION OF "{AUDIT_TABLE}" DEFAULT'))
+        print(f"📝 Created {created} monthly partitions")
+
+        copied = conn.execute(text(f'INSERT INTO "{AUDIT_TABLE}" SELECT * FROM "{OLD_TABLE}"')).rowcount
+        print(f"📝 Copied {copied} audit log rows")
+
+        if drop_old:
+            conn.execute(text(f'DROP TABLE "{OLD_TABLE}"'))
+            print(f"🗑️ Dropped {OLD_TABLE}")
+
+    print("✅ Audit log partitioned by month")
+
+
+if __name__ == "__main__":
+    partition_audit_log(drop_old="--drop-old" in sys.argv)
@@ -7,7 +7,7 @@ from app.models import (
     # Core models
     NotificationGlobalSettings, SystemSettings, Tenant, Facility, Staff, User, Schedule, ShiftAssignment, 
     ScheduleConfig, StaffUnavailability, SwapRequest, SwapHistory, UserProfile,
-    ZoneAssignment, ScheduleTemplate, ScheduleOptimization,
+    ZoneAssignment, ScheduleTemplate, ScheduleOptimization, ScheduleChange, StaffTimelineEntry,
     # Facility management models
     FacilityShift, FacilityRole, FacilityZone, ShiftRoleRequirement,
     # Notification system models
@@ -63,6 +63,8 @@ def reset_database(session):
     session.execute(delete(ScheduleConfig))
     session.execute(delete(StaffUnavailability))
     session.execute(delete(ShiftAssignment))
+    session.execute(delete(ScheduleChange))
+    session.execute(delete(StaffTimelineEntry))
     session.execute(delete(Schedule))
 
     # ------------------------
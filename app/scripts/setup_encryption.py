@@ -2,6 +2,15 @@
 """
 Setup script for configuring encryption in the hospitality scheduler.
 Generates encryption keys, verifies setup, and migrates existing data.
+
+Key rotation:
+  1. Move the current ENCRYPTION_KEY (or SECRET_KEY, if keys were derived
+     from it) to ENCRYPTION_OLD_KEYS and set a new ENCRYPTION_KEY.
+  2. Restart the app; it decrypts with either key and encrypts with the new one.
+  3. Run `python -m app.scripts.setup_encryption rotate`. It re-encrypts
+     tables in batches and can be interrupted and re-run; it resumes from
+     its checkpoint file (--restart starts over).
+  4. Remove ENCRYPTION_OLD_KEYS.
 """
 
 import os
@@ -19,11 +28,13 @@ from app.core.encryption import (
     verify_encryption_setup,
     get_field_encryption
 )
-from app.core.encryption_db import EncryptionMigration
+from app.core.encryption_db import EncryptionMigration, TableReEncryption
 from app.core.config import get_settings
 from app.deps import engine
 from app.models import NotificationGlobalSettings
 
+REENCRYPT_CHECKPOINT_FILE = "encryption_reencrypt_checkpoint.json"
+
 def print_header(title: str):
     """Print a formatted header"""
     print("\n" + "=" * 60)
@@ -182,6 +193,45 @@ def migrate_existing_data(dry_run: bool = True):
         print_step(f"Migration failed: {e}", "❌")
         return False
 
+def reencrypt_tables(rotate: bool = False, restart: bool = False):
+    """Encrypt plaintext values (and with rotate, move retired-key values to the current key) table by table"""
+    print_header("KEY ROTATION" if rotate else "RE-ENCRYPT TABLES")
+    
+    if restart and os.path.exists(REENCRYPT_CHECKPOINT_FILE):
+        os.remove(REENCRYPT_CHECKPOINT_FILE)
+        print_step("Removed previous checkpoint", "📝")
+    elif os.path.exists(REENCRYPT_CHECKPOINT_FILE):
+        print_step(f"Resuming from {REENCRYPT_CHECKPOINT_FILE}", "📝")
+    
+    try:
+        with Session(engine) as session:
+            results = TableReEncryption(
+                session, rotate=rotate, checkpoint_path=REENCRYPT_CHECKPOINT_FILE
+            ).run()
+        
+        failed = False
+        for model_name, stats in results.items():
+            print(f"\n   📊 {model_name}:")
+            print(f"      Rows scanned: {stats['rows']} in {stats['batches']} batches")
+            print(f"      Encrypted: {stats['encrypted']}")
+            print(f"      Rotated: {stats['rotated']}")
+            if stats["errors"]:
+                failed = True
+                print(f"      Errors: {len(stats['errors'])}")
+                for error in stats["errors"][:20]:
+                    print(f"         • {error}")
+        
+        if failed:
+            print_step("Some values could not be decrypted with any configured key", "⚠️")
+            return False
+        print_step("All tables re-encrypted", "✅")
+        return True
+        
+    except Exception as e:
+        print_step(f"Re-encryption failed: {e}", "❌")
+        print(f"   Run the command again to resume from {REENCRYPT_CHECKPOINT_FILE}")
+        return False
+
 def interactive_setup():
     """Interactive setup wizard"""
     print_header("ENCRYPTION SETUP WIZARD")
@@ -250,8 +300,10 @@ def main():
             migrate_existing_data(dry_run=True)
         elif command == "migrate":
             migrate_existing_data(dry_run=False)
+        elif command in ("reencrypt", "rotate"):
+            reencrypt_tables(rotate=command == "rotate", restart="--restart" in sys.argv)
         else:
-            print("Usage: python setup_encryption.py [generate-key|verify|check-db|migrate-dry|migrate]")
+            print("Usage: python setup_encryption.py [generate-key|verify|check-db|migrate-dry|migrate|reencrypt|rotate [--restart]]")
             print("       python setup_encryption.py  (for interactive mode)")
     else:
         interactive_setup()
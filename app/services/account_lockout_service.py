@@ -2,24 +2,39 @@
 Account Lockout Service
 
 Handles account lockout logic, including tracking failed login attempts and locking accounts.
+With a counter backend configured (see lockout_counters.py) failures and
+locks are tracked there and the database only receives sampled attempts
+and lockout records in batches.
 """
 from datetime import datetime, timezone, timedelta
 from sqlmodel import Session, select, and_
-from typing import Optional
+from typing import Any, Optional
 import logging
 
-from ..models import LoginAttempt, AccountLockout, SecuritySettings, User
+from ..models import LoginAttempt, AccountLockout, User
 from ..core.config import get_settings
+from .tenant_settings_cache import tenant_settings_cache
+from .lockout_counters import get_lockout_backend, login_attempt_log
 
 logger = logging.getLogger(__name__)
 
+# Default for record_failed_attempt(user=...): look the user up by email
+_NOT_LOADED = object()
+
 class AccountLockoutService:
     def __init__(self, db: Session):
         self.db = db
         self.settings = get_settings()
+        self.counters = get_lockout_backend()
     
     async def is_account_locked(self, email: str) -> bool:
         """Check if account is currently locked"""
+        if self.counters:
+            try:
+                return await self.counters.is_locked(email.lower())
+            except Exception as e:
+                logger.warning(f"Lockout counters unavailable, checking database: {e}")
+        
         lockout = self.db.exec(
             select(AccountLockout).where(
                 AccountLockout.email == email.lower(),
@@ -35,25 +50,45 @@ class AccountLockoutService:
     async def record_failed_attempt(
                 self, email: str, 
                 ip_address: str, 
-                user_agent: Optional[str] = None
+                user_agent: Optional[str] = None,
+                user: Any = _NOT_LOADED
                 ) -> None: # type: ignore
-        """Record a failed login attempt and potentially lock account"""
+        """
+        Record a failed login attempt and potentially lock account.
+        Pass `user` (or None for an unknown email) when the caller already
+        looked it up, to skip the query.
+        """
         email = email.lower()
         
         # Get security settings for this user's tenant
-        user = self.db.exec(select(User).where(User.email == email)).first()
+        if user is _NOT_LOADED:
+            user = self.db.exec(select(User).where(User.email == email)).first()
         security_settings = None
         
         if user:
-            security_settings = self.db.exec(
-                select(SecuritySettings).where(SecuritySettings.tenant_id == user.tenant_id)
-            ).first()
+            security_settings = tenant_settings_cache.get_security_settings(self.db, user.tenant_id)
         
         # Use default settings if none found
         max_attempts = security_settings.max_failed_attempts if security_settings else 5
         window_minutes = security_settings.failed_attempts_window_minutes if security_settings else 15
         lockout_minutes = security_settings.lockout_duration_minutes if security_settings else 30
         
+        if self.counters:
+            try:
+                failed_count = await self.counters.record_failure(email, window_minutes * 60)
+                login_attempt_log.record_attempt(
+                    email, ip_address, success=False, user_agent=user_agent, failure_reason="invalid_credentials"
+                )
+                logger.info(f"Failed login attempts for {email}: {failed_count}/{max_attempts}")
+                
+                if failed_count >= max_attempts:
+                    await self.counters.lock(email, lockout_minutes * 60)
+                    login_attempt_log.record_lockout(email, failed_count, lockout_minutes)
+                    logger.warning(f"Account locked: {email} for {lockout_minutes} minutes")
+                return
+            except Exception as e:
+                logger.warning(f"Lockout counters unavailable, recording in database: {e}")
+        
         # Record the failed attempt
         attempt = LoginAttempt(
             email=email,
@@ -118,6 +153,16 @@ class AccountLockoutService:
         """Clear failed attempts and unlock account (on successful login)"""
         email = email.lower()
         
+        if self.counters:
+            try:
+                was_locked = await self.counters.clear(email)
+                login_attempt_log.record_attempt(email, "", success=True)
+                if was_locked:
+                    login_attempt_log.record_unlock(email)
+                return
+            except Exception as e:
+                logger.warning(f"Lockout counters unavailable, clearing in database: {e}")
+        
         # Mark existing lockout as inactive
         lockout = self.db.exec(
             select(AccountLockout).where(AccountLockout.email == email)
@@ -142,6 +187,15 @@ class AccountLockoutService:
         """Manually unlock an account (admin action)"""
         email = email.lower()
         
+        was_locked = False
+        if self.counters:
+            try:
+                was_locked = await self.counters.clear(email)
+                if was_locked:
+                    login_attempt_log.record_unlock(email)
+            except Exception as e:
+                logger.warning(f"Lockout counters unavailable while unlocking {email}: {e}")
+        
         lockout = self.db.exec(
             select(AccountLockout).where(
                 AccountLockout.email == email,
@@ -156,4 +210,6 @@ class AccountLockoutService:
             logger.info(f"Account manually unlocked: {email} by admin: {admin_user_id}")
             return True
         
-        return False
\ No newline at end of file
+        if was_locked:
+            logger.info(f"Account manually unlocked: {email} by admin: {admin_user_id}")
+        return was_locked
\ No newline at end of file
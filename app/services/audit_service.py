@@ -4,8 +4,10 @@ from sqlalchemy import and_
 from sqlmodel import Session, select, desc, col
 from typing import Optional, Dict, Any, List
 import logging
+import random
 
 from ..models import AuditLog, AuditEvent, User
+from .audit_writer import audit_writer, SYSTEM_EVENTS
 
 logger = logging.getLogger(__name__)
 
@@ -25,34 +27,31 @@ class AuditService:
         resource_id: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None,
         severity: str = "info",
-        event_description: Optional[str] = None
+        event_description: Optional[str] = None,
+        sample_rate: float = 1.0
     ) -> Optional[AuditLog]:
-        """Log an audit event with smart tenant context handling"""
+        """Log an audit event with smart tenant context handling
+
+        Events are buffered and bulk-inserted by the audit writer when it is
+        running; otherwise (scripts, tests) they are written immediately.
+        sample_rate < 1 keeps only that fraction of high-volume events.
+        """
         
         try:
-            # ✅ FIX: Try to derive tenant_id from user_id if missing
-            if not tenant_id and user_id:
-                from ..models import User
-                user = self.db.get(User, user_id)
-                if user:
-                    tenant_id = user.tenant_id
-            
-            # ✅ FIX: Skip logging if no tenant context for non-system events
-            if not tenant_id and event_type not in [
-                AuditEvent.SYSTEM_STARTUP,
-                AuditEvent.SYSTEM_SHUTDOWN,
-                AuditEvent.SYSTEM_ERROR,
-                AuditEvent.SYSTEM_MAINTENANCE
-            ]:
-                logger.warning(f"Skipping audit log - no tenant context: {event_type.value}")
-                return None
+            if sample_rate < 1.0:
+                if random.random() >= sample_rate:
+                    return None
+                details = {**(details or {}), "sample_rate": sample_rate}
             
             # Auto-generate description if not provided
             if not event_description:
                 event_description = self._generate_description(event_type, details)
             
-            # Create audit log data
+            # Create audit log data (every column present, so rows can be bulk-inserted together)
             audit_log_data = {
+                "id": uuid.uuid4(),
+                "tenant_id": uuid.UUID(str(tenant_id)) if tenant_id else None,
+                "user_id": uuid.UUID(str(user_id)) if user_id else None,
                 "action": event_type.value,
                 "resource_type": resource_type or "system",
                 "resource_id": uuid.UUID(resource_id) if resource_id else None,
@@ -60,23 +59,13 @@ class AuditService:
                 "ip_address": ip_address,
                 "user_agent": user_agent,
                 "created_at": datetime.now(timezone.utc),
-                "event_type": event_type.value,
+                "event_type": event_type,
                 "event_description": event_description,
                 "severity": severity,
                 "request_id": request_id,
                 "details": details or {}
             }
             
-            # ✅ FIX: Only add if not None
-            if user_id:
-                audit_log_data["user_id"] = user_id
-            if tenant_id:
-                audit_log_data["tenant_id"] = tenant_id
-            
-            audit_log = AuditLog(**audit_log_data)
-            self.db.add(audit_log)
-            self.db.commit()
-            
             # Log to application logger as well
             log_level = getattr(logging, severity.upper(), logging.INFO)
             logger.log(
@@ -84,7 +73,11 @@ class AuditService:
                 f"AUDIT: {event_type.value} - {event_description} (User: {user_id}, IP: {ip_address})"
             )
             
-            return audit_log
+            if audit_writer.is_running:
+                await audit_writer.enqueue(audit_log_data)
+                return AuditLog(**audit_log_data)
+            
+            return self._write_now(audit_log_data)
             
         except Exception as e:
             # ✅ FAILSAFE: Don't break the application if audit logging fails
@@ -92,6 +85,24 @@ class AuditService:
             self.db.rollback()
             return None
     
+    def _write_now(self, audit_log_data: Dict[str, Any]) -> Optional[AuditLog]:
+        """Write a single audit row in this request's session"""
+        # ✅ FIX: Try to derive tenant_id from user_id if missing
+        if not audit_log_data["tenant_id"] and audit_log_data["user_id"]:
+            user = self.db.get(User, audit_log_data["user_id"])
+            if user:
+                audit_log_data["tenant_id"] = user.tenant_id
+        
+        # ✅ FIX: Skip logging if no tenant context for non-system events
+        if not audit_log_data["tenant_id"] and audit_log_data["event_type"] not in SYSTEM_EVENTS:
+            logger.warning(f"Skipping audit log - no tenant context: {audit_log_data['event_type'].value}")
+            return None
+        
+        audit_log = AuditLog(**audit_log_data)
+        self.db.add(audit_log)
+        self.db.commit()
+        return audit_log
+    
     def _generate_description(self, event_type: AuditEvent, details: Optional[Dict[str, Any]]) -> str:
         """Generate human-readable event description"""
         descriptions = {
@@ -225,19 +236,12 @@ class AuditService:
     # Cleanup method for maintenance
     async def cleanup_old_logs(self, days: int = 90) -> int:
         """Clean up audit logs older than specified days"""
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        from .retention_service import RetentionService
         
-        # Get count of logs to be deleted
-        count_query = select(AuditLog).where(col(AuditLog.created_at) < cutoff_date)
-        count_result = self.db.exec(count_query)
-        logs_to_delete = list(count_result.all())
-        count = len(logs_to_delete)
-        
-        # Delete old logs
-        for log in logs_to_delete:
-            self.db.delete(log)
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         
-        self.db.commit()
+        # Chunked DELETE in the database; the count comes from the affected rows
+        count = RetentionService(self.db).delete_audit_logs_before(cutoff_date)
         
         logger.info(f"Cleaned up {count} audit logs older than {days} days")
         return count
\ No newline at end of file
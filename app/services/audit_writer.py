@@ -0,0 +1,177 @@
+# app/services/audit_writer.py
+"""
+Buffered, batched writer for audit log rows.
+
+AuditService.log_event used to add and commit one AuditLog row inside every
+request. Events are now appended to a bounded in-memory buffer and written
+with a single multi-row INSERT when the buffer reaches AUDIT_BATCH_SIZE or
+every AUDIT_FLUSH_INTERVAL_SECONDS, whichever comes first.
+
+When the buffer is full, info-level events are dropped (and counted) while
+warning and above make the caller wait for a flush, so security events are
+never lost to load.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import AuditEvent, AuditLog, User
+
+logger = logging.getLogger(__name__)
+
+# Events that are written even without tenant context
+SYSTEM_EVENTS = {
+    AuditEvent.SYSTEM_STARTUP,
+    AuditEvent.SYSTEM_SHUTDOWN,
+    AuditEvent.SYSTEM_ERROR,
+    AuditEvent.SYSTEM_MAINTENANCE,
+}
+
+
+class AuditLogWriter:
+    """Collects audit rows and bulk-inserts them from a background task"""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        max_buffer: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        engine=None
+    ):
+        settings = get_settings()
+        self._engine = engine
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.max_buffer = max_buffer or settings.AUDIT_BUFFER_MAX_EVENTS
+        self.flush_interval = flush_interval or settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self.dropped = 0
+        self.written = 0
+
+    @property
+    def is_running(self) -> bool:
+        """True while the background flush loop is active (set up by the app lifespan)"""
+        return self._running
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def enqueue(self, row: Dict[str, Any]) -> bool:
+        """
+        Buffer one audit row. Returns False if the row was dropped because
+        the buffer is full and the event is low severity.
+        """
+        if len(self._buffer) >= self.max_buffer:
+            if row.get("severity", "info") == "info":
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Audit buffer full, dropped {self.dropped} info events so far")
+                return False
+            # Backpressure: important events wait for room instead of being lost
+            await self.flush()
+
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def run(self) -> None:
+        """Flush on size or time trigger until cancelled"""
+        self._running = True
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Audit flush failed: {e}")
+        finally:
+            self._running = False
+
+    async def flush(self) -> int:
+        """Write everything currently buffered, in batches of batch_size"""
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                written += await asyncio.to_thread(self._write_batch, batch)
+        return written
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> int:
+        if self._engine is None:
+            from ..deps import background_engine
+            self._engine = background_engine
+
+        with Session(self._engine) as db:
+            rows = self._prepare_rows(db, rows)
+            if not rows:
+                return 0
+            try:
+                db.execute(insert(AuditLog), rows)
+                db.commit()
+                written = len(rows)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Audit batch insert of {len(rows)} rows failed, retrying row by row: {e}")
+                written = 0
+                for row in rows:
+                    try:
+                        db.execute(insert(AuditLog), [row])
+                        db.commit()
+                        written += 1
+                    except Exception as row_error:
+                        db.rollback()
+                        logger.error(f"Audit logging failed: {row_error}")
+
+        self.written += written
+        return written
+
+    @staticmethod
+    def _prepare_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fill missing tenant_id from the user in one query and drop rows that
+        cannot be stored (tenant_id and user_id are NOT NULL on AuditLog).
+        """
+        missing = {
+            row["user_id"] for row in rows
+            if not row.get("tenant_id") and row.get("user_id")
+        }
+        tenants: Dict[uuid.UUID, uuid.UUID] = {}
+        if missing:
+            tenants = {
+                user_id: tenant_id
+                for user_id, tenant_id in db.exec(
+                    select(User.id, User.tenant_id).where(User.id.in_(missing))
+                ).all()
+            }
+
+        resolved = []
+        for row in rows:
+            if not row.get("tenant_id") and row.get("user_id"):
+                row["tenant_id"] = tenants.get(row["user_id"])
+            if not row.get("tenant_id") and row["event_type"] not in SYSTEM_EVENTS:
+                logger.warning(f"Skipping audit log - no tenant context: {row['event_type'].value}")
+                continue
+            if not row.get("tenant_id") or not row.get("user_id"):
+                logger.debug(f"Skipping audit log without user/tenant: {row['event_type'].value}")
+                continue
+            resolved.append(row)
+        return resolved
+
+
+# Create a global instance
+audit_writer = AuditLogWriter()
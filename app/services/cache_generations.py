@@ -0,0 +1,62 @@
+# app/services/cache_generations.py
+"""
+Invalidation generations for read-through caches.
+
+A cache miss reads the database outside the cache's lock, so an
+invalidation can land between the read and the store; storing anyway would
+keep the pre-invalidation value for a whole TTL. Each cache therefore takes
+a token before loading and stores only if the key's generation is still the
+one it started with:
+
+    with self._lock:
+        token = self._generations.start(key)
+    try:
+        value = load()
+    except BaseException:
+        with self._lock:
+            self._generations.finish(key, token)
+        raise
+    with self._lock:
+        if self._generations.finish(key, token):
+            store(value)
+
+Counters exist only while a load of their key is in flight, so the map is
+as small as the number of concurrent misses. Not thread-safe on its own:
+call every method under the owning cache's lock.
+"""
+
+from typing import Dict, Hashable, List, Tuple
+
+Token = Tuple[int, int]
+
+
+class CacheGenerations:
+    """Per-key invalidation counters for loads in flight"""
+
+    def __init__(self):
+        # key -> [generation, loads in flight]
+        self._counters: Dict[Hashable, List[int]] = {}
+        # Bumped by bump_all(), e.g. on clear()
+        self._epoch = 0
+
+    def start(self, key: Hashable) -> Token:
+        counter = self._counters.setdefault(key, [0, 0])
+        counter[1] += 1
+        return counter[0], self._epoch
+
+    def finish(self, key: Hashable, token: Token) -> bool:
+        """End a load; True when nothing invalidated the key since start()"""
+        counter = self._counters[key]
+        counter[1] -= 1
+        unchanged = token == (counter[0], self._epoch)
+        if not counter[1]:
+            del self._counters[key]
+        return unchanged
+
+    def bump(self, key: Hashable) -> None:
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += 1
+
+    def bump_all(self) -> None:
+        self._epoch += 1
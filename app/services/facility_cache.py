@@ -0,0 +1,283 @@
+# app/services/facility_cache.py
+"""
+Per-tenant cache of facility details for the facility picker.
+
+GET /facilities/ with details used to run five queries per facility
+(shifts, roles, zones, staff count, schedule count). load_facility_details()
+reads a whole tenant in six queries, whatever the number of facilities:
+the facilities, then shifts, roles and zones with one IN query each and the
+two counts as GROUP BY aggregates, grouped by facility in memory.
+
+Results are kept per (tenant, include_inactive) for
+FACILITY_CACHE_TTL_SECONDS. Any committed write to a Facility,
+FacilityShift, FacilityRole or FacilityZone, and any Staff or Schedule
+insert/delete that changes a count, drops the tenant's entries in this
+process and is broadcast over Redis pub/sub to the other workers. Child
+writes are broadcast by facility id, since the writing worker may not have
+the tenant cached and each worker maps facilities to tenants itself.
+"""
+
+import asyncio
+import copy
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..core.replicas import is_replica_session
+from ..models import Facility, FacilityRole, FacilityShift, FacilityZone, Schedule, Staff
+from ..schemas import FacilityRead, FacilityRoleRead, FacilityShiftRead, FacilityZoneRead
+from .cache_generations import CacheGenerations
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "facilities:invalidations"
+FACILITY_CHILD_MODELS = (FacilityShift, FacilityRole, FacilityZone)
+COUNTED_MODELS = (Staff, Schedule)
+
+
+def load_facility_details(
+    db: Session,
+    tenant_id: uuid.UUID,
+    include_inactive: bool = False,
+    facility_ids: Optional[List[uuid.UUID]] = None,
+) -> List[Dict[str, Any]]:
+    """FacilityWithDetails data for a tenant's facilities, in a constant number of queries"""
+    query = select(Facility).where(Facility.tenant_id == tenant_id)
+    if facility_ids is not None:
+        query = query.where(Facility.id.in_(facility_ids))
+    facilities = db.exec(query).all()
+    ids = [facility.id for facility in facilities]
+    if not ids:
+        return []
+
+    def children(model, order_by=None):
+        child_query = select(model).where(model.facility_id.in_(ids))
+        if not include_inactive:
+            child_query = child_query.where(model.is_active == True)
+        if order_by is not None:
+            child_query = child_query.order_by(order_by)
+        grouped = defaultdict(list)
+        for row in db.exec(child_query).all():
+            grouped[row.facility_id].append(row)
+        return grouped
+
+    shifts = children(FacilityShift, FacilityShift.shift_order)
+    roles = children(FacilityRole)
+    zones = children(FacilityZone, FacilityZone.display_order)
+
+    staff_counts = dict(db.exec(
+        select(Staff.facility_id, func.count(Staff.id))
+        .where(Staff.facility_id.in_(ids), Staff.is_active == True)
+        .group_by(Staff.facility_id)
+    ).all())
+    schedule_counts = dict(db.exec(
+        select(Schedule.facility_id, func.count(Schedule.id))
+        .where(Schedule.facility_id.in_(ids))
+        .group_by(Schedule.facility_id)
+    ).all())
+
+    return [
+        {
+            **FacilityRead.model_validate(facility).model_dump(),
+            "shifts": [FacilityShiftRead.model_validate(s).model_dump() for s in shifts[facility.id]],
+            "roles": [FacilityRoleRead.model_validate(r).model_dump() for r in roles[facility.id]],
+            "zones": [FacilityZoneRead.model_validate(z).model_dump() for z in zones[facility.id]],
+            "staff_count": staff_counts.get(facility.id, 0),
+            "active_schedules": schedule_counts.get(facility.id, 0),
+        }
+        for facility in facilities
+    ]
+
+
+class FacilityDetailsCache:
+    """Facility details keyed by (tenant_id, include_inactive)"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_settings().FACILITY_CACHE_TTL_SECONDS
+        self._entries: Dict[Tuple[uuid.UUID, bool], Tuple[List[Dict[str, Any]], float]] = {}
+        # facility_id -> tenant_id for every cached facility, to invalidate on child writes
+        self._facility_tenants: Dict[uuid.UUID, uuid.UUID] = {}
+        self._generations = CacheGenerations()  # per tenant
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== LOOKUPS ====================
+
+    def get_tenant_facilities(
+        self, db: Session, tenant_id: uuid.UUID, include_inactive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Copies of the tenant's facility details; safe for callers to modify"""
+        key = (tenant_id, include_inactive)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            self.hits += 1
+            details = entry[0]
+        else:
+            self.misses += 1
+            if is_replica_session(db):
+                details = load_facility_details(db, tenant_id, include_inactive)
+            else:
+                details = self._load_and_store(db, tenant_id, include_inactive)
+        return copy.deepcopy(details)
+
+    def _load_and_store(self, db: Session, tenant_id: uuid.UUID, include_inactive: bool) -> List[Dict[str, Any]]:
+        with self._lock:
+            token = self._generations.start(tenant_id)
+        try:
+            details = load_facility_details(db, tenant_id, include_inactive)
+        except BaseException:
+            with self._lock:
+                self._generations.finish(tenant_id, token)
+            raise
+        with self._lock:
+            if self._generations.finish(tenant_id, token):
+                self._entries[(tenant_id, include_inactive)] = (details, time.monotonic())
+                for facility in details:
+                    self._facility_tenants[facility["id"]] = tenant_id
+        return details
+
+    def get_facility(self, db: Session, tenant_id: uuid.UUID, facility_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """One facility's details from the tenant's cached list, or None if it is not the tenant's"""
+        for facility in self.get_tenant_facilities(db, tenant_id):
+            if facility["id"] == facility_id:
+                return facility
+        return None
+
+    def tenant_for_facility(self, facility_id: uuid.UUID) -> Optional[uuid.UUID]:
+        return self._facility_tenants.get(facility_id)
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self, tenant_id: uuid.UUID, broadcast: bool = True) -> None:
+        """Forget a tenant's facilities here and, if Redis is attached, in every worker"""
+        self._drop_local(tenant_id)
+        if broadcast and self._redis is not None:
+            self._schedule_publish(f"tenant:{tenant_id}")
+
+    def invalidate_facility(self, facility_id: uuid.UUID, broadcast: bool = True) -> None:
+        """Forget the tenant owning a facility, in every worker that has it cached"""
+        tenant_id = self.tenant_for_facility(facility_id)
+        if tenant_id:
+            self._drop_local(tenant_id)
+        else:
+            # A first load of the facility's tenant may be in flight
+            with self._lock:
+                self._generations.bump_all()
+        if broadcast and self._redis is not None:
+            self._schedule_publish(f"facility:{facility_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._facility_tenants.clear()
+            self._generations.bump_all()
+
+    def _drop_local(self, tenant_id: uuid.UUID) -> None:
+        with self._lock:
+            self._generations.bump(tenant_id)
+            self._entries.pop((tenant_id, False), None)
+            self._entries.pop((tenant_id, True), None)
+
+    def _apply_message(self, message: str) -> None:
+        kind, _, value = message.partition(":")
+        if kind == "tenant":
+            self.invalidate(uuid.UUID(value), broadcast=False)
+        elif kind == "facility":
+            self.invalidate_facility(uuid.UUID(value), broadcast=False)
+
+    def _schedule_publish(self, message: str) -> None:
+        # Facility endpoints are sync and run in the threadpool; the Redis client belongs to the loop
+        try:
+            asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str) -> None:
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Facility invalidation broadcast failed: {e}")
+
+    # ==================== REDIS ====================
+
+    def attach_redis(self, redis) -> None:
+        """Broadcast invalidations through a shared Redis client (redis.asyncio)"""
+        self._redis = redis
+        self._loop = asyncio.get_running_loop()
+
+    async def listen_for_changes(self) -> None:
+        """Drop facilities changed by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._apply_message(data.decode("utf-8") if isinstance(data, bytes) else data)
+            except Exception as e:
+                logger.warning(f"Facility invalidation listener error: {e}")
+                # Changes may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+
+# Create a global instance
+facility_details_cache = FacilityDetailsCache()
+
+
+def _changed_facility(obj, is_dirty: bool) -> Optional[uuid.UUID]:
+    if isinstance(obj, FACILITY_CHILD_MODELS) or isinstance(obj, Staff):
+        return obj.facility_id
+    if isinstance(obj, Schedule) and not is_dirty:
+        # Only inserts and deletes change the schedule count
+        return obj.facility_id
+    return None
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_changed_facilities(session, flush_context) -> None:
+    """Remember which tenants and facilities this transaction changed"""
+    changed = [(obj, False) for obj in itertools.chain(session.new, session.deleted)]
+    changed += [(obj, True) for obj in session.dirty]
+    for obj, is_dirty in changed:
+        if isinstance(obj, Facility):
+            session.info.setdefault("changed_facility_tenants", set()).add(obj.tenant_id)
+            continue
+        facility_id = _changed_facility(obj, is_dirty)
+        if facility_id:
+            session.info.setdefault("changed_facilities", set()).add(facility_id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_changed_facilities(session) -> None:
+    tenants = session.info.pop("changed_facility_tenants", set())
+    for tenant_id in tenants:
+        facility_details_cache.invalidate(tenant_id)
+    for facility_id in session.info.pop("changed_facilities", ()):
+        # Broadcast by facility: another worker may have the tenant cached when this one does not
+        if facility_details_cache.tenant_for_facility(facility_id) not in tenants:
+            facility_details_cache.invalidate_facility(facility_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_changed_facilities(session) -> None:
+    session.info.pop("changed_facility_tenants", None)
+    session.info.pop("changed_facilities", None)
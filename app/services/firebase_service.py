@@ -226,6 +226,81 @@ class FirebaseService:
 
         return success_total, failure_total
 
+    # --------------------------------------------------------------------- #
+    # Public API — BATCH (different payload per token)
+    # --------------------------------------------------------------------- #
+    async def send_push_batch(
+        self,
+        pushes: Sequence[Dict[str, Any]],
+        *,
+        dry_run: bool = False,
+    ) -> List[Tuple[bool, Optional[str]]]:
+        """Send one message per entry, packed into `send_each()` calls of ≤ 500.
+
+        Each entry holds ``token``, ``title``, ``body`` and optionally ``data``,
+        ``action_url`` and ``analytics_label``. Unlike multicast, every token
+        may carry its own payload, so notifications for many recipients share
+        the same FCM round trip.
+
+        Returns
+        -------
+        One ``(success, error_name)`` tuple per entry, in input order.
+        """
+        if not self._app:
+            logger.error("firebase_unavailable")
+            return [(False, "FirebaseUnavailable")] * len(pushes)
+
+        results: List[Tuple[bool, Optional[str]]] = []
+        loop = asyncio.get_running_loop()
+
+        for start in range(0, len(pushes), _MAX_BATCH_SIZE):
+            batch = pushes[start:start + _MAX_BATCH_SIZE]
+            messages = [
+                self._build_message(
+                    token=push["token"],
+                    title=push["title"],
+                    body=push["body"],
+                    data=push.get("data"),
+                    action_url=push.get("action_url"),
+                    analytics_label=push.get("analytics_label", "scheduler_v1"),
+                )
+                for push in batch
+            ]
+            try:
+                response = await loop.run_in_executor(
+                    None, lambda: messaging.send_each(messages, dry_run=dry_run)
+                )
+            except Exception as exc:
+                # Catastrophic batch failure — count every token as failed
+                logger.exception("fcm_batch_error", extra={"size": len(batch)})
+                results.extend([(False, type(exc).__name__)] * len(batch))
+                continue
+
+            for push, resp in zip(batch, response.responses):
+                if resp.success:
+                    results.append((True, None))
+                    continue
+
+                err = resp.exception
+                logger.warning(
+                    "fcm_bad_token"
+                    if isinstance(err, messaging.UnregisteredError)
+                    else "fcm_api_error",
+                    extra={
+                        "token": push["token"],
+                        "reason": type(err).__name__,
+                        "code": getattr(err, "code", None),
+                    },
+                )
+                results.append((False, type(err).__name__))
+
+            logger.info(
+                "fcm_batch_sent",
+                extra={"success": response.success_count, "failure": response.failure_count},
+            )
+
+        return results
+
     # ------------------------------------------------------------------ #
     # Internal builders
     # ------------------------------------------------------------------ #
@@ -222,9 +222,14 @@ class InvitationService:
         self, 
         token: str,
         signup_method: str,
-        password: Optional[str] = None
+        password: Optional[str] = None,
+        hashed_password: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Accept an invitation and create user account"""
+        """
+        Accept an invitation and create user account.
+        Async callers should pass `hashed_password` (from password_hasher) so
+        Argon2 does not run on the event loop.
+        """
         
         # Find and validate invitation
         invitation = self.db.exec(
@@ -259,9 +264,9 @@ class InvitationService:
                 user.whatsapp_number = staff.phone
                 logger.info(f"📱 Auto-populated WhatsApp number from staff phone: {staff.phone}")
 
-            if signup_method == "credentials" and password:
+            if signup_method == "credentials" and (hashed_password or password):
                 from ..core.security import hash_password
-                user.hashed_password = hash_password(password)
+                user.hashed_password = hashed_password or hash_password(password)
         else:
             # Create new user account
             logger.info(f"✨ Creating new user account for {staff.email}")
@@ -278,9 +283,9 @@ class InvitationService:
             if staff.phone:
                 logger.info(f"📱 Auto-populated WhatsApp number from staff phone: {staff.phone}")
 
-            if signup_method == "credentials" and password:
+            if signup_method == "credentials" and (hashed_password or password):
                 from ..core.security import hash_password
-                user.hashed_password = hash_password(password)
+                user.hashed_password = hashed_password or hash_password(password)
 
             self.db.add(user)
         
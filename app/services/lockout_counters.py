@@ -0,0 +1,251 @@
+# app/services/lockout_counters.py
+"""
+Counter backends for AccountLockoutService.
+
+By default failed attempts and lock state live in the database
+(LoginAttempt / AccountLockout). With a counter backend they live in
+Redis (INCR with a TTL per failure window, SET EX for locks) or, for a
+single process, in memory, so checking and rejecting a login does not
+query or write Postgres.
+
+The database is still kept informed for forensics and the security
+dashboard: a LOGIN_ATTEMPT_SAMPLE_RATE share of attempts and every lock /
+unlock are buffered in `login_attempt_log` and written in batches by a
+background task.
+
+LOCKOUT_BACKEND: database | auto | redis | memory. `auto` uses Redis when
+it is reachable and otherwise stays on the database, since per-process
+counters would let an attacker spread attempts across workers.
+"""
+
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import AccountLockout, LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+# Cap on sampled attempts kept in memory while the database is unreachable
+MAX_BUFFERED_ATTEMPTS = 10000
+
+
+class LockoutCounterBackend:
+    """Failure counters and lock flags keyed by email"""
+
+    async def record_failure(self, email: str, window_seconds: int) -> int:
+        """Count one failure; return failures within the current window"""
+        raise NotImplementedError
+
+    async def lock(self, email: str, lockout_seconds: int) -> None:
+        raise NotImplementedError
+
+    async def is_locked(self, email: str) -> bool:
+        raise NotImplementedError
+
+    async def clear(self, email: str) -> bool:
+        """Forget failures and any lock (successful login or admin unlock); True if a lock was active"""
+        raise NotImplementedError
+
+
+class InMemoryLockoutBackend(LockoutCounterBackend):
+    """Fixed-window counters in this process, bounded to `max_keys` emails"""
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or get_settings().LOCKOUT_MAX_KEYS
+        # email -> [failures, window_ends_at]
+        self._failures: "OrderedDict[str, list]" = OrderedDict()
+        # email -> locked_until, oldest lock first
+        self._locks: "OrderedDict[str, float]" = OrderedDict()
+
+    async def record_failure(self, email: str, window_seconds: int) -> int:
+        now = time.monotonic()
+        entry = self._failures.get(email)
+        if entry is None or entry[1] <= now:
+            entry = [0, now + window_seconds]
+            self._failures[email] = entry
+        self._failures.move_to_end(email)
+        entry[0] += 1
+
+        while len(self._failures) > self.max_keys:
+            self._failures.popitem(last=False)
+        return entry[0]
+
+    async def lock(self, email: str, lockout_seconds: int) -> None:
+        now = time.monotonic()
+        self._locks[email] = now + lockout_seconds
+        self._locks.move_to_end(email)
+
+        # Locks of emails that never log in again would otherwise stay forever
+        while self._locks:
+            oldest, locked_until = next(iter(self._locks.items()))
+            if locked_until > now and len(self._locks) <= self.max_keys:
+                break
+            del self._locks[oldest]
+
+    async def is_locked(self, email: str) -> bool:
+        locked_until = self._locks.get(email)
+        if locked_until is None:
+            return False
+        if locked_until <= time.monotonic():
+            self._locks.pop(email, None)
+            return False
+        return True
+
+    async def clear(self, email: str) -> bool:
+        self._failures.pop(email, None)
+        locked_until = self._locks.pop(email, None)
+        return locked_until is not None and locked_until > time.monotonic()
+
+
+# KEYS[1] = failure counter; ARGV[1] = window seconds
+_RECORD_FAILURE_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[1]))
+end
+return count
+"""
+
+
+class RedisLockoutBackend(LockoutCounterBackend):
+    """Counters and locks in Redis, shared by every worker"""
+
+    FAILURES_PREFIX = "lockout:failures:"
+    LOCK_PREFIX = "lockout:locked:"
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._record_failure = redis.register_script(_RECORD_FAILURE_LUA)
+
+    async def record_failure(self, email: str, window_seconds: int) -> int:
+        return int(await self._record_failure(keys=[self.FAILURES_PREFIX + email], args=[window_seconds]))
+
+    async def lock(self, email: str, lockout_seconds: int) -> None:
+        await self.redis.set(self.LOCK_PREFIX + email, "1", ex=lockout_seconds)
+
+    async def is_locked(self, email: str) -> bool:
+        return bool(await self.redis.exists(self.LOCK_PREFIX + email))
+
+    async def clear(self, email: str) -> bool:
+        await self.redis.delete(self.FAILURES_PREFIX + email)
+        # Lock keys expire with the lock, so deleting one means it was active
+        return bool(await self.redis.delete(self.LOCK_PREFIX + email))
+
+
+class LoginAttemptLog:
+    """Sampled LoginAttempt rows and lockout changes, written in batches"""
+
+    def __init__(self, sample_rate: Optional[float] = None):
+        self.sample_rate = get_settings().LOGIN_ATTEMPT_SAMPLE_RATE if sample_rate is None else sample_rate
+        self._attempts: List[Dict[str, Any]] = []
+        # email -> AccountLockout values (None = unlock)
+        self._lockouts: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def record_attempt(
+        self,
+        email: str,
+        ip_address: str,
+        success: bool,
+        user_agent: Optional[str] = None,
+        failure_reason: Optional[str] = None
+    ) -> None:
+        if random.random() >= self.sample_rate:
+            return
+        self._attempts.append({
+            "email": email,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "success": success,
+            "failure_reason": failure_reason,
+            "attempted_at": datetime.now(timezone.utc),
+        })
+
+    def record_lockout(self, email: str, failed_attempts: int, lockout_minutes: int) -> None:
+        now = datetime.now(timezone.utc)
+        self._lockouts[email] = {
+            "locked_at": now,
+            "locked_until": now + timedelta(minutes=lockout_minutes),
+            "failed_attempts": failed_attempts,
+        }
+
+    def record_unlock(self, email: str) -> None:
+        self._lockouts[email] = None
+
+    def flush(self, db: Session) -> int:
+        """Write buffered attempts and lockout changes; returns rows written"""
+        attempts, self._attempts = self._attempts, []
+        lockouts, self._lockouts = self._lockouts, {}
+        if not attempts and not lockouts:
+            return 0
+
+        try:
+            if attempts:
+                db.execute(insert(LoginAttempt), [{"id": uuid.uuid4(), **row} for row in attempts])
+
+            if lockouts:
+                existing = {
+                    lockout.email: lockout
+                    for lockout in db.exec(
+                        select(AccountLockout).where(AccountLockout.email.in_(list(lockouts)))
+                    ).all()
+                }
+                for email, values in lockouts.items():
+                    lockout = existing.get(email)
+                    if values is None:
+                        if lockout:
+                            lockout.is_active = False
+                    elif lockout:
+                        lockout.locked_at = values["locked_at"]
+                        lockout.locked_until = values["locked_until"]
+                        lockout.failed_attempts = values["failed_attempts"]
+                        lockout.is_active = True
+                    else:
+                        db.add(AccountLockout(email=email, **values))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep what we couldn't write; newer lockout changes win
+            self._attempts = (attempts + self._attempts)[-MAX_BUFFERED_ATTEMPTS:]
+            self._lockouts = {**lockouts, **self._lockouts}
+            raise
+
+        return len(attempts) + len(lockouts)
+
+
+_backend: Optional[LockoutCounterBackend] = None
+
+
+def get_lockout_backend() -> Optional[LockoutCounterBackend]:
+    """The counter backend in use, or None when lockouts are tracked in the database"""
+    return _backend
+
+
+def configure_lockout_backend(redis=None) -> Optional[LockoutCounterBackend]:
+    """Pick the backend from LOCKOUT_BACKEND (database | auto | redis | memory)"""
+    global _backend
+
+    choice = get_settings().LOCKOUT_BACKEND.lower()
+    if choice in ("redis", "auto") and redis is not None:
+        _backend = RedisLockoutBackend(redis)
+    elif choice == "memory":
+        _backend = InMemoryLockoutBackend()
+    else:
+        if choice == "redis":
+            logger.warning("LOCKOUT_BACKEND=redis but Redis is not available, tracking lockouts in the database")
+        _backend = None
+
+    logger.info(f"Lockout backend: {type(_backend).__name__ if _backend else 'database'}")
+    return _backend
+
+
+# Create a global instance
+login_attempt_log = LoginAttemptLog()
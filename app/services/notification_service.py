@@ -28,6 +28,7 @@ from ..models import (
 from ..core.config import get_settings
 from .firebase_service import FirebaseService
 from .push_token_manager import PushTokenManager
+from .push_planner import PushSendPlanner
 
 # Fix: Use proper logging setup
 logger = logging.getLogger(__name__)
@@ -40,6 +41,8 @@ class NotificationService:
         self.db = db
         self.firebase_service = FirebaseService()
         self.push_manager = PushTokenManager(db)
+        # (notification_id, template_data) pairs held back by send_notification(defer_delivery=True)
+        self._deferred_deliveries: List[Tuple[str, Dict[str, Any]]] = []
     
     # Get user's preferred language
     def _get_user_locale(self, user_id: uuid.UUID) -> str:
@@ -127,8 +130,6 @@ class NotificationService:
             raise ValueError(f"Schedule {schedule_id} not found")
         
         # Get staff and their user mappings
-        valid_device_tokens = []
-        
         if staff_ids:
             staff_list = self.db.exec(
                 select(Staff).where(Staff.id.in_(staff_ids))
@@ -138,93 +139,87 @@ class NotificationService:
                 select(Staff).where(Staff.facility_id == schedule.facility_id)
             ).all()
         
-        # Collect all valid tokens from all users' devices
+        user_ids = [staff.user_id for staff in staff_list if staff.user_id]
+        users = {
+            user.id: user
+            for user in self.db.exec(select(User).where(User.id.in_(user_ids))).all()
+        } if user_ids else {}
+        facility = self.db.get(Facility, schedule.facility_id) if schedule.facility_id else None
+        
+        # Create notification records; device tokens are resolved by the planner in one query
         notification_data = []
-        total_devices = 0
         
         for staff in staff_list:
-            user = self.db.exec(
-                select(User).where(User.id == staff.user_id)
-            ).first()
+            user = users.get(staff.user_id)
             
             if user and user.is_active:
-                # Get valid tokens for this user
-                user_tokens = self.push_manager.get_valid_push_tokens(str(user.id))
-                valid_device_tokens.extend(user_tokens)
-                total_devices += len(user_tokens)
-                
-                # Create notification record
                 if template_data:
                     notification_template_data = {**template_data}
                 else:
-                    facility = self.db.get(Facility, schedule.facility_id) if schedule.facility_id else None
                     notification_template_data = {
                         "staff_name": user.email.split('@')[0],
                         "facility_name": facility.name if facility else "Facility"
                     }
                 
-                # FIX: Add tenant_id parameter
                 notification = Notification(
                     notification_type=notification_type,
                     recipient_user_id=user.id,
-                    tenant_id=user.tenant_id,  # ✅ FIXED: Added missing tenant_id
+                    tenant_id=user.tenant_id,
                     title="Schedule Published",
                     message=custom_message or f"Your schedule for week starting {schedule.week_start} is now available",
                     priority=NotificationPriority.HIGH,
                     channels=["IN_APP", "PUSH"],
                     action_url=f"/schedule/{schedule_id}",
-                    data=notification_template_data
+                    data={**notification_template_data, "schedule_id": str(schedule_id)}
                 )
                 self.db.add(notification)
                 notification_data.append(notification)
         
         self.db.commit()
         
-        # Send multicast push notification if we have valid tokens
+        # Send every recipient's push in shared FCM batches
+        total_devices = 0
         success_count = 0
         failure_count = 0
         
-        if valid_device_tokens:
-            try:
-                success_count, failure_count = await self.firebase_service.send_push_multicast(
-                    tokens=valid_device_tokens,
-                    title="Schedule Published",
-                    body=custom_message or f"Your schedule for week starting {schedule.week_start} is now available",
-                    data={
-                        "notification_type": str(notification_type),
-                        "schedule_id": str(schedule_id),
-                        "action_url": f"/schedule/{schedule_id}"
-                    },
-                    action_url=f"/schedule/{schedule_id}",
-                    analytics_label=f"schedule_published_{schedule.facility_id}"
-                )
+        try:
+            planner = PushSendPlanner(self.db, self.firebase_service, self.push_manager)
+            for notification in notification_data:
+                planner.add(notification)
+            push_results = await planner.flush()
+            
+            # Update delivery status for all notifications
+            for notification in notification_data:
+                counts = push_results.get(str(notification.id), {"attempted": 0, "success": 0, "failure": 0})
+                total_devices += counts["attempted"]
+                success_count += counts["success"]
+                failure_count += counts["failure"]
                 
-                # Update delivery status for all notifications
-                for notification in notification_data:
-                    delivery_status: Dict[str, Dict[str, Any]] = {
-                        "PUSH": {
-                            "status": "delivered" if success_count > 0 else "failed",
-                            "timestamp": datetime.now(timezone.utc).isoformat(),
-                            "method": "multicast",
-                            "devices_attempted": total_devices,
-                            "devices_success": success_count,
-                            "devices_failed": failure_count
-                        },
-                        "IN_APP": {
-                            "status": "delivered",
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
+                delivery_status: Dict[str, Dict[str, Any]] = {
+                    "PUSH": {
+                        "status": "delivered" if counts["success"] > 0 else "failed",
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "method": "batch",
+                        "devices_attempted": counts["attempted"],
+                        "devices_success": counts["success"],
+                        "devices_failed": counts["failure"]
+                    },
+                    "IN_APP": {
+                        "status": "delivered",
+                        "timestamp": datetime.now(timezone.utc).isoformat()
                     }
-                    
-                    notification.delivery_status = delivery_status
-                    notification.is_delivered = True
-                    notification.delivered_at = datetime.now(timezone.utc)
-                
-                self.db.commit()
+                }
                 
-            except Exception as e:
-                logger.error(f"Bulk push notification failed: {e}")
-                failure_count = len(valid_device_tokens)
+                notification.delivery_status = delivery_status
+                notification.is_delivered = True
+                notification.delivered_at = datetime.now(timezone.utc)
+                self.db.add(notification)
+            
+            self.db.commit()
+            
+        except Exception as e:
+            logger.error(f"Bulk push notification failed: {e}")
+            failure_count = total_devices
         
         logger.info(
             "bulk_schedule_notification_sent",
@@ -258,9 +253,15 @@ class NotificationService:
         action_text: Optional[str] = None,
         background_tasks: Optional[BackgroundTasks] = None,
         pdf_attachment_url: Optional[str] = None,
-        override_recipient_email: Optional[str] = None
+        override_recipient_email: Optional[str] = None,
+        defer_delivery: bool = False
     ) -> Notification:
-        """Send a notification through multiple channels with i18n support"""
+        """Send a notification through multiple channels with i18n support
+
+        With defer_delivery=True the notification is stored but delivered only
+        when flush_deferred_deliveries() is called, so pushes for many
+        recipients share FCM batches.
+        """
 
         logger.info(f"📬 Creating notification: {notification_type} for user {recipient_user_id}")
     
@@ -324,7 +325,9 @@ class NotificationService:
         logger.info(f"✅ Notification {notification.id} created for {user.email}")
         
         # Send through channels
-        if background_tasks:
+        if defer_delivery:
+            self._deferred_deliveries.append((str(notification.id), template_data))
+        elif background_tasks:
             background_tasks.add_task(
                 self._deliver_notification,
                 str(notification.id),
@@ -657,250 +660,176 @@ class NotificationService:
         
         return notification
     
+    async def flush_deferred_deliveries(self, background_tasks: Optional[BackgroundTasks] = None) -> int:
+        """Deliver notifications held back with defer_delivery=True as one batch"""
+        pending, self._deferred_deliveries = self._deferred_deliveries, []
+        if not pending:
+            return 0
+
+        if background_tasks:
+            background_tasks.add_task(self.deliver_notifications, pending)
+        else:
+            await self.deliver_notifications(pending)
+        return len(pending)
+
+    async def deliver_notifications(self, pending: List[Tuple[str, Dict[str, Any]]]):
+        """Deliver many notifications, sending all their pushes through one planner"""
+        from app.deps import background_engine
+
+        with Session(background_engine) as session:
+            planner = PushSendPlanner(session, self.firebase_service)
+
+            for notification_id, template_data in pending:
+                await self._deliver_notification(
+                    notification_id, template_data, push_planner=planner, session=session
+                )
+
+            push_results = await planner.flush()
+            if not push_results:
+                return
+
+            notifications = session.exec(
+                select(Notification).where(
+                    Notification.id.in_([uuid.UUID(n_id) for n_id in push_results])
+                )
+            ).all()
+
+            for notification in notifications:
+                counts = push_results[str(notification.id)]
+                delivery_status = dict(notification.delivery_status or {})
+                delivery_status["PUSH"] = {
+                    "status": "delivered" if counts["success"] > 0 else "failed",
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "method": "batch",
+                    "devices_attempted": counts["attempted"],
+                    "devices_success": counts["success"],
+                    "devices_failed": counts["failure"]
+                }
+                notification.delivery_status = delivery_status
+                if counts["success"] > 0 and not notification.is_delivered:
+                    notification.is_delivered = True
+                    notification.delivered_at = datetime.now(timezone.utc)
+                session.add(notification)
+
+            session.commit()
+            print(f"✅ Batched push delivery finished for {len(notifications)} notifications")
+
     async def _deliver_notification(
         self, 
         notification_id: str,
-        template_data: Dict[str, Any]
+        template_data: Dict[str, Any],
+        push_planner: Optional[PushSendPlanner] = None,
+        session: Optional[Session] = None
     ):
-        """Deliver notification through all specified channels - SAFE VERSION"""
+        """Deliver notification through all specified channels - SAFE VERSION
+
+        When a push_planner is given, the push is queued on it instead of sent
+        and the caller records the push outcome after flushing the planner.
+        """
+        if session is None:
+            # Create a new session for the background task
+            from app.deps import background_engine
+
+            with Session(background_engine) as own_session:
+                await self._deliver_notification(notification_id, template_data, push_planner, own_session)
+            return
+
+        # Fetch fresh notification object in this session
+        notification = session.get(Notification, uuid.UUID(notification_id))
+        if not notification:
+            print(f"❌ Notification {notification_id} not found")
+            return
         
-        # Create a new session for the background task
-        from sqlmodel import Session
-        from app.deps import engine
+        # Get template in this session
+        template = session.exec(
+            select(NotificationTemplate).where(
+                NotificationTemplate.notification_type == notification.notification_type,
+                NotificationTemplate.tenant_id == notification.tenant_id
+            )
+        ).first()
         
-        with Session(engine) as session:
-            # Fetch fresh notification object in this session
-            notification = session.get(Notification, uuid.UUID(notification_id))
-            if not notification:
-                print(f"❌ Notification {notification_id} not found")
-                return
-            
-            # Get template in this session
-            template = session.exec(
-                select(NotificationTemplate).where(
-                    NotificationTemplate.notification_type == notification.notification_type,
-                    NotificationTemplate.tenant_id == notification.tenant_id
-                )
-            ).first()
-            
-            delivery_status: Dict[str, Dict[str, Any]] = {}
-            
-            print(f"📡 Delivering notification {notification.id} via channels: {notification.channels}")
-            
-            for channel in notification.channels:
-                try:
-                    if channel == "IN_APP":
-                        # In-app notifications are already stored in DB
-                        delivery_status[channel] = {
-                            "status": "delivered", 
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                        print(f"✅ In-app notification delivered")
-                    
-                    elif channel == "PUSH":
-                        success = await self._send_push_notification(notification, session)
-                        delivery_status[channel] = {
-                            "status": "delivered" if success else "failed",
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                        print(f"{'✅' if success else '❌'} Push notification {'delivered' if success else 'failed'}")
-                    
-                    elif channel == "EMAIL":
-                        success = await self._send_email_notification(notification, template, template_data)
-                        delivery_status[channel] = {
-                            "status": "delivered" if success else "failed",
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                        print(f"{'✅' if success else '❌'} Email {'sent' if success else 'failed'}")
+        delivery_status: Dict[str, Dict[str, Any]] = {}
+        
+        print(f"📡 Delivering notification {notification.id} via channels: {notification.channels}")
+        
+        for channel in notification.channels:
+            try:
+                if channel == "IN_APP":
+                    # In-app notifications are already stored in DB
+                    delivery_status[channel] = {
+                        "status": "delivered", 
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    }
+                    print(f"✅ In-app notification delivered")
+                
+                elif channel == "PUSH" and push_planner is not None:
+                    push_planner.add(notification)
+                    delivery_status[channel] = {
+                        "status": "queued",
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    }
+                    print(f"📨 Push notification queued for batch send")
 
-                    elif channel == "WHATSAPP":
-                        success = await self._send_whatsapp_message(notification, template, template_data)
-                        delivery_status[channel] = {
-                            "status": "delivered" if success else "failed",
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                        print(f"{'✅' if success else '❌'} WhatsApp {'sent' if success else 'failed'}")
-                    
-                except Exception as e:
+                elif channel == "PUSH":
+                    success = await self._send_push_notification(notification, session)
                     delivery_status[channel] = {
-                        "status": "error",
-                        "error": str(e),
+                        "status": "delivered" if success else "failed",
                         "timestamp": datetime.now(timezone.utc).isoformat()
                     }
-                    print(f"❌ Error delivering via {channel}: {e}")
-            
-            # Update delivery status in the same session
-            notification.delivery_status = delivery_status
-            notification.is_delivered = any(
-                status.get("status") == "delivered" 
-                for status in delivery_status.values()
-            )
-            if notification.is_delivered:
-                notification.delivered_at = datetime.now(timezone.utc)
-            
-            session.add(notification)
-            session.commit()
-            
-            print(f"✅ Delivery status updated for notification {notification.id}")
-    
+                    print(f"{'✅' if success else '❌'} Push notification {'delivered' if success else 'failed'}")
+                
+                elif channel == "EMAIL":
+                    success = await self._send_email_notification(notification, template, template_data)
+                    delivery_status[channel] = {
+                        "status": "delivered" if success else "failed",
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    }
+                    print(f"{'✅' if success else '❌'} Email {'sent' if success else 'failed'}")
+
+                elif channel == "WHATSAPP":
+                    success = await self._send_whatsapp_message(notification, template, template_data)
+                    delivery_status[channel] = {
+                        "status": "delivered" if success else "failed",
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    }
+                    print(f"{'✅' if success else '❌'} WhatsApp {'sent' if success else 'failed'}")
+                
+            except Exception as e:
+                delivery_status[channel] = {
+                    "status": "error",
+                    "error": str(e),
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }
+                print(f"❌ Error delivering via {channel}: {e}")
+        
+        # Update delivery status in the same session
+        notification.delivery_status = delivery_status
+        notification.is_delivered = any(
+            status.get("status") == "delivered" 
+            for status in delivery_status.values()
+        )
+        if notification.is_delivered:
+            notification.delivered_at = datetime.now(timezone.utc)
+        
+        session.add(notification)
+        session.commit()
+        
+        print(f"✅ Delivery status updated for notification {notification.id}")
+
     async def _send_push_notification(self, notification: Notification, session: Session) -> bool:
         """Send push notification with session safety"""
         try:
-            user = session.get(User, notification.recipient_user_id)
-            if not user:
-                logger.warning(f"User {notification.recipient_user_id} not found")
-                return False
-            
-            # Get valid push tokens using device manager
-            valid_tokens = self.push_manager.get_valid_push_tokens(str(user.id))
-            
-            if not valid_tokens:
-                logger.warning(
-                    "push_notification_no_valid_tokens",
-                    extra={
-                        "user_id": str(notification.recipient_user_id),
-                        "user_email": user.email
-                    }
-                )
-                return False
-            
-            if not self.firebase_service.is_available():
-                logger.error("firebase_service_unavailable")
-                return False
-            
-            # Prepare push data
-            push_data = {
-                "notification_id": str(notification.id),
-                "type": str(notification.notification_type),
-                "action_url": notification.action_url or "",
-                **notification.data
-            }
-            
-            # Send to multiple devices if user has multiple valid tokens
-            if len(valid_tokens) == 1:
-                # Single device
-                success = await self._send_single_push_notification(
-                    str(user.id), valid_tokens[0], notification, push_data
-                )
-                return success
-            else:
-                # Multiple devices - use multicast
-                success_count, failure_count = await self._send_multicast_push_notification(
-                    str(user.id), valid_tokens, notification, push_data
-                )
-                return success_count > 0
-            
+            planner = PushSendPlanner(session, self.firebase_service)
+            planner.add(notification)
+            results = await planner.flush()
+
+            counts = results.get(str(notification.id))
+            return bool(counts and counts["success"] > 0)
+
         except Exception as e:
             logger.error(f"Push notification failed: {e}")
             return False
-    
-    async def _send_single_push_notification(
-        self, 
-        user_id: str, 
-        token: str, 
-        notification: Notification, 
-        push_data: Dict[str, Any]
-    ) -> bool:
-        """Send push notification to single device with failure tracking"""
-        try:
-            # Find device by token
-            device = self.db.exec(
-                select(UserDevice).where(
-                    UserDevice.user_id == user_id,
-                    UserDevice.push_token == token,
-                    UserDevice.is_active == True
-                )
-            ).first()
-            
-            if not device:
-                logger.warning(f"Device not found for token (user: {user_id})")
-                return False
-            
-            # Send notification
-            success = await self.firebase_service.send_push_notification(
-                token=token,
-                title=notification.title,
-                body=notification.message,
-                data=push_data,
-                action_url=notification.action_url,
-                analytics_label=f"single_{notification.notification_type}"
-            )
-            
-            # Record result
-            if success:
-                self.push_manager.record_push_success(str(device.id))
-                logger.info(f"Push notification sent successfully to device {device.id}")
-            else:
-                needs_reauth = self.push_manager.record_push_failure(
-                    str(device.id), 
-                    "Firebase send failed"
-                )
-                if needs_reauth:
-                    logger.warning(f"Device {device.id} marked for re-authorization")
-            
-            return success
-            
-        except Exception as e:
-            logger.error(f"Single push notification failed: {e}")
-            return False
-    
-    async def _send_multicast_push_notification(
-        self, 
-        user_id: str, 
-        tokens: List[str], 
-        notification: Notification, 
-        push_data: Dict[str, Any]
-    ) -> Tuple[int, int]:
-        """Send push notification to multiple devices with per-device failure tracking"""
-        try:
-            # Get devices for all tokens
-            devices = self.db.exec(
-                select(UserDevice).where(
-                    UserDevice.user_id == user_id,
-                    UserDevice.push_token.in_(tokens),
-                    UserDevice.is_active == True
-                )
-            ).all()
-            
-            # Send multicast notification
-            success_count, failure_count = await self.firebase_service.send_push_multicast(
-                tokens=tokens,
-                title=notification.title,
-                body=notification.message,
-                data=push_data,
-                action_url=notification.action_url,
-                analytics_label=f"multicast_{notification.notification_type}"
-            )
-            
-            # Unfortunately, Firebase doesn't give us per-token results in multicast
-            # So we'll mark all devices as successful if any succeeded, or failed if all failed
-            if success_count > 0:
-                # At least some succeeded - record success for all (optimistic)
-                for device in devices:
-                    self.push_manager.record_push_success(str(device.id))
-            else:
-                # All failed - record failures
-                for device in devices:
-                    needs_reauth = self.push_manager.record_push_failure(
-                        str(device.id), 
-                        "Multicast send failed"
-                    )
-                    if needs_reauth:
-                        logger.warning(f"Device {device.id} marked for re-authorization")
-            
-            logger.info(
-                f"Multicast push notification: {success_count} success, {failure_count} failures"
-            )
-            
-            return success_count, failure_count
-            
-        except Exception as e:
-            logger.error(f"Multicast push notification failed: {e}")
-            return 0, len(tokens)
-        
-    
-    
-    # ✅ UPDATED: WhatsApp with i18n support
+
     async def _send_whatsapp_message(
         self,
         notification: Notification,
@@ -918,9 +847,7 @@ class NotificationService:
 
         if not whatsapp_number:
             # Try to find staff member and use their phone
-            staff = self.db.exec(
-                select(Staff).where(Staff.email == user.email)
-            ).first()
+            staff = UserStaffMappingService(self.db).get_staff_for_user(user)
 
             if staff and staff.phone:
                 whatsapp_number = staff.phone
@@ -1051,9 +978,7 @@ class NotificationService:
             print(f"⚠️ Assigned staff {swap_request.assigned_staff_id} not found")
             return
         
-        assigned_user = self.db.exec(
-            select(User).where(User.email == assigned_staff.email)
-        ).first()
+        assigned_user = UserStaffMappingService(self.db).get_user_for_staff(assigned_staff)
         
         if not assigned_user:
             print(f"⚠️ No user account found for assigned staff {assigned_staff.email}")
@@ -0,0 +1,217 @@
+# app/services/pdf_cache.py
+"""
+Content-addressed storage for generated schedule PDFs.
+
+PDFs are keyed by a hash of everything that affects the rendered output
+(assignments, staff, zones, shifts, facility and template version), so an
+unchanged schedule maps to the same file no matter how often it is published
+or downloaded. Files are written once and evicted by age and total size.
+
+Each PDF records the tenants it was rendered for in a `<key>.tenant` file
+next to it; GET /schedule/pdf/{key} serves a key only to those tenants,
+since a content hash is derived from schedule data rather than being a
+secret.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _canonical(value: Any) -> Any:
+    """Convert values into a JSON-stable form (UUIDs, dates, models)"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class SchedulePDFCache:
+    """Stores schedule PDFs once under a content hash and serves them by key"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[int] = None
+    ):
+        settings = get_settings()
+        self.cache_dir = Path(cache_dir or settings.PDF_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.PDF_CACHE_MAX_BYTES
+        self.max_age_days = max_age_days if max_age_days is not None else settings.PDF_CACHE_MAX_AGE_DAYS
+
+    @staticmethod
+    def compute_key(
+        *,
+        week_start: Any,
+        assignments: List[Dict],
+        staff: List[Dict],
+        facility: Dict,
+        shifts: List[Dict],
+        zones: List[Dict],
+        template_version: str,
+        pdf_type: str = "full"
+    ) -> str:
+        """
+        Build the cache key for a schedule rendering.
+
+        Lists are sorted before hashing so the key does not depend on the
+        order rows came back from the database.
+        """
+        def _sorted(rows: List[Dict]) -> List[Any]:
+            canonical_rows = [_canonical(row) for row in rows]
+            return sorted(canonical_rows, key=lambda row: json.dumps(row, sort_keys=True))
+
+        payload = {
+            "week_start": _canonical(week_start),
+            "assignments": _sorted(assignments),
+            "staff": _sorted(staff),
+            "facility": _canonical(facility),
+            "shifts": _sorted(shifts),
+            "zones": _sorted(zones),
+            "template_version": template_version,
+            "pdf_type": pdf_type,
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        """Keys are sha256 hex digests; anything else is rejected before touching disk"""
+        return bool(key) and bool(_KEY_PATTERN.match(key))
+
+    def path_for(self, key: str) -> Path:
+        if not self.is_valid_key(key):
+            raise ValueError(f"Invalid PDF cache key: {key}")
+        return self.cache_dir / f"{key}.pdf"
+
+    def _tenant_path(self, key: str) -> Path:
+        return self.path_for(key).with_suffix(".tenant")
+
+    def url_for(self, key: str) -> str:
+        """The authenticated download endpoint; the cache directory itself is not served"""
+        return f"{get_settings().API_V1_STR}/schedule/pdf/{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the URL for a cached PDF, or None on a miss"""
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+
+        # Bump mtime so size-based eviction drops the least recently used files first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return self.url_for(key)
+
+    def read(self, key: str) -> Optional[bytes]:
+        """Return the cached PDF bytes, or None on a miss"""
+        if self.get(key) is None:
+            return None
+        return self.path_for(key).read_bytes()
+
+    def tenants_for(self, key: str) -> Set[str]:
+        """Tenants the PDF was rendered for; empty when unknown"""
+        try:
+            return set(self._tenant_path(key).read_text().split())
+        except FileNotFoundError:
+            return set()
+
+    def add_tenant(self, key: str, tenant_id: Any) -> None:
+        """Allow a tenant to download the PDF by key"""
+        # Identical renderings (e.g. two empty weeks) can share a key across tenants
+        if str(tenant_id) not in self.tenants_for(key):
+            with open(self._tenant_path(key), "a") as f:
+                f.write(f"{tenant_id}\n")
+
+    def put(self, key: str, pdf_data: bytes, tenant_id: Optional[Any] = None) -> str:
+        """Store a PDF under its key (write-once) and return its URL"""
+        path = self.path_for(key)
+        if tenant_id is not None:
+            self.add_tenant(key, tenant_id)
+        if path.exists():
+            return self.get(key) or self.url_for(key)
+
+        # Write to a temp file and rename so concurrent readers never see a partial PDF
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_data)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Cached schedule PDF {key} ({len(pdf_data)} bytes)")
+        return self.url_for(key)
+
+    def evict(self) -> Dict[str, int]:
+        """
+        Remove PDFs older than max_age_days, then the least recently used
+        files until the cache fits in max_bytes.
+        """
+        now = time.time()
+        max_age_seconds = self.max_age_days * 86400 if self.max_age_days else None
+
+        entries = []
+        expired = 0
+        freed = 0
+        for path in self.cache_dir.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            if max_age_seconds is not None and now - stat.st_mtime > max_age_seconds:
+                try:
+                    self._unlink(path)
+                    expired += 1
+                    freed += stat.st_size
+                except FileNotFoundError:
+                    pass
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        if self.max_bytes and total > self.max_bytes:
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    self._unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                freed += size
+                evicted += 1
+
+        if expired or evicted:
+            logger.info(f"PDF cache eviction: {expired} expired, {evicted} evicted, {freed} bytes freed")
+
+        return {
+            "expired": expired,
+            "evicted": evicted,
+            "bytes_freed": freed,
+            "bytes_remaining": total
+        }
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        path.unlink()
+        path.with_suffix(".tenant").unlink(missing_ok=True)
@@ -1,21 +1,37 @@
 # app/services/pdf_service.py
 
-from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.pagesizes import letter, A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
+import asyncio
+from tempfile import SpooledTemporaryFile
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import shutil
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, IO
 import uuid
 from pathlib import Path
 
+from .pdf_cache import SchedulePDFCache
+from .puppeteer_pdf_service import PuppeteerPDFService
+from ..core.config import get_settings
+
+DEFAULT_SHIFTS = [
+    {'shift_index': 0, 'name': 'Morning', 'start_time': '6:00 AM', 'end_time': '2:00 PM'},
+    {'shift_index': 1, 'name': 'Afternoon', 'start_time': '2:00 PM', 'end_time': '10:00 PM'},
+    {'shift_index': 2, 'name': 'Evening', 'start_time': '10:00 PM', 'end_time': '6:00 AM'}
+]
+
 class PDFService:
     """Service for generating PDF schedules with professional layouts"""
     
+    # Bump whenever the ReportLab layout changes so cached PDFs are regenerated
+    LAYOUT_VERSION = "reportlab-2"
+    
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
@@ -24,6 +40,10 @@ class PDFService:
         self.upload_dir = Path("uploads/schedules")
         self.upload_dir.mkdir(parents=True, exist_ok=True)
     
+    def template_version(self) -> str:
+        """Version string for PDF cache keys"""
+        return self.LAYOUT_VERSION
+    
     def setup_custom_styles(self):
         """Setup custom paragraph styles for better formatting"""
         
@@ -84,11 +104,33 @@ class PDFService:
         assignments: List[Dict], 
         staff: List[Dict], 
         facility: Dict,
-        pdf_type: str = "full"  # "full", "individual", or "summary"
+        pdf_type: str = "full",  # "full", "individual", or "summary"
+        shifts: Optional[List[Dict]] = None,
+        zones: Optional[List[Dict]] = None
     ) -> bytes:
         """
         Generate a PDF schedule with improved data handling
+        
+        shifts/zones are accepted so this service can stand in for
+        PuppeteerPDFService; they fill in the facility's shifts/zones when
+        the facility dict doesn't carry them. ReportLab is CPU-bound, so the
+        layout runs in a worker thread and keeps the event loop free.
         """
+        return await asyncio.to_thread(
+            self.render_schedule_pdf, schedule, assignments, staff, facility, pdf_type, shifts, zones
+        )
+    
+    def render_schedule_pdf(
+        self, 
+        schedule, 
+        assignments: List[Dict], 
+        staff: List[Dict], 
+        facility: Dict,
+        pdf_type: str = "full",
+        shifts: Optional[List[Dict]] = None,
+        zones: Optional[List[Dict]] = None
+    ) -> bytes:
+        """Synchronous body of generate_schedule_pdf"""
         buffer = BytesIO()
         
         # Use A4 for better international compatibility
@@ -173,19 +215,26 @@ class PDFService:
                     'zones': facility.get('zones', []),
                     'shifts': facility.get('shifts', [])
                 }
+            if not facility_dict['shifts'] and shifts:
+                facility_dict['shifts'] = shifts
+            if not facility_dict['zones'] and zones:
+                facility_dict['zones'] = zones
+            
+            # Group assignments once; every table below reads from this instead of rescanning
+            grouped = self._group_assignments(normalized_assignments)
             
             # Build content based on PDF type
             if pdf_type == "individual":
                 content = self._build_individual_schedule_content(
-                    schedule_dict, normalized_assignments, normalized_staff, facility_dict
+                    schedule_dict, normalized_assignments, normalized_staff, facility_dict, grouped
                 )
             elif pdf_type == "summary":
                 content = self._build_summary_content(
-                    schedule_dict, normalized_assignments, normalized_staff, facility_dict
+                    schedule_dict, normalized_assignments, normalized_staff, facility_dict, grouped
                 )
             else:  # full
                 content = self._build_full_schedule_content(
-                    schedule_dict, normalized_assignments, normalized_staff, facility_dict
+                    schedule_dict, normalized_assignments, normalized_staff, facility_dict, grouped
                 )
             
             # Build PDF
@@ -202,7 +251,82 @@ class PDFService:
             traceback.print_exc()
             raise Exception(f"PDF generation failed: {str(e)}")
     
-    def _build_full_schedule_content(self, schedule, assignments, staff, facility):
+    def _group_assignments(self, assignments) -> Dict[str, Any]:
+        """
+        Pre-group assignments in a single pass:
+        - by_staff: staff_id -> {day -> [shift, ...]}
+        - shift_totals: shift -> assignment count
+        - staff_totals: staff_id -> assignment count
+        """
+        by_staff: Dict[Any, Dict[int, List[int]]] = {}
+        shift_totals: Dict[int, int] = {}
+        staff_totals: Dict[Any, int] = {}
+        
+        for assignment in assignments:
+            staff_id = assignment.get('staff_id')
+            day = assignment.get('day', 0)
+            shift = assignment.get('shift', 0)
+            
+            by_staff.setdefault(staff_id, {}).setdefault(day, []).append(shift)
+            shift_totals[shift] = shift_totals.get(shift, 0) + 1
+            staff_totals[staff_id] = staff_totals.get(staff_id, 0) + 1
+        
+        for days in by_staff.values():
+            for day_shifts in days.values():
+                day_shifts.sort()
+        
+        return {
+            'by_staff': by_staff,
+            'shift_totals': shift_totals,
+            'staff_totals': staff_totals
+        }
+    
+    def _shift_lookup(self, facility) -> Dict[int, Dict[str, Any]]:
+        """Map shift index -> {name, start_time, end_time, hours}; accepts both 'name' and 'shift_name' keys"""
+        facility_shifts = facility.get('shifts') or DEFAULT_SHIFTS
+        
+        lookup = {}
+        for i, shift in enumerate(facility_shifts):
+            if not isinstance(shift, dict):
+                shift = {
+                    'shift_index': getattr(shift, 'shift_order', i),
+                    'name': getattr(shift, 'shift_name', None),
+                    'start_time': getattr(shift, 'start_time', ''),
+                    'end_time': getattr(shift, 'end_time', '')
+                }
+            index = shift.get('shift_index', shift.get('shift_order', i))
+            start_time = shift.get('start_time', '')
+            end_time = shift.get('end_time', '')
+            lookup[index] = {
+                'name': shift.get('name') or shift.get('shift_name') or f'Shift {index}',
+                'start_time': start_time,
+                'end_time': end_time,
+                'hours': self._shift_hours(start_time, end_time)
+            }
+        return lookup
+    
+    @staticmethod
+    def _shift_hours(start_time: str, end_time: str) -> float:
+        """Length of a shift from its 'HH:MM' / 'H:MM AM' times; 8 hours when unknown"""
+        def _parse(value: str) -> Optional[datetime]:
+            for fmt in ('%H:%M', '%I:%M %p', '%I %p'):
+                try:
+                    return datetime.strptime(value.strip(), fmt)
+                except (ValueError, AttributeError):
+                    continue
+            return None
+        
+        start = _parse(start_time)
+        end = _parse(end_time)
+        if not start or not end:
+            return 8.0
+        
+        delta = (end - start).total_seconds() / 3600
+        if delta <= 0:  # Overnight shift
+            delta += 24
+        return delta
+    
+    def _build_full_schedule_content(self, schedule, assignments, staff, facility, grouped):
         """Build content for full schedule PDF"""
         content = []
         
@@ -215,12 +339,12 @@ class PDFService:
         content.append(Spacer(1, 0.2*inch))
         
         # Main schedule table
-        schedule_table = self._build_schedule_table(assignments, staff, facility)
+        schedule_table = self._build_schedule_table(grouped, staff, facility)
         content.append(schedule_table)
         content.append(Spacer(1, 0.3*inch))
         
         # Staff summary
-        content.extend(self._build_staff_summary(assignments, staff))
+        content.extend(self._build_staff_summary(grouped, staff, facility))
         content.append(Spacer(1, 0.2*inch))
         
         # Footer
@@ -228,17 +352,14 @@ class PDFService:
         
         return content
     
-    def _build_individual_schedule_content(self, schedule, assignments, staff, facility):
+    def _build_individual_schedule_content(self, schedule, assignments, staff, facility, grouped):
         """Build content for individual staff schedule PDF"""
         content = []
         
         # Group assignments by staff member
         staff_assignments = {}
         for assignment in assignments:
-            staff_id = assignment.get('staff_id')
-            if staff_id not in staff_assignments:
-                staff_assignments[staff_id] = []
-            staff_assignments[staff_id].append(assignment)
+            staff_assignments.setdefault(assignment.get('staff_id'), []).append(assignment)
         
         # Create a page for each staff member
         for staff_id, staff_member in enumerate(staff):
@@ -263,7 +384,7 @@ class PDFService:
         
         return content
     
-    def _build_summary_content(self, schedule, assignments, staff, facility):
+    def _build_summary_content(self, schedule, assignments, staff, facility, grouped):
         """Build content for summary PDF"""
         content = []
         
@@ -276,7 +397,7 @@ class PDFService:
         content.append(Spacer(1, 0.2*inch))
         
         # Staff summary table
-        content.append(self._build_staff_summary_table(assignments, staff))
+        content.append(self._build_staff_summary_table(grouped, staff, facility))
         content.append(Spacer(1, 0.2*inch))
         
         # Footer
@@ -376,56 +497,31 @@ class PDFService:
         
         return content
     
-    def _build_schedule_table(self, assignments, staff, facility):
+    def _build_schedule_table(self, grouped, staff, facility):
         """Build the main schedule table"""
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         
-        # Get facility shifts or create default ones
-        facility_shifts = facility.get('shifts', [
-            {'shift_index': 0, 'name': 'Morning', 'start_time': '6:00 AM', 'end_time': '2:00 PM'},
-            {'shift_index': 1, 'name': 'Afternoon', 'start_time': '2:00 PM', 'end_time': '10:00 PM'},
-            {'shift_index': 2, 'name': 'Evening', 'start_time': '10:00 PM', 'end_time': '6:00 AM'}
-        ])
-        
-        # Create staff lookup
-        staff_dict = {s.get('id'): s.get('full_name', 'Unknown') for s in staff}
+        shift_lookup = self._shift_lookup(facility)
+        staff_schedules = grouped['by_staff']
         
         # Build table data - organized by day and shift
         table_data = [['Staff'] + days]  # Header row
         
-        # Group assignments by staff member
-        staff_schedules = {}
-        for assignment in assignments:
-            staff_id = assignment.get('staff_id')
-            if staff_id not in staff_schedules:
-                staff_schedules[staff_id] = {}
-            
-            day = assignment.get('day', 0)
-            shift = assignment.get('shift', 0)
-            
-            if day not in staff_schedules[staff_id]:
-                staff_schedules[staff_id] = {}
-            if day not in staff_schedules[staff_id]:
-                staff_schedules[staff_id][day] = []
-            
-            # Get shift name
-            shift_info = next((s for s in facility_shifts if s.get('shift_index') == shift), None)
-            shift_name = shift_info.get('name', f'Shift {shift}') if shift_info else f'Shift {shift}'
-            
-            staff_schedules[staff_id][day].append(shift_name)
-        
         # Build rows for each staff member
         for staff_member in staff:
             staff_id = staff_member.get('id')
             staff_name = staff_member.get('full_name', 'Unknown')
+            staff_days = staff_schedules.get(staff_id, {})
             
             row = [staff_name]
             
             # Add cell for each day
             for day_idx in range(7):
-                if staff_id in staff_schedules and day_idx in staff_schedules[staff_id]:
-                    shifts_for_day = staff_schedules[staff_id][day_idx]
-                    cell_content = '\n'.join(shifts_for_day)
+                shifts_for_day = staff_days.get(day_idx)
+                if shifts_for_day:
+                    cell_content = '\n'.join(
+                        shift_lookup.get(shift, {}).get('name', f'Shift {shift}') for shift in shifts_for_day
+                    )
                 else:
                     cell_content = '-'
                 row.append(cell_content)
@@ -463,11 +559,7 @@ class PDFService:
         """Build individual staff schedule table"""
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         
-        facility_shifts = facility.get('shifts', [
-            {'shift_index': 0, 'name': 'Morning', 'start_time': '6:00 AM', 'end_time': '2:00 PM'},
-            {'shift_index': 1, 'name': 'Afternoon', 'start_time': '2:00 PM', 'end_time': '10:00 PM'},
-            {'shift_index': 2, 'name': 'Evening', 'start_time': '10:00 PM', 'end_time': '6:00 AM'}
-        ])
+        shift_lookup = self._shift_lookup(facility)
         
         # Build schedule for this staff member
         schedule_by_day = {}
@@ -478,7 +570,7 @@ class PDFService:
             if day not in schedule_by_day:
                 schedule_by_day[day] = []
             
-            shift_info = next((s for s in facility_shifts if s.get('shift_index') == shift), None)
+            shift_info = shift_lookup.get(shift)
             if shift_info:
                 shift_text = f"{shift_info.get('name')}\n{shift_info.get('start_time')} - {shift_info.get('end_time')}"
             else:
@@ -515,19 +607,11 @@ class PDFService:
         
         return table
     
-    def _build_staff_summary(self, assignments, staff):
+    def _build_staff_summary(self, grouped, staff, facility):
         """Build staff summary section"""
         content = []
         
-        # Calculate hours per staff member
-        staff_hours = {}
-        for assignment in assignments:
-            staff_id = assignment.get('staff_id')
-            if staff_id not in staff_hours:
-                staff_hours[staff_id] = 0
-            staff_hours[staff_id] += 8  # Assuming 8-hour shifts
-        
-        staff_dict = {s.get('id'): s.get('full_name', 'Unknown') for s in staff}
+        shift_lookup = self._shift_lookup(facility)
         
         summary_data = [['Staff Member', 'Scheduled Shifts', 'Total Hours']]
         
@@ -535,10 +619,10 @@ class PDFService:
             staff_id = staff_member.get('id')
             staff_name = staff_member.get('full_name', 'Unknown')
             
-            shift_count = len([a for a in assignments if a.get('staff_id') == staff_id])
-            total_hours = staff_hours.get(staff_id, 0)
+            shift_count = grouped['staff_totals'].get(staff_id, 0)
+            total_hours = self._staff_hours(grouped['by_staff'].get(staff_id, {}), shift_lookup)
             
-            summary_data.append([staff_name, str(shift_count), f"{total_hours} hrs"])
+            summary_data.append([staff_name, str(shift_count), f"{total_hours:g} hrs"])
         
         summary_table = Table(summary_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
         summary_table.setStyle(TableStyle([
@@ -562,23 +646,24 @@ class PDFService:
         """Build summary for individual staff member"""
         content = []
         
+        shift_lookup = self._shift_lookup(facility)
         total_shifts = len(assignments)
-        total_hours = total_shifts * 8  # Assuming 8-hour shifts
+        total_hours = 0.0
         
         # Group by shift type
         shift_counts = {}
-        facility_shifts = facility.get('shifts', [])
         
         for assignment in assignments:
             shift = assignment.get('shift', 0)
-            shift_info = next((s for s in facility_shifts if s.get('shift_index') == shift), None)
-            shift_name = shift_info.get('name', f'Shift {shift}') if shift_info else f'Shift {shift}'
+            shift_info = shift_lookup.get(shift)
+            shift_name = shift_info['name'] if shift_info else f'Shift {shift}'
+            total_hours += shift_info['hours'] if shift_info else 8
             
             shift_counts[shift_name] = shift_counts.get(shift_name, 0) + 1
         
         summary_text = f"<b>Weekly Summary:</b><br/>"
         summary_text += f"Total Shifts: {total_shifts}<br/>"
-        summary_text += f"Total Hours: {total_hours}<br/><br/>"
+        summary_text += f"Total Hours: {total_hours:g}<br/><br/>"
         
         if shift_counts:
             summary_text += "<b>Shift Breakdown:</b><br/>"
@@ -615,27 +700,20 @@ class PDFService:
         
         return content
     
-    def _build_staff_summary_table(self, assignments, staff):
+    def _build_staff_summary_table(self, grouped, staff, facility):
         """Build staff summary table for summary PDF"""
         staff_dict = {s.get('id'): s for s in staff}
-        staff_assignments = {}
-        
-        for assignment in assignments:
-            staff_id = assignment.get('staff_id')
-            if staff_id not in staff_assignments:
-                staff_assignments[staff_id] = []
-            staff_assignments[staff_id].append(assignment)
+        shift_lookup = self._shift_lookup(facility)
         
         table_data = [['Staff Member', 'Role', 'Shifts', 'Hours']]
         
-        for staff_id, assignments_list in staff_assignments.items():
+        for staff_id, shift_count in grouped['staff_totals'].items():
             staff_info = staff_dict.get(staff_id, {})
             name = staff_info.get('full_name', 'Unknown')
             role = staff_info.get('role', 'Staff')
-            shift_count = len(assignments_list)
-            hours = shift_count * 8
+            hours = self._staff_hours(grouped['by_staff'].get(staff_id, {}), shift_lookup)
             
-            table_data.append([name, role, str(shift_count), f"{hours}h"])
+            table_data.append([name, role, str(shift_count), f"{hours:g}h"])
         
         table = Table(table_data, colWidths=[2*inch, 1.5*inch, 1*inch, 1*inch])
         table.setStyle(TableStyle([
@@ -652,6 +730,14 @@ class PDFService:
         
         return table
     
+    def _staff_hours(self, staff_days: Dict[int, List[int]], shift_lookup: Dict[int, Dict[str, Any]]) -> float:
+        """Total hours for one staff member's day -> shifts mapping"""
+        return sum(
+            shift_lookup[shift]['hours'] if shift in shift_lookup else 8
+            for day_shifts in staff_days.values()
+            for shift in day_shifts
+        )
+    
     def _build_footer(self):
         """Build PDF footer"""
         content = []
@@ -662,17 +748,25 @@ class PDFService:
         
         return content
     
-    async def save_pdf(self, pdf_data: bytes, filename: str) -> str:
+    async def save_pdf(
+        self, pdf_data: bytes, filename: str, cache_key: Optional[str] = None, tenant_id: Optional[Any] = None
+    ) -> str:
         """
         Save PDF data to file and return URL
         
         Args:
             pdf_data: PDF file content as bytes
             filename: Desired filename
+            cache_key: Content hash from SchedulePDFCache.compute_key; when given
+                the PDF is stored once under that key instead of a timestamped name
+            tenant_id: Tenant the cached PDF belongs to; checked when it is served by key
             
         Returns:
             str: URL where PDF can be accessed
         """
+        if cache_key:
+            return SchedulePDFCache().put(cache_key, pdf_data, tenant_id=tenant_id)
+        
         # Ensure filename is unique
         if not filename.endswith('.pdf'):
             filename += '.pdf'
@@ -706,12 +800,15 @@ class PDFService:
         """
         staff_pdfs = {}
         
+        assignments_by_staff: Dict[Any, List[Dict]] = {}
+        for assignment in assignments:
+            assignments_by_staff.setdefault(assignment.get('staff_id'), []).append(assignment)
+        
         for staff_member in staff:
             staff_id = staff_member.get('id')
             staff_name = staff_member.get('full_name', 'staff')
             
-            # Filter assignments for this staff member
-            staff_assignments = [a for a in assignments if a.get('staff_id') == staff_id]
+            staff_assignments = assignments_by_staff.get(staff_id, [])
             
             if staff_assignments:  # Only generate PDF if staff has assignments
                 pdf_data = await self.generate_schedule_pdf(
@@ -726,4 +823,180 @@ class PDFService:
                 pdf_url = await self.save_pdf(pdf_data, filename)
                 staff_pdfs[staff_id] = pdf_url
         
-        return staff_pdfs
\ No newline at end of file
+        return staff_pdfs
+    
+    # ==================== PERIOD (MULTI-WEEK) FAST PATH ====================
+    
+    PERIOD_ROWS_PER_PAGE = 34
+    
+    def render_period_pdf(
+        self,
+        facility: Dict,
+        staff: List[Dict],
+        assignments: List[Dict],
+        start_date: date,
+        days: int,
+        shifts: Optional[List[Dict]] = None
+    ) -> IO[bytes]:
+        """
+        Render a multi-week roster (e.g. a 30-day month) for large facilities.
+        
+        Assignments carry 'day' as an offset from start_date. The period is cut
+        into 7-day bands and each band into page-sized LongTable chunks with a
+        repeated header, so table layout only ever works on one page of rows.
+        Output goes to a spooled temp file (positioned at 0) that callers stream
+        with iter_pdf_chunks. This is CPU-bound; call it from a worker thread.
+        """
+        settings = get_settings()
+        output = SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_BYTES)
+        
+        facility_name = facility.get('name', 'Facility')
+        end_date = start_date + timedelta(days=days - 1)
+        shift_lookup = self._shift_lookup({'shifts': shifts or facility.get('shifts')})
+        shift_codes = self._shift_codes(shift_lookup)
+        grouped = self._group_assignments(assignments)
+        
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=landscape(A4),
+            topMargin=0.5*inch,
+            bottomMargin=0.6*inch,
+            leftMargin=0.5*inch,
+            rightMargin=0.5*inch,
+            title=f"{facility_name} schedule {start_date.isoformat()} - {end_date.isoformat()}"
+        )
+        
+        def _draw_page_footer(canvas, doc_template):
+            canvas.saveState()
+            canvas.setFont('Helvetica', 7)
+            canvas.setFillColor(colors.HexColor('#9ca3af'))
+            canvas.drawCentredString(
+                doc_template.pagesize[0] / 2,
+                0.35*inch,
+                f"{facility_name} • {start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')} • Page {doc_template.page}"
+            )
+            canvas.restoreState()
+        
+        content = [
+            Paragraph(f"{facility_name}<br/>Schedule", self.title_style),
+            Paragraph(f"{start_date.strftime('%B %d')} - {end_date.strftime('%B %d, %Y')}", self.subtitle_style),
+            Paragraph(
+                " • ".join(
+                    f"<b>{shift_codes[index]}</b> = {info['name']}"
+                    + (f" ({info['start_time']}-{info['end_time']})" if info['start_time'] and info['end_time'] else "")
+                    for index, info in sorted(shift_lookup.items())
+                ),
+                self.header_info_style
+            ),
+        ]
+        
+        for band_start in range(0, days, 7):
+            band_days = list(range(band_start, min(band_start + 7, days)))
+            band_dates = [start_date + timedelta(days=offset) for offset in band_days]
+            header = ['Staff'] + [d.strftime('%a %d %b') for d in band_dates]
+            band_title = f"Week of {band_dates[0].strftime('%a, %b %d')} - {band_dates[-1].strftime('%a, %b %d, %Y')}"
+            
+            rows = []
+            for staff_member in staff:
+                staff_days = grouped['by_staff'].get(staff_member.get('id'), {})
+                row = [staff_member.get('full_name', 'Unknown')]
+                for offset in band_days:
+                    day_shifts = staff_days.get(offset)
+                    row.append('/'.join(shift_codes.get(shift, str(shift)) for shift in day_shifts) if day_shifts else '-')
+                rows.append(row)
+            
+            for chunk_start in range(0, max(len(rows), 1), self.PERIOD_ROWS_PER_PAGE):
+                content.append(PageBreak())
+                content.append(Paragraph(band_title, self.staff_name_style))
+                content.append(self._build_period_table(header, rows[chunk_start:chunk_start + self.PERIOD_ROWS_PER_PAGE]))
+        
+        # Period totals, paginated the same way
+        summary_rows = []
+        for staff_member in staff:
+            staff_id = staff_member.get('id')
+            summary_rows.append([
+                staff_member.get('full_name', 'Unknown'),
+                staff_member.get('role', 'Staff'),
+                str(grouped['staff_totals'].get(staff_id, 0)),
+                f"{self._staff_hours(grouped['by_staff'].get(staff_id, {}), shift_lookup):g}"
+            ])
+        for chunk_start in range(0, len(summary_rows), self.PERIOD_ROWS_PER_PAGE):
+            content.append(PageBreak())
+            content.append(Paragraph("Staff Summary", self.staff_name_style))
+            content.append(self._build_period_table(
+                ['Staff Member', 'Role', 'Shifts', 'Hours'],
+                summary_rows[chunk_start:chunk_start + self.PERIOD_ROWS_PER_PAGE],
+                col_widths=[3*inch, 2.5*inch, 1*inch, 1*inch]
+            ))
+        
+        doc.build(content, onFirstPage=_draw_page_footer, onLaterPages=_draw_page_footer)
+        output.seek(0)
+        return output
+    
+    def _shift_codes(self, shift_lookup: Dict[int, Dict[str, Any]]) -> Dict[int, str]:
+        """Short, unique per-shift labels so a 7-day band fits across a landscape page"""
+        codes: Dict[int, str] = {}
+        used = set()
+        for index, info in sorted(shift_lookup.items()):
+            name = ''.join(ch for ch in info['name'] if ch.isalnum()) or f"S{index}"
+            code = name[:3].title()
+            if code in used:
+                code = f"{name[:2].title()}{index}"
+            used.add(code)
+            codes[index] = code
+        return codes
+    
+    def _build_period_table(self, header: List[str], rows: List[List[str]], col_widths: Optional[List[float]] = None) -> LongTable:
+        """One page of the period roster; plain-string cells keep layout cheap"""
+        if col_widths is None:
+            day_width = (landscape(A4)[0] - 1*inch - 1.8*inch) / max(len(header) - 1, 1)
+            col_widths = [1.8*inch] + [day_width] * (len(header) - 1)
+        
+        table = LongTable([header] + rows, colWidths=col_widths, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f2937')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb')),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ]))
+        return table
+
+
+def iter_pdf_chunks(pdf_file: IO[bytes], chunk_size: int = 64 * 1024):
+    """Yield a rendered PDF in chunks for StreamingResponse, closing the file when done"""
+    try:
+        while True:
+            chunk = pdf_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        pdf_file.close()
+
+
+def puppeteer_available() -> bool:
+    """True when Node and the Puppeteer generator script (with its dependencies) are installed"""
+    script = Path(__file__).parent.parent.parent / "scripts" / "generate_pdf.js"
+    return (
+        shutil.which("node") is not None
+        and script.exists()
+        and (script.parent / "node_modules" / "puppeteer").exists()
+    )
+
+
+def get_schedule_pdf_service():
+    """
+    Pick the schedule PDF renderer from PDF_RENDERER:
+    "puppeteer", "reportlab", or "auto" (Puppeteer when installed, else ReportLab).
+    """
+    renderer = get_settings().PDF_RENDERER.lower()
+    if renderer == "reportlab" or (renderer == "auto" and not puppeteer_available()):
+        return PDFService()
+    return PuppeteerPDFService()
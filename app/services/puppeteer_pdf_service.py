@@ -1,6 +1,7 @@
 # app/services/puppeteer_pdf_service.py
 
 import asyncio
+import hashlib
 import subprocess
 import json
 import os
@@ -9,15 +10,22 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from jinja2 import Environment, FileSystemLoader
 
+from .pdf_cache import SchedulePDFCache
+
 class PuppeteerPDFService:
     """Service for generating high-quality PDF schedules using Puppeteer"""
 
+    # Bump when the rendering pipeline changes in a way the template hash can't see
+    RENDERER_VERSION = "puppeteer-1"
+    TEMPLATE_NAME = "schedule_pdf.html"
+
     def __init__(self):
         self.upload_dir = Path("uploads/schedules")
         self.upload_dir.mkdir(parents=True, exist_ok=True)
 
         # Setup Jinja2 for HTML templates
         template_dir = Path(__file__).parent.parent / "templates"
+        self.template_path = template_dir / self.TEMPLATE_NAME
         self.jinja_env = Environment(loader=FileSystemLoader(str(template_dir)))
 
         # Path to the Node.js PDF generator script
@@ -81,6 +89,14 @@ class PuppeteerPDFService:
             traceback.print_exc()
             raise Exception(f"PDF generation failed: {str(e)}")
 
+    def template_version(self) -> str:
+        """Version string for PDF cache keys; changes whenever the HTML template does"""
+        try:
+            digest = hashlib.sha256(self.template_path.read_bytes()).hexdigest()[:16]
+        except OSError:
+            digest = "missing"
+        return f"{self.RENDERER_VERSION}:{digest}"
+
     def _parse_date(self, date_input) -> datetime:
         """Parse various date formats to datetime"""
         if isinstance(date_input, str):
@@ -184,7 +200,7 @@ class PuppeteerPDFService:
 
     def _render_html_template(self, template_data: Dict[str, Any]) -> str:
         """Render the HTML template with data"""
-        template = self.jinja_env.get_template('schedule_pdf.html')
+        template = self.jinja_env.get_template(self.TEMPLATE_NAME)
         return template.render(**template_data)
 
     async def _generate_pdf_from_html(self, html_content: str) -> bytes:
@@ -229,17 +245,25 @@ class PuppeteerPDFService:
             if temp_pdf_path.exists():
                 temp_pdf_path.unlink()
 
-    async def save_pdf(self, pdf_data: bytes, filename: str) -> str:
+    async def save_pdf(
+        self, pdf_data: bytes, filename: str, cache_key: Optional[str] = None, tenant_id: Optional[Any] = None
+    ) -> str:
         """
         Save PDF data to file and return URL
 
         Args:
             pdf_data: PDF file content as bytes
             filename: Desired filename
+            cache_key: Content hash from SchedulePDFCache.compute_key; when given
+                the PDF is stored once under that key instead of a timestamped name
+            tenant_id: Tenant the cached PDF belongs to; checked when it is served by key
 
         Returns:
             str: URL where PDF can be accessed
         """
+        if cache_key:
+            return SchedulePDFCache().put(cache_key, pdf_data, tenant_id=tenant_id)
+
         # Ensure filename is unique
         if not filename.endswith('.pdf'):
             filename += '.pdf'
@@ -0,0 +1,154 @@
+# app/services/push_planner.py
+"""
+PushSendPlanner - batches push notifications across recipients
+
+Collects notifications for many users, resolves their device tokens in one
+query, sends every token in shared FCM batches of up to 500 messages and
+applies the per-device success/failure bookkeeping in bulk.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from ..models import DeviceStatus, Notification, UserDevice
+from .firebase_service import FirebaseService
+from .push_token_manager import PushTokenManager
+
+logger = logging.getLogger(__name__)
+
+
+class PushSendPlanner:
+    """Plans and sends push notifications for many recipients at once"""
+
+    def __init__(
+        self,
+        db: Session,
+        firebase_service: Optional[FirebaseService] = None,
+        push_manager: Optional[PushTokenManager] = None
+    ):
+        self.db = db
+        self.firebase_service = firebase_service or FirebaseService()
+        self.push_manager = push_manager or PushTokenManager(db)
+        self._planned: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._planned)
+
+    @staticmethod
+    def build_push_data(notification: Notification) -> Dict[str, Any]:
+        """FCM data payload for a notification"""
+        return {
+            "notification_id": str(notification.id),
+            "type": str(notification.notification_type),
+            "action_url": notification.action_url or "",
+            **(notification.data or {})
+        }
+
+    def add(self, notification: Notification) -> None:
+        """
+        Queue a notification for push delivery.
+
+        Only plain values are kept, so the notification's session may be
+        closed before the planner is flushed.
+        """
+        self._planned.append({
+            "notification_id": str(notification.id),
+            "user_id": notification.recipient_user_id,
+            "title": notification.title,
+            "body": notification.message,
+            "data": self.build_push_data(notification),
+            "action_url": notification.action_url,
+            "analytics_label": f"batch_{notification.notification_type}",
+        })
+
+    def _load_devices(self, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[UserDevice]]:
+        """Active devices with a push token for all recipients, in one query"""
+        devices = self.db.exec(
+            select(UserDevice).where(
+                UserDevice.user_id.in_(user_ids),
+                UserDevice.is_active == True,
+                UserDevice.status == DeviceStatus.ACTIVE,
+                UserDevice.push_token != None
+            )
+        ).all()
+
+        by_user: Dict[uuid.UUID, List[UserDevice]] = defaultdict(list)
+        for device in devices:
+            by_user[device.user_id].append(device)
+        return by_user
+
+    async def flush(self) -> Dict[str, Dict[str, int]]:
+        """
+        Send everything queued so far.
+
+        Returns per-notification counts keyed by notification id:
+        {"attempted": n, "success": n, "failure": n}
+        """
+        planned, self._planned = self._planned, []
+        results = {
+            item["notification_id"]: {"attempted": 0, "success": 0, "failure": 0}
+            for item in planned
+        }
+        if not planned:
+            return results
+
+        if not self.firebase_service.is_available():
+            logger.error("firebase_service_unavailable")
+            return results
+
+        devices_by_user = self._load_devices(list({item["user_id"] for item in planned}))
+
+        # One message per (notification, token); duplicate device rows sharing a
+        # token get a single send and share its outcome
+        pushes: List[Dict[str, Any]] = []
+        targets: List[Tuple[str, List[uuid.UUID]]] = []
+        for item in planned:
+            device_ids_by_token: Dict[str, List[uuid.UUID]] = defaultdict(list)
+            for device in devices_by_user.get(item["user_id"], []):
+                device_ids_by_token[device.push_token].append(device.id)
+
+            if not device_ids_by_token:
+                logger.warning(
+                    "push_notification_no_valid_tokens",
+                    extra={"user_id": str(item["user_id"])}
+                )
+
+            for token, device_ids in device_ids_by_token.items():
+                pushes.append({
+                    "token": token,
+                    "title": item["title"],
+                    "body": item["body"],
+                    "data": item["data"],
+                    "action_url": item["action_url"],
+                    "analytics_label": item["analytics_label"],
+                })
+                targets.append((item["notification_id"], device_ids))
+
+        if not pushes:
+            return results
+
+        outcomes = await self.firebase_service.send_push_batch(pushes)
+
+        succeeded: List[uuid.UUID] = []
+        failed: List[uuid.UUID] = []
+        for (notification_id, device_ids), (success, _) in zip(targets, outcomes):
+            counts = results[notification_id]
+            counts["attempted"] += 1
+            if success:
+                counts["success"] += 1
+                succeeded.extend(device_ids)
+            else:
+                counts["failure"] += 1
+                failed.extend(device_ids)
+
+        self.push_manager.record_push_results(succeeded, failed)
+
+        logger.info(
+            f"Push batch: {len(planned)} notifications, {len(pushes)} devices, "
+            f"{len(set(succeeded))} succeeded, {len(set(failed))} failed"
+        )
+        return results
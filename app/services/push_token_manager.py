@@ -8,7 +8,9 @@ Tracks push failures per user/device and triggers re-auth prompts after 2 failur
 
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import uuid
+from sqlalchemy import case, literal, update
 from sqlmodel import Session, select, and_, or_
 from ..models import UserDevice, DeviceStatus, User
 from ..schemas import (
@@ -175,6 +177,71 @@ class PushTokenManager:
             self.db.add(device)
             self.db.commit()
     
+    def record_push_results(
+        self,
+        succeeded_device_ids: Iterable[uuid.UUID],
+        failed_device_ids: Iterable[uuid.UUID]
+    ) -> Dict[str, int]:
+        """
+        Apply success and failure bookkeeping for many devices at once.
+
+        Same rules as record_push_success / record_push_failure, but as one
+        UPDATE per outcome and a single commit instead of one per device.
+        """
+        succeeded = list(set(succeeded_device_ids))
+        failed = list(set(failed_device_ids) - set(succeeded))
+        now = datetime.now(timezone.utc)
+        status_type = UserDevice.__table__.c.status.type
+
+        if succeeded:
+            was_reauth = UserDevice.status == DeviceStatus.NEEDS_REAUTH
+            self.db.execute(
+                update(UserDevice)
+                .where(UserDevice.id.in_(succeeded))
+                .values(
+                    last_push_success=now,
+                    push_failures=0,
+                    status=case(
+                        (was_reauth, literal(DeviceStatus.ACTIVE, status_type)),
+                        else_=UserDevice.status
+                    ),
+                    needs_permission_prompt=case(
+                        (was_reauth, False),
+                        else_=UserDevice.needs_permission_prompt
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        if failed:
+            # Right-hand side sees the pre-update count, hence the + 1
+            needs_reauth = UserDevice.push_failures + 1 >= 2
+            self.db.execute(
+                update(UserDevice)
+                .where(UserDevice.id.in_(failed))
+                .values(
+                    push_failures=UserDevice.push_failures + 1,
+                    last_push_failure=now,
+                    status=case(
+                        (needs_reauth, literal(DeviceStatus.NEEDS_REAUTH, status_type)),
+                        else_=UserDevice.status
+                    ),
+                    needs_permission_prompt=case(
+                        (needs_reauth, True),
+                        else_=UserDevice.needs_permission_prompt
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        if succeeded or failed:
+            self.db.commit()
+            logger.info(
+                f"Recorded push results: {len(succeeded)} devices succeeded, {len(failed)} failed"
+            )
+
+        return {"succeeded": len(succeeded), "failed": len(failed)}
+
     def handle_token_reauthorization(self, request: UpdateTokenRequest) -> Dict[str, Any]:
         """Handle token update after user re-authorization"""
         device = self.db.get(UserDevice, request.device_id)
@@ -0,0 +1,269 @@
+# app/services/retention_service.py
+"""
+Set-based retention for user sessions and audit logs.
+
+Rows are never loaded into Python: each pass is
+`DELETE ... WHERE id IN (SELECT id ... LIMIT batch_size)` (or the UPDATE
+equivalent), committed per batch so locks stay short and the job can be
+interrupted at any point without losing progress.
+
+Only one process runs the jobs at a time: run_retention_jobs() takes a
+Postgres advisory lock and returns immediately in every other worker.
+
+If the audit log has been converted to a monthly-partitioned table
+(app/scripts/partition_audit_log.py), partitions entirely older than the
+longest tenant retention are dropped outright and upcoming partitions are
+created ahead of time.
+"""
+
+import logging
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, delete, or_, text, update
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import AuditLog, SecuritySettings, UserSession
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_KEY = zlib.crc32(b"schedula:retention")
+AUDIT_TABLE = AuditLog.__tablename__
+
+# Progress of the most recent runs in this process (see /health)
+retention_metrics: Dict[str, Any] = {"runs": 0, "skipped_not_leader": 0, "last_run": None}
+
+
+@contextmanager
+def advisory_lock(engine, key: int = RETENTION_LOCK_KEY) -> Iterator[bool]:
+    """
+    Try to become the leader for `key`; yields False if another process
+    holds it. Databases without advisory locks (SQLite in dev) always lead.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    with engine.connect() as conn:
+        acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+        conn.commit()  # The lock is session-level; don't sit idle in a transaction
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                conn.commit()
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def audit_partition_name(month: date) -> str:
+    return f"{AUDIT_TABLE}_p{month:%Y%m}"
+
+
+def create_audit_partition_sql(month: date) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{audit_partition_name(month)}" '
+        f'PARTITION OF "{AUDIT_TABLE}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    )
+
+
+class RetentionService:
+    """Chunked retention jobs for UserSession and AuditLog"""
+
+    def __init__(self, db: Session, batch_size: Optional[int] = None, batch_pause: Optional[float] = None):
+        settings = get_settings()
+        self.db = db
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.batch_pause = settings.RETENTION_BATCH_PAUSE_SECONDS if batch_pause is None else batch_pause
+        self.batches = 0
+
+    # ==================== CHUNKED PRIMITIVES ====================
+
+    def _delete_in_chunks(self, model, *conditions) -> int:
+        ids = select(model.id).where(*conditions).limit(self.batch_size)
+        return self._run_in_chunks(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False),
+            model.__tablename__
+        )
+
+    def _update_in_chunks(self, model, values: Dict[str, Any], *conditions) -> int:
+        # `conditions` must stop matching updated rows, or this never finishes
+        ids = select(model.id).where(*conditions).limit(self.batch_size)
+        return self._run_in_chunks(
+            update(model).where(model.id.in_(ids)).values(**values).execution_options(synchronize_session=False),
+            model.__tablename__
+        )
+
+    def _run_in_chunks(self, statement, label: str) -> int:
+        total = 0
+        while True:
+            affected = self.db.execute(statement).rowcount or 0
+            self.db.commit()
+            self.batches += 1
+            total += affected
+
+            if affected < self.batch_size:
+                break
+            if self.batches % 20 == 0:
+                logger.info(f"Retention on {label}: {total} rows so far")
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+        return total
+
+    # ==================== SESSIONS ====================
+
+    def expire_sessions(self) -> int:
+        """Mark sessions past their expiry as inactive"""
+        now = datetime.now(timezone.utc)
+        return self._update_in_chunks(
+            UserSession,
+            {"is_active": False, "revoked_at": now, "revocation_reason": "expired"},
+            UserSession.is_active == True,
+            UserSession.expires_at < now
+        )
+
+    def purge_sessions(self, retention_days: Optional[int] = None) -> int:
+        """Delete sessions that expired or were revoked more than `retention_days` ago"""
+        days = retention_days if retention_days is not None else get_settings().SESSION_RETENTION_DAYS
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        return self._delete_in_chunks(
+            UserSession,
+            or_(
+                UserSession.expires_at < cutoff,
+                and_(UserSession.is_active == False, UserSession.revoked_at < cutoff)
+            )
+        )
+
+    # ==================== AUDIT LOGS ====================
+
+    def delete_audit_logs_before(self, cutoff: datetime, *conditions) -> int:
+        return self._delete_in_chunks(AuditLog, AuditLog.created_at < cutoff, *conditions)
+
+    def audit_retention_days(self) -> List[int]:
+        """Distinct retention periods configured in SecuritySettings"""
+        periods = self.db.exec(select(SecuritySettings.audit_retention_days).distinct()).all()
+        return sorted(days for days in periods if days)
+
+    def purge_audit_logs(self) -> int:
+        """Delete audit logs past each tenant's SecuritySettings.audit_retention_days"""
+        now = datetime.now(timezone.utc)
+        deleted = 0
+
+        for days in self.audit_retention_days():
+            deleted += self.delete_audit_logs_before(
+                now - timedelta(days=days),
+                AuditLog.tenant_id.in_(
+                    select(SecuritySettings.tenant_id).where(SecuritySettings.audit_retention_days == days)
+                )
+            )
+
+        deleted += self.delete_audit_logs_before(
+            now - timedelta(days=get_settings().AUDIT_LOG_RETENTION_DAYS),
+            AuditLog.tenant_id.not_in(select(SecuritySettings.tenant_id))
+        )
+        return deleted
+
+    # ==================== AUDIT PARTITIONS ====================
+
+    def audit_log_is_partitioned(self) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        relkind = self.db.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :name"), {"name": AUDIT_TABLE}
+        ).scalar()
+        return relkind == "p"
+
+    def audit_partitions(self) -> List[str]:
+        return list(self.db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :name ORDER BY c.relname"
+        ), {"name": AUDIT_TABLE}).scalars())
+
+    def ensure_audit_partitions(self, months_ahead: Optional[int] = None) -> List[str]:
+        """Create monthly partitions from the current month up to `months_ahead` months out"""
+        months_ahead = months_ahead if months_ahead is not None else get_settings().AUDIT_PARTITION_MONTHS_AHEAD
+        existing = set(self.audit_partitions())
+        created = []
+
+        month = month_start(datetime.now(timezone.utc).date())
+        for _ in range(months_ahead + 1):
+            if audit_partition_name(month) not in existing:
+                self.db.execute(text(create_audit_partition_sql(month)))
+                created.append(audit_partition_name(month))
+            month = next_month(month)
+
+        self.db.commit()
+        return created
+
+    def drop_expired_audit_partitions(self) -> List[str]:
+        """Drop monthly partitions whose whole range is older than the longest retention"""
+        longest = max([get_settings().AUDIT_LOG_RETENTION_DAYS, *self.audit_retention_days()])
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=longest)).date()
+        dropped = []
+
+        for name in self.audit_partitions():
+            suffix = name[len(AUDIT_TABLE) + 2:]
+            if not name.startswith(f"{AUDIT_TABLE}_p") or not suffix.isdigit():
+                continue  # the default partition, or one we did not create
+            start = date(int(suffix[:4]), int(suffix[4:]), 1)
+            if next_month(start) <= cutoff:
+                self.db.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+
+        self.db.commit()
+        return dropped
+
+    # ==================== ALL JOBS ====================
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        result: Dict[str, Any] = {
+            "sessions_expired": self.expire_sessions(),
+            "sessions_deleted": self.purge_sessions(),
+        }
+
+        if self.audit_log_is_partitioned():
+            try:
+                result["audit_partitions_created"] = self.ensure_audit_partitions()
+                result["audit_partitions_dropped"] = self.drop_expired_audit_partitions()
+            except Exception as e:
+                # e.g. rows for a new month already landed in the default partition
+                self.db.rollback()
+                logger.warning(f"Audit partition maintenance failed, falling back to row deletes: {e}")
+        result["audit_logs_deleted"] = self.purge_audit_logs()
+
+        result["batches"] = self.batches
+        result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+
+def run_retention_jobs(engine=None) -> Optional[Dict[str, Any]]:
+    """Run all retention jobs if this process wins the leader lock; None otherwise"""
+    if engine is None:
+        from ..deps import background_engine as engine
+
+    with advisory_lock(engine) as leader:
+        if not leader:
+            retention_metrics["skipped_not_leader"] += 1
+            return None
+
+        with Session(engine) as db:
+            result = RetentionService(db).run()
+
+    retention_metrics["runs"] += 1
+    retention_metrics["last_run"] = {"finished_at": datetime.now(timezone.utc).isoformat(), **result}
+    return result
@@ -0,0 +1,205 @@
+# app/services/schedule_history.py
+"""
+Windowed schedule history for GET /schedule/facility/{facility_id}.
+
+A page is a date window and/or keyset cursor over a facility's schedules,
+newest week first. Assignments, staff and zones for the whole page are
+read in one query (or one GROUP BY in summary mode) instead of one query
+per schedule.
+
+Pages carry an ETag derived from each schedule's `updated_at` and publication
+state plus the facility's staff changes, so unchanged pages revalidate with
+a 304. To keep that honest, any flush that adds, changes or removes a
+ShiftAssignment or ZoneAssignment also bumps its schedule's version and
+`updated_at`, logs the diff and updates the staff timeline (see
+_version_changed_schedules, schedule_versions.py and staff_timeline.py).
+"""
+
+import hashlib
+import itertools
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, event, func, inspect
+from sqlalchemy.orm import Session as ORMSession
+from sqlmodel import Session, select
+
+from ..models import Schedule, ShiftAssignment, Staff, ZoneAssignment
+from .schedule_versions import bump_versions
+from .schedule_writes import describe_diff
+from .staff_timeline import sync_assignments
+
+
+def _committed_value(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+def _assignment_cell(obj, committed: bool = False) -> Tuple[int, int, UUID]:
+    """(day, shift, staff_id) of an assignment, as loaded or as it will be written"""
+    read = _committed_value if committed else getattr
+    return read(obj, "day"), read(obj, "shift"), read(obj, "staff_id")
+
+
+@event.listens_for(ORMSession, "before_flush")
+def _version_changed_schedules(session, flush_context, instances) -> None:
+    """Bump the version of schedules whose assignments change in this flush, log the diffs and update the timeline"""
+    changes = defaultdict(lambda: ([], [], []))  # schedule_id -> (added, removed, zone_changes)
+    timeline_added, timeline_removed = [], []
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, (ShiftAssignment, ZoneAssignment)) or not obj.schedule_id:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        added, removed, zone_changes = changes[obj.schedule_id]
+        old_cell = None if obj in session.new else _assignment_cell(obj, committed=True)
+        new_cell = None if obj in session.deleted else _assignment_cell(obj)
+        if isinstance(obj, ShiftAssignment):
+            if old_cell != new_cell:
+                if old_cell:
+                    removed.append(old_cell)
+                    timeline_removed.append((obj.id, old_cell[2]))
+                if new_cell:
+                    added.append(new_cell)
+                    timeline_added.append((obj.id, obj.schedule_id, *new_cell))
+        else:
+            if old_cell and old_cell != new_cell:
+                zone_changes.append((old_cell, None))
+            if new_cell and (old_cell != new_cell or _committed_value(obj, "zone_id") != obj.zone_id):
+                zone_changes.append((new_cell, obj.zone_id))
+    if not changes:
+        return
+
+    schedules = [obj for obj in itertools.chain(session.new, session.identity_map.values()) if isinstance(obj, Schedule)]
+    sync_assignments(session, timeline_added, timeline_removed, schedules)
+
+    # New schedules start at version 1; deleted ones need no version
+    pending = {obj.id for obj in itertools.chain(session.new, session.deleted) if isinstance(obj, Schedule)}
+    diffs = {
+        schedule_id: describe_diff(*change) for schedule_id, change in changes.items()
+        if schedule_id not in pending
+    }
+    bump_versions(session, {schedule_id: diff for schedule_id, diff in diffs.items() if diff["changed"]})
+
+
+def schedule_page(
+    db: Session,
+    facility_id: UUID,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[date] = None,
+    limit: int = 12,
+) -> Tuple[List[Schedule], Optional[date]]:
+    """One page of schedules, newest week first, and the cursor for the next page"""
+    query = select(Schedule).where(Schedule.facility_id == facility_id)
+    if start_date:
+        # Include the week that is already running on start_date
+        query = query.where(Schedule.week_start > start_date - timedelta(days=7))
+    if end_date:
+        query = query.where(Schedule.week_start <= end_date)
+    if cursor:
+        query = query.where(Schedule.week_start < cursor)
+
+    schedules = db.exec(query.order_by(Schedule.week_start.desc()).limit(limit + 1)).all()
+    if len(schedules) > limit:
+        schedules = schedules[:limit]
+        return schedules, schedules[-1].week_start
+    return schedules, None
+
+
+def page_etag(db: Session, facility_id: UUID, schedules: Iterable[Schedule], variant: str = "") -> str:
+    """ETag for a page: its schedules' versions and publication state plus the facility's staff changes"""
+    staff_changed, staff_count = db.exec(
+        select(func.max(func.coalesce(Staff.updated_at, Staff.created_at)), func.count(Staff.id))
+        .where(Staff.facility_id == facility_id)
+    ).one()
+
+    digest = hashlib.sha256(variant.encode())
+    for schedule in schedules:
+        # Publishing changes the body without touching updated_at
+        digest.update(
+            f"{schedule.id}:{schedule.updated_at or schedule.created_at}:{schedule.is_published}:{schedule.published_at}|".encode()
+        )
+    digest.update(f"staff:{staff_changed}:{staff_count}".encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def load_assignments(db: Session, schedule_ids: List[UUID]) -> Dict[UUID, List[Dict[str, Any]]]:
+    """Assignments with staff and zone for every schedule on the page, in one query"""
+    by_schedule: Dict[UUID, List[Dict[str, Any]]] = defaultdict(list)
+    if not schedule_ids:
+        return by_schedule
+
+    rows = db.exec(
+        select(ShiftAssignment, Staff, ZoneAssignment.zone_id)
+        .join(Staff, ShiftAssignment.staff_id == Staff.id)
+        .outerjoin(ZoneAssignment,
+            and_(
+                ZoneAssignment.schedule_id == ShiftAssignment.schedule_id,
+                ZoneAssignment.staff_id == ShiftAssignment.staff_id,
+                ZoneAssignment.day == ShiftAssignment.day,
+                ZoneAssignment.shift == ShiftAssignment.shift
+            )
+        )
+        .where(ShiftAssignment.schedule_id.in_(schedule_ids))
+        .order_by(ShiftAssignment.schedule_id, ShiftAssignment.day, ShiftAssignment.shift)
+    ).all()
+
+    for assignment, staff, zone_id in rows:
+        by_schedule[assignment.schedule_id].append({
+            'id': f"{assignment.schedule_id}-{assignment.day}-{assignment.shift}-{assignment.staff_id}",
+            'day': assignment.day,
+            'shift': assignment.shift,
+            'staff_id': str(assignment.staff_id),
+            'schedule_id': str(assignment.schedule_id),
+            'staff_name': staff.full_name,
+            'staff_role': staff.role,
+            'staff_email': staff.email,
+            'staff_skill_level': staff.skill_level,
+            'zone_id': zone_id
+        })
+    return by_schedule
+
+
+def load_assignment_counts(db: Session, schedule_ids: List[UUID]) -> Dict[UUID, Tuple[int, int]]:
+    """(assignments, distinct staff) per schedule, in one query"""
+    if not schedule_ids:
+        return {}
+
+    rows = db.exec(
+        select(ShiftAssignment.schedule_id, func.count(ShiftAssignment.id), func.count(func.distinct(ShiftAssignment.staff_id)))
+        .where(ShiftAssignment.schedule_id.in_(schedule_ids))
+        .group_by(ShiftAssignment.schedule_id)
+    ).all()
+    return {schedule_id: (assignments, staff) for schedule_id, assignments, staff in rows}
+
+
+def serialize_page(db: Session, schedules: List[Schedule], summary: bool = False) -> List[Dict[str, Any]]:
+    """Schedules of a page with their assignments, or only counts in summary mode"""
+    schedule_ids = [schedule.id for schedule in schedules]
+    if summary:
+        counts = load_assignment_counts(db, schedule_ids)
+    else:
+        assignments = load_assignments(db, schedule_ids)
+
+    result = []
+    for schedule in schedules:
+        schedule_data = {
+            "id": str(schedule.id),
+            "facility_id": str(schedule.facility_id),
+            "week_start": schedule.week_start.isoformat(),
+            "created_at": schedule.created_at.isoformat() if schedule.created_at else None,
+            "updated_at": schedule.updated_at.isoformat() if schedule.updated_at else None,
+            "version": schedule.version,
+            "is_published": schedule.is_published,
+        }
+        if summary:
+            assignment_count, staff_count = counts.get(schedule.id, (0, 0))
+            schedule_data["assignment_count"] = assignment_count
+            schedule_data["staff_count"] = staff_count
+        else:
+            schedule_data["assignments"] = assignments.get(schedule.id, [])
+        result.append(schedule_data)
+    return result
@@ -6,6 +6,7 @@ from fastapi import BackgroundTasks
 from sqlmodel import Session, select
 
 from .notification_service import NotificationService
+from .user_staff_mapping import UserStaffMappingService
 from ..models import Schedule, Staff, User, Facility, NotificationType, NotificationPriority
 from ..core.config import get_settings
 
@@ -41,11 +42,10 @@ class ScheduleNotificationHandler:
         # Get frontend URL for absolute links
         settings = get_settings()
 
+        users = UserStaffMappingService(self.db).get_users_for_staff(staff_list)
         for staff in staff_list:
             # Find their user account
-            user = self.db.exec(
-                select(User).where(User.email == staff.email)
-            ).first()
+            user = users.get(staff.id)
 
             if user:
                 # Build absolute URL for email links
@@ -0,0 +1,122 @@
+# app/services/schedule_versions.py
+"""
+Schedule versions for optimistic concurrency and cheap change detection.
+
+Every assignment change, and publishing, increments `Schedule.version` (and
+`updated_at`) in a single UPDATE ... RETURNING and records the diff that
+produced the new version in ScheduleChange. Editors make their writes conditional on the
+version they loaded, HEAD /schedule/{id} answers "did it change?" with an
+ETag, and GET /schedule/{id}/changes?since_version=N replays the diffs a
+client missed instead of shipping the whole schedule again.
+
+Only the last SCHEDULE_CHANGE_LOG_VERSIONS diffs are kept per schedule;
+clients further behind are told to refetch.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import Schedule, ScheduleChange
+
+
+def bump_versions(
+    db: Session, diffs: Dict[uuid.UUID, Dict[str, Any]], expected_version: Optional[int] = None
+) -> Dict[uuid.UUID, int]:
+    """
+    Increment the version of each schedule in `diffs` and log its diff.
+
+    With expected_version (one schedule) nothing happens unless the stored
+    version still matches. Returns the new version of each schedule bumped.
+    """
+    if not diffs:
+        return {}
+    now = datetime.now(timezone.utc)
+    statement = (
+        update(Schedule)
+        .where(Schedule.id.in_(list(diffs)))
+        .values(version=Schedule.version + 1, updated_at=now)
+        .returning(Schedule.id, Schedule.version)
+    )
+    if expected_version is not None:
+        statement = statement.where(Schedule.version == expected_version)
+    versions = dict(db.execute(statement, execution_options={"synchronize_session": False}).all())
+    if not versions:
+        return versions
+
+    db.execute(insert(ScheduleChange), [
+        {
+            "id": uuid.uuid4(),
+            "schedule_id": schedule_id,
+            "version": version,
+            "changes": {key: value for key, value in diffs[schedule_id].items() if key != "changed"},
+            "created_at": now,
+        }
+        for schedule_id, version in versions.items()
+    ])
+    current = select(Schedule.version).where(Schedule.id == ScheduleChange.schedule_id).scalar_subquery()
+    db.execute(
+        delete(ScheduleChange).where(
+            ScheduleChange.schedule_id.in_(list(versions)),
+            ScheduleChange.version <= current - get_settings().SCHEDULE_CHANGE_LOG_VERSIONS
+        ),
+        execution_options={"synchronize_session": False}
+    )
+
+    # Keep loaded schedules in step without flushing the values again
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Schedule) and obj.id in versions:
+            set_committed_value(obj, "version", versions[obj.id])
+            set_committed_value(obj, "updated_at", now)
+    return versions
+
+
+def current_version(db: Session, schedule_id: uuid.UUID) -> Optional[int]:
+    return db.exec(select(Schedule.version).where(Schedule.id == schedule_id)).first()
+
+
+def schedule_etag(schedule_id: uuid.UUID, version: int) -> str:
+    return f'W/"{schedule_id}-v{version}"'
+
+
+def parse_etag_version(schedule_id: uuid.UUID, etag: Optional[str]) -> Optional[int]:
+    """Version named by an If-Match ETag for this schedule, or None"""
+    if not etag:
+        return None
+    prefix = f"{schedule_id}-v"
+    tag = etag.strip().removeprefix("W/").strip('"')
+    if not tag.startswith(prefix) or not tag[len(prefix):].isdigit():
+        return None
+    return int(tag[len(prefix):])
+
+
+def changes_since(db: Session, schedule: Schedule, since_version: int) -> Dict[str, Any]:
+    """Diffs after since_version, oldest first, or full_refresh when they are no longer all logged"""
+    result: Dict[str, Any] = {
+        "schedule_id": str(schedule.id),
+        "version": schedule.version,
+        "full_refresh": False,
+        "changes": [],
+    }
+    if since_version >= schedule.version:
+        return result
+
+    rows: List[ScheduleChange] = db.exec(
+        select(ScheduleChange)
+        .where(ScheduleChange.schedule_id == schedule.id, ScheduleChange.version > since_version)
+        .order_by(ScheduleChange.version)
+    ).all()
+    if [row.version for row in rows] != list(range(since_version + 1, schedule.version + 1)):
+        result["full_refresh"] = True
+        return result
+
+    result["changes"] = [
+        {"version": row.version, "changed_at": row.created_at.isoformat() if row.created_at else None, **row.changes}
+        for row in rows
+    ]
+    return result
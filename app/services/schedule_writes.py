@@ -0,0 +1,244 @@
+# app/services/schedule_writes.py
+"""
+Diff-based writes for POST /schedule/create and PUT /schedule/{schedule_id}.
+
+Editors send the whole week on every (auto)save. Instead of deleting and
+re-inserting every ShiftAssignment, the desired cells are compared with the
+stored ones and only the difference is written: one DELETE for removed
+cells, one INSERT ... ON CONFLICT DO NOTHING for added ones and one upsert
+(ON CONFLICT DO UPDATE) for zone changes, in the caller's transaction.
+
+A cell is (day, shift, staff_id), unique per schedule. A save that changes
+nothing writes nothing and leaves `updated_at` alone, so caches keyed on
+it stay warm.
+
+Writes are conditional on the schedule's version: the caller may pass the
+version it loaded (expected_version), and the version bump itself only
+succeeds if nobody else changed the schedule since the assignments were
+read. Either mismatch raises ScheduleConflictError. The bump also logs the
+diff for the changes-since feed (see schedule_versions.py).
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from ..models import Schedule, ShiftAssignment, Staff, ZoneAssignment
+from .schedule_versions import bump_versions, current_version
+from .staff_timeline import sync_assignments
+
+logger = logging.getLogger(__name__)
+
+# (day, shift, staff_id)
+Cell = Tuple[int, int, uuid.UUID]
+
+
+class ScheduleConflictError(Exception):
+    """The schedule changed since the caller (or this write) last read it"""
+
+    def __init__(self, current_version: Optional[int]):
+        self.current_version = current_version
+        super().__init__("Schedule was modified by someone else")
+
+
+def parse_assignments(raw_assignments: List[Dict[str, Any]]) -> Dict[Cell, Optional[str]]:
+    """Validated cells of a request and their zone; raises ValueError naming the bad assignment"""
+    cells: Dict[Cell, Optional[str]] = {}
+    for i, assignment_data in enumerate(raw_assignments):
+        day = assignment_data.get('day')
+        shift = assignment_data.get('shift')
+        staff_id = assignment_data.get('staff_id')
+        if day is None or shift is None or not staff_id:
+            raise ValueError(f"Assignment {i + 1} is missing day, shift or staff_id")
+        try:
+            cell = (int(day), int(shift), uuid.UUID(str(staff_id)))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Assignment {i + 1} has invalid data types: {e}")
+        if not 0 <= cell[0] <= 6:
+            raise ValueError(f"Assignment {i + 1} has invalid day: {cell[0]} (must be 0-6)")
+        if not 0 <= cell[1] <= 2:
+            raise ValueError(f"Assignment {i + 1} has invalid shift: {cell[1]} (must be 0-2)")
+        cells[cell] = assignment_data.get('zone_id') or None
+    return cells
+
+
+def unknown_staff(db: Session, facility_id: uuid.UUID, staff_ids: Set[uuid.UUID]) -> Set[uuid.UUID]:
+    """Ids that are not active staff of the facility, in one query"""
+    if not staff_ids:
+        return set()
+    found = db.exec(
+        select(Staff.id).where(Staff.id.in_(staff_ids), Staff.facility_id == facility_id, Staff.is_active == True)
+    ).all()
+    return staff_ids - set(found)
+
+
+def stored_assignments(db: Session, schedule_id: uuid.UUID) -> Tuple[Dict[Cell, uuid.UUID], Dict[Cell, Tuple[uuid.UUID, str]]]:
+    """Stored shift cells -> row id, and zone cells -> (row id, zone_id)"""
+    shifts = {
+        (day, shift, staff_id): row_id
+        for row_id, day, shift, staff_id in db.exec(
+            select(ShiftAssignment.id, ShiftAssignment.day, ShiftAssignment.shift, ShiftAssignment.staff_id)
+            .where(ShiftAssignment.schedule_id == schedule_id)
+        ).all()
+    }
+    zones = {
+        (day, shift, staff_id): (row_id, zone_id)
+        for row_id, day, shift, staff_id, zone_id in db.exec(
+            select(ZoneAssignment.id, ZoneAssignment.day, ZoneAssignment.shift, ZoneAssignment.staff_id, ZoneAssignment.zone_id)
+            .where(ZoneAssignment.schedule_id == schedule_id)
+        ).all()
+    }
+    return shifts, zones
+
+
+def diff_assignments(
+    stored_shifts: Dict[Cell, Any], stored_zones: Dict[Cell, Tuple[uuid.UUID, str]], desired: Dict[Cell, Optional[str]]
+) -> Tuple[List[Cell], List[Cell], List[Tuple[Cell, Optional[str]]]]:
+    """Cells to add, cells to remove and (cell, zone_id) zone changes, None meaning no zone"""
+    added = [cell for cell in desired if cell not in stored_shifts]
+    removed = [cell for cell in stored_shifts if cell not in desired]
+    zone_changes = [
+        (cell, zone_id) for cell, zone_id in desired.items()
+        if zone_id != (stored_zones[cell][1] if cell in stored_zones else None)
+    ]
+    return added, removed, zone_changes
+
+
+def describe_diff(
+    added: List[Cell], removed: List[Cell], zone_changes: List[Tuple[Cell, Optional[str]]]
+) -> Dict[str, Any]:
+    """JSON diff for clients, caches and notifications; same-day shift changes are reported as moves"""
+    removed_shifts = defaultdict(list)
+    for day, shift, staff_id in removed:
+        removed_shifts[(staff_id, day)].append(shift)
+
+    zones = dict(zone_changes)
+    moved, moved_cells = [], set()
+    for day, shift, staff_id in added:
+        from_shifts = removed_shifts.get((staff_id, day))
+        if from_shifts:
+            from_shift = from_shifts.pop(0)
+            moved.append({"staff_id": str(staff_id), "day": day, "from_shift": from_shift, "to_shift": shift,
+                          "zone_id": zones.get((day, shift, staff_id))})
+            moved_cells.update({(day, from_shift, staff_id), (day, shift, staff_id)})
+
+    cell = lambda day, shift, staff_id: {"day": day, "shift": shift, "staff_id": str(staff_id)}
+    added_cells = set(added)
+    return {
+        "changed": bool(added or removed or zone_changes),
+        "added": [{**cell(*c), "zone_id": zones.get(c)} for c in added if c not in moved_cells],
+        "removed": [cell(*c) for c in removed if c not in moved_cells],
+        "moved": moved,
+        "zone_changed": [{**cell(*c), "zone_id": zone_id} for c, zone_id in zone_changes if c not in added_cells],
+    }
+
+
+def _upsert(db: Session, model):
+    """Dialect INSERT that supports ON CONFLICT, or None where it is not available"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
+
+
+def apply_assignments(
+    db: Session,
+    schedule: Schedule,
+    desired: Dict[Cell, Optional[str]],
+    expected_version: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Write only what differs from the stored assignments and return the diff; the caller commits"""
+    if expected_version is not None and expected_version != schedule.version:
+        raise ScheduleConflictError(schedule.version)
+
+    stored_shifts, stored_zones = stored_assignments(db, schedule.id)
+    added, removed, zone_changes = diff_assignments(stored_shifts, stored_zones, desired)
+    diff = describe_diff(added, removed, zone_changes)
+    if not diff["changed"]:
+        return diff
+
+    # Version check and bump in one statement; concurrent writers queue on the row lock
+    if not bump_versions(db, {schedule.id: diff}, expected_version=schedule.version):
+        raise ScheduleConflictError(current_version(db, schedule.id))
+
+    if removed:
+        db.execute(
+            delete(ShiftAssignment).where(ShiftAssignment.id.in_([stored_shifts[cell] for cell in removed])),
+            execution_options={"synchronize_session": False}
+        )
+    stale_zones = [stored_zones[cell][0] for cell in removed if cell in stored_zones]
+    stale_zones += [stored_zones[cell][0] for cell, zone_id in zone_changes if zone_id is None and cell in stored_zones]
+    if stale_zones:
+        db.execute(
+            delete(ZoneAssignment).where(ZoneAssignment.id.in_(stale_zones)),
+            execution_options={"synchronize_session": False}
+        )
+
+    rows = [
+        {"id": uuid.uuid4(), "schedule_id": schedule.id, "day": day, "shift": shift, "staff_id": staff_id}
+        for day, shift, staff_id in added
+    ]
+    if rows:
+        statement = _upsert(db, ShiftAssignment)
+        if statement is not None:
+            statement = statement.on_conflict_do_nothing(index_elements=["schedule_id", "day", "shift", "staff_id"])
+        db.execute(statement if statement is not None else insert(ShiftAssignment), rows)
+    sync_assignments(
+        db,
+        added=[(row["id"], schedule.id, row["day"], row["shift"], row["staff_id"]) for row in rows],
+        removed=[(stored_shifts[cell], cell[2]) for cell in removed],
+        schedules=[schedule]
+    )
+
+    now = datetime.now(timezone.utc)
+    zone_rows = [
+        {"id": uuid.uuid4(), "schedule_id": schedule.id, "staff_id": staff_id, "day": day, "shift": shift,
+         "zone_id": zone_id, "created_at": now}
+        for (day, shift, staff_id), zone_id in zone_changes if zone_id is not None
+    ]
+    if zone_rows:
+        statement = _upsert(db, ZoneAssignment)
+        if statement is not None:
+            statement = statement.on_conflict_do_update(
+                index_elements=["schedule_id", "staff_id", "day", "shift"],
+                set_={"zone_id": statement.excluded.zone_id}
+            )
+            db.execute(statement, zone_rows)
+        else:
+            db.execute(
+                delete(ZoneAssignment).where(
+                    ZoneAssignment.schedule_id == schedule.id,
+                    ZoneAssignment.id.in_([stored_zones[cell][0] for cell, _ in zone_changes if cell in stored_zones])
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            db.execute(insert(ZoneAssignment), zone_rows)
+
+    logger.info(
+        f"Schedule {schedule.id}: +{len(added)} -{len(removed)} shift cells, {len(zone_changes)} zone changes"
+    )
+    return diff
+
+
+def serialize_cells(schedule: Schedule, desired: Dict[Cell, Optional[str]]) -> List[Dict[str, Any]]:
+    """Assignments in the shape the create/update endpoints have always returned"""
+    return [
+        {
+            'id': f"{schedule.id}-{day}-{shift}-{staff_id}",
+            'day': day,
+            'shift': shift,
+            'staff_id': str(staff_id),
+            'schedule_id': str(schedule.id),
+            'zone_id': zone_id
+        }
+        for (day, shift, staff_id), zone_id in desired.items()
+    ]
@@ -0,0 +1,211 @@
+# app/services/session_cache.py
+"""
+Short-lived cache of validated sessions.
+
+SecurityMiddleware validates the session on every authenticated request.
+Validated sessions are kept for a few seconds in an in-process LRU and,
+when Redis is available, in a shared Redis tier so other workers skip the
+database too. Revocations drop the entry locally, delete it from Redis and
+are broadcast over pub/sub so every worker forgets the session immediately.
+
+`last_used` is no longer written per request: touches are collected here
+and flushed to the database in one batch by a background task.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from ..core.config import get_settings
+from ..models import UserSession
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "session:valid:"
+REVOCATION_CHANNEL = "session:revocations"
+
+
+@dataclass(frozen=True)
+class CachedSession:
+    """The parts of a validated UserSession needed to authorize a request"""
+    session_id: uuid.UUID
+    user_id: uuid.UUID
+    expires_at: datetime
+
+    @property
+    def is_valid(self) -> bool:
+        return datetime.now(timezone.utc) < self.expires_at
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "session_id": str(self.session_id),
+            "user_id": str(self.user_id),
+            "expires_at": self.expires_at.isoformat(),
+        })
+
+    @classmethod
+    def from_json(cls, raw: Any) -> "CachedSession":
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        data = json.loads(raw)
+        return cls(
+            session_id=uuid.UUID(data["session_id"]),
+            user_id=uuid.UUID(data["user_id"]),
+            expires_at=datetime.fromisoformat(data["expires_at"]),
+        )
+
+    @classmethod
+    def from_session(cls, session: UserSession) -> "CachedSession":
+        expires_at = session.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return cls(session_id=session.id, user_id=session.user_id, expires_at=expires_at)
+
+
+class SessionValidationCache:
+    """LRU (+ optional Redis) cache of validated sessions keyed by token hash"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.SESSION_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.SESSION_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending_last_used: Dict[uuid.UUID, datetime] = {}
+        self._redis = None
+
+    # ==================== REDIS TIER ====================
+
+    def attach_redis(self, redis) -> None:
+        """Use a shared Redis client (redis.asyncio) as the second cache tier"""
+        self._redis = redis
+
+    async def listen_for_revocations(self) -> None:
+        """Drop sessions revoked by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._drop_local(data.decode("utf-8") if isinstance(data, bytes) else data)
+            except Exception as e:
+                logger.warning(f"Session revocation listener error: {e}")
+                # Whatever was cached may have missed revocations while disconnected
+                self._entries.clear()
+                await asyncio.sleep(5)
+
+    # ==================== LOOKUPS ====================
+
+    async def get(self, token_hash: str) -> Optional[CachedSession]:
+        """Return a cached valid session, or None on a miss"""
+        entry = self._entries.get(token_hash)
+        if entry is not None:
+            cached, stored_at = entry
+            if time.monotonic() - stored_at < self.ttl_seconds and cached.is_valid:
+                self._entries.move_to_end(token_hash)
+                return cached
+            self._entries.pop(token_hash, None)
+
+        if self._redis is None:
+            return None
+
+        try:
+            raw = await self._redis.get(REDIS_KEY_PREFIX + token_hash)
+        except Exception as e:
+            logger.debug(f"Session cache Redis lookup failed: {e}")
+            return None
+
+        if not raw:
+            return None
+
+        cached = CachedSession.from_json(raw)
+        if not cached.is_valid:
+            return None
+        self._store_local(token_hash, cached)
+        return cached
+
+    async def set(self, token_hash: str, cached: CachedSession) -> None:
+        """Remember a session that was just validated against the database"""
+        self._store_local(token_hash, cached)
+
+        if self._redis is None:
+            return
+
+        # Never keep an entry past the session's own expiry
+        ttl = min(self.ttl_seconds, int((cached.expires_at - datetime.now(timezone.utc)).total_seconds()))
+        if ttl <= 0:
+            return
+        try:
+            await self._redis.set(REDIS_KEY_PREFIX + token_hash, cached.to_json(), ex=ttl)
+        except Exception as e:
+            logger.debug(f"Session cache Redis write failed: {e}")
+
+    async def invalidate(self, token_hashes: Iterable[str]) -> None:
+        """Forget revoked sessions here, in Redis and in every other worker"""
+        token_hashes = list(token_hashes)
+        for token_hash in token_hashes:
+            self._drop_local(token_hash)
+
+        if self._redis is None or not token_hashes:
+            return
+
+        try:
+            await self._redis.delete(*[REDIS_KEY_PREFIX + h for h in token_hashes])
+            for token_hash in token_hashes:
+                await self._redis.publish(REVOCATION_CHANNEL, token_hash)
+        except Exception as e:
+            logger.warning(f"Session revocation broadcast failed: {e}")
+
+    def _store_local(self, token_hash: str, cached: CachedSession) -> None:
+        self._entries[token_hash] = (cached, time.monotonic())
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _drop_local(self, token_hash: str) -> None:
+        self._entries.pop(token_hash, None)
+
+    # ==================== LAST USED ====================
+
+    def touch(self, session_id: uuid.UUID) -> None:
+        """Record a use of the session; written by flush_last_used()"""
+        self._pending_last_used[session_id] = datetime.now(timezone.utc)
+
+    def flush_last_used(self, db: Session) -> int:
+        """Write all pending last_used timestamps in one batch"""
+        pending, self._pending_last_used = self._pending_last_used, {}
+        if not pending:
+            return 0
+
+        try:
+            db.execute(
+                update(UserSession),
+                [{"id": session_id, "last_used": last_used} for session_id, last_used in pending.items()]
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep newer touches recorded since the swap, retry the rest next time
+            for session_id, last_used in pending.items():
+                self._pending_last_used.setdefault(session_id, last_used)
+            raise
+
+        return len(pending)
+
+
+# Create a global instance
+session_cache = SessionValidationCache()
@@ -6,8 +6,10 @@ from sqlmodel import desc
 from typing import Optional, List
 import logging
 
-from ..models import UserSession, User, SecuritySettings
+from ..models import UserSession, User
 from ..core.config import get_settings
+from .session_cache import session_cache, CachedSession
+from .tenant_settings_cache import tenant_settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +37,7 @@ class SessionService:
         security_settings = None
         
         if user:
-            security_settings = self.db.exec(
-                select(SecuritySettings).where(SecuritySettings.tenant_id == user.tenant_id)
-            ).first()
+            security_settings = tenant_settings_cache.get_security_settings(self.db, user.tenant_id)
         
         # Determine session timeout
         timeout_minutes = security_settings.session_timeout_minutes if security_settings else 480
@@ -78,12 +78,14 @@ class SessionService:
         # Revoke oldest sessions if limit exceeded
         if len(active_sessions) >= max_sessions:
             sessions_to_revoke = active_sessions[max_sessions-1:]
+            revoked_hashes = [session.session_token_hash for session in sessions_to_revoke]
             for session in sessions_to_revoke:
                 session.is_active = False
                 session.revoked_at = datetime.now(timezone.utc)
                 session.revocation_reason = "session_limit_exceeded"
             
             self.db.commit()
+            await session_cache.invalidate(revoked_hashes)
             logger.info(f"Revoked {len(sessions_to_revoke)} sessions for user {user_id} (limit: {max_sessions})")
     
     async def validate_session(self, token: str) -> Optional[UserSession]:
@@ -97,12 +99,24 @@ class SessionService:
         if not session or not session.is_valid:
             return None
         
-        # Update last used timestamp
-        session.last_used = datetime.now(timezone.utc)
-        self.db.commit()
+        # last_used is written in batches by the session cache flush task
+        session_cache.touch(session.id)
+        await session_cache.set(token_hash, CachedSession.from_session(session))
         
         return session
     
+    async def validate_session_cached(self, token: str) -> Optional[CachedSession]:
+        """Validate a session, answering from the validation cache when possible"""
+        token_hash = self._hash_token(token)
+        
+        cached = await session_cache.get(token_hash)
+        if cached:
+            session_cache.touch(cached.session_id)
+            return cached
+        
+        session = await self.validate_session(token)
+        return CachedSession.from_session(session) if session else None
+    
     async def revoke_session(self, token: str) -> bool:
         """Revoke a specific session"""
         token_hash = self._hash_token(token)
@@ -121,6 +135,7 @@ class SessionService:
             session.revoked_at = datetime.now(timezone.utc)
             session.revocation_reason = "user_requested"
             self.db.commit()
+            await session_cache.invalidate([token_hash])
             
             logger.info(f"Revoked session for user {session.user_id}")
             return True
@@ -141,6 +156,8 @@ class SessionService:
         
         except_token_hash = self._hash_token(except_token) if except_token else None
         
+        revoked_hashes = []
+        
         for session in sessions:
             if except_token_hash and session.session_token_hash == except_token_hash:
                 continue  # Skip current session
@@ -148,33 +165,24 @@ class SessionService:
             session.is_active = False
             session.revoked_at = datetime.now(timezone.utc)
             session.revocation_reason = "all_sessions_revoked"
+            revoked_hashes.append(session.session_token_hash)
             revoked_count += 1
         
         self.db.commit()
+        await session_cache.invalidate(revoked_hashes)
         
         logger.info(f"Revoked {revoked_count} sessions for user {user_id}")
         return revoked_count
     
     async def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions (should be run periodically)"""
-        expired_sessions = self.db.exec(
-            select(UserSession).where(
-                and_(
-                    UserSession.is_active == True,
-                    UserSession.expires_at < datetime.now(timezone.utc)
-                )
-            )
-        ).all()
+        from .retention_service import RetentionService
         
-        for session in expired_sessions:
-            session.is_active = False
-            session.revoked_at = datetime.now(timezone.utc)
-            session.revocation_reason = "expired"
-        
-        self.db.commit()
+        # Chunked UPDATE in the database; sessions are not loaded into Python
+        expired = RetentionService(self.db).expire_sessions()
         
-        logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
-        return len(expired_sessions)
+        logger.info(f"Cleaned up {expired} expired sessions")
+        return expired
     
     async def get_user_sessions(self, user_id: uuid.UUID, active_only: bool = True) -> List[UserSession]:
         """Get all sessions for a user"""
@@ -773,7 +773,7 @@ from ..models import Schedule, ShiftAssignment, Staff, ScheduleConfig
 from ..schemas import ScheduleAnalytics, StaffUtilizationMetrics, WorkloadBalanceMetrics, CoverageMetrics
 
 class ScheduleAnalyticsService:
-    """Service for generating comprehensive schedule analytics"""
+    """Service for generating comprehensive schedule analytics (read-only; pass a get_read_db session)"""
     
     def __init__(self, db: Session):
         self.db = db
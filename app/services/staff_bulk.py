@@ -0,0 +1,375 @@
+# app/services/staff_bulk.py
+"""
+Set-based staff offboarding.
+
+deletion_impact() computes the StaffDeleteValidation of any number of staff
+members with a fixed set of grouped queries (invitations, future
+assignments, pending swaps, facility role coverage, unavailability, zone
+assignments), instead of seven or more count queries per person.
+Facility coverage warnings account for the whole batch: removing every
+supervisor of a facility at once is flagged even though each of them has
+colleagues outside the batch.
+
+deactivate_staff() and delete_staff() apply a batch with one UPDATE or
+DELETE per table, committed as a single transaction. These statements bypass ORM
+events, so the caches that rely on them (facility details, user snapshots)
+and schedule versions are updated explicitly.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import any_, bindparam, case, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, select
+
+from ..models import (
+    Facility,
+    Schedule,
+    ShiftAssignment,
+    Staff,
+    StaffInvitation,
+    StaffUnavailability,
+    SwapRequest,
+    SwapStatus,
+    User,
+    UserDevice,
+    UserProvider,
+    UserSession,
+    ZoneAssignment,
+)
+from ..schemas import StaffDeleteValidation
+from .facility_cache import facility_details_cache
+from .schedule_versions import bump_versions
+from .schedule_writes import describe_diff
+from .staff_timeline import sync_assignments
+from .user_cache import user_cache
+from .user_staff_mapping import mark_changed
+
+logger = logging.getLogger(__name__)
+
+PENDING_SWAP_STATUSES = [
+    SwapStatus.PENDING,
+    SwapStatus.MANAGER_APPROVED,
+    SwapStatus.POTENTIAL_ASSIGNMENT,
+    SwapStatus.STAFF_ACCEPTED,
+    SwapStatus.MANAGER_FINAL_APPROVAL,
+]
+
+
+def is_manager_role(role: str) -> bool:
+    return bool(role) and ("manager" in role.lower() or "supervisor" in role.lower())
+
+
+def any_of(db: Session, column, values) -> Any:
+    """column = ANY(:values) with one array parameter on PostgreSQL, IN elsewhere"""
+    values = list(values)
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(bindparam(None, values, type_=ARRAY(column.type)))
+    return column.in_(values)
+
+
+def _pending_swaps_filter(db: Session, staff_ids: List[uuid.UUID]):
+    return (
+        or_(
+            any_of(db, SwapRequest.requesting_staff_id, staff_ids),
+            any_of(db, SwapRequest.target_staff_id, staff_ids),
+            any_of(db, SwapRequest.assigned_staff_id, staff_ids),
+        ),
+        SwapRequest.status.in_(PENDING_SWAP_STATUSES),
+    )
+
+
+def load_tenant_staff(
+    db: Session, staff_ids: List[uuid.UUID], tenant_id: uuid.UUID
+) -> Tuple[List[Staff], List[uuid.UUID]]:
+    """The tenant's staff among staff_ids, and the ids that are not (missing or another tenant's)"""
+    staff_members = db.exec(
+        select(Staff).join(Facility).where(any_of(db, Staff.id, staff_ids), Facility.tenant_id == tenant_id)
+    ).all()
+    found = {staff.id for staff in staff_members}
+    return staff_members, [staff_id for staff_id in dict.fromkeys(staff_ids) if staff_id not in found]
+
+
+def deletion_impact(db: Session, staff_members: List[Staff]) -> Dict[uuid.UUID, StaffDeleteValidation]:
+    """StaffDeleteValidation for every staff member, from grouped queries over the whole batch"""
+    staff_ids = [staff.id for staff in staff_members]
+    if not staff_ids:
+        return {}
+    now = datetime.now(timezone.utc)
+    today = date.today()
+
+    invitations = {
+        staff_id: (total, pending or 0)
+        for staff_id, total, pending in db.exec(
+            select(
+                StaffInvitation.staff_id,
+                func.count(StaffInvitation.id),
+                func.sum(case((
+                    StaffInvitation.accepted_at.is_(None)
+                    & StaffInvitation.cancelled_at.is_(None)
+                    & (StaffInvitation.expires_at > now), 1
+                ), else_=0)),
+            )
+            .where(any_of(db, StaffInvitation.staff_id, staff_ids))
+            .group_by(StaffInvitation.staff_id)
+        ).all()
+    }
+
+    # One row per (staff, future schedule) gives both the counts and the blocking schedules
+    future_assignments: Dict[uuid.UUID, int] = defaultdict(int)
+    blocking: Dict[uuid.UUID, List[Dict[str, Any]]] = defaultdict(list)
+    for staff_id, schedule_id, week_start, facility_id, assignments in db.exec(
+        select(ShiftAssignment.staff_id, Schedule.id, Schedule.week_start, Schedule.facility_id, func.count(ShiftAssignment.id))
+        .join(Schedule, ShiftAssignment.schedule_id == Schedule.id)
+        .where(any_of(db, ShiftAssignment.staff_id, staff_ids), Schedule.week_start >= today)
+        .group_by(ShiftAssignment.staff_id, Schedule.id, Schedule.week_start, Schedule.facility_id)
+        .order_by(Schedule.week_start)
+    ).all():
+        future_assignments[staff_id] += assignments
+        blocking[staff_id].append({
+            "type": "schedule",
+            "id": str(schedule_id),
+            "name": f"Schedule for week {week_start}",
+            "facility_id": str(facility_id)
+        })
+
+    pending_swaps: Dict[uuid.UUID, int] = defaultdict(int)
+    batch = set(staff_ids)
+    for swap_staff in db.exec(
+        select(SwapRequest.requesting_staff_id, SwapRequest.target_staff_id, SwapRequest.assigned_staff_id)
+        .where(*_pending_swaps_filter(db, staff_ids))
+    ).all():
+        for staff_id in set(swap_staff) & batch:
+            pending_swaps[staff_id] += 1
+
+    # Active staff per (facility, role, skill level), minus the active members of the batch
+    coverage: Dict[tuple, int] = defaultdict(int)
+    for facility_id, role, skill_level, count in db.exec(
+        select(Staff.facility_id, Staff.role, Staff.skill_level, func.count(Staff.id))
+        .where(any_of(db, Staff.facility_id, {staff.facility_id for staff in staff_members}), Staff.is_active == True)
+        .group_by(Staff.facility_id, Staff.role, Staff.skill_level)
+    ).all():
+        coverage[(facility_id, role, skill_level)] += count
+    for staff in staff_members:
+        if staff.is_active:
+            coverage[(staff.facility_id, staff.role, staff.skill_level)] -= 1
+
+    remaining_roles: Dict[tuple, int] = defaultdict(int)
+    remaining_managers: Dict[uuid.UUID, int] = defaultdict(int)
+    for (facility_id, role, _), count in coverage.items():
+        remaining_roles[(facility_id, role)] += count
+        if is_manager_role(role):
+            remaining_managers[facility_id] += count
+
+    upcoming_unavailability = dict(db.exec(
+        select(StaffUnavailability.staff_id, func.count(StaffUnavailability.id))
+        .where(any_of(db, StaffUnavailability.staff_id, staff_ids), StaffUnavailability.end >= now)
+        .group_by(StaffUnavailability.staff_id)
+    ).all())
+    zone_assignments = dict(db.exec(
+        select(ZoneAssignment.staff_id, func.count(ZoneAssignment.id))
+        .where(any_of(db, ZoneAssignment.staff_id, staff_ids))
+        .group_by(ZoneAssignment.staff_id)
+    ).all())
+
+    results = {}
+    for staff in staff_members:
+        errors, warnings = [], []
+        total_invitations, pending_invitations = invitations.get(staff.id, (0, 0))
+        if pending_invitations > 0:
+            warnings.append(f"Staff member has {pending_invitations} pending invitation(s) that will be cancelled")
+        if total_invitations > 0:
+            warnings.append(f"Staff member has {total_invitations} invitation record(s) that will be deleted")
+        if future_assignments[staff.id] > 0:
+            errors.append(f"Staff member has {future_assignments[staff.id]} future shift assignments")
+        if pending_swaps[staff.id] > 0:
+            warnings.append(f"Staff member has {pending_swaps[staff.id]} pending swap requests")
+
+        is_manager = is_manager_role(staff.role)
+        if is_manager and remaining_managers[staff.facility_id] == 0:
+            warnings.append("This is the only manager/supervisor for this facility")
+        has_unique_skills = remaining_roles[(staff.facility_id, staff.role)] == 0
+        if has_unique_skills:
+            warnings.append(f"Staff member is the only one with role: {staff.role}")
+        if coverage[(staff.facility_id, staff.role, staff.skill_level)] == 0 and staff.skill_level and staff.skill_level > 3:
+            warnings.append(f"Staff member is the only {staff.role} with skill level {staff.skill_level}")
+
+        if upcoming_unavailability.get(staff.id, 0) > 0:
+            warnings.append(f"Staff member has {upcoming_unavailability[staff.id]} future unavailability records")
+        if zone_assignments.get(staff.id, 0) > 0:
+            warnings.append(f"Staff member has {zone_assignments[staff.id]} zone assignments")
+
+        results[staff.id] = StaffDeleteValidation(
+            can_delete=len(errors) == 0,
+            future_assignments_count=future_assignments[staff.id],
+            pending_swap_requests_count=pending_swaps[staff.id],
+            is_manager=is_manager,
+            has_unique_skills=has_unique_skills,
+            errors=errors,
+            warnings=warnings,
+            blocking_entities=blocking[staff.id]
+        )
+    return results
+
+
+def _associated_user_ids(db: Session, staff_members: List[Staff], tenant_id: uuid.UUID) -> List[uuid.UUID]:
+    emails = {staff.email.lower() for staff in staff_members if staff.email}
+    if not emails:
+        return []
+    return db.exec(
+        select(User.id).where(any_of(db, func.lower(User.email), emails), User.tenant_id == tenant_id)
+    ).all()
+
+
+def _cancel_pending_swaps(db: Session, staff_ids: List[uuid.UUID], actor_email: str) -> int:
+    return db.execute(
+        update(SwapRequest)
+        .where(*_pending_swaps_filter(db, staff_ids))
+        .values(
+            status=SwapStatus.CANCELLED,
+            manager_notes=f"Cancelled due to staff deletion by {actor_email}"
+        ),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+
+
+def _delete_dependencies(db: Session, staff_ids: List[uuid.UUID], cascade_assignments: bool) -> int:
+    """Remove zone assignments, future unavailability and optionally future shifts; returns schedules touched"""
+    changes = defaultdict(lambda: ([], [], []))  # schedule_id -> (added, removed, zone_changes)
+    removed_assignments = []
+    if cascade_assignments:
+        future_schedules = select(Schedule.id).where(Schedule.week_start >= date.today())
+        for assignment_id, schedule_id, day, shift, staff_id in db.exec(
+            select(ShiftAssignment.id, ShiftAssignment.schedule_id, ShiftAssignment.day, ShiftAssignment.shift, ShiftAssignment.staff_id)
+            .where(any_of(db, ShiftAssignment.staff_id, staff_ids), ShiftAssignment.schedule_id.in_(future_schedules))
+        ).all():
+            changes[schedule_id][1].append((day, shift, staff_id))
+            removed_assignments.append((assignment_id, staff_id))
+        db.execute(
+            delete(ShiftAssignment)
+            .where(any_of(db, ShiftAssignment.staff_id, staff_ids), ShiftAssignment.schedule_id.in_(future_schedules)),
+            execution_options={"synchronize_session": False}
+        )
+
+    for schedule_id, day, shift, staff_id in db.exec(
+        select(ZoneAssignment.schedule_id, ZoneAssignment.day, ZoneAssignment.shift, ZoneAssignment.staff_id)
+        .where(any_of(db, ZoneAssignment.staff_id, staff_ids))
+    ).all():
+        changes[schedule_id][2].append(((day, shift, staff_id), None))
+    db.execute(
+        delete(ZoneAssignment).where(any_of(db, ZoneAssignment.staff_id, staff_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.execute(
+        delete(StaffUnavailability)
+        .where(any_of(db, StaffUnavailability.staff_id, staff_ids), StaffUnavailability.end >= datetime.now(timezone.utc)),
+        execution_options={"synchronize_session": False}
+    )
+
+    # Keep schedule versions, ETags and timelines honest; the before_flush hook does not see Core statements
+    bump_versions(db, {schedule_id: describe_diff(*change) for schedule_id, change in changes.items()})
+    sync_assignments(db, added=[], removed=removed_assignments)
+    return len(changes)
+
+
+def deactivate_staff(
+    db: Session, staff_members: List[Staff], tenant_id: uuid.UUID, actor_email: str, cancel_swaps: bool = False
+) -> Dict[str, int]:
+    """Soft-delete a batch: staff and their user accounts inactive, pending invitations cancelled"""
+    staff_ids = [staff.id for staff in staff_members]
+    user_ids = _associated_user_ids(db, staff_members, tenant_id)
+    now = datetime.now(timezone.utc)
+
+    db.execute(
+        update(Staff).where(any_of(db, Staff.id, staff_ids)).values(is_active=False, updated_at=now),
+        execution_options={"synchronize_session": False}
+    )
+    if user_ids:
+        db.execute(
+            update(User).where(any_of(db, User.id, user_ids)).values(is_active=False),
+            execution_options={"synchronize_session": False}
+        )
+    cancelled_invitations = db.execute(
+        update(StaffInvitation)
+        .where(
+            any_of(db, StaffInvitation.staff_id, staff_ids),
+            StaffInvitation.accepted_at.is_(None),
+            StaffInvitation.cancelled_at.is_(None)
+        )
+        .values(cancelled_at=now),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    cancelled_swaps = _cancel_pending_swaps(db, staff_ids, actor_email) if cancel_swaps else 0
+
+    mark_changed(db, [staff.email for staff in staff_members])
+    db.commit()
+    _after_bulk_change(tenant_id, user_ids)
+    return {
+        "affected_count": len(staff_ids),
+        "deactivated_users_count": len(user_ids),
+        "cancelled_invitations_count": cancelled_invitations,
+        "cancelled_swaps_count": cancelled_swaps,
+        "reassigned_schedules_count": 0,
+    }
+
+
+def delete_staff(
+    db: Session,
+    staff_members: List[Staff],
+    tenant_id: uuid.UUID,
+    actor_email: str,
+    force: bool = False,
+    cascade_assignments: bool = False,
+) -> Dict[str, int]:
+    """Hard-delete a batch and its dependent rows; raises IntegrityError if past history still references it"""
+    staff_ids = [staff.id for staff in staff_members]
+    user_ids = _associated_user_ids(db, staff_members, tenant_id)
+
+    cancelled_invitations = db.execute(
+        delete(StaffInvitation).where(any_of(db, StaffInvitation.staff_id, staff_ids)),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+
+    cancelled_swaps = 0
+    reassigned_schedules = 0
+    if cascade_assignments or force:
+        cancelled_swaps = _cancel_pending_swaps(db, staff_ids, actor_email)
+        reassigned_schedules = _delete_dependencies(db, staff_ids, cascade_assignments)
+
+    if user_ids:
+        # Audit logs and notifications still reference the users, so they are deactivated, not deleted
+        for model in (UserSession, UserDevice, UserProvider):
+            db.execute(
+                delete(model).where(any_of(db, model.user_id, user_ids)),
+                execution_options={"synchronize_session": False}
+            )
+        db.execute(
+            update(User).where(any_of(db, User.id, user_ids)).values(is_active=False),
+            execution_options={"synchronize_session": False}
+        )
+
+    db.execute(
+        delete(Staff).where(any_of(db, Staff.id, staff_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    mark_changed(db, [staff.email for staff in staff_members])
+    db.commit()
+    _after_bulk_change(tenant_id, user_ids)
+    return {
+        "affected_count": len(staff_ids),
+        "deactivated_users_count": len(user_ids),
+        "cancelled_invitations_count": cancelled_invitations,
+        "cancelled_swaps_count": cancelled_swaps,
+        "reassigned_schedules_count": reassigned_schedules,
+    }
+
+
+def _after_bulk_change(tenant_id: uuid.UUID, user_ids: List[uuid.UUID]) -> None:
+    facility_details_cache.invalidate(tenant_id)
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    logger.info(f"Bulk staff change for tenant {tenant_id}: {len(user_ids)} user account(s) deactivated")
@@ -0,0 +1,247 @@
+# app/services/staff_import.py
+"""
+Streaming staff import for POST /import/staff.
+
+Files are read in chunks of STAFF_IMPORT_CHUNK_SIZE rows (pandas chunked
+CSV reader, openpyxl read-only mode for Excel), so memory stays flat
+whatever the size of the file. Each chunk is validated with vectorised
+pandas operations: required values, skill level and hours ranges, email
+and phone normalisation, facility lookup by id or name, duplicate emails
+within the file and, in one query per chunk, against the tenant's active
+staff.
+
+Valid rows are written per chunk with COPY on PostgreSQL (psycopg2) and a
+multi-row INSERT elsewhere, all in one transaction. Rows that fail are
+returned as a per-row error report instead of aborting the import.
+"""
+
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Set
+
+import pandas as pd
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import Facility, Staff
+from .facility_cache import facility_details_cache
+from .user_staff_mapping import mark_changed
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = {"full_name", "role", "skill_level", "facility_id"}
+OPTIONAL_COLUMNS = {"email", "phone", "weekly_hours_max"}
+STAFF_COLUMNS = ["id", "facility_id", "full_name", "email", "role", "skill_level",
+                 "weekly_hours_max", "phone", "is_active", "created_at"]
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+# Header row plus 1-based numbering, as shown in a spreadsheet
+FIRST_DATA_ROW = 2
+
+
+class StaffImportError(ValueError):
+    """The file cannot be imported at all (unreadable or missing columns)"""
+
+
+def read_chunks(file: BinaryIO, filename: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Rows of a CSV or Excel file as string DataFrames of at most chunk_size rows"""
+    try:
+        if filename.endswith(".csv"):
+            reader = pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_size)
+            for chunk in reader:
+                yield _normalise_headers(chunk)
+        else:
+            yield from _read_excel_chunks(file, chunk_size)
+    except StaffImportError:
+        raise
+    except Exception as e:
+        raise StaffImportError(f"Failed to parse file: {e}")
+
+
+def _read_excel_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = ["" if name is None else str(name) for name in header]
+
+        batch: List[List[str]] = []
+        for row in rows:
+            batch.append(["" if value is None else str(value) for value in row])
+            if len(batch) == chunk_size:
+                yield _normalise_headers(pd.DataFrame(batch, columns=columns))
+                batch = []
+        if batch:
+            yield _normalise_headers(pd.DataFrame(batch, columns=columns))
+    finally:
+        workbook.close()
+
+
+def _normalise_headers(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(column).strip().lower().replace(" ", "_") for column in df.columns]
+    return df
+
+
+def facility_lookup(db: Session, tenant_id: uuid.UUID) -> Dict[str, uuid.UUID]:
+    """Tenant facilities keyed by id and by lower-cased name"""
+    lookup: Dict[str, uuid.UUID] = {}
+    for facility_id, name in db.exec(select(Facility.id, Facility.name).where(Facility.tenant_id == tenant_id)).all():
+        lookup[name.strip().lower()] = facility_id
+        lookup[str(facility_id)] = facility_id
+    return lookup
+
+
+def existing_emails(db: Session, tenant_id: uuid.UUID, emails: List[str]) -> Set[str]:
+    """Emails (lower-cased) already used by the tenant's active staff"""
+    if not emails:
+        return set()
+    return set(db.exec(
+        select(func.lower(Staff.email)).join(Facility).where(
+            Facility.tenant_id == tenant_id,
+            Staff.is_active == True,
+            func.lower(Staff.email).in_(emails)
+        )
+    ).all())
+
+
+def validate_chunk(
+    db: Session,
+    df: pd.DataFrame,
+    tenant_id: uuid.UUID,
+    facilities: Dict[str, uuid.UUID],
+    seen_emails: Set[str],
+    first_row: int,
+) -> tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Normalised valid rows of a chunk and the errors of the others"""
+    for column in OPTIONAL_COLUMNS - set(df.columns):
+        df[column] = ""
+    text = {column: df[column].astype(str).str.strip() for column in REQUIRED_COLUMNS | OPTIONAL_COLUMNS}
+
+    email = text["email"].str.lower()
+    phone = text["phone"].str.replace(r"(?!^\+)[^\d]", "", regex=True)
+    facility_id = text["facility_id"].str.lower().map(facilities)
+    skill_level = pd.to_numeric(text["skill_level"].replace("", "1"), errors="coerce")
+    hours = pd.to_numeric(text["weekly_hours_max"].replace("", "40"), errors="coerce")
+
+    has_email = email != ""
+    in_file = (email.duplicated(keep="first") | email.isin(seen_emails)) & has_email
+    in_db = email.isin(existing_emails(db, tenant_id, email[has_email & ~in_file].unique().tolist()))
+
+    problems = pd.DataFrame({
+        "full_name is required": text["full_name"] == "",
+        "role is required": text["role"] == "",
+        "Unknown facility": facility_id.isna(),
+        "skill_level must be a whole number from 1 to 5": ~(skill_level.between(1, 5) & (skill_level % 1 == 0)),
+        "weekly_hours_max must be a whole number from 1 to 168": ~(hours.between(1, 168) & (hours % 1 == 0)),
+        "Invalid email format": has_email & ~email.str.match(EMAIL_PATTERN),
+        "Invalid phone number": (phone != "") & (phone.str.lstrip("+").str.len() < 7),
+        "Duplicate email in file": in_file,
+        "Email already belongs to an active staff member": in_db,
+    })
+    failed = problems.any(axis=1)
+    seen_emails.update(email[has_email & ~failed])
+
+    errors = [
+        {"row": first_row + position, "full_name": text["full_name"].iat[position], "errors": list(problems.columns[flags])}
+        for position, flags in enumerate(problems.to_numpy()) if flags.any()
+    ]
+
+    valid = pd.DataFrame({
+        "facility_id": facility_id,
+        "full_name": text["full_name"],
+        "email": email.where(has_email, None),
+        "role": text["role"],
+        "skill_level": skill_level,
+        "weekly_hours_max": hours,
+        "phone": phone.where(phone != "", None),
+    })[~failed]
+    return valid, errors
+
+
+def insert_staff_rows(db: Session, valid: pd.DataFrame) -> int:
+    """Insert validated rows with COPY on PostgreSQL, a multi-row INSERT elsewhere"""
+    if valid.empty:
+        return 0
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "facility_id": row.facility_id,
+            "full_name": row.full_name,
+            "email": row.email,
+            "role": row.role,
+            "skill_level": int(row.skill_level),
+            "weekly_hours_max": int(row.weekly_hours_max),
+            "phone": row.phone,
+            "is_active": True,
+            "created_at": now,
+        }
+        for row in valid.itertuples(index=False)
+    ]
+
+    if db.get_bind().dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # None is written unquoted and read back as NULL
+            writer.writerow([row[column] for column in STAFF_COLUMNS])
+        buffer.seek(0)
+        with db.connection().connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY staff ({', '.join(STAFF_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        db.execute(insert(Staff), rows)
+    # New staff may match existing user accounts
+    mark_changed(db, valid["email"].dropna())
+    return len(rows)
+
+
+def import_staff_file(
+    db: Session, file: BinaryIO, filename: str, tenant_id: uuid.UUID, dry_run: bool = False
+) -> Dict[str, Any]:
+    """Validate and insert a staff file chunk by chunk; returns counts and per-row errors"""
+    settings = get_settings()
+    facilities = facility_lookup(db, tenant_id)
+    seen_emails: Set[str] = set()
+    total_rows, valid_rows, error_count = 0, 0, 0
+    errors: List[Dict[str, Any]] = []
+
+    for chunk in read_chunks(file, filename, settings.STAFF_IMPORT_CHUNK_SIZE):
+        if total_rows == 0:
+            missing = REQUIRED_COLUMNS - set(chunk.columns)
+            if missing:
+                raise StaffImportError(f"Missing columns: {', '.join(sorted(missing))}")
+
+        valid, chunk_errors = validate_chunk(
+            db, chunk.reset_index(drop=True), tenant_id, facilities, seen_emails, FIRST_DATA_ROW + total_rows
+        )
+        total_rows += len(chunk)
+        error_count += len(chunk_errors)
+        errors.extend(chunk_errors[:max(0, settings.STAFF_IMPORT_MAX_REPORTED_ERRORS - len(errors))])
+        valid_rows += len(valid)
+        if not dry_run:
+            insert_staff_rows(db, valid)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        # COPY and Core inserts bypass the ORM events that invalidate facility details
+        facility_details_cache.invalidate(tenant_id)
+
+    logger.info(f"Staff import for tenant {tenant_id}: {valid_rows} of {total_rows} rows valid (dry_run={dry_run})")
+    return {
+        "total_rows": total_rows,
+        "added": 0 if dry_run else valid_rows,
+        "valid": valid_rows,
+        "error_count": error_count,
+        "errors": errors,
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,319 @@
+# app/services/staff_timeline.py
+"""
+Personal timeline read model for GET /staff/me/schedule and
+/staff/me/dashboard-stats.
+
+StaffTimelineEntry holds one dated row per ShiftAssignment (same id), so a
+staff member's shifts in any date range are one index range scan on
+(staff_id, shift_date) instead of a walk over every facility schedule of
+the period. Rows are written in the same transaction as the assignments
+they mirror: by apply_assignments for schedule saves, by the before_flush
+hook in schedule_history.py for ORM writes such as swap execution, and by
+bulk staff removal.
+
+Ranges are cached per staff member for STAFF_TIMELINE_CACHE_TTL_SECONDS
+and dropped when a commit changes that staff member's timeline; the
+staff ids are broadcast over Redis pub/sub so every worker drops them. Shift names and times come from the facility's FacilityShift
+definitions (cached in facility_details_cache), not from the rows, so
+editing a shift's hours never leaves the timeline stale.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session as ORMSession
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..core.replicas import is_replica_session
+from ..models import Schedule, StaffTimelineEntry
+from .cache_generations import CacheGenerations
+from .facility_cache import facility_details_cache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "staff_timeline:invalidations"
+
+# (assignment_id, schedule_id, day, shift, staff_id)
+AddedAssignment = Tuple[uuid.UUID, uuid.UUID, int, int, uuid.UUID]
+# (assignment_id, staff_id)
+RemovedAssignment = Tuple[uuid.UUID, uuid.UUID]
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# For facilities without shift definitions
+DEFAULT_SHIFTS = [
+    {"shift_name": "Morning", "start_time": "06:00", "end_time": "14:00"},
+    {"shift_name": "Afternoon", "start_time": "14:00", "end_time": "22:00"},
+    {"shift_name": "Evening", "start_time": "22:00", "end_time": "06:00"},
+]
+
+
+# ==================== WRITES ====================
+
+def sync_assignments(
+    db: Session,
+    added: List[AddedAssignment],
+    removed: List[RemovedAssignment],
+    schedules: Iterable[Schedule] = (),
+) -> None:
+    """
+    Mirror assignment inserts and deletes into the timeline; the caller commits.
+
+    An assignment changed in place (a swap) is removed and added under the
+    same id. `schedules` may supply Schedule objects that are not in the
+    database yet; the others are looked up.
+    """
+    if not added and not removed:
+        return
+
+    ids = [assignment_id for assignment_id, _ in removed] + [row[0] for row in added]
+    db.execute(
+        delete(StaffTimelineEntry).where(StaffTimelineEntry.id.in_(ids)),
+        execution_options={"synchronize_session": False}
+    )
+
+    if added:
+        weeks = {schedule.id: (schedule.facility_id, schedule.week_start) for schedule in schedules}
+        missing = {row[1] for row in added} - weeks.keys()
+        if missing:
+            weeks.update({
+                schedule_id: (facility_id, week_start)
+                for schedule_id, facility_id, week_start in db.execute(
+                    select(Schedule.id, Schedule.facility_id, Schedule.week_start).where(Schedule.id.in_(missing))
+                ).all()
+            })
+        db.execute(insert(StaffTimelineEntry), [
+            {
+                "id": assignment_id,
+                "staff_id": staff_id,
+                "shift_date": weeks[schedule_id][1] + timedelta(days=day),
+                "shift": shift,
+                "day": day,
+                "schedule_id": schedule_id,
+                "facility_id": weeks[schedule_id][0],
+            }
+            for assignment_id, schedule_id, day, shift, staff_id in added
+        ])
+
+    db.info.setdefault("changed_timeline_staff", set()).update(
+        itertools.chain((row[4] for row in added), (staff_id for _, staff_id in removed))
+    )
+
+
+# ==================== READS ====================
+
+def load_entries(db: Session, staff_id: uuid.UUID, start: date, end: date) -> List[Dict[str, Any]]:
+    """A staff member's timeline between start and end inclusive, in date and shift order"""
+    rows = db.execute(
+        select(
+            StaffTimelineEntry.id, StaffTimelineEntry.shift_date, StaffTimelineEntry.day,
+            StaffTimelineEntry.shift, StaffTimelineEntry.schedule_id, StaffTimelineEntry.facility_id
+        )
+        .where(
+            StaffTimelineEntry.staff_id == staff_id,
+            StaffTimelineEntry.shift_date >= start,
+            StaffTimelineEntry.shift_date <= end
+        )
+        .order_by(StaffTimelineEntry.shift_date, StaffTimelineEntry.shift)
+    ).all()
+    return [
+        {"assignment_id": row[0], "date": row[1], "day": row[2], "shift": row[3],
+         "schedule_id": row[4], "facility_id": row[5]}
+        for row in rows
+    ]
+
+
+class StaffTimelineCache:
+    """LRU of timeline ranges keyed by (staff_id, start, end)"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.STAFF_TIMELINE_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.STAFF_TIMELINE_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Tuple[uuid.UUID, date, date], tuple]" = OrderedDict()
+        self._keys_by_staff: Dict[uuid.UUID, Set[Tuple[uuid.UUID, date, date]]] = defaultdict(set)
+        self._generations = CacheGenerations()  # per staff member
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, staff_id: uuid.UUID, start: date, end: date) -> List[Dict[str, Any]]:
+        """Timeline entries of a range, reading the database only on a miss"""
+        key = (staff_id, start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+
+        if is_replica_session(db):
+            return load_entries(db, staff_id, start, end)
+
+        with self._lock:
+            token = self._generations.start(staff_id)
+        try:
+            entries = load_entries(db, staff_id, start, end)
+        except BaseException:
+            with self._lock:
+                self._generations.finish(staff_id, token)
+            raise
+        with self._lock:
+            if not self._generations.finish(staff_id, token):
+                return entries
+            self._entries[key] = (entries, time.monotonic())
+            self._entries.move_to_end(key)
+            self._keys_by_staff[staff_id].add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                keys = self._keys_by_staff.get(evicted[0])
+                if keys is not None:
+                    keys.discard(evicted)
+                    if not keys:
+                        del self._keys_by_staff[evicted[0]]
+        return entries
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self, staff_ids: Iterable[uuid.UUID], broadcast: bool = True) -> None:
+        """Forget these staff members' timelines here and, if Redis is attached, in every worker"""
+        staff_ids = set(staff_ids)
+        with self._lock:
+            for staff_id in staff_ids:
+                self._generations.bump(staff_id)
+                for key in self._keys_by_staff.pop(staff_id, ()):
+                    self._entries.pop(key, None)
+        if broadcast and staff_ids and self._redis is not None:
+            # One message per commit; a schedule save touches most of a facility's staff
+            self._schedule_publish(",".join(sorted(str(staff_id) for staff_id in staff_ids)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_staff.clear()
+            self._generations.bump_all()
+
+    def _apply_message(self, message: str) -> None:
+        self.invalidate((uuid.UUID(value) for value in message.split(",")), broadcast=False)
+
+    def _schedule_publish(self, message: str) -> None:
+        # Schedule writes are sync and run in the threadpool; the Redis client belongs to the loop
+        try:
+            asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str) -> None:
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Staff timeline invalidation broadcast failed: {e}")
+
+    # ==================== REDIS ====================
+
+    def attach_redis(self, redis) -> None:
+        """Broadcast invalidations through a shared Redis client (redis.asyncio)"""
+        self._redis = redis
+        self._loop = asyncio.get_running_loop()
+
+    async def listen_for_changes(self) -> None:
+        """Drop timelines changed by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._apply_message(data.decode("utf-8") if isinstance(data, bytes) else data)
+            except Exception as e:
+                logger.warning(f"Staff timeline invalidation listener error: {e}")
+                # Changes may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+
+# Create a global instance
+staff_timeline_cache = StaffTimelineCache()
+
+
+@event.listens_for(ORMSession, "after_commit")
+def _invalidate_changed_timelines(session) -> None:
+    staff_ids = session.info.pop("changed_timeline_staff", None)
+    if staff_ids:
+        staff_timeline_cache.invalidate(staff_ids)
+
+
+@event.listens_for(ORMSession, "after_rollback")
+def _discard_changed_timelines(session) -> None:
+    session.info.pop("changed_timeline_staff", None)
+
+
+def _shift_hours(start_time: str, end_time: str) -> float:
+    """Length of a shift in hours; shifts ending at or before they start run past midnight"""
+    try:
+        start = datetime.strptime(start_time, "%H:%M")
+        end = datetime.strptime(end_time, "%H:%M")
+    except (TypeError, ValueError):
+        return 8.0
+    hours = (end - start).total_seconds() / 3600
+    return hours if hours > 0 else hours + 24
+
+
+def shift_time_label(start_time: Optional[str], end_time: Optional[str]) -> str:
+    """Shift times as the staff app displays them, e.g. 7:00 AM - 3:00 PM"""
+    try:
+        start = datetime.strptime(start_time, "%H:%M")
+        end = datetime.strptime(end_time, "%H:%M")
+    except (TypeError, ValueError):
+        return "Unknown"
+    label = lambda moment: moment.strftime("%I:%M %p").lstrip("0")
+    return f"{label(start)} - {label(end)}"
+
+
+def facility_shift_definitions(db: Session, tenant_id: uuid.UUID, facility_id: uuid.UUID) -> Dict[int, Dict[str, Any]]:
+    """Shift index -> name, times and hours from the facility's active FacilityShift rows"""
+    facility = facility_details_cache.get_facility(db, tenant_id, facility_id)
+    shifts = (facility or {}).get("shifts") or DEFAULT_SHIFTS
+    return {
+        shift.get("shift_order", index): {
+            "shift_name": shift["shift_name"],
+            "start_time": shift["start_time"],
+            "end_time": shift["end_time"],
+            "hours": _shift_hours(shift["start_time"], shift["end_time"]),
+        }
+        for index, shift in enumerate(shifts)
+    }
+
+
+def personal_timeline(
+    db: Session, staff_id: uuid.UUID, tenant_id: uuid.UUID, start: date, end: date
+) -> List[Dict[str, Any]]:
+    """A staff member's dated shifts with their facility's real shift names and times"""
+    definitions: Dict[uuid.UUID, Dict[int, Dict[str, Any]]] = {}
+    timeline = []
+    for entry in staff_timeline_cache.get(db, staff_id, start, end):
+        facility_id = entry["facility_id"]
+        if facility_id not in definitions:
+            definitions[facility_id] = facility_shift_definitions(db, tenant_id, facility_id)
+        shift = definitions[facility_id].get(entry["shift"]) or {
+            "shift_name": "Unknown", "start_time": None, "end_time": None, "hours": 8.0
+        }
+        timeline.append({**entry, **shift})
+    return timeline
@@ -80,9 +80,7 @@ class SwapNotificationHandler:
         if not requesting_staff:
             return
         
-        requesting_user = self.db.exec(
-            select(User).where(User.email == requesting_staff.email)
-        ).first()
+        requesting_user = UserStaffMappingService(self.db).get_user_for_staff(requesting_staff)
         
         if not requesting_user:
             print(f" No user account found for staff {requesting_staff.email}")
@@ -0,0 +1,191 @@
+# app/services/tenant_settings_cache.py
+"""
+Per-tenant cache of SecuritySettings, SystemSettings and
+NotificationGlobalSettings.
+
+Logins read SecuritySettings and the settings endpoints read the other two
+(decrypting the Fernet fields of NotificationGlobalSettings) on every call,
+while the rows change a few times a year. Snapshots are kept per tenant for
+TENANT_SETTINGS_CACHE_TTL_SECONDS; notification settings are stored already
+decrypted.
+
+Any committed insert, update or delete of these models drops the tenant's
+entries in this process and is broadcast over Redis pub/sub so other
+workers drop theirs too. The TTL only bounds staleness if a broadcast is
+missed. A load that an invalidation of its tenant overtakes is returned
+but not stored.
+"""
+
+import asyncio
+import copy
+import itertools
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from ..core.config import get_settings
+from ..models import NotificationGlobalSettings, SecuritySettings, SystemSettings
+from .cache_generations import CacheGenerations
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "settings:invalidations"
+CACHED_MODELS = (SecuritySettings, SystemSettings, NotificationGlobalSettings)
+
+# Cached "no settings row" marker so tenants without settings don't query every time
+_MISSING = object()
+
+
+class TenantSettingsCache:
+    """Snapshots of tenant settings rows keyed by (model, tenant_id)"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_settings().TENANT_SETTINGS_CACHE_TTL_SECONDS
+        self._entries: Dict[Tuple[str, uuid.UUID], Tuple[Any, float]] = {}
+        self._generations = CacheGenerations()  # per tenant
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== LOOKUPS ====================
+
+    def get_security_settings(self, db: Session, tenant_id: uuid.UUID) -> Optional[SecuritySettings]:
+        return self._get(db, SecuritySettings, tenant_id)
+
+    def get_system_settings(self, db: Session, tenant_id: uuid.UUID) -> Optional[SystemSettings]:
+        return self._get(db, SystemSettings, tenant_id)
+
+    def get_notification_settings(self, db: Session, tenant_id: uuid.UUID) -> Optional[NotificationGlobalSettings]:
+        """Notification settings with sensitive fields already decrypted"""
+        return self._get(db, NotificationGlobalSettings, tenant_id, decrypt=True)
+
+    def _get(self, db: Session, model: Type, tenant_id: uuid.UUID, decrypt: bool = False):
+        """
+        Return a fresh, unattached instance built from the cached snapshot.
+        Callers that need to modify settings must load the row from `db`.
+        """
+        key = (model.__name__, tenant_id)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            self.hits += 1
+            data = entry[0]
+        else:
+            self.misses += 1
+            with self._lock:
+                token = self._generations.start(tenant_id)
+            try:
+                data = self._load(db, model, tenant_id, decrypt)
+            except BaseException:
+                with self._lock:
+                    self._generations.finish(tenant_id, token)
+                raise
+            with self._lock:
+                if self._generations.finish(tenant_id, token):
+                    self._entries[key] = (data, time.monotonic())
+
+        if data is _MISSING:
+            return None
+        return model(**copy.deepcopy(data))
+
+    @staticmethod
+    def _load(db: Session, model: Type, tenant_id: uuid.UUID, decrypt: bool):
+        row = db.exec(select(model).where(model.tenant_id == tenant_id)).first()
+        if row is None:
+            return _MISSING
+
+        data = {column.key: getattr(row, column.key) for column in model.__table__.columns}
+        if decrypt:
+            from ..core.encryption import ModelEncryption
+            data = ModelEncryption(model.__name__).decrypt_model_fields(data)
+        return data
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self, tenant_id: uuid.UUID, broadcast: bool = True) -> None:
+        """Forget a tenant's settings here and, if Redis is attached, in every worker"""
+        self._drop_local(tenant_id)
+        if broadcast and self._redis is not None:
+            self._schedule_publish(str(tenant_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.bump_all()
+
+    def _drop_local(self, tenant_id: uuid.UUID) -> None:
+        with self._lock:
+            self._generations.bump(tenant_id)
+            for model in CACHED_MODELS:
+                self._entries.pop((model.__name__, tenant_id), None)
+
+    def _schedule_publish(self, message: str) -> None:
+        # Settings endpoints are sync and run in the threadpool; the Redis client belongs to the loop
+        try:
+            asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str) -> None:
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Settings invalidation broadcast failed: {e}")
+
+    # ==================== REDIS ====================
+
+    def attach_redis(self, redis) -> None:
+        """Broadcast invalidations through a shared Redis client (redis.asyncio)"""
+        self._redis = redis
+        self._loop = asyncio.get_running_loop()
+
+    async def listen_for_changes(self) -> None:
+        """Drop settings changed by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._drop_local(uuid.UUID(data.decode("utf-8") if isinstance(data, bytes) else data))
+            except Exception as e:
+                logger.warning(f"Settings invalidation listener error: {e}")
+                # Changes may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+
+# Create a global instance
+tenant_settings_cache = TenantSettingsCache()
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_changed_tenants(session, flush_context) -> None:
+    """Remember which tenants' settings this transaction wrote"""
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, CACHED_MODELS) and obj.tenant_id:
+            session.info.setdefault("changed_settings_tenants", set()).add(obj.tenant_id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_changed_tenants(session) -> None:
+    for tenant_id in session.info.pop("changed_settings_tenants", ()):
+        tenant_settings_cache.invalidate(tenant_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_changed_tenants(session) -> None:
+    session.info.pop("changed_settings_tenants", None)
@@ -0,0 +1,198 @@
+# app/services/user_cache.py
+"""
+Request principal and short-lived user cache.
+
+SecurityMiddleware decodes the JWT and validates the session once per
+request, then stores a Principal on `request.state.principal`.
+`get_current_user` rebuilds the User from the principal's snapshot and
+attaches it to the endpoint's session without decoding the token again or
+querying the user table.
+
+User snapshots are cached for USER_CACHE_TTL_SECONDS and dropped as soon as
+a User row is updated or deleted through the ORM in this process. Once the
+write commits the user id is broadcast over Redis pub/sub, as session
+revocations are, so other workers stop serving the old role or tenant too.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as ORMSession, make_transient_to_detached, object_session
+from sqlmodel import Session
+
+from ..core.config import get_settings
+from ..models import User
+from .cache_generations import CacheGenerations
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "users:invalidations"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller of a request, resolved once by SecurityMiddleware"""
+    user_id: uuid.UUID
+    tenant_id: uuid.UUID
+    is_manager: bool
+    is_super_admin: bool
+    token_payload: Dict[str, Any] = field(default_factory=dict)
+    user_data: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def attach_user(self, db: Session) -> User:
+        """Return the principal's User as a persistent object in `db`, without a query"""
+        user = User(**self.user_data)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+class UserCache:
+    """LRU of User column snapshots keyed by user id"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.USER_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.USER_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[uuid.UUID, tuple]" = OrderedDict()
+        self._generations = CacheGenerations()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def snapshot(user: User) -> Dict[str, Any]:
+        """Column values of a User, enough to rebuild it without the database"""
+        return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+    def get(self, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            user_data, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                self._entries.pop(user_id, None)
+                return None
+
+            self._entries.move_to_end(user_id)
+            return user_data
+
+    def set(self, user_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._store(user_data)
+
+    def _store(self, user_data: Dict[str, Any]) -> None:
+        user_id = user_data["id"]
+        self._entries[user_id] = (user_data, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID, broadcast: bool = True) -> None:
+        """Forget a user here and, if Redis is attached, in every worker"""
+        with self._lock:
+            self._generations.bump(user_id)
+            self._entries.pop(user_id, None)
+        if broadcast and self._redis is not None:
+            self._schedule_publish(str(user_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.bump_all()
+
+    def _schedule_publish(self, message: str) -> None:
+        # User writes mostly commit in sync endpoints on the threadpool; the Redis client belongs to the loop
+        try:
+            asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str) -> None:
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"User invalidation broadcast failed: {e}")
+
+    # ==================== REDIS ====================
+
+    def attach_redis(self, redis) -> None:
+        """Broadcast invalidations through a shared Redis client (redis.asyncio)"""
+        self._redis = redis
+        self._loop = asyncio.get_running_loop()
+
+    async def listen_for_changes(self) -> None:
+        """Drop users changed by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self.invalidate(uuid.UUID(data.decode("utf-8") if isinstance(data, bytes) else data), broadcast=False)
+            except Exception as e:
+                logger.warning(f"User invalidation listener error: {e}")
+                # Whatever was cached may have missed changes while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+    def load(self, db: Session, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """Return the user's snapshot, reading the database only on a miss"""
+        user_data = self.get(user_id)
+        if user_data is not None:
+            return user_data
+
+        with self._lock:
+            token = self._generations.start(user_id)
+        try:
+            user = db.get(User, user_id)
+            user_data = self.snapshot(user) if user is not None else None
+        except BaseException:
+            with self._lock:
+                self._generations.finish(user_id, token)
+            raise
+
+        with self._lock:
+            if self._generations.finish(user_id, token) and user_data is not None:
+                self._store(user_data)
+        return user_data
+
+
+# Create a global instance
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    """Role, tenant or activation changes must not be served from the cache"""
+    user_cache.invalidate(target.id, broadcast=False)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(ORMSession, "after_commit")
+def _broadcast_changed_users(session) -> None:
+    # Dropped again here: a request may have cached the old row between flush and commit
+    for user_id in session.info.pop("changed_users", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(ORMSession, "after_rollback")
+def _discard_changed_users(session) -> None:
+    session.info.pop("changed_users", None)
@@ -1,56 +1,352 @@
-from typing import Optional
+# app/services/user_staff_mapping.py
+"""
+User <-> Staff identity mapping.
+
+A User and a Staff record are the same person when their emails match
+(case-insensitively) within a tenant. Staff-facing endpoints resolve "which
+Staff is this User" on nearly every request, and notifications resolve the
+reverse, so both directions are cached as id pairs for
+USER_STAFF_MAPPING_CACHE_TTL_SECONDS. The records themselves are then
+loaded by primary key in the caller's session.
+
+Entries are indexed by email and dropped when a commit in this process
+creates or deletes a Staff or User, or changes a staff member's email,
+facility or activation, or a user's email or tenant (accepting an
+invitation does both). Core statements bypass those ORM events, so bulk
+paths call mark_changed() before committing. Invalidations are broadcast
+over Redis pub/sub so every worker drops the same emails.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
 import uuid
-from sqlalchemy import func
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session as ORMSession
 from sqlmodel import Session, select
-from ..models import User, Staff
+
+from ..core.config import get_settings
+from ..core.replicas import is_replica_session
+from ..models import Facility, Staff, User
+from .cache_generations import CacheGenerations, Token
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user_staff_mapping:invalidations"
+
+# ("user", user_id) -> staff id, ("user", user_id, facility_id) -> staff id in that
+# facility, ("staff", staff_id) -> user id
+CacheKey = Tuple[Any, ...]
+
+# Attributes that decide which record an email maps to
+STAFF_IDENTITY_ATTRIBUTES = ("email", "facility_id", "is_active")
+USER_IDENTITY_ATTRIBUTES = ("email", "tenant_id")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else None
+
+
+class UserStaffMappingCache:
+    """LRU of user id <-> staff id pairs (None when there is no match), indexed by email"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        settings = get_settings()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.USER_STAFF_MAPPING_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.USER_STAFF_MAPPING_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[CacheKey, tuple]" = OrderedDict()
+        self._keys_by_email: Dict[str, Set[CacheKey]] = defaultdict(set)
+        self._generations = CacheGenerations()  # per email
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Tuple[bool, Optional[uuid.UUID]]:
+        """(found, mapped id); a found None means the record has no counterpart"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[2] >= self.ttl_seconds:
+                self.misses += 1
+                return False, None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def start_load(self, emails: Iterable[Optional[str]]) -> Dict[str, Token]:
+        """Tokens for a database read of these emails' mappings; pass them to finish_load()"""
+        with self._lock:
+            return {email: self._generations.start(email) for email in {normalize_email(e) or "" for e in emails}}
+
+    def finish_load(
+        self, tokens: Dict[str, Token], mappings: Iterable[Tuple[CacheKey, Optional[uuid.UUID], Optional[str]]]
+    ) -> None:
+        """Store (key, mapped id, email) results unless their email was invalidated during the read"""
+        with self._lock:
+            fresh = {email for email, token in tokens.items() if self._generations.finish(email, token)}
+            for key, mapped_id, email in mappings:
+                email = normalize_email(email) or ""
+                if email in fresh:
+                    self._store(key, mapped_id, email)
+
+    def _store(self, key: CacheKey, mapped_id: Optional[uuid.UUID], email: str) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._discard(key, previous[1])
+        self._entries[key] = (mapped_id, email, time.monotonic())
+        self._keys_by_email[email].add(key)
+        while len(self._entries) > self.max_entries:
+            evicted, (_, evicted_email, _) = self._entries.popitem(last=False)
+            self._discard(evicted, evicted_email)
+
+    def _discard(self, key: CacheKey, email: str) -> None:
+        keys = self._keys_by_email.get(email)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_email[email]
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate_emails(self, emails: Iterable[Optional[str]], broadcast: bool = True) -> None:
+        """Forget the mappings of these emails here and, if Redis is attached, in every worker"""
+        emails = {normalize_email(email) or "" for email in emails}
+        with self._lock:
+            for email in emails:
+                self._generations.bump(email)
+                for key in self._keys_by_email.pop(email, ()):
+                    self._entries.pop(key, None)
+        if broadcast and emails and self._redis is not None:
+            # Emails cannot contain newlines, so one message carries the whole commit
+            self._schedule_publish("\n".join(sorted(emails)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_email.clear()
+            self._generations.bump_all()
+
+    def _apply_message(self, message: str) -> None:
+        self.invalidate_emails(message.split("\n"), broadcast=False)
+
+    def _schedule_publish(self, message: str) -> None:
+        # Most commits happen in sync endpoints on the threadpool; the Redis client belongs to the loop
+        try:
+            asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str) -> None:
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"User-staff mapping invalidation broadcast failed: {e}")
+
+    # ==================== REDIS ====================
+
+    def attach_redis(self, redis) -> None:
+        """Broadcast invalidations through a shared Redis client (redis.asyncio)"""
+        self._redis = redis
+        self._loop = asyncio.get_running_loop()
+
+    async def listen_for_changes(self) -> None:
+        """Drop mappings changed by other workers; runs until cancelled"""
+        if self._redis is None:
+            return
+
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._apply_message(data.decode("utf-8") if isinstance(data, bytes) else data)
+            except Exception as e:
+                logger.warning(f"User-staff mapping invalidation listener error: {e}")
+                # Changes may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+
+# Create a global instance
+user_staff_mapping_cache = UserStaffMappingCache()
+
 
 class UserStaffMappingService:
     """Centralized service for reliable User-Staff ID mapping"""
-    
-    def __init__(self, db: Session):
+
+    def __init__(self, db: Session, cache: UserStaffMappingCache = user_staff_mapping_cache):
         self.db = db
-    
+        self.cache = cache
+
+    # ==================== IDS ====================
+
+    def staff_id_for_user(self, user: User, facility_id: Optional[uuid.UUID] = None) -> Optional[uuid.UUID]:
+        """
+        Id of the user's Staff record in their tenant, preferring an active one.
+
+        With facility_id, only the user's record in that facility; people
+        can have a record in several facilities of a tenant.
+        """
+        key = ("user", user.id) if facility_id is None else ("user", user.id, facility_id)
+        found, staff_id = self.cache.get(key)
+        if found:
+            return staff_id
+
+        email = normalize_email(user.email)
+        query = select(Staff.id).join(Facility).where(
+            func.lower(Staff.email) == email,
+            Facility.tenant_id == user.tenant_id
+        ).order_by(Staff.is_active.desc())
+        if facility_id is not None:
+            query = query.where(Staff.facility_id == facility_id)
+        tokens = {} if is_replica_session(self.db) else self.cache.start_load([email])
+        try:
+            staff_id = self.db.exec(query).first() if email else None
+        except BaseException:
+            self.cache.finish_load(tokens, ())
+            raise
+        self.cache.finish_load(tokens, [(key, staff_id, email)])
+        return staff_id
+
+    def user_ids_for_staff(self, staff_members: List[Staff]) -> Dict[uuid.UUID, Optional[uuid.UUID]]:
+        """Staff id -> id of the User with the same email in the staff member's tenant, in at most one query"""
+        user_ids: Dict[uuid.UUID, Optional[uuid.UUID]] = {}
+        missing: List[Staff] = []
+        for staff in staff_members:
+            found, user_id = self.cache.get(("staff", staff.id))
+            if found:
+                user_ids[staff.id] = user_id
+            else:
+                missing.append(staff)
+
+        if not missing:
+            return user_ids
+
+        emails = {normalize_email(staff.email) for staff in missing} - {None}
+        tokens = {} if is_replica_session(self.db) else self.cache.start_load(staff.email for staff in missing)
+        matches: Dict[Tuple[uuid.UUID, str], uuid.UUID] = {}
+        try:
+            if emails:
+                rows = self.db.exec(
+                    select(User.id, func.lower(User.email), Facility.id)
+                    .join(Facility, Facility.tenant_id == User.tenant_id)
+                    .where(
+                        func.lower(User.email).in_(emails),
+                        Facility.id.in_({staff.facility_id for staff in missing})
+                    )
+                ).all()
+                for user_id, email, facility_id in rows:
+                    matches.setdefault((facility_id, email), user_id)
+        except BaseException:
+            self.cache.finish_load(tokens, ())
+            raise
+
+        loaded = []
+        for staff in missing:
+            email = normalize_email(staff.email)
+            user_id = matches.get((staff.facility_id, email)) if email else None
+            loaded.append((("staff", staff.id), user_id, email))
+            user_ids[staff.id] = user_id
+        self.cache.finish_load(tokens, loaded)
+        return user_ids
+
+    # ==================== RECORDS ====================
+
+    def get_staff_for_user(self, user: User, facility_id: Optional[uuid.UUID] = None) -> Optional[Staff]:
+        staff_id = self.staff_id_for_user(user, facility_id)
+        return self.db.get(Staff, staff_id) if staff_id else None
+
+    def get_user_for_staff(self, staff: Staff) -> Optional[User]:
+        user_id = self.user_ids_for_staff([staff])[staff.id]
+        return self.db.get(User, user_id) if user_id else None
+
+    def get_users_for_staff(self, staff_members: List[Staff]) -> Dict[uuid.UUID, User]:
+        """Staff id -> User for the staff members that have an account, in at most two queries"""
+        user_ids = {staff_id: user_id for staff_id, user_id in self.user_ids_for_staff(staff_members).items() if user_id}
+        if not user_ids:
+            return {}
+        users = {user.id: user for user in self.db.exec(select(User).where(User.id.in_(set(user_ids.values())))).all()}
+        return {staff_id: users[user_id] for staff_id, user_id in user_ids.items() if user_id in users}
+
     def get_user_from_staff_id(self, staff_id: uuid.UUID) -> Optional[User]:
         """Get User record from Staff ID via email lookup"""
         staff = self.db.get(Staff, staff_id)
         if not staff:
             return None
-        
-        # Normalize email for lookup (strip whitespace, lowercase)
-        staff_email = staff.email.strip().lower() if staff.email else None
-        
-        user = self.db.exec(
-            select(User).where(func.lower(User.email) == staff_email)
-        ).first()
-        
-        return user
-    
+        return self.get_user_for_staff(staff)
+
     def get_staff_from_user_id(self, user_id: uuid.UUID) -> Optional[Staff]:
         """Get Staff record from User ID via email lookup"""
         user = self.db.get(User, user_id)
         if not user:
             return None
-        
-        # Normalize email for lookup
-        user_email = user.email.strip().lower()
-        
-        staff = self.db.exec(
-            select(Staff).where(func.lower(Staff.email) == user_email)
-        ).first()
-        
-        return staff
-    
+        return self.get_staff_for_user(user)
+
     def validate_user_staff_mapping(self, user_id: uuid.UUID, staff_id: uuid.UUID) -> bool:
         """Validate that a user_id and staff_id correspond to the same person"""
         user = self.db.get(User, user_id)
         staff = self.db.get(Staff, staff_id)
-        
+
         if not user or not staff:
             return False
-        
+
         # Compare normalized emails
         return (
-            user.email is not None and 
-            staff.email is not None and 
+            user.email is not None and
+            staff.email is not None and
             user.email.strip().lower() == staff.email.strip().lower()
-        )
\ No newline at end of file
+        )
+
+
+def mark_changed(db: Session, emails: Iterable[Optional[str]]) -> None:
+    """Drop the mappings of these emails when `db` commits; for writes that bypass the ORM"""
+    db.info.setdefault("changed_identity_emails", set()).update(normalize_email(email) for email in emails)
+
+
+# ==================== INVALIDATION ====================
+
+def _changed_emails(obj, attributes: Tuple[str, ...]) -> List[Optional[str]]:
+    """Old and new emails of an object whose identity attributes changed in this flush"""
+    state = inspect(obj)
+    if not any(state.attrs[attribute].history.has_changes() for attribute in attributes):
+        return []
+    return [obj.email, *state.attrs.email.history.deleted]
+
+
+@event.listens_for(ORMSession, "after_flush")
+def _collect_changed_identities(session, flush_context) -> None:
+    """Remember the emails whose user or staff record this transaction created, changed or deleted"""
+    emails: List[Optional[str]] = []
+    for obj in itertools.chain(session.new, session.deleted):
+        if isinstance(obj, (Staff, User)):
+            emails.append(obj.email)
+    for obj in session.dirty:
+        if isinstance(obj, Staff):
+            emails += _changed_emails(obj, STAFF_IDENTITY_ATTRIBUTES)
+        elif isinstance(obj, User):
+            emails += _changed_emails(obj, USER_IDENTITY_ATTRIBUTES)
+    if emails:
+        mark_changed(session, emails)
+
+
+@event.listens_for(ORMSession, "after_commit")
+def _invalidate_changed_identities(session) -> None:
+    emails = session.info.pop("changed_identity_emails", None)
+    if emails:
+        user_staff_mapping_cache.invalidate_emails(emails)
+
+
+@event.listens_for(ORMSession, "after_rollback")
+def _discard_changed_identities(session) -> None:
+    session.info.pop("changed_identity_emails", None)
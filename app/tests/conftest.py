@@ -0,0 +1,85 @@
+"""
+Shared fixtures for tests that run endpoints and services against SQLite.
+
+- engine: an in-memory database with every table. StaticPool keeps the one
+  connection, so TestClient's worker threads see what the test wrote.
+- make_user: principal stub for get_current_user with the attributes
+  endpoints read, without a User row.
+- make_client: TestClient over some routers with the database dependencies
+  bound to an engine and a given current user.
+"""
+
+import uuid
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.deps import get_async_db, get_current_user, get_db, get_read_db
+from app.services.facility_cache import facility_details_cache
+from app.services.staff_timeline import staff_timeline_cache
+from app.services.user_cache import user_cache
+from app.services.user_staff_mapping import user_staff_mapping_cache
+
+
+class StubUser:
+    """The User attributes endpoints read: id, tenant_id, email, is_manager"""
+
+    def __init__(self, tenant_id, email=None, is_manager=True):
+        self.id = uuid.uuid4()
+        self.tenant_id = tenant_id
+        self.email = email
+        self.is_manager = is_manager
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    # Process-wide caches must not serve rows of an earlier test's database
+    for cache in (facility_details_cache, staff_timeline_cache, user_cache, user_staff_mapping_cache):
+        cache.clear()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_user():
+    return StubUser
+
+
+@pytest.fixture
+def make_client(engine):
+    """
+    make_client(user, *routers, async_engine=None)
+
+    Routers are APIRouters or (router, prefix) pairs. get_db and get_read_db
+    use the `engine` fixture; get_async_db is overridden when an
+    `async_engine` is given.
+    """
+
+    def make_client(user, *routers, async_engine=None):
+        def override_db():
+            with Session(engine) as session:
+                yield session
+
+        app = FastAPI()
+        for router in routers:
+            router, prefix = (router, "") if isinstance(router, APIRouter) else router
+            app.include_router(router, prefix=prefix)
+        app.dependency_overrides[get_db] = override_db
+        app.dependency_overrides[get_read_db] = override_db
+        app.dependency_overrides[get_current_user] = lambda: user
+
+        if async_engine is not None:
+            async def override_async_db():
+                async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                    yield session
+
+            app.dependency_overrides[get_async_db] = override_async_db
+        return TestClient(app)
+
+    return make_client
@@ -0,0 +1,121 @@
+"""
+Unit tests for the AsyncSession read endpoints.
+"""
+
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.api.endpoints import staff as staff_endpoints
+from app.core.database import async_database_url, build_async_engine
+from app.models import Facility, Schedule, ShiftAssignment, Staff, SwapRequest
+from app.services import schedule_history  # noqa: F401 - registers the timeline hook
+
+WEEK = date(2026, 10, 12)
+
+
+@pytest.fixture
+def client_for(tmp_path, make_client, make_user):
+    """
+    Seed a SQLite file (aiosqlite cannot share the in-memory engine) and
+    return a factory of /staff/me clients reading it through AsyncSession.
+    """
+    path = tmp_path / "reads.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    tenant_id = uuid.uuid4()
+    with Session(engine) as db:
+        facility = Facility(tenant_id=tenant_id, name="Hotel")
+        me = Staff(facility_id=facility.id, full_name="Me", email="me@example.com", role="Chef")
+        other = Staff(facility_id=facility.id, full_name="Other", email="other@example.com", role="Chef")
+        schedules = [Schedule(facility_id=facility.id, week_start=WEEK - timedelta(days=7 * i)) for i in range(2)]
+        db.add_all([facility, me, other, *schedules])
+        for schedule in schedules:
+            db.add(ShiftAssignment(schedule_id=schedule.id, day=1, shift=0, staff_id=me.id))
+            db.add(ShiftAssignment(schedule_id=schedule.id, day=1, shift=1, staff_id=other.id))
+        db.add(SwapRequest(
+            schedule_id=schedules[0].id, requesting_staff_id=other.id, target_staff_id=me.id,
+            original_day=1, original_shift=1, swap_type="specific", reason="Appointment"
+        ))
+        db.commit()
+    engine.dispose()
+
+    async_engine = build_async_engine(f"sqlite:///{path}", name="test_async")
+    return lambda email="me@example.com": make_client(
+        make_user(tenant_id, email, is_manager=False), staff_endpoints.router, async_engine=async_engine
+    )
+
+
+class TestAsyncEngine:
+    """Test async driver selection"""
+
+    def test_async_database_url(self):
+        assert async_database_url("postgresql://u:p@db/app").drivername == "postgresql+asyncpg"
+        assert async_database_url("postgresql+psycopg2://u:p@db/app").drivername == "postgresql+asyncpg"
+        assert async_database_url("sqlite:///app.db").drivername == "sqlite+aiosqlite"
+
+    def test_async_engine_queries(self, tmp_path):
+        engine = build_async_engine(f"sqlite:///{tmp_path / 'async.db'}", name="test_async_engine")
+
+        async def run():
+            async with engine.connect() as conn:
+                value = (await conn.execute(text("SELECT 1"))).scalar()
+            await engine.dispose()
+            return value
+
+        assert asyncio.run(run()) == 1
+
+    def test_pgbouncer_mode_sets_timeout_per_transaction(self, monkeypatch):
+        import sqlalchemy.ext.asyncio
+
+        create_async_engine = sqlalchemy.ext.asyncio.create_async_engine
+        options = {}
+
+        def recording_create_async_engine(url, **kwargs):
+            options.update(kwargs)
+            return create_async_engine(url, **kwargs)
+
+        monkeypatch.setattr(sqlalchemy.ext.asyncio, "create_async_engine", recording_create_async_engine)
+        engine = build_async_engine(
+            "postgresql://u:p@db/app", name="test_pgbouncer", statement_timeout_ms=5000, pgbouncer_mode=True
+        )
+
+        statements = []
+
+        class _Connection:
+            def exec_driver_sql(self, statement):
+                statements.append(statement)
+
+        engine.sync_engine.dispatch.begin(_Connection())
+        assert "server_settings" not in options["connect_args"]
+        assert statements == ["SET LOCAL statement_timeout = 5000"]
+
+
+class TestStaffMeEndpoints:
+    """Test /staff/me reads through the async session"""
+
+    def test_my_schedule(self, client_for):
+        response = client_for().get("/staff/me/schedule", params={
+            "start_date": (WEEK - timedelta(days=7)).isoformat(),
+            "end_date": (WEEK + timedelta(days=6)).isoformat(),
+        })
+
+        assert response.status_code == 200
+        dates = [a["date"] for a in response.json()["assignments"]]
+        assert dates == [(WEEK - timedelta(days=6)).isoformat(), (WEEK + timedelta(days=1)).isoformat()]
+
+    def test_my_swap_requests(self, client_for):
+        swaps = client_for().get("/staff/me/swap-requests").json()
+
+        assert len(swaps) == 1
+        assert swaps[0]["user_role"] == "target"
+        assert swaps[0]["requesting_staff"]["full_name"] == "Other"
+        assert swaps[0]["target_staff"]["full_name"] == "Me"
+
+    def test_missing_profile(self, client_for):
+        assert client_for("nobody@example.com").get("/staff/me").status_code == 404
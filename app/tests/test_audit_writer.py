@@ -0,0 +1,85 @@
+"""
+Unit tests for the buffered audit log writer.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from sqlmodel import Session, create_engine, select
+
+from app.models import AuditEvent, AuditLog, User
+from app.services.audit_writer import AuditLogWriter
+
+
+def _row(severity="info", **overrides):
+    row = {
+        "id": uuid.uuid4(),
+        "tenant_id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "action": AuditEvent.SENSITIVE_DATA_ACCESSED.value,
+        "resource_type": "system",
+        "resource_id": None,
+        "changes": {},
+        "ip_address": "127.0.0.1",
+        "user_agent": None,
+        "created_at": datetime.now(timezone.utc),
+        "event_type": AuditEvent.SENSITIVE_DATA_ACCESSED,
+        "event_description": "test",
+        "severity": severity,
+        "request_id": None,
+        "details": {},
+    }
+    row.update(overrides)
+    return row
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    User.__table__.create(engine)
+    AuditLog.__table__.create(engine)
+    return engine
+
+
+class TestAuditLogWriter:
+    """Test buffering, backpressure and bulk writes"""
+
+    def test_flush_writes_in_batches(self, tmp_path):
+        engine = _engine(tmp_path)
+        writer = AuditLogWriter(batch_size=2, max_buffer=10, flush_interval=1, engine=engine)
+
+        async def run():
+            for _ in range(5):
+                await writer.enqueue(_row())
+            return await writer.flush()
+
+        assert asyncio.run(run()) == 5
+        assert len(writer) == 0
+        with Session(engine) as db:
+            assert len(db.exec(select(AuditLog)).all()) == 5
+
+    def test_full_buffer_drops_info_but_keeps_warnings(self, tmp_path):
+        engine = _engine(tmp_path)
+        writer = AuditLogWriter(batch_size=10, max_buffer=2, flush_interval=1, engine=engine)
+
+        async def run():
+            results = [await writer.enqueue(_row()) for _ in range(3)]
+            results.append(await writer.enqueue(_row(severity="warning")))
+            return results
+
+        assert asyncio.run(run()) == [True, True, False, True]
+        assert writer.dropped == 1
+        # The warning forced the two buffered rows out before being queued
+        assert writer.written == 2
+        assert len(writer) == 1
+
+    def test_rows_without_tenant_are_skipped(self, tmp_path):
+        engine = _engine(tmp_path)
+        writer = AuditLogWriter(batch_size=10, max_buffer=10, flush_interval=1, engine=engine)
+
+        async def run():
+            await writer.enqueue(_row(tenant_id=None))
+            await writer.enqueue(_row())
+            return await writer.flush()
+
+        assert asyncio.run(run()) == 1
@@ -0,0 +1,40 @@
+"""
+Unit tests for instrumented engine pools.
+"""
+
+import pytest
+from sqlalchemy import exc, text
+
+from app.core.database import InstrumentedQueuePool, build_engine, pool_metrics, render_pool_metrics
+
+
+class TestInstrumentedPool:
+    """Test pool sizing and checkout metrics"""
+
+    def test_counts_checkouts_and_timeouts(self, tmp_path):
+        engine = build_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", name="test_pool",
+            pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        stats = pool_metrics["test_pool"].stats()
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.05
+
+    def test_metrics_survive_dispose(self, tmp_path):
+        engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}", name="test_dispose", pool_size=2)
+        with engine.connect():
+            pass
+        engine.dispose()
+        with engine.connect():
+            pass
+
+        assert pool_metrics["test_dispose"].stats()["checkouts"] == 2
+        assert 'db_pool_checkouts_total{pool="test_dispose"} 2' in render_pool_metrics()
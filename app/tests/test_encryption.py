@@ -4,7 +4,9 @@ Unit tests for encryption utilities.
 
 import pytest
 import os
+import uuid
 from unittest.mock import patch, MagicMock
+from sqlmodel import Session, create_engine, select
 from app.core.encryption import (
     FieldEncryption, 
     ModelEncryption, 
@@ -13,9 +15,12 @@ from app.core.encryption import (
     is_field_encrypted,
     generate_encryption_key,
     verify_encryption_setup,
+    derive_key,
+    KeyRotation,
     SENSITIVE_FIELDS
 )
-from app.core.encryption_db import DatabaseEncryption, EncryptionMigration
+from app.core.encryption_db import DatabaseEncryption, EncryptionMigration, TableReEncryption
+from app.models import NotificationGlobalSettings
 
 class TestFieldEncryption:
     """Test field-level encryption functionality"""
@@ -158,6 +163,128 @@ class TestModelEncryption:
         assert encrypted_data["smtp_password"] == encrypted_password  # Unchanged
         assert encrypted_data["twilio_account_sid"] != test_data["twilio_account_sid"]  # Changed
 
+class TestBulkEncryption:
+    """Test cached keys, batch APIs and key rotation"""
+    
+    def test_derived_keys_are_cached(self):
+        derive_key.cache_clear()
+        FieldEncryption("cached_secret").encrypt("a")
+        FieldEncryption("cached_secret").encrypt("b")
+        
+        assert derive_key.cache_info().misses == 1
+        assert derive_key.cache_info().hits == 1
+    
+    def test_encrypt_many_roundtrip(self):
+        encryption = FieldEncryption("test_secret_key_123")
+        values = ["one", "", None, "three"]
+        
+        encrypted = encryption.encrypt_many(values)
+        
+        assert encrypted[1] == encrypted[2] == ""
+        assert encryption.decrypt(encrypted[0]) == "one"
+        assert encryption.decrypt_many(encrypted) == ["one", "", "", "three"]
+    
+    def test_decrypt_many_raises_on_bad_value(self):
+        encryption = FieldEncryption("test_secret_key_123")
+        
+        with pytest.raises(Exception):
+            encryption.decrypt_many([encryption.encrypt("ok"), "invalid_encrypted_data"])
+    
+    def test_old_keys_decrypt_and_rotate(self):
+        old = FieldEncryption("old_secret")
+        new = FieldEncryption("new_secret", old_keys=["old_secret"])
+        token = old.encrypt("value")
+        
+        assert new.decrypt(token) == "value"
+        assert not new.uses_current_key(token)
+        
+        rotated = new.rotate_many([token])[0]
+        assert new.uses_current_key(rotated)
+        assert FieldEncryption("new_secret").decrypt(rotated) == "value"
+    
+    def test_key_rotation(self):
+        rotation = KeyRotation("old_secret", "new_secret")
+        token = FieldEncryption("old_secret").encrypt("value")
+        
+        assert rotation.needs_rotation(token)
+        rotated = rotation.rotate_field(token)
+        assert not rotation.needs_rotation(rotated)
+        assert FieldEncryption("new_secret").decrypt(rotated) == "value"
+    
+    def test_key_rotation_with_encryption_keys(self, monkeypatch):
+        old_key, new_key = generate_encryption_key(), generate_encryption_key()
+        monkeypatch.setenv("ENCRYPTION_KEY", old_key)
+        token = FieldEncryption().encrypt("value")
+        rotation = KeyRotation(old_key, new_key)
+        
+        assert rotation.old_encryption.uses_current_key(token)
+        assert rotation.needs_rotation(token)
+        rotated = rotation.rotate_field(token)
+        assert not rotation.needs_rotation(rotated)
+        monkeypatch.setenv("ENCRYPTION_KEY", new_key)
+        assert FieldEncryption().decrypt(rotated) == "value"
+    
+    def test_decrypt_models_keeps_bad_values(self):
+        model_encryption = ModelEncryption("NotificationGlobalSettings")
+        encrypted = model_encryption.encrypt_models([
+            {"smtp_password": "first"}, {"smtp_password": "second"}
+        ])
+        encrypted.append({"smtp_password": "x" * 40})
+        
+        decrypted = model_encryption.decrypt_models(encrypted)
+        
+        assert [row["smtp_password"] for row in decrypted] == ["first", "second", "x" * 40]
+
+class TestTableReEncryption:
+    """Test chunked, resumable re-encryption of a table"""
+    
+    def _db(self):
+        engine = create_engine("sqlite://")
+        NotificationGlobalSettings.__table__.create(engine)
+        return Session(engine)
+    
+    def _settings(self, **values):
+        return NotificationGlobalSettings(tenant_id=uuid.uuid4(), **values)
+    
+    def test_encrypts_plaintext_in_batches(self):
+        db = self._db()
+        db.add_all([self._settings(smtp_password=f"password{i}") for i in range(5)] + [self._settings()])
+        db.commit()
+        
+        encryption = FieldEncryption("test_secret_key_123")
+        stats = TableReEncryption(db, batch_size=2, encryption=encryption).reencrypt_model(
+            NotificationGlobalSettings, ["smtp_password", "twilio_auth_token"]
+        )
+        
+        assert (stats["rows"], stats["encrypted"], stats["batches"]) == (6, 5, 3)
+        db.expire_all()
+        passwords = [s.smtp_password for s in db.exec(select(NotificationGlobalSettings)).all() if s.smtp_password]
+        assert sorted(encryption.decrypt_many(passwords)) == [f"password{i}" for i in range(5)]
+    
+    def test_rotation_resumes_from_checkpoint(self, tmp_path):
+        old = FieldEncryption("old_secret")
+        db = self._db()
+        rows = [self._settings(smtp_password=old.encrypt(f"password{i}")) for i in range(4)]
+        db.add_all(rows)
+        db.commit()
+        
+        ordered_ids = sorted(row.id for row in rows)
+        checkpoint = tmp_path / "checkpoint.json"
+        checkpoint.write_text(
+            f'{{"NotificationGlobalSettings": {{"last_id": "{ordered_ids[1]}", "done": false}}}}'
+        )
+        
+        new = FieldEncryption("new_secret", old_keys=["old_secret"])
+        results = TableReEncryption(
+            db, rotate=True, batch_size=10, checkpoint_path=str(checkpoint), encryption=new
+        ).run(["NotificationGlobalSettings"])
+        
+        assert results["NotificationGlobalSettings"]["rotated"] == 2
+        assert not checkpoint.exists()
+        db.expire_all()
+        rotated = {s.id: new.uses_current_key(s.smtp_password) for s in db.exec(select(NotificationGlobalSettings)).all()}
+        assert [rotated[row_id] for row_id in ordered_ids] == [False, False, True, True]
+
 class TestConvenienceFunctions:
     """Test convenience functions"""
     
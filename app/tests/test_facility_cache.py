@@ -0,0 +1,113 @@
+"""
+Unit tests for batched, cached facility details.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.api.endpoints import facility as facility_endpoints
+from app.models import Facility, FacilityRole, FacilityShift, FacilityZone, Staff
+from app.services.facility_cache import FacilityDetailsCache, load_facility_details
+
+
+def _seed(engine, facility_count=3):
+    tenant_id = uuid.uuid4()
+    with Session(engine) as db:
+        for i in range(facility_count):
+            facility = Facility(tenant_id=tenant_id, name=f"Hotel {i}")
+            db.add(facility)
+            db.add(FacilityShift(facility_id=facility.id, shift_name="Day", start_time="07:00", end_time="15:00"))
+            db.add(FacilityRole(facility_id=facility.id, role_name="Chef"))
+            db.add(FacilityZone(facility_id=facility.id, zone_id="kitchen", zone_name="Kitchen"))
+            db.add(Staff(facility_id=facility.id, full_name=f"Staff {i}", role="Chef"))
+        db.commit()
+    return tenant_id
+
+
+def _count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestLoadFacilityDetails:
+    """Test batched loading"""
+
+    @pytest.mark.parametrize("facility_count", [1, 10])
+    def test_query_count_independent_of_facilities(self, engine, facility_count):
+        tenant_id = _seed(engine, facility_count)
+        statements = _count_queries(engine)
+        with Session(engine) as db:
+            details = load_facility_details(db, tenant_id)
+
+        assert len(details) == facility_count
+        assert len(statements) == 6
+
+    def test_details_grouped_per_facility(self, engine):
+        tenant_id = _seed(engine, 2)
+        with Session(engine) as db:
+            details = load_facility_details(db, tenant_id)
+
+        for facility in details:
+            assert [s["shift_name"] for s in facility["shifts"]] == ["Day"]
+            assert [z["zone_id"] for z in facility["zones"]] == ["kitchen"]
+            assert facility["staff_count"] == 1
+            assert facility["active_schedules"] == 0
+
+
+class TestFacilityDetailsCache:
+    """Test cache hits and invalidation"""
+
+    def test_hit_runs_no_queries(self, engine):
+        tenant_id = _seed(engine)
+        cache = FacilityDetailsCache(ttl_seconds=60)
+        with Session(engine) as db:
+            cache.get_tenant_facilities(db, tenant_id)
+            statements = _count_queries(engine)
+            details = cache.get_tenant_facilities(db, tenant_id)
+
+        assert statements == []
+        assert cache.hits == 1
+        details[0]["shifts"].clear()
+        with Session(engine) as db:
+            assert cache.get_tenant_facilities(db, tenant_id)[0]["shifts"]
+
+    def test_child_write_invalidates(self, engine, make_client, make_user):
+        tenant_id = _seed(engine)
+        client = make_client(make_user(tenant_id), facility_endpoints.router)
+        facility = client.get("/facilities/").json()[0]
+
+        with Session(engine) as db:
+            db.add(FacilityShift(
+                facility_id=uuid.UUID(facility["id"]), shift_name="Night", start_time="23:00", end_time="07:00", shift_order=1
+            ))
+            db.commit()
+
+        refreshed = client.get(f"/facilities/{facility['id']}").json()
+        assert [s["shift_name"] for s in refreshed["shifts"]] == ["Day", "Night"]
+
+    def test_facility_broadcast_reaches_other_workers(self, engine):
+        tenant_id = _seed(engine)
+        writer, reader = FacilityDetailsCache(ttl_seconds=60), FacilityDetailsCache(ttl_seconds=60)
+        published = []
+        writer._redis = object()
+        writer._schedule_publish = published.append
+        with Session(engine) as db:
+            facility_id = reader.get_tenant_facilities(db, tenant_id)[0]["id"]
+
+        writer.invalidate_facility(facility_id)
+        reader._apply_message(published[0])
+
+        assert published == [f"facility:{facility_id}"]
+        assert reader._entries == {}
+
+    def test_other_tenant_gets_404(self, engine, make_client, make_user):
+        tenant_id = _seed(engine)
+        client = make_client(make_user(uuid.uuid4()), facility_endpoints.router)
+        with Session(engine) as db:
+            facility_id = load_facility_details(db, tenant_id)[0]["id"]
+
+        assert client.get(f"/facilities/{facility_id}").status_code in (403, 404)
@@ -0,0 +1,113 @@
+"""
+Unit tests for counter-backed account lockout.
+"""
+
+import asyncio
+
+from sqlmodel import Session, create_engine, func, select
+
+from app.models import AccountLockout, LoginAttempt
+from app.services import account_lockout_service, lockout_counters
+from app.services.account_lockout_service import AccountLockoutService
+from app.services.lockout_counters import InMemoryLockoutBackend, LoginAttemptLog
+
+
+class _NoQuerySession:
+    """Fails the test if the service touches the database"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"database used: {name}")
+
+
+class TestInMemoryLockoutBackend:
+    """Test failure windows and locks"""
+
+    def test_window_counts_and_lock(self):
+        backend = InMemoryLockoutBackend(max_keys=10)
+
+        async def run():
+            counts = [await backend.record_failure("a@example.com", 60) for _ in range(3)]
+            await backend.lock("a@example.com", 60)
+            locked = await backend.is_locked("a@example.com")
+            await backend.clear("a@example.com")
+            return counts, locked, await backend.is_locked("a@example.com")
+
+        assert asyncio.run(run()) == ([1, 2, 3], True, False)
+
+    def test_expired_and_excess_locks_pruned(self):
+        backend = InMemoryLockoutBackend(max_keys=2)
+
+        async def run():
+            await backend.lock("expired@example.com", 0)
+            for name in ("a", "b", "c"):
+                await backend.lock(f"{name}@example.com", 60)
+            return list(backend._locks), await backend.clear("c@example.com"), await backend.clear("c@example.com")
+
+        assert asyncio.run(run()) == (["b@example.com", "c@example.com"], True, False)
+
+
+class TestCounterBackedLockoutService:
+    """Test that login rejects stay off the database"""
+
+    def test_lock_after_max_attempts_without_database(self, monkeypatch):
+        backend = InMemoryLockoutBackend(max_keys=10)
+        log = LoginAttemptLog(sample_rate=1.0)
+        monkeypatch.setattr(account_lockout_service, "get_lockout_backend", lambda: backend)
+        monkeypatch.setattr(account_lockout_service, "login_attempt_log", log)
+        service = AccountLockoutService(_NoQuerySession())
+
+        async def run():
+            for _ in range(5):
+                await service.record_failed_attempt("A@example.com", "10.0.0.1", user=None)
+            return await service.is_account_locked("a@example.com")
+
+        assert asyncio.run(run())
+        assert len(log._attempts) == 5
+        assert log._lockouts["a@example.com"]["failed_attempts"] == 5
+
+
+    def test_unlock_recorded_only_for_active_lock(self, monkeypatch):
+        backend = InMemoryLockoutBackend(max_keys=10)
+        log = LoginAttemptLog(sample_rate=1.0)
+        monkeypatch.setattr(account_lockout_service, "get_lockout_backend", lambda: backend)
+        monkeypatch.setattr(account_lockout_service, "login_attempt_log", log)
+        service = AccountLockoutService(_NoQuerySession())
+
+        asyncio.run(service.clear_failed_attempts("a@example.com"))
+        assert log._lockouts == {}
+
+        asyncio.run(backend.lock("a@example.com", 60))
+        asyncio.run(service.clear_failed_attempts("a@example.com"))
+        assert log._lockouts == {"a@example.com": None}
+        assert backend._locks == {}
+
+
+class TestLoginAttemptLog:
+    """Test batched persistence"""
+
+    def test_flush_writes_attempts_and_lockouts(self):
+        engine = create_engine("sqlite://")
+        LoginAttempt.__table__.create(engine)
+        AccountLockout.__table__.create(engine)
+        log = LoginAttemptLog(sample_rate=1.0)
+
+        log.record_attempt("a@example.com", "10.0.0.1", success=False)
+        log.record_attempt("a@example.com", "10.0.0.1", success=False)
+        log.record_lockout("a@example.com", failed_attempts=2, lockout_minutes=30)
+
+        with Session(engine) as db:
+            assert log.flush(db) == 3
+            assert log.flush(db) == 0
+            assert db.exec(select(func.count()).select_from(LoginAttempt)).one() == 2
+            assert db.exec(select(AccountLockout)).one().is_active
+
+            log.record_unlock("a@example.com")
+            log.flush(db)
+            db.expire_all()
+            assert not db.exec(select(AccountLockout)).one().is_active
+
+    def test_sampling(self):
+        log = LoginAttemptLog(sample_rate=0.0)
+        log.record_attempt("a@example.com", "10.0.0.1", success=False)
+        assert log._attempts == []
+        assert lockout_counters.get_lockout_backend() is None
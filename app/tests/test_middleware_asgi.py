@@ -0,0 +1,61 @@
+"""
+Unit tests for the ASGI security and rate limit middleware.
+"""
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.path_matching import compile_path_matcher
+from app.middleware.rate_limit_middleware import CustomRateLimitMiddleware
+from app.middleware.security_middleware import SecurityMiddleware
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    app.add_middleware(SecurityMiddleware)
+    app.add_middleware(CustomRateLimitMiddleware)
+    return TestClient(app)
+
+
+class TestPathMatcher:
+    """Test the precompiled path matcher"""
+
+    def test_exact_and_prefix(self):
+        matches = compile_path_matcher(exact=["/docs"], prefixes=["/static", "/v1/invitations/verify/"])
+
+        assert matches("/docs")
+        assert not matches("/docs/extra")
+        assert matches("/static/app.js")
+        assert matches("/v1/invitations/verify/abc")
+        assert not matches("/v1/staff")
+
+    def test_empty_matcher(self):
+        assert not compile_path_matcher()("/anything")
+
+
+class TestMiddlewareStack:
+    """Test responses passing through both middlewares"""
+
+    def test_rate_limit_headers_added(self):
+        response = _client().get("/stream")
+
+        assert response.status_code == 200
+        assert response.text == "abc"
+        assert response.headers["X-Rate-Limit-Limit"] == "500"
+        assert response.headers["X-Rate-Limit-Window"] == "3600"
+
+    def test_exempt_path_has_no_rate_limit_headers(self):
+        response = _client().get("/health")
+
+        assert response.status_code == 200
+        assert "X-Rate-Limit-Limit" not in response.headers
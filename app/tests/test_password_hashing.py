@@ -0,0 +1,77 @@
+"""
+Unit tests for off-loop password hashing.
+"""
+
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.core.password_hashing import PasswordHasher, concurrency_for_memory_budget
+
+
+def _context(rounds=1, memory_cost=1024):
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=rounds,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=1,
+    )
+
+
+class TestPasswordHasher:
+    """Test hashing, verification and rehash on login"""
+
+    def test_hash_and_verify(self):
+        hasher = PasswordHasher(context=_context(), max_concurrency=2)
+
+        async def run():
+            hashed = await hasher.hash("Secret123!")
+            return await hasher.verify("Secret123!", hashed), await hasher.verify("wrong", hashed)
+
+        assert asyncio.run(run()) == (True, False)
+        assert hasher.stats()["completed"] == 3
+        hasher.shutdown()
+
+    def test_outdated_parameters_are_rehashed(self):
+        old_hash = _context(rounds=1).hash("Secret123!")
+        hasher = PasswordHasher(context=_context(rounds=2), max_concurrency=1)
+
+        valid, new_hash = asyncio.run(hasher.verify_and_update("Secret123!", old_hash))
+
+        assert valid
+        assert new_hash and "t=2" in new_hash
+        assert asyncio.run(hasher.verify_and_update("Secret123!", new_hash)) == (True, None)
+        assert hasher.rehashed == 1
+        hasher.shutdown()
+
+    def test_concurrency_is_bounded(self):
+        hasher = PasswordHasher(context=_context(), max_concurrency=2)
+        peak = 0
+
+        async def run():
+            nonlocal peak
+
+            async def watch():
+                nonlocal peak
+                while True:
+                    peak = max(peak, hasher.in_flight)
+                    await asyncio.sleep(0)
+
+            watcher = asyncio.create_task(watch())
+            await asyncio.gather(*(hasher.hash(f"pw-{i}") for i in range(8)))
+            watcher.cancel()
+
+        asyncio.run(run())
+        assert peak <= 2
+        assert hasher.stats()["completed"] == 8
+        hasher.shutdown()
+
+
+class TestConcurrencyForMemoryBudget:
+    """Test pool sizing from Argon2 memory cost"""
+
+    def test_budget_limits_concurrency(self):
+        assert concurrency_for_memory_budget(65536, 256, 8) == 4
+        assert concurrency_for_memory_budget(65536, 32, 8) == 1
+        assert concurrency_for_memory_budget(1024, 256, 8) == 8
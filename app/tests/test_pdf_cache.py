@@ -0,0 +1,139 @@
+"""
+Unit tests for the content-addressed schedule PDF cache.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import date
+
+import pytest
+from sqlmodel import Session
+
+from app.api.endpoints import schedule as schedule_endpoints
+from app.core.config import get_settings
+from app.models import Facility, Schedule
+from app.services.pdf_cache import SchedulePDFCache
+
+
+def _inputs(**overrides):
+    data = {
+        "week_start": "2025-01-06",
+        "assignments": [
+            {"staff_id": "s1", "day": 0, "shift": 0, "zone_id": "bar", "id": "a1"},
+            {"staff_id": "s2", "day": 1, "shift": 2, "zone_id": None, "id": "a2"},
+        ],
+        "staff": [{"id": "s1", "full_name": "Ann", "role": "Bartender"}],
+        "facility": {"name": "Hotel", "facility_type": "hotel"},
+        "shifts": [{"shift_index": 0, "shift_name": "Morning", "start_time": "07:00", "end_time": "15:00"}],
+        "zones": [{"id": "z1", "zone_id": "bar", "zone_name": "Bar"}],
+        "template_version": "v1",
+    }
+    data.update(overrides)
+    return data
+
+
+class TestCacheKey:
+    """Test cache key computation"""
+
+    def test_key_is_stable_across_row_order(self):
+        """Same schedule in a different row order maps to the same PDF"""
+        inputs = _inputs()
+        reordered = _inputs(assignments=list(reversed(inputs["assignments"])))
+
+        assert SchedulePDFCache.compute_key(**inputs) == SchedulePDFCache.compute_key(**reordered)
+
+    def test_key_changes_with_content(self):
+        """Any change to assignments or template produces a new key"""
+        base = SchedulePDFCache.compute_key(**_inputs())
+        moved = _inputs()
+        moved["assignments"][0]["shift"] = 1
+
+        assert SchedulePDFCache.compute_key(**moved) != base
+        assert SchedulePDFCache.compute_key(**_inputs(template_version="v2")) != base
+        assert SchedulePDFCache.is_valid_key(base)
+
+
+class TestCacheStorage:
+    """Test storing, serving and evicting cached PDFs"""
+
+    def test_put_get_roundtrip(self, tmp_path):
+        cache = SchedulePDFCache(cache_dir=str(tmp_path), max_bytes=0, max_age_days=0)
+        key = SchedulePDFCache.compute_key(**_inputs())
+
+        assert cache.get(key) is None
+        url = cache.put(key, b"%PDF-1.4 data")
+
+        assert url == f"/v1/schedule/pdf/{key}"
+        assert cache.get(key) == url
+        assert cache.read(key) == b"%PDF-1.4 data"
+
+    def test_tenant_recorded_and_evicted_with_pdf(self, tmp_path):
+        cache = SchedulePDFCache(cache_dir=str(tmp_path), max_bytes=1, max_age_days=0)
+        key = SchedulePDFCache.compute_key(**_inputs())
+        tenant_id = uuid.uuid4()
+
+        cache.put(key, b"%PDF-1.4 data", tenant_id=tenant_id)
+        cache.put(key, b"%PDF-1.4 data", tenant_id=tenant_id)
+        assert cache.tenants_for(key) == {str(tenant_id)}
+
+        cache.evict()
+        assert cache.tenants_for(key) == set()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_download_by_key_is_tenant_scoped(self, tmp_path, monkeypatch, make_client, make_user):
+        monkeypatch.setattr(get_settings(), "PDF_CACHE_DIR", str(tmp_path))
+        owner, other = uuid.uuid4(), uuid.uuid4()
+        key = SchedulePDFCache.compute_key(**_inputs())
+        SchedulePDFCache().put(key, b"%PDF-1.4 data", tenant_id=owner)
+
+        statuses = [
+            make_client(make_user(tenant_id), (schedule_endpoints.router, "/schedule")).get(f"/schedule/pdf/{key}").status_code
+            for tenant_id in (owner, other)
+        ]
+
+        assert statuses == [200, 404]
+
+    def test_cache_hit_grants_the_calling_tenant(self, tmp_path, monkeypatch, engine):
+        monkeypatch.setattr(get_settings(), "PDF_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(get_settings(), "PDF_RENDERER", "reportlab")
+        week = date(2026, 10, 12)
+        with Session(engine) as db:
+            # Two tenants whose empty weeks render identically
+            facilities = [Facility(tenant_id=uuid.uuid4(), name="Hotel") for _ in range(2)]
+            schedules = [Schedule(facility_id=facility.id, week_start=week) for facility in facilities]
+            db.add_all([*facilities, *schedules])
+            db.commit()
+
+            keys = [
+                asyncio.run(schedule_endpoints._get_or_generate_schedule_pdf(db, schedule, facility, [], []))[0]
+                for schedule, facility in zip(schedules, facilities)
+            ]
+
+        assert keys[0] == keys[1]
+        assert SchedulePDFCache().tenants_for(keys[0]) == {str(f.tenant_id) for f in facilities}
+
+    def test_invalid_key_rejected(self, tmp_path):
+        cache = SchedulePDFCache(cache_dir=str(tmp_path))
+
+        with pytest.raises(ValueError):
+            cache.path_for("../../etc/passwd")
+
+    def test_evict_by_age_and_size(self, tmp_path):
+        cache = SchedulePDFCache(cache_dir=str(tmp_path), max_bytes=150, max_age_days=30)
+        keys = [SchedulePDFCache.compute_key(**_inputs(template_version=str(i))) for i in range(3)]
+        for key in keys:
+            cache.put(key, b"x" * 100)
+
+        now = time.time()
+        # Oldest file is past the age limit, the other two exceed the size budget together
+        os.utime(cache.path_for(keys[0]), (now - 40 * 86400, now - 40 * 86400))
+        os.utime(cache.path_for(keys[1]), (now - 60, now - 60))
+
+        result = cache.evict()
+
+        assert result["expired"] == 1
+        assert result["evicted"] == 1
+        assert cache.get(keys[2]) is not None
+        assert cache.get(keys[1]) is None
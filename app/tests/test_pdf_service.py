@@ -0,0 +1,87 @@
+"""
+Unit tests for the ReportLab PDF fast path.
+"""
+
+import asyncio
+import threading
+from datetime import date
+
+from app.services.pdf_service import PDFService
+
+
+SHIFTS = [
+    {'shift_index': 0, 'shift_name': 'Morning', 'start_time': '07:00', 'end_time': '15:00'},
+    {'shift_index': 1, 'shift_name': 'Night', 'start_time': '22:00', 'end_time': '06:00'},
+]
+
+
+class TestShiftLookup:
+    """Test shift metadata derived from facility shifts"""
+
+    def test_hours_from_shift_times(self):
+        lookup = PDFService()._shift_lookup({'shifts': SHIFTS})
+
+        assert lookup[0]['name'] == 'Morning'
+        assert lookup[0]['hours'] == 8
+        assert lookup[1]['hours'] == 8  # Overnight shift wraps past midnight
+
+    def test_unknown_times_default_to_eight_hours(self):
+        assert PDFService._shift_hours('', '') == 8.0
+
+
+class TestSchedulePdf:
+    """Test the weekly schedule renderer"""
+
+    def test_renders_off_the_event_loop(self):
+        service = PDFService()
+        render_threads = []
+        render = service.render_schedule_pdf
+
+        def recording_render(*args):
+            render_threads.append(threading.get_ident())
+            return render(*args)
+
+        service.render_schedule_pdf = recording_render
+        schedule = {'id': 'week', 'week_start': date(2025, 1, 6), 'facility_id': 'hotel'}
+        staff = [{'id': 's1', 'full_name': 'Ann', 'role': 'Server'}]
+        assignments = [{'staff_id': 's1', 'day': 0, 'shift': 1, 'id': 'a1'}]
+
+        async def run():
+            data = await service.generate_schedule_pdf(schedule, assignments, staff, {'name': 'Hotel'}, shifts=SHIFTS)
+            return data, threading.get_ident()
+
+        data, loop_thread = asyncio.run(run())
+
+        assert data.startswith(b'%PDF')
+        assert render_threads and render_threads[0] != loop_thread
+
+
+class TestPeriodPdf:
+    """Test the multi-week roster renderer"""
+
+    def test_render_month(self):
+        service = PDFService()
+        staff = [{'id': str(i), 'full_name': f'Staff {i}', 'role': 'Server'} for i in range(50)]
+        assignments = [
+            {'staff_id': str(i), 'day': day, 'shift': (i + day) % 2}
+            for i in range(50) for day in range(0, 30, 2)
+        ]
+
+        pdf_file = service.render_period_pdf(
+            {'name': 'Hotel'}, staff, assignments, date(2025, 1, 1), 30, SHIFTS
+        )
+        data = pdf_file.read()
+        pdf_file.close()
+
+        assert data.startswith(b'%PDF')
+
+    def test_grouping_counts(self):
+        grouped = PDFService()._group_assignments([
+            {'staff_id': 'a', 'day': 0, 'shift': 1},
+            {'staff_id': 'a', 'day': 0, 'shift': 0},
+            {'staff_id': 'b', 'day': 3, 'shift': 1},
+        ])
+
+        assert grouped['by_staff']['a'][0] == [0, 1]
+        assert grouped['staff_totals'] == {'a': 2, 'b': 1}
+        assert grouped['shift_totals'] == {1: 2, 0: 1}
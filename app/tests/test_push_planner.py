@@ -0,0 +1,111 @@
+"""
+Unit tests for batched push delivery and bulk device bookkeeping.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from app.models import DeviceStatus, UserDevice
+from app.services.push_planner import PushSendPlanner
+from app.services.push_token_manager import PushTokenManager
+
+
+class FakeFirebase:
+    """Records batches and fails every token listed in `bad_tokens`"""
+
+    def __init__(self, bad_tokens=()):
+        self.bad_tokens = set(bad_tokens)
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    async def send_push_batch(self, pushes):
+        self.calls.append(list(pushes))
+        return [
+            (False, "UnregisteredError") if push["token"] in self.bad_tokens else (True, None)
+            for push in pushes
+        ]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    UserDevice.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _device(db, user_id, token, **fields):
+    device = UserDevice(user_id=user_id, push_token=token, **fields)
+    db.add(device)
+    db.commit()
+    return device.id
+
+
+def _notification(user_id):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        recipient_user_id=user_id,
+        notification_type="SCHEDULE_PUBLISHED",
+        title="Schedule Published",
+        message="Your schedule is ready",
+        action_url="/schedule",
+        data={"facility_name": "Hotel"},
+    )
+
+
+class TestPushSendPlanner:
+    """Test planning pushes across recipients"""
+
+    def test_recipients_share_one_batch(self, db):
+        users = [uuid.uuid4() for _ in range(3)]
+        for i, user_id in enumerate(users):
+            _device(db, user_id, f"token-{i}")
+        bad_id = _device(db, users[0], "token-bad", push_failures=1)
+
+        firebase = FakeFirebase(bad_tokens={"token-bad"})
+        planner = PushSendPlanner(db, firebase)
+        notifications = [_notification(user_id) for user_id in users]
+        for notification in notifications:
+            planner.add(notification)
+
+        results = asyncio.run(planner.flush())
+
+        assert len(firebase.calls) == 1
+        assert len(firebase.calls[0]) == 4
+        assert results[str(notifications[0].id)] == {"attempted": 2, "success": 1, "failure": 1}
+        assert results[str(notifications[1].id)]["success"] == 1
+
+        bad = db.get(UserDevice, bad_id)
+        assert bad.push_failures == 2
+        assert bad.status == DeviceStatus.NEEDS_REAUTH
+
+
+class TestRecordPushResults:
+    """Test bulk success/failure updates"""
+
+    def test_success_resets_reauth(self, db):
+        manager = PushTokenManager(db)
+        user_id = uuid.uuid4()
+        recovered = _device(
+            db, user_id, "a", push_failures=3,
+            status=DeviceStatus.NEEDS_REAUTH, needs_permission_prompt=True
+        )
+        first_failure = _device(db, user_id, "b")
+
+        manager.record_push_results([recovered], [first_failure])
+
+        device = db.get(UserDevice, recovered)
+        assert device.push_failures == 0
+        assert device.status == DeviceStatus.ACTIVE
+        assert device.needs_permission_prompt is False
+        assert device.last_push_success is not None
+
+        device = db.get(UserDevice, first_failure)
+        assert device.push_failures == 1
+        assert device.status == DeviceStatus.ACTIVE
@@ -0,0 +1,84 @@
+"""
+Query plan regression tests for the scheduling hot paths.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.query_plans import check_query_plans, critical_queries, find_sequential_scans
+from app.models import (
+    Notification, NotificationType, Schedule, ScheduleChange, ShiftAssignment, Staff, StaffTimelineEntry,
+    StaffUnavailability, SwapRequest, User,
+)
+
+HOT_MODELS = (
+    Staff, StaffUnavailability, Schedule, ScheduleChange, ShiftAssignment, StaffTimelineEntry, SwapRequest, Notification,
+    User,
+)
+
+
+def _seeded_engine():
+    engine = create_engine("sqlite://")
+    for model in HOT_MODELS:
+        model.__table__.create(engine)
+
+    facility_id, user_id = uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        staff = [
+            Staff(facility_id=facility_id, full_name=f"Staff {i}", email=f"staff{i}@example.com", role="server")
+            for i in range(20)
+        ]
+        schedules = [Schedule(facility_id=facility_id, week_start=date(2025, 1, 6) + timedelta(weeks=i)) for i in range(4)]
+        db.add_all(staff + schedules)
+        db.add_all(
+            User(tenant_id=uuid.uuid4(), email=f"Staff{i}@example.com", hashed_password="x") for i in range(20)
+        )
+        db.flush()
+
+        for schedule in schedules:
+            db.add_all(
+                ShiftAssignment(schedule_id=schedule.id, day=day, shift=shift, staff_id=staff[(day + shift) % 20].id)
+                for day in range(7) for shift in range(3)
+            )
+        db.add_all(
+            StaffUnavailability(staff_id=member.id, start=now, end=now + timedelta(hours=8)) for member in staff
+        )
+        db.add_all(
+            SwapRequest(
+                schedule_id=schedules[0].id, requesting_staff_id=staff[i].id, original_day=i % 7,
+                original_shift=0, swap_type="auto", reason="test"
+            )
+            for i in range(5)
+        )
+        db.add_all(
+            Notification(
+                recipient_user_id=user_id, tenant_id=uuid.uuid4(), notification_type=NotificationType.SCHEDULE_PUBLISHED,
+                title="Schedule", message="Published"
+            )
+            for _ in range(10)
+        )
+        ids = {"schedule_id": schedules[0].id, "staff_id": staff[0].id, "facility_id": facility_id, "user_id": user_id}
+        db.commit()
+
+    return engine, ids
+
+
+class TestCriticalQueryPlans:
+    """Every hot-path query must be served by an index"""
+
+    def test_no_sequential_scans(self):
+        engine, ids = _seeded_engine()
+
+        assert check_query_plans(engine, ids) == {}
+
+    def test_detects_missing_index(self):
+        engine, ids = _seeded_engine()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX idx_staff_facility_active"))
+
+        with engine.connect() as conn:
+            assert find_sequential_scans(conn, critical_queries(ids)["staff_pool"]) == ["staff"]
@@ -0,0 +1,137 @@
+"""
+Unit tests for the rate limiter backends.
+"""
+
+import asyncio
+
+from app.middleware import rate_limit_backends
+from app.middleware.rate_limit_backends import InMemoryTokenBucketBackend, RedisSlidingWindowBackend
+
+
+class _FakeRedis:
+    """register_script stub running the sliding-window script over in-memory sorted sets"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.calls = []
+        self.down = False
+
+    def register_script(self, source):
+        assert source == rate_limit_backends._SLIDING_WINDOW_LUA
+
+        async def script(keys, args):
+            if self.down:
+                raise ConnectionError("Connection refused")
+            self.calls.append((keys, args))
+            return self._sliding_window(keys[0], *args)
+
+        return script
+
+    def _sliding_window(self, key, now, window, limit, member):
+        # Same steps as _SLIDING_WINDOW_LUA
+        zset = self.zsets.setdefault(key, {})
+        for old in [m for m, score in zset.items() if score <= now - window]:
+            del zset[old]
+        if len(zset) >= limit:
+            return [0, 0]
+        zset[member] = now
+        return [1, limit - len(zset)]
+
+
+class TestInMemoryTokenBucket:
+    """Test limits and bounded memory of the in-process backend"""
+
+    def test_limit_then_refill(self):
+        backend = InMemoryTokenBucketBackend(max_keys=10)
+
+        async def run():
+            results = [await backend.hit("ip:/v1/auth/login:POST", 3, 300) for _ in range(4)]
+            # Pretend a full window has passed
+            backend._buckets["ip:/v1/auth/login:POST"][1] -= 300
+            results.append(await backend.hit("ip:/v1/auth/login:POST", 3, 300))
+            return results
+
+        assert asyncio.run(run()) == [(True, 2), (True, 1), (True, 0), (False, 0), (True, 2)]
+
+    def test_key_count_is_bounded(self):
+        backend = InMemoryTokenBucketBackend(max_keys=100)
+
+        async def run():
+            for i in range(1000):
+                await backend.hit(f"10.0.{i // 256}.{i % 256}:/scan/{i}:GET", 500, 3600)
+
+        asyncio.run(run())
+        assert len(backend) == 100
+
+    def test_idle_buckets_are_swept(self):
+        backend = InMemoryTokenBucketBackend(max_keys=100, sweep_interval=0)
+
+        async def run():
+            await backend.hit("idle", 5, 60)
+            backend._buckets["idle"][1] -= 61
+            await backend.hit("active", 5, 60)
+
+        asyncio.run(run())
+        assert list(backend._buckets) == ["active"]
+
+
+class TestRedisSlidingWindow:
+    """Test the Redis backend's window and limit semantics and its fallback"""
+
+    def _backend(self, monkeypatch, redis):
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limit_backends.time, "time", lambda: clock[0])
+        return RedisSlidingWindowBackend(redis, fallback=InMemoryTokenBucketBackend(max_keys=10)), clock
+
+    def test_window_slides(self, monkeypatch):
+        redis = _FakeRedis()
+        backend, clock = self._backend(monkeypatch, redis)
+
+        async def run():
+            results = []
+            for offset in (0, 10, 20, 30):
+                clock[0] = 1000.0 + offset
+                results.append(await backend.hit("ip:/v1/auth/login:POST", 3, 60))
+            # The first hit leaves the window; the next two are still in it
+            clock[0] = 1060.0
+            results.append(await backend.hit("ip:/v1/auth/login:POST", 3, 60))
+            results.append(await backend.hit("ip:/v1/auth/login:POST", 3, 60))
+            return results
+
+        assert asyncio.run(run()) == [(True, 2), (True, 1), (True, 0), (False, 0), (True, 0), (False, 0)]
+        # Rejected hits are not recorded, so they do not extend the lockout
+        assert len(redis.zsets["ratelimit:ip:/v1/auth/login:POST"]) == 3
+
+    def test_script_arguments(self, monkeypatch):
+        redis = _FakeRedis()
+        backend, _ = self._backend(monkeypatch, redis)
+
+        async def run():
+            await backend.hit("user:1", 5, 60)
+            await backend.hit("user:1", 5, 60)
+
+        asyncio.run(run())
+        (keys, first), (_, second) = redis.calls
+        assert keys == ["ratelimit:user:1"]
+        assert first[:3] == [1000000, 60000, 5]
+        # Hits in the same millisecond are distinct members of the set
+        assert first[3] != second[3]
+
+    def test_falls_back_to_memory_and_recovers(self, monkeypatch):
+        redis = _FakeRedis()
+        backend, _ = self._backend(monkeypatch, redis)
+
+        async def run():
+            redis.down = True
+            results = [await backend.hit("ip", 2, 60) for _ in range(3)]
+            failing = backend._failing
+            redis.down = False
+            results.append(await backend.hit("ip", 2, 60))
+            return results, failing
+
+        results, failing = asyncio.run(run())
+        # Limits still hold per worker while Redis is down, instead of failing open
+        assert results == [(True, 1), (True, 0), (False, 0), (True, 1)]
+        assert failing is True
+        assert backend._failing is False
+        assert list(backend.fallback._buckets) == ["ip"]
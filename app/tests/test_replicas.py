@@ -0,0 +1,114 @@
+"""
+Unit tests for read replica routing.
+"""
+
+import asyncio
+import uuid
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import deps
+from app.core import replicas
+from app.core.database import build_engine
+from app.core.replicas import ReplicaRouter
+from app.services.user_cache import Principal
+
+
+def _database(path, name):
+    engine = build_engine(f"sqlite:///{path}", name=f"test_{name}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (name TEXT)"))
+        conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+    return engine
+
+
+def _served_by(engine) -> str:
+    with Session(engine) as db:
+        return db.exec(text("SELECT name FROM marker")).one()[0]
+
+
+def _router(tmp_path, **kwargs):
+    primary = _database(tmp_path / "primary.db", "primary")
+    replica = _database(tmp_path / "replica.db", "replica")
+    return ReplicaRouter(primary, [replica], max_lag_seconds=5, check_interval_seconds=60, sticky_seconds=30, **kwargs)
+
+
+class TestReplicaRouting:
+    """Test lag-aware engine choice"""
+
+    def test_replica_used_once_checked(self, tmp_path):
+        router = _router(tmp_path)
+
+        assert _served_by(router.read_engine()) == "primary"
+        assert router.refresh_lag() == {"replica0": 0.0}
+        assert _served_by(router.read_engine()) == "replica"
+        assert _served_by(router.read_engine(use_primary=True)) == "primary"
+        assert router.stats()["replica_reads"] == 1
+
+    def test_lagging_replica_skipped(self, tmp_path, monkeypatch):
+        router = _router(tmp_path)
+        monkeypatch.setattr(replicas, "replication_lag_seconds", lambda conn: 12.0)
+
+        router.refresh_lag()
+
+        assert _served_by(router.read_engine()) == "primary"
+
+    def test_unreachable_replica_skipped(self, tmp_path):
+        primary = _database(tmp_path / "primary.db", "primary")
+        missing = build_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", name="test_missing")
+        router = ReplicaRouter(primary, [missing], check_interval_seconds=60)
+
+        assert router.refresh_lag() == {"replica0": None}
+        assert router.stats()["replicas"]["replica0"]["error"]
+        assert _served_by(router.read_engine()) == "primary"
+
+
+class TestReadYourWrites:
+    """Test that a writer's reads stay on the primary"""
+
+    def test_sticky_after_write(self, tmp_path):
+        router = _router(tmp_path)
+        user_id, other_id = uuid.uuid4(), uuid.uuid4()
+
+        async def run():
+            await router.record_write(user_id)
+            return await router.reads_from_primary(user_id), await router.reads_from_primary(other_id)
+
+        assert asyncio.run(run()) == (True, False)
+
+    def test_sticky_expires(self, tmp_path):
+        router = _router(tmp_path)
+        router.sticky_seconds = 0
+        user_id = uuid.uuid4()
+
+        async def run():
+            await router.record_write(user_id)
+            return await router.reads_from_primary(user_id)
+
+        assert not asyncio.run(run())
+
+    def test_get_read_db(self, tmp_path, monkeypatch):
+        router = _router(tmp_path)
+        router.refresh_lag()
+        monkeypatch.setattr(deps, "replica_router", router)
+        principal = Principal(user_id=uuid.uuid4(), tenant_id=uuid.uuid4(), is_manager=True, is_super_admin=False)
+
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def authenticate(request, call_next):
+            request.state.principal = principal
+            return await call_next(request)
+
+        @app.get("/read")
+        def read(db: Session = Depends(deps.get_read_db)):
+            return [db.exec(text("SELECT name FROM marker")).one()[0], replicas.is_replica_session(db)]
+
+        client = TestClient(app)
+        assert client.get("/read").json() == ["replica", True]
+
+        asyncio.run(router.record_write(principal.user_id))
+        assert client.get("/read").json() == ["primary", False]
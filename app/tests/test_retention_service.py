@@ -0,0 +1,99 @@
+"""
+Unit tests for chunked session and audit log retention.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, create_engine, func, select
+
+from app.models import AuditEvent, AuditLog, SecuritySettings, UserSession
+from app.services.retention_service import RetentionService, run_retention_jobs
+
+
+def _engine(url="sqlite://"):
+    engine = create_engine(url)
+    for model in (UserSession, AuditLog, SecuritySettings):
+        model.__table__.create(engine)
+    return engine
+
+
+def _session(expires_in_days, active=True):
+    return UserSession(
+        user_id=uuid.uuid4(),
+        session_token_hash=uuid.uuid4().hex,
+        ip_address="127.0.0.1",
+        is_active=active,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=expires_in_days),
+    )
+
+
+def _audit(tenant_id, age_days):
+    return AuditLog(
+        tenant_id=tenant_id,
+        user_id=uuid.uuid4(),
+        action="LOGIN_SUCCESS",
+        resource_type="auth",
+        event_type=AuditEvent.LOGIN_SUCCESS,
+        created_at=datetime.now(timezone.utc) - timedelta(days=age_days),
+    )
+
+
+def _count(db, model):
+    return db.exec(select(func.count()).select_from(model)).one()
+
+
+class TestSessionRetention:
+    """Test chunked expiry and deletion of sessions"""
+
+    def test_expire_in_batches(self):
+        with Session(_engine()) as db:
+            db.add_all([_session(-1) for _ in range(5)] + [_session(1)])
+            db.commit()
+
+            service = RetentionService(db, batch_size=2, batch_pause=0)
+            assert service.expire_sessions() == 5
+            assert service.batches == 3
+            assert db.exec(select(func.count()).where(UserSession.is_active == True)).one() == 1
+
+    def test_purge_old_sessions(self):
+        with Session(_engine()) as db:
+            db.add_all([_session(-40), _session(-40, active=False), _session(-1), _session(1)])
+            db.commit()
+
+            assert RetentionService(db, batch_size=10, batch_pause=0).purge_sessions(retention_days=30) == 2
+            assert _count(db, UserSession) == 2
+
+
+class TestAuditRetention:
+    """Test per-tenant audit log retention"""
+
+    def test_tenant_retention_and_default(self):
+        short_tenant, default_tenant = uuid.uuid4(), uuid.uuid4()
+
+        with Session(_engine()) as db:
+            db.add(SecuritySettings(tenant_id=short_tenant, audit_retention_days=7))
+            db.add_all([_audit(short_tenant, 10), _audit(short_tenant, 1)])
+            db.add_all([_audit(default_tenant, 400), _audit(default_tenant, 100)])
+            db.commit()
+
+            assert RetentionService(db, batch_size=1, batch_pause=0).purge_audit_logs() == 2
+            remaining = db.exec(select(AuditLog.tenant_id, AuditLog.created_at)).all()
+
+        assert len(remaining) == 2
+        assert {tenant_id for tenant_id, _ in remaining} == {short_tenant, default_tenant}
+
+
+class TestRunRetentionJobs:
+    """Test the leader entry point"""
+
+    def test_run_reports_results(self, tmp_path):
+        engine = _engine(f"sqlite:///{tmp_path / 'retention.db'}")
+        with Session(engine) as db:
+            db.add(_session(-1))
+            db.commit()
+
+        result = run_retention_jobs(engine)
+
+        assert result["sessions_expired"] == 1
+        assert result["audit_logs_deleted"] == 0
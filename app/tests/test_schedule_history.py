@@ -0,0 +1,125 @@
+"""
+Unit tests for the windowed schedule history API.
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.api.endpoints import schedule as schedule_endpoints
+from app.models import Facility, Schedule, ShiftAssignment, Staff, ZoneAssignment
+from app.services.schedule_history import schedule_page
+
+WEEK = date(2026, 10, 12)
+
+
+@pytest.fixture
+def seeded(engine):
+    """(facility id, tenant id) for a facility with five weekly schedules"""
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        staff = Staff(facility_id=facility.id, full_name="Ana", email="ana@example.com", role="Chef")
+        db.add_all([facility, staff])
+        for week in range(5):
+            schedule = Schedule(facility_id=facility.id, week_start=WEEK - timedelta(weeks=week))
+            db.add(schedule)
+            db.add(ShiftAssignment(schedule_id=schedule.id, day=0, shift=0, staff_id=staff.id))
+            db.add(ShiftAssignment(schedule_id=schedule.id, day=1, shift=2, staff_id=staff.id))
+        db.add(ZoneAssignment(schedule_id=schedule.id, staff_id=staff.id, zone_id="kitchen", day=0, shift=0))
+        db.commit()
+        return facility.id, facility.tenant_id
+
+
+@pytest.fixture
+def client_for(make_client, make_user):
+    """TestClient for the schedule endpoints as a manager of a tenant"""
+    return lambda tenant_id: make_client(make_user(tenant_id), (schedule_endpoints.router, "/schedule"))
+
+
+class TestSchedulePage:
+    """Test windows and cursors"""
+
+    def test_cursor_pages(self, engine, seeded):
+        facility_id, _ = seeded
+        with Session(engine) as db:
+            first, cursor = schedule_page(db, facility_id, limit=3)
+            second, last_cursor = schedule_page(db, facility_id, cursor=cursor, limit=3)
+
+        assert [s.week_start for s in first] == [WEEK - timedelta(weeks=i) for i in range(3)]
+        assert cursor == WEEK - timedelta(weeks=2)
+        assert [s.week_start for s in second] == [WEEK - timedelta(weeks=i) for i in (3, 4)]
+        assert last_cursor is None
+
+    def test_date_window_includes_running_week(self, engine, seeded):
+        facility_id, _ = seeded
+        with Session(engine) as db:
+            schedules, _ = schedule_page(db, facility_id, start_date=WEEK - timedelta(days=3), end_date=WEEK)
+
+        assert [s.week_start for s in schedules] == [WEEK, WEEK - timedelta(weeks=1)]
+
+    def test_assignment_change_touches_schedule(self, engine, seeded):
+        facility_id, _ = seeded
+        with Session(engine) as db:
+            assignment = db.exec(select(ShiftAssignment)).first()
+            before = db.get(Schedule, assignment.schedule_id).updated_at
+            db.delete(assignment)
+            db.commit()
+
+            assert before is None
+            assert db.get(Schedule, assignment.schedule_id).updated_at is not None
+
+
+class TestFacilitySchedulesEndpoint:
+    """Test headers, summaries and revalidation"""
+
+    def test_page_headers_and_assignments(self, seeded, client_for):
+        facility_id, tenant_id = seeded
+        response = client_for(tenant_id).get(f"/schedule/facility/{facility_id}", params={"limit": 2})
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == (WEEK - timedelta(weeks=1)).isoformat()
+        assert 'rel="next"' in response.headers["Link"]
+        assert [len(s["assignments"]) for s in response.json()] == [2, 2]
+        assert response.json()[0]["assignments"][0]["staff_name"] == "Ana"
+
+    def test_summary_mode(self, seeded, client_for):
+        facility_id, tenant_id = seeded
+        schedules = client_for(tenant_id).get(f"/schedule/facility/{facility_id}", params={"summary": True}).json()
+
+        assert len(schedules) == 5
+        assert "assignments" not in schedules[0]
+        assert (schedules[0]["assignment_count"], schedules[0]["staff_count"]) == (2, 1)
+
+    def test_not_modified_until_assignments_change(self, engine, seeded, client_for):
+        facility_id, tenant_id = seeded
+        client = client_for(tenant_id)
+        url = f"/schedule/facility/{facility_id}"
+
+        etag = client.get(url).headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        with Session(engine) as db:
+            schedule = db.exec(select(Schedule).where(Schedule.week_start == WEEK)).one()
+            staff = db.exec(select(Staff)).one()
+            db.add(ShiftAssignment(schedule_id=schedule.id, day=3, shift=1, staff_id=staff.id))
+            db.commit()
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_publish_changes_etag(self, engine, seeded, client_for):
+        facility_id, tenant_id = seeded
+        client = client_for(tenant_id)
+        url = f"/schedule/facility/{facility_id}"
+        before = client.get(url)
+        with Session(engine) as db:
+            schedule_id = db.exec(select(Schedule.id).where(Schedule.week_start == WEEK)).one()
+
+        assert client.post(f"/schedule/{schedule_id}/publish", json={}).status_code == 200
+
+        response = client.get(url, headers={"If-None-Match": before.headers["ETag"]})
+        assert response.status_code == 200
+        assert (before.json()[0]["is_published"], response.json()[0]["is_published"]) == (False, True)
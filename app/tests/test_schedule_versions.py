@@ -0,0 +1,124 @@
+"""
+Unit tests for schedule versions, ETags and the changes-since feed.
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.api.endpoints import schedule as schedule_endpoints
+from app.core.config import get_settings
+from app.models import Facility, Schedule, ScheduleChange, ShiftAssignment, Staff, ZoneAssignment
+
+
+@pytest.fixture
+def seeded(engine, make_client, make_user):
+    """(manager client, schedule id, staff ids) for a schedule with one assignment"""
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        staff = [Staff(facility_id=facility.id, full_name=f"Staff {i}", role="Waiter") for i in range(2)]
+        schedule = Schedule(facility_id=facility.id, week_start=date.today() + timedelta(days=7))
+        db.add_all([facility, schedule, *staff])
+        db.add(ShiftAssignment(schedule_id=schedule.id, day=0, shift=0, staff_id=staff[0].id))
+        db.commit()
+        ids = schedule.id, [s.id for s in staff]
+        tenant_id = facility.tenant_id
+
+    return make_client(make_user(tenant_id), (schedule_endpoints.router, "/schedule")), *ids
+
+
+def _save(client, schedule_id, cells, **body):
+    assignments = [{"day": day, "shift": shift, "staff_id": str(staff_id)} for day, shift, staff_id in cells]
+    return client.put(f"/schedule/{schedule_id}", json={"assignments": assignments, **body})
+
+
+class TestVersionBumps:
+    """Test that every kind of assignment change bumps the version"""
+
+    def test_orm_changes_are_versioned_and_logged(self, engine, seeded):
+        _, schedule_id, staff = seeded
+        with Session(engine) as db:
+            # As a swap does: reassign in place
+            assignment = db.exec(select(ShiftAssignment)).one()
+            assignment.staff_id = staff[1]
+            db.add(ZoneAssignment(schedule_id=schedule_id, staff_id=staff[1], zone_id="bar", day=0, shift=0))
+            db.commit()
+
+            assert db.get(Schedule, schedule_id).version == 2
+            change = db.exec(select(ScheduleChange)).one()
+        assert change.version == 2
+        assert change.changes["removed"] == [{"day": 0, "shift": 0, "staff_id": str(staff[0])}]
+        assert change.changes["added"] == [{"day": 0, "shift": 0, "staff_id": str(staff[1]), "zone_id": "bar"}]
+
+    def test_new_schedule_starts_at_version_one(self, engine, seeded):
+        _, _, staff = seeded
+        with Session(engine) as db:
+            assert db.exec(select(Schedule.version)).one() == 1
+            assert db.exec(select(ScheduleChange)).all() == []
+
+    def test_if_match_conflict(self, seeded):
+        client, schedule_id, staff = seeded
+        etag = client.head(f"/schedule/{schedule_id}").headers["etag"]
+        assert _save(client, schedule_id, [(1, 0, staff[0])], ).status_code == 200
+
+        response = client.put(
+            f"/schedule/{schedule_id}", json={"assignments": []}, headers={"If-Match": etag}
+        )
+
+        assert response.status_code == 409
+        assert response.json()["detail"]["current_version"] == 2
+
+
+class TestChangeDetection:
+    """Test ETags and the changes-since feed"""
+
+    def test_head_revalidates_until_changed(self, seeded):
+        client, schedule_id, staff = seeded
+        head = client.head(f"/schedule/{schedule_id}")
+        assert head.headers["x-schedule-version"] == "1"
+        assert client.head(f"/schedule/{schedule_id}", headers={"If-None-Match": head.headers["etag"]}).status_code == 304
+        assert client.get(f"/schedule/{schedule_id}", headers={"If-None-Match": head.headers["etag"]}).status_code == 304
+
+        _save(client, schedule_id, [(0, 0, staff[0]), (1, 2, staff[1])])
+
+        changed = client.head(f"/schedule/{schedule_id}", headers={"If-None-Match": head.headers["etag"]})
+        assert (changed.status_code, changed.headers["x-schedule-version"]) == (200, "2")
+        assert client.get(f"/schedule/{schedule_id}").json()["version"] == 2
+
+    def test_publish_changes_etag(self, seeded):
+        client, schedule_id, _ = seeded
+        etag = client.head(f"/schedule/{schedule_id}").headers["etag"]
+
+        assert client.post(f"/schedule/{schedule_id}/publish", json={}).status_code == 200
+
+        revalidated = client.get(f"/schedule/{schedule_id}", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 200
+        assert (revalidated.json()["version"], revalidated.json()["is_published"]) == (2, True)
+        feed = client.get(f"/schedule/{schedule_id}/changes", params={"since_version": 1}).json()
+        assert feed["changes"][0]["published"] is True
+
+    def test_changes_since(self, seeded):
+        client, schedule_id, staff = seeded
+        _save(client, schedule_id, [(0, 1, staff[0])])
+        _save(client, schedule_id, [(0, 1, staff[0]), (3, 0, staff[1])])
+
+        feed = client.get(f"/schedule/{schedule_id}/changes", params={"since_version": 1}).json()
+
+        assert (feed["version"], feed["full_refresh"]) == (3, False)
+        assert [change["version"] for change in feed["changes"]] == [2, 3]
+        assert feed["changes"][0]["moved"][0]["to_shift"] == 1
+        assert feed["changes"][1]["added"] == [{"day": 3, "shift": 0, "staff_id": str(staff[1]), "zone_id": None}]
+        assert client.get(f"/schedule/{schedule_id}/changes", params={"since_version": 3}).json()["changes"] == []
+
+    def test_pruned_log_requires_full_refresh(self, engine, seeded, monkeypatch):
+        client, schedule_id, staff = seeded
+        monkeypatch.setattr(get_settings(), "SCHEDULE_CHANGE_LOG_VERSIONS", 2)
+        for shift in (1, 2, 0):
+            _save(client, schedule_id, [(0, shift, staff[0])])
+
+        assert client.get(f"/schedule/{schedule_id}/changes", params={"since_version": 1}).json()["full_refresh"] is True
+        assert len(client.get(f"/schedule/{schedule_id}/changes", params={"since_version": 2}).json()["changes"]) == 2
+        with Session(engine) as db:
+            assert len(db.exec(select(ScheduleChange)).all()) == 2
@@ -0,0 +1,127 @@
+"""
+Unit tests for diff-based schedule writes.
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.api.endpoints import schedule as schedule_endpoints
+from app.models import Facility, Schedule, ShiftAssignment, Staff, ZoneAssignment
+from app.services.schedule_writes import describe_diff, diff_assignments
+
+
+@pytest.fixture
+def seeded(engine, make_client, make_user):
+    """(manager client, facility id, staff ids) for a facility with three staff"""
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        staff = [Staff(facility_id=facility.id, full_name=f"Staff {i}", role="Waiter") for i in range(3)]
+        db.add_all([facility, *staff])
+        db.commit()
+        facility_id, tenant_id, staff_ids = facility.id, facility.tenant_id, [s.id for s in staff]
+
+    client = make_client(make_user(tenant_id), (schedule_endpoints.router, "/schedule"))
+    return client, facility_id, staff_ids
+
+
+def _cell(day, shift, staff_id, zone_id=None):
+    return {"day": day, "shift": shift, "staff_id": str(staff_id), "zone_id": zone_id}
+
+
+def _create(client, facility_id, assignments):
+    week_start = (date.today() + timedelta(days=7)).isoformat()
+    return client.post(
+        "/schedule/create", json={"facility_id": str(facility_id), "week_start": week_start, "assignments": assignments}
+    )
+
+
+class TestDiff:
+    """Test the diff computation"""
+
+    def test_moves_and_zone_changes(self):
+        a, b = uuid.uuid4(), uuid.uuid4()
+        stored_shifts = {(0, 0, a): 1, (1, 0, b): 2, (2, 1, b): 3}
+        stored_zones = {(2, 1, b): (4, "bar")}
+        desired = {(0, 2, a): None, (1, 0, b): None, (2, 1, b): "pool", (3, 0, a): "bar"}
+
+        diff = describe_diff(*diff_assignments(stored_shifts, stored_zones, desired))
+
+        assert diff["moved"] == [{"staff_id": str(a), "day": 0, "from_shift": 0, "to_shift": 2, "zone_id": None}]
+        assert diff["added"] == [{"day": 3, "shift": 0, "staff_id": str(a), "zone_id": "bar"}]
+        assert diff["removed"] == []
+        assert diff["zone_changed"] == [{"day": 2, "shift": 1, "staff_id": str(b), "zone_id": "pool"}]
+
+
+class TestScheduleWrites:
+    """Test the create/update endpoints"""
+
+    def test_create_writes_zones(self, engine, seeded):
+        client, facility_id, staff = seeded
+        response = _create(client, facility_id, [_cell(0, 0, staff[0], "bar"), _cell(0, 1, staff[1])])
+
+        assert response.status_code == 200
+        assert len(response.json()["diff"]["added"]) == 2
+        with Session(engine) as db:
+            assert len(db.exec(select(ShiftAssignment)).all()) == 2
+            assert [(z.staff_id, z.zone_id) for z in db.exec(select(ZoneAssignment)).all()] == [(staff[0], "bar")]
+
+    def test_update_writes_only_the_difference(self, engine, seeded):
+        client, facility_id, staff = seeded
+        created = _create(client, facility_id, [_cell(0, 0, staff[0], "bar"), _cell(1, 1, staff[1])]).json()
+        with Session(engine) as db:
+            kept_id = db.exec(select(ShiftAssignment.id).where(ShiftAssignment.day == 1)).one()
+
+        response = client.put(
+            f"/schedule/{created['id']}", json={"assignments": [_cell(0, 2, staff[0]), _cell(1, 1, staff[1], "pool")]}
+        ).json()
+
+        assert response["diff"]["moved"] == [{"staff_id": str(staff[0]), "day": 0, "from_shift": 0, "to_shift": 2, "zone_id": None}]
+        assert response["diff"]["zone_changed"] == [_cell(1, 1, staff[1], "pool")]
+        with Session(engine) as db:
+            # Unchanged cells keep their rows
+            assert db.exec(select(ShiftAssignment.id).where(ShiftAssignment.day == 1)).one() == kept_id
+            assert [(z.day, z.zone_id) for z in db.exec(select(ZoneAssignment)).all()] == [(1, "pool")]
+
+    def test_unchanged_save_writes_nothing(self, engine, seeded):
+        client, facility_id, staff = seeded
+        cells = [_cell(0, 0, staff[0], "bar")]
+        created = _create(client, facility_id, cells).json()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        response = client.put(f"/schedule/{created['id']}", json={"assignments": cells}).json()
+
+        assert response["diff"]["changed"] is False
+        assert (response["version"], response["updated_at"]) == (created["version"], created["updated_at"])
+        assert not [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+
+    def test_stale_expected_version_conflicts(self, engine, seeded):
+        client, facility_id, staff = seeded
+        created = _create(client, facility_id, [_cell(0, 0, staff[0])]).json()
+        first = client.put(
+            f"/schedule/{created['id']}",
+            json={"assignments": [_cell(0, 1, staff[0])], "expected_version": created["version"]}
+        )
+        assert first.json()["version"] == created["version"] + 1
+
+        response = client.put(
+            f"/schedule/{created['id']}",
+            json={"assignments": [_cell(0, 2, staff[0])], "expected_version": created["version"]}
+        )
+
+        assert response.status_code == 409
+        assert response.json()["detail"]["current_version"] == created["version"] + 1
+        with Session(engine) as db:
+            assert db.exec(select(ShiftAssignment.shift)).all() == [1]
+
+    def test_rejects_staff_from_other_facility(self, engine, seeded):
+        client, facility_id, staff = seeded
+        response = _create(client, facility_id, [_cell(0, 0, uuid.uuid4())])
+
+        assert response.status_code == 400
+        with Session(engine) as db:
+            assert db.exec(select(Schedule)).all() == []
@@ -0,0 +1,86 @@
+"""
+Unit tests for the validated-session cache.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, create_engine
+
+from app.models import UserSession
+from app.services.session_cache import CachedSession, SessionValidationCache
+
+
+def _cached(minutes=60):
+    return CachedSession(
+        session_id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=minutes),
+    )
+
+
+class TestSessionValidationCache:
+    """Test lookups, expiry and revocation"""
+
+    def test_hit_until_invalidated(self):
+        cache = SessionValidationCache(ttl_seconds=30, max_entries=10)
+        cached = _cached()
+
+        asyncio.run(cache.set("hash", cached))
+        assert asyncio.run(cache.get("hash")) == cached
+
+        asyncio.run(cache.invalidate(["hash"]))
+        assert asyncio.run(cache.get("hash")) is None
+
+    def test_expired_session_is_a_miss(self):
+        cache = SessionValidationCache(ttl_seconds=30, max_entries=10)
+        asyncio.run(cache.set("hash", _cached(minutes=-1)))
+
+        assert asyncio.run(cache.get("hash")) is None
+
+    def test_lru_bound(self):
+        cache = SessionValidationCache(ttl_seconds=30, max_entries=2)
+        for key in ("a", "b", "c"):
+            asyncio.run(cache.set(key, _cached()))
+
+        assert asyncio.run(cache.get("a")) is None
+        assert asyncio.run(cache.get("c")) is not None
+
+    def test_json_roundtrip(self):
+        cached = _cached()
+        assert CachedSession.from_json(cached.to_json().encode()) == cached
+
+
+class TestLastUsedFlush:
+    """Test batched last_used writes"""
+
+    def test_flush_updates_all_touched_sessions(self):
+        engine = create_engine("sqlite://")
+        UserSession.__table__.create(engine)
+        cache = SessionValidationCache(ttl_seconds=30, max_entries=10)
+        old = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        with Session(engine) as db:
+            sessions = [
+                UserSession(
+                    user_id=uuid.uuid4(),
+                    session_token_hash=f"hash-{i}",
+                    ip_address="127.0.0.1",
+                    last_used=old,
+                    expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+                )
+                for i in range(3)
+            ]
+            db.add_all(sessions)
+            db.commit()
+            ids = [session.id for session in sessions]
+
+            cache.touch(ids[0])
+            cache.touch(ids[1])
+            assert cache.flush_last_used(db) == 2
+            assert cache.flush_last_used(db) == 0
+
+            db.expire_all()
+            assert db.get(UserSession, ids[0]).last_used.year > 2024
+            assert db.get(UserSession, ids[2]).last_used.year == 2024
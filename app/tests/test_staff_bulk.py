@@ -0,0 +1,121 @@
+"""
+Unit tests for bulk staff validation, deactivation and deletion.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.api.endpoints import staff as staff_endpoints
+from app.models import Facility, Schedule, ShiftAssignment, Staff, StaffInvitation, User
+from app.services import staff_bulk
+
+
+def _seed(engine, staff_count=4):
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        supervisors = [
+            Staff(facility_id=facility.id, full_name=f"Supervisor {i}", role="Supervisor", email=f"s{i}@example.com")
+            for i in range(2)
+        ]
+        waiters = [
+            Staff(facility_id=facility.id, full_name=f"Waiter {i}", role="Waiter", email=f"w{i}@example.com")
+            for i in range(staff_count - 2)
+        ]
+        schedule = Schedule(facility_id=facility.id, week_start=date.today() + timedelta(days=7))
+        db.add_all([facility, schedule, *supervisors, *waiters])
+        db.add(ShiftAssignment(schedule_id=schedule.id, day=0, shift=0, staff_id=waiters[0].id))
+        db.add(User(tenant_id=facility.tenant_id, email="W0@example.com", hashed_password="x"))
+        db.add(StaffInvitation(
+            staff_id=waiters[1].id, email=waiters[1].email, token=uuid.uuid4().hex, invited_by=uuid.uuid4(),
+            tenant_id=facility.tenant_id, facility_id=facility.id,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=3)
+        ))
+        db.commit()
+        return facility.tenant_id, [s.id for s in supervisors], [w.id for w in waiters], schedule.id
+
+
+@pytest.fixture
+def client_for(make_client, make_user):
+    """TestClient for the staff endpoints as a manager of a tenant"""
+    return lambda tenant_id: make_client(make_user(tenant_id, "boss@example.com"), staff_endpoints.router)
+
+
+class TestBulkValidation:
+    """Test grouped impact queries"""
+
+    def test_query_count_independent_of_batch_size(self, engine):
+        counts = []
+        for staff_count in (4, 40):
+            tenant_id, supervisors, waiters, _ = _seed(engine, staff_count)
+            with Session(engine) as db:
+                staff_members, _ = staff_bulk.load_tenant_staff(db, supervisors + waiters, tenant_id)
+                statements = []
+                listener = lambda *args: statements.append(args[2])
+                event.listen(engine, "before_cursor_execute", listener)
+                staff_bulk.deletion_impact(db, staff_members)
+                event.remove(engine, "before_cursor_execute", listener)
+            counts.append(len(statements))
+
+        assert counts[0] == counts[1]
+
+    def test_blocking_assignments_and_batch_coverage(self, engine, client_for):
+        tenant_id, supervisors, waiters, schedule_id = _seed(engine)
+        missing = uuid.uuid4()
+        response = client_for(tenant_id).post(
+            "/staff/bulk/validate-deletion", json={"staff_ids": [str(i) for i in supervisors + waiters[:1] + [missing]]}
+        ).json()
+
+        results = {uuid.UUID(r["staff_id"]): r for r in response["results"]}
+        assert response["can_delete"] is False
+        assert response["not_found"] == [str(missing)]
+        assert results[waiters[0]]["future_assignments_count"] == 1
+        assert results[waiters[0]]["blocking_entities"][0]["id"] == str(schedule_id)
+        # Each supervisor has a colleague, but not outside the batch
+        assert "This is the only manager/supervisor for this facility" in results[supervisors[0]]["warnings"]
+
+    def test_single_validation_unchanged(self, engine, client_for):
+        tenant_id, supervisors, _, _ = _seed(engine)
+        result = client_for(tenant_id).delete(f"/staff/{supervisors[0]}/validate").json()
+
+        assert result["can_delete"] is True
+        assert result["is_manager"] is True
+        assert result["warnings"] == []
+
+
+class TestBulkChanges:
+    """Test set-based deactivate and delete"""
+
+    def test_deactivate(self, engine, client_for):
+        tenant_id, _, waiters, _ = _seed(engine)
+        response = client_for(tenant_id).post("/staff/bulk/deactivate", json={"staff_ids": [str(i) for i in waiters]})
+
+        assert response.status_code == 200
+        assert (response.json()["deactivated_users_count"], response.json()["cancelled_invitations_count"]) == (1, 1)
+        with Session(engine) as db:
+            assert all(not db.get(Staff, staff_id).is_active for staff_id in waiters)
+            assert not db.exec(select(User)).one().is_active
+            assert db.exec(select(StaffInvitation)).one().cancelled_at is not None
+
+    def test_delete_blocked_without_force(self, engine, client_for):
+        tenant_id, _, waiters, _ = _seed(engine)
+        response = client_for(tenant_id).post("/staff/bulk/delete", json={"staff_ids": [str(i) for i in waiters]})
+
+        assert response.status_code == 400
+        assert [b["staff_id"] for b in response.json()["detail"]["blocked"]] == [str(waiters[0])]
+
+    def test_delete_with_cascade(self, engine, client_for):
+        tenant_id, _, waiters, schedule_id = _seed(engine)
+        response = client_for(tenant_id).post(
+            "/staff/bulk/delete", json={"staff_ids": [str(i) for i in waiters], "force": True, "cascade_assignments": True}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["reassigned_schedules_count"] == 1
+        with Session(engine) as db:
+            assert db.exec(select(Staff).where(Staff.id.in_(waiters))).all() == []
+            assert db.exec(select(ShiftAssignment)).all() == []
+            assert db.get(Schedule, schedule_id).updated_at is not None
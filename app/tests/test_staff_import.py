@@ -0,0 +1,94 @@
+"""
+Unit tests for the streaming staff import.
+"""
+
+import io
+import uuid
+
+from openpyxl import Workbook
+from sqlmodel import Session, select
+
+from app.api.endpoints import import_staff as import_endpoints
+from app.core.config import get_settings
+from app.models import Facility, Staff
+from app.services.staff_import import import_staff_file
+
+HEADER = "full_name,role,skill_level,facility_id,email,phone\n"
+
+
+def _seed(engine):
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Seaside Hotel")
+        db.add(facility)
+        db.add(Staff(facility_id=facility.id, full_name="Existing", role="Chef", email="taken@example.com"))
+        db.commit()
+        return facility.id, facility.tenant_id
+
+
+def _import(engine, tenant_id, content, filename="staff.csv", **kwargs):
+    with Session(engine) as db:
+        return import_staff_file(db, io.BytesIO(content), filename, tenant_id, **kwargs)
+
+
+class TestStaffImport:
+    """Test validation, duplicates and chunked inserts"""
+
+    def test_valid_rows_inserted_and_normalised(self, engine, monkeypatch):
+        facility_id, tenant_id = _seed(engine)
+        monkeypatch.setattr(get_settings(), "STAFF_IMPORT_CHUNK_SIZE", 2)
+        rows = "".join(f"Person {i},Waiter,2,seaside hotel,P{i}@Example.com,+1 (555) 010-{i:04d}\n" for i in range(5))
+
+        result = _import(engine, tenant_id, (HEADER + rows).encode())
+
+        assert (result["total_rows"], result["added"], result["errors"]) == (5, 5, [])
+        with Session(engine) as db:
+            staff = db.exec(select(Staff).where(Staff.full_name == "Person 3")).one()
+        assert (staff.facility_id, staff.email, staff.phone) == (facility_id, "p3@example.com", "+15550100003")
+
+    def test_per_row_errors(self, engine, monkeypatch):
+        facility_id, tenant_id = _seed(engine)
+        monkeypatch.setattr(get_settings(), "STAFF_IMPORT_CHUNK_SIZE", 2)
+        rows = (
+            f"Ana,Chef,3,{facility_id},ana@example.com,\n"
+            f"Ana Again,Chef,3,{facility_id},ANA@example.com,\n"
+            f"Taken,Chef,1,{facility_id},taken@example.com,\n"
+            ",Chef,9,Nowhere,not-an-email,12\n"
+        )
+
+        result = _import(engine, tenant_id, (HEADER + rows).encode())
+
+        assert (result["added"], result["error_count"]) == (1, 3)
+        errors = {error["row"]: error["errors"] for error in result["errors"]}
+        assert errors[3] == ["Duplicate email in file"]
+        assert errors[4] == ["Email already belongs to an active staff member"]
+        assert set(errors[5]) == {
+            "full_name is required", "Unknown facility", "skill_level must be a whole number from 1 to 5",
+            "Invalid email format", "Invalid phone number",
+        }
+
+    def test_dry_run_inserts_nothing(self, engine):
+        facility_id, tenant_id = _seed(engine)
+        result = _import(engine, tenant_id, (HEADER + f"Ana,Chef,3,{facility_id},,\n").encode(), dry_run=True)
+
+        assert (result["valid"], result["added"]) == (1, 0)
+        with Session(engine) as db:
+            assert len(db.exec(select(Staff)).all()) == 1
+
+    def test_excel_file(self, engine):
+        _, tenant_id = _seed(engine)
+        workbook = Workbook()
+        workbook.active.append(["Full Name", "Role", "Skill Level", "Facility ID"])
+        workbook.active.append(["Ana", "Chef", 3, "Seaside Hotel"])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        assert _import(engine, tenant_id, content.getvalue(), filename="staff.xlsx")["added"] == 1
+
+    def test_endpoint_rejects_missing_columns(self, engine, make_client, make_user):
+        _, tenant_id = _seed(engine)
+        client = make_client(make_user(tenant_id), import_endpoints.router)
+
+        response = client.post("/import/staff", files={"file": ("staff.csv", b"full_name,role\nAna,Chef\n")})
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Missing columns: facility_id, skill_level"
@@ -0,0 +1,152 @@
+"""
+Unit tests for the personal staff timeline.
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.api.endpoints import schedule as schedule_endpoints
+from app.api.endpoints import staff as staff_endpoints
+from app.models import Facility, FacilityShift, ShiftAssignment, Staff, StaffTimelineEntry
+from app.services import staff_timeline
+
+
+@pytest.fixture
+def seeded(engine):
+    """(facility id, tenant id, staff ids) for a facility with two staff and two shifts"""
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        staff = [
+            Staff(facility_id=facility.id, full_name=f"Staff {i}", role="Waiter", email=f"s{i}@example.com")
+            for i in range(2)
+        ]
+        shifts = [
+            FacilityShift(facility_id=facility.id, shift_name="Breakfast", start_time="07:00", end_time="15:00", shift_order=0),
+            FacilityShift(facility_id=facility.id, shift_name="Dinner", start_time="17:00", end_time="23:30", shift_order=1),
+        ]
+        db.add_all([facility, *staff, *shifts])
+        db.commit()
+        return facility.id, facility.tenant_id, [s.id for s in staff]
+
+
+@pytest.fixture
+def client_for(make_client):
+    """TestClient for the schedule and staff endpoints as the given user"""
+    return lambda user: make_client(user, (schedule_endpoints.router, "/schedule"), staff_endpoints.router)
+
+
+def _week_start():
+    today = date.today()
+    return today - timedelta(days=today.weekday())
+
+
+def _create(client, facility_id, assignments):
+    return client.post("/schedule/create", json={
+        "facility_id": str(facility_id),
+        "week_start": _week_start().isoformat(),
+        "assignments": [{"day": d, "shift": s, "staff_id": str(staff_id)} for d, s, staff_id in assignments],
+    })
+
+
+def _timeline(engine, tenant_id, staff_id):
+    week_start = _week_start()
+    with Session(engine) as db:
+        return staff_timeline.personal_timeline(db, staff_id, tenant_id, week_start, week_start + timedelta(days=6))
+
+
+class TestTimelineWrites:
+    """Test that assignment writes keep the timeline in step"""
+
+    def test_schedule_save_writes_dated_rows(self, engine, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        _create(client_for(make_user(tenant_id)), facility_id, [(2, 1, staff[0]), (4, 0, staff[1])])
+
+        with Session(engine) as db:
+            entries = db.exec(select(StaffTimelineEntry).where(StaffTimelineEntry.staff_id == staff[0])).all()
+            assignment = db.exec(select(ShiftAssignment).where(ShiftAssignment.staff_id == staff[0])).one()
+        assert [(e.id, e.shift_date, e.shift, e.facility_id) for e in entries] == [
+            (assignment.id, _week_start() + timedelta(days=2), 1, facility_id)
+        ]
+
+    def test_update_and_swap_move_rows(self, engine, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        client = client_for(make_user(tenant_id))
+        schedule_id = _create(client, facility_id, [(0, 0, staff[0])]).json()["id"]
+        client.put(f"/schedule/{schedule_id}", json={"assignments": [{"day": 1, "shift": 1, "staff_id": str(staff[0])}]})
+
+        # Swap execution reassigns the row through the ORM
+        with Session(engine) as db:
+            assignment = db.exec(select(ShiftAssignment)).one()
+            assignment.staff_id = staff[1]
+            db.commit()
+
+        assert _timeline(engine, tenant_id, staff[0]) == []
+        assert [(e["day"], e["shift"]) for e in _timeline(engine, tenant_id, staff[1])] == [(1, 1)]
+
+
+class TestTimelineReads:
+    """Test the cached timeline and the /staff/me endpoints"""
+
+    def test_real_shift_times(self, engine, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        _create(client_for(make_user(tenant_id)), facility_id, [(0, 1, staff[0])])
+
+        entry = _timeline(engine, tenant_id, staff[0])[0]
+
+        assert (entry["shift_name"], entry["start_time"], entry["end_time"], entry["hours"]) == ("Dinner", "17:00", "23:30", 6.5)
+        assert staff_timeline.shift_time_label("17:00", "23:30") == "5:00 PM - 11:30 PM"
+
+    def test_cache_invalidated_on_commit(self, engine, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        client = client_for(make_user(tenant_id))
+        schedule_id = _create(client, facility_id, [(0, 0, staff[0])]).json()["id"]
+        assert len(_timeline(engine, tenant_id, staff[0])) == 1
+        assert len(_timeline(engine, tenant_id, staff[0])) == 1
+        assert staff_timeline.staff_timeline_cache.hits == 1
+
+        client.put(f"/schedule/{schedule_id}", json={"assignments": [
+            {"day": 0, "shift": 0, "staff_id": str(staff[0])}, {"day": 3, "shift": 1, "staff_id": str(staff[0])}
+        ]})
+
+        assert [e["day"] for e in _timeline(engine, tenant_id, staff[0])] == [0, 3]
+
+    def test_replica_reads_not_cached(self, engine, seeded):
+        _, _, staff = seeded
+        cache = staff_timeline.StaffTimelineCache(ttl_seconds=60)
+        week_start = _week_start()
+        with Session(engine) as db:
+            db.info["replica"] = True
+            cache.get(db, staff[0], week_start, week_start + timedelta(days=6))
+
+        assert not cache._entries
+
+    def test_broadcast_reaches_other_workers(self, engine, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        _create(client_for(make_user(tenant_id)), facility_id, [(0, 0, staff[0]), (1, 0, staff[1])])
+        writer = staff_timeline.StaffTimelineCache(ttl_seconds=60)
+        reader = staff_timeline.StaffTimelineCache(ttl_seconds=60)
+        published = []
+        writer._redis = object()
+        writer._schedule_publish = published.append
+        week_start = _week_start()
+        with Session(engine) as db:
+            for staff_id in staff:
+                reader.get(db, staff_id, week_start, week_start + timedelta(days=6))
+
+        writer.invalidate([staff[0]])
+        reader._apply_message(published[0])
+
+        assert published == [str(staff[0])]
+        assert [key[0] for key in reader._entries] == [staff[1]]
+
+    def test_dashboard_hours_from_shift_definitions(self, seeded, client_for, make_user):
+        facility_id, tenant_id, staff = seeded
+        _create(client_for(make_user(tenant_id)), facility_id, [(0, 0, staff[0]), (1, 1, staff[0])])
+
+        stats = client_for(make_user(tenant_id, "s0@example.com", is_manager=False)).get("/staff/me/dashboard-stats")
+
+        assert stats.status_code == 200
+        assert stats.json()["thisWeekHours"] == 14.5
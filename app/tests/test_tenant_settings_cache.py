@@ -0,0 +1,79 @@
+"""
+Unit tests for the per-tenant settings cache.
+"""
+
+import uuid
+
+from sqlmodel import Session, create_engine
+
+from app.models import SecuritySettings
+from app.services.tenant_settings_cache import TenantSettingsCache, tenant_settings_cache
+
+
+def _engine():
+    engine = create_engine("sqlite://")
+    SecuritySettings.__table__.create(engine)
+    return engine
+
+
+class TestTenantSettingsCache:
+    """Test cached reads and invalidation on commit"""
+
+    def test_second_read_is_a_hit(self):
+        cache = TenantSettingsCache(ttl_seconds=60)
+        tenant_id = uuid.uuid4()
+
+        with Session(_engine()) as db:
+            db.add(SecuritySettings(tenant_id=tenant_id, max_failed_attempts=7))
+            db.commit()
+
+            first = cache.get_security_settings(db, tenant_id)
+            second = cache.get_security_settings(db, tenant_id)
+
+        assert first.max_failed_attempts == second.max_failed_attempts == 7
+        assert first is not second
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_missing_settings_are_cached(self):
+        cache = TenantSettingsCache(ttl_seconds=60)
+        tenant_id = uuid.uuid4()
+
+        with Session(_engine()) as db:
+            assert cache.get_security_settings(db, tenant_id) is None
+            assert cache.get_security_settings(db, tenant_id) is None
+
+        assert cache.misses == 1
+
+    def test_invalidation_during_load_is_not_stored(self):
+        cache = TenantSettingsCache(ttl_seconds=60)
+        tenant_id = uuid.uuid4()
+        load = cache._load
+
+        def load_then_invalidate(db, model, tenant_id, decrypt):
+            data = load(db, model, tenant_id, decrypt)
+            cache.invalidate(tenant_id, broadcast=False)  # a commit landing mid-read
+            return data
+
+        cache._load = load_then_invalidate
+        with Session(_engine()) as db:
+            db.add(SecuritySettings(tenant_id=tenant_id, max_failed_attempts=7))
+            db.commit()
+
+            assert cache.get_security_settings(db, tenant_id).max_failed_attempts == 7
+
+        assert cache._entries == {}
+        assert cache._generations._counters == {}
+
+    def test_commit_invalidates_tenant(self):
+        tenant_id = uuid.uuid4()
+
+        with Session(_engine()) as db:
+            settings = SecuritySettings(tenant_id=tenant_id, max_failed_attempts=5)
+            db.add(settings)
+            db.commit()
+            assert tenant_settings_cache.get_security_settings(db, tenant_id).max_failed_attempts == 5
+
+            settings.max_failed_attempts = 3
+            db.commit()
+
+            assert tenant_settings_cache.get_security_settings(db, tenant_id).max_failed_attempts == 3
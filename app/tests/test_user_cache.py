@@ -0,0 +1,119 @@
+"""
+Unit tests for the request principal and user cache.
+"""
+
+import uuid
+
+from sqlalchemy import event, inspect
+from sqlmodel import Session, create_engine
+
+from app.models import Tenant, User
+from app.services.user_cache import Principal, UserCache, user_cache
+
+
+def _setup():
+    engine = create_engine("sqlite://")
+    Tenant.__table__.create(engine)
+    User.__table__.create(engine)
+    with Session(engine) as db:
+        tenant = Tenant(name="Hotel")
+        db.add(tenant)
+        db.commit()
+        user = User(tenant_id=tenant.id, email="ann@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return engine, user.id
+
+
+class TestPrincipal:
+    """Test rebuilding the current user without the database"""
+
+    def test_attach_user_runs_no_query(self):
+        engine, user_id = _setup()
+        with Session(engine) as db:
+            user_data = UserCache.snapshot(db.get(User, user_id))
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        principal = Principal(
+            user_id=user_id,
+            tenant_id=user_data["tenant_id"],
+            is_manager=False,
+            is_super_admin=False,
+            user_data=user_data,
+        )
+        with Session(engine) as db:
+            user = principal.attach_user(db)
+
+            assert inspect(user).persistent
+            assert user.email == "ann@example.com"
+            assert statements == []
+
+
+class TestUserCache:
+    """Test caching and invalidation"""
+
+    def test_update_invalidates_cached_user(self):
+        engine, user_id = _setup()
+        with Session(engine) as db:
+            assert user_cache.load(db, user_id)["is_manager"] is False
+            assert user_cache.get(user_id) is not None
+
+            user = db.get(User, user_id)
+            user.is_manager = True
+            db.commit()
+
+            assert user_cache.get(user_id) is None
+            assert user_cache.load(db, user_id)["is_manager"] is True
+
+    def test_commit_broadcasts_to_other_workers(self):
+        engine, user_id = _setup()
+        published = []
+        user_cache._redis = object()
+        user_cache._schedule_publish = published.append
+        reader = UserCache(ttl_seconds=60)
+        try:
+            with Session(engine) as db:
+                reader.load(db, user_id)
+                user = db.get(User, user_id)
+                user.is_manager = True
+                db.flush()
+                assert published == []  # nothing is broadcast before the commit
+
+                db.commit()
+        finally:
+            user_cache._redis = None
+            del user_cache._schedule_publish
+
+        assert published == [str(user_id)]
+        reader.invalidate(uuid.UUID(published[0]), broadcast=False)
+        assert reader.get(user_id) is None
+
+    def test_invalidation_during_load_is_not_stored(self):
+        engine, user_id = _setup()
+        cache = UserCache(ttl_seconds=60)
+
+        with Session(engine) as db:
+            get = db.get
+
+            def get_then_invalidate(model, ident):
+                user = get(model, ident)
+                cache.invalidate(ident, broadcast=False)  # a role change committed mid-read
+                return user
+
+            db.get = get_then_invalidate
+            assert cache.load(db, user_id)["id"] == user_id
+
+        assert cache.get(user_id) is None
+        assert cache._generations._counters == {}
+
+    def test_ttl_and_bound(self):
+        cache = UserCache(ttl_seconds=0, max_entries=1)
+        cache.set({"id": uuid.uuid4()})
+        assert len(cache._entries) == 1
+
+        user_id = uuid.uuid4()
+        cache.set({"id": user_id})
+        assert len(cache._entries) == 1
+        assert cache.get(user_id) is None  # ttl of 0 expires immediately
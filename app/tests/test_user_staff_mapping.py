@@ -0,0 +1,181 @@
+"""
+Unit tests for the cached user <-> staff mapping.
+"""
+
+import uuid
+
+import pytest
+from fastapi import APIRouter, Depends
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.deps import get_current_staff
+from app.models import Facility, Staff, User
+from app.services import staff_bulk
+from app.services.user_staff_mapping import UserStaffMappingCache, UserStaffMappingService
+
+whoami_router = APIRouter()
+
+
+@whoami_router.get("/whoami")
+def whoami(staff: Staff = Depends(get_current_staff)):
+    return {"staff_id": str(staff.id)}
+
+
+@pytest.fixture
+def seeded(engine):
+    """(user id, staff ids) with the user matching the first staff member of its tenant"""
+    with Session(engine) as db:
+        facility = Facility(tenant_id=uuid.uuid4(), name="Hotel")
+        other_facility = Facility(tenant_id=uuid.uuid4(), name="Other hotel")
+        staff = [
+            Staff(facility_id=facility.id, full_name=f"Staff {i}", role="Waiter", email=f"Staff{i}@Example.com")
+            for i in range(3)
+        ]
+        # Same person in another tenant
+        outsider = Staff(facility_id=other_facility.id, full_name="Staff 0", role="Waiter", email="staff0@example.com")
+        user = User(tenant_id=facility.tenant_id, email="staff0@example.com", hashed_password="x")
+        db.add_all([facility, other_facility, *staff, outsider, user])
+        db.commit()
+        return user.id, [s.id for s in staff]
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestMapping:
+    """Test lookups and caching in both directions"""
+
+    def test_staff_for_user_is_tenant_scoped_and_cached(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            user = db.get(User, user_id)
+            assert UserStaffMappingService(db).staff_id_for_user(user) == staff[0]
+
+            statements = _count_statements(engine)
+            assert UserStaffMappingService(db).staff_id_for_user(user) == staff[0]
+            assert statements == []
+
+    def test_staff_for_user_in_each_facility(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            user = db.get(User, user_id)
+            home = db.get(Staff, staff[0]).facility_id
+            annex = Facility(tenant_id=user.tenant_id, name="Annex")
+            second = Staff(facility_id=annex.id, full_name="Staff 0", role="Waiter", email="staff0@example.com")
+            db.add_all([annex, second])
+            db.commit()
+
+            service = UserStaffMappingService(db)
+            assert service.staff_id_for_user(user, home) == staff[0]
+            assert service.staff_id_for_user(user, annex.id) == second.id
+            assert service.staff_id_for_user(user, uuid.uuid4()) is None
+
+    def test_users_for_staff_in_one_query(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            members = [db.get(Staff, staff_id) for staff_id in staff]
+            statements = _count_statements(engine)
+            users = UserStaffMappingService(db).get_users_for_staff(members)
+
+        assert {staff_id: user.id for staff_id, user in users.items()} == {staff[0]: user_id}
+        assert len(statements) == 2
+
+    def test_email_change_invalidates(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            user = db.get(User, user_id)
+            assert UserStaffMappingService(db).staff_id_for_user(user) == staff[0]
+
+            db.get(Staff, staff[0]).email = "moved@example.com"
+            db.get(Staff, staff[1]).email = "STAFF0@example.com"
+            db.commit()
+
+            assert UserStaffMappingService(db).staff_id_for_user(db.get(User, user_id)) == staff[1]
+
+    def test_new_account_invalidates_missing_user(self, engine, seeded):
+        _, staff = seeded
+        with Session(engine) as db:
+            member = db.get(Staff, staff[2])
+            assert UserStaffMappingService(db).get_user_for_staff(member) is None
+
+            # Accepting an invitation creates the account
+            db.add(User(tenant_id=member.facility.tenant_id, email="staff2@example.com", hashed_password="x"))
+            db.commit()
+
+            assert UserStaffMappingService(db).get_user_for_staff(member).email == "staff2@example.com"
+
+    def test_rollback_keeps_cache(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            UserStaffMappingService(db).staff_id_for_user(db.get(User, user_id))
+            db.get(Staff, staff[0]).email = "moved@example.com"
+            db.flush()
+            db.rollback()
+
+            statements = _count_statements(engine)
+            assert UserStaffMappingService(db).staff_id_for_user(db.get(User, user_id)) == staff[0]
+            assert [s for s in statements if "staff" in s.lower()] == []
+
+    def test_bulk_delete_invalidates(self, engine, seeded):
+        user_id, staff = seeded
+        with Session(engine) as db:
+            user = db.get(User, user_id)
+            tenant_id = user.tenant_id
+            assert UserStaffMappingService(db).staff_id_for_user(user) == staff[0]
+
+            staff_bulk.delete_staff(db, [db.get(Staff, staff[0])], tenant_id, "boss@example.com")
+
+            assert UserStaffMappingService(db).staff_id_for_user(db.get(User, user_id)) is None
+
+    def test_broadcast_reaches_other_workers(self, engine, seeded):
+        user_id, staff = seeded
+        writer, reader = UserStaffMappingCache(ttl_seconds=60), UserStaffMappingCache(ttl_seconds=60)
+        published = []
+        writer._redis = object()
+        writer._schedule_publish = published.append
+        with Session(engine) as db:
+            UserStaffMappingService(db, cache=reader).staff_id_for_user(db.get(User, user_id))
+            UserStaffMappingService(db, cache=reader).user_ids_for_staff([db.get(Staff, staff[1])])
+
+        writer.invalidate_emails(["Staff0@Example.com", None])
+        reader._apply_message(published[0])
+
+        assert published == ["\nstaff0@example.com"]
+        assert list(reader._entries) == [("staff", staff[1])]
+
+    def test_invalidation_during_load_is_not_stored(self):
+        cache = UserStaffMappingCache(ttl_seconds=60)
+        first, second = uuid.uuid4(), uuid.uuid4()
+
+        tokens = cache.start_load(["a@example.com", "B@example.com"])
+        cache.invalidate_emails(["b@example.com"], broadcast=False)  # committed while the read ran
+        cache.finish_load(tokens, [(("staff", first), None, "a@example.com"), (("staff", second), None, "b@example.com")])
+
+        assert list(cache._entries) == [("staff", first)]
+        assert cache._generations._counters == {}
+
+
+class TestCurrentStaffDependency:
+    """Test the get_current_staff dependency"""
+
+    def _client(self, engine, make_client, user_id):
+        with Session(engine) as db:
+            return make_client(db.get(User, user_id), whoami_router)
+
+    def test_resolves_staff(self, engine, seeded, make_client):
+        user_id, staff = seeded
+        assert self._client(engine, make_client, user_id).get("/whoami").json() == {"staff_id": str(staff[0])}
+
+    def test_missing_profile(self, engine, seeded, make_client):
+        user_id, _ = seeded
+        with Session(engine) as db:
+            stranger = User(tenant_id=db.get(User, user_id).tenant_id, email="nobody@example.com", hashed_password="x")
+            db.add(stranger)
+            db.commit()
+            stranger_id = stranger.id
+
+        assert self._client(engine, make_client, stranger_id).get("/whoami").status_code == 404
@@ -1822,7 +1822,16 @@ export default function SchedulePage() {
     try {
       console.log('Loading schedules for facility:', selectedFacility.name)
 
-      const schedulesData = await apiClient.getFacilitySchedules(selectedFacility.id)
+      // Only the weeks around the period on screen (a monthly view spans up to six weeks)
+      const windowStart = new Date(currentDate)
+      windowStart.setDate(windowStart.getDate() - 42)
+      const windowEnd = new Date(currentDate)
+      windowEnd.setDate(windowEnd.getDate() + 42)
+      const schedulesData = await apiClient.getFacilitySchedules(selectedFacility.id, {
+        start_date: windowStart.toISOString().split('T')[0],
+        end_date: windowEnd.toISOString().split('T')[0],
+        limit: 52,
+      })
 
       console.log('Raw API response:', {
         schedulesCount: schedulesData.length,
@@ -917,9 +917,22 @@ export class ApiClient {
   }
 
   // Schedule Management
-  async getFacilitySchedules(facilityId: string) {
-  return this.request<ApiTypes.ScheduleWithAssignments[]>(`/v1/schedule/facility/${facilityId}`)
-}
+  // Newest week first; without a window the API returns the 12 most recent weeks
+  async getFacilitySchedules(facilityId: string, params?: {
+    start_date?: string
+    end_date?: string
+    cursor?: string
+    limit?: number
+  }) {
+    const searchParams = new URLSearchParams()
+    Object.entries(params || {}).forEach(([key, value]) => {
+      if (value !== undefined) searchParams.append(key, String(value))
+    })
+    const queryString = searchParams.toString()
+    return this.request<ApiTypes.ScheduleWithAssignments[]>(
+      `/v1/schedule/facility/${facilityId}${queryString ? `?${queryString}` : ''}`
+    )
+  }
 
   async getSchedule(scheduleId: string) {
     return this.request<ApiTypes.ScheduleWithAssignments>(`/v1/schedule/${scheduleId}`)